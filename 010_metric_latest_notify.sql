@@ -0,0 +1,75 @@
+-- MS5.0 Floor Dashboard - Metric Latest Change Notifications
+-- Publishes metric_latest upserts on the 'metric_latest' channel so API pods can
+-- keep an in-memory mirror of current values instead of querying per request.
+
+-- ============================================================================
+-- 1. NOTIFY TRIGGER FUNCTION
+-- ============================================================================
+
+-- Payload stays well under the 8000 byte NOTIFY limit: JSON values and text
+-- values over 1024 characters are not forwarded. Those notifications carry
+-- "reload": true and consumers reload the row from metric_latest instead.
+CREATE OR REPLACE FUNCTION factory_telemetry.notify_metric_latest()
+RETURNS TRIGGER AS $$
+DECLARE
+    needs_reload BOOLEAN := NEW.value_json IS NOT NULL
+        OR COALESCE(length(NEW.value_text) > 1024, FALSE);
+BEGIN
+    PERFORM pg_notify(
+        'metric_latest',
+        json_build_object(
+            'metric_def_id', NEW.metric_def_id,
+            'ts', NEW.ts,
+            'value_bool', NEW.value_bool,
+            'value_int', NEW.value_int,
+            'value_real', NEW.value_real,
+            'value_text', CASE WHEN needs_reload THEN NULL ELSE NEW.value_text END,
+            'reload', needs_reload
+        )::text
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- 2. TRIGGERS
+-- ============================================================================
+
+DROP TRIGGER IF EXISTS trg_metric_latest_notify_insert ON factory_telemetry.metric_latest;
+CREATE TRIGGER trg_metric_latest_notify_insert
+    AFTER INSERT ON factory_telemetry.metric_latest
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.notify_metric_latest();
+
+-- The poller upserts every metric each second; only notify when the value changes
+DROP TRIGGER IF EXISTS trg_metric_latest_notify_update ON factory_telemetry.metric_latest;
+CREATE TRIGGER trg_metric_latest_notify_update
+    AFTER UPDATE ON factory_telemetry.metric_latest
+    FOR EACH ROW
+    WHEN (
+        OLD.value_bool IS DISTINCT FROM NEW.value_bool OR
+        OLD.value_int IS DISTINCT FROM NEW.value_int OR
+        OLD.value_real IS DISTINCT FROM NEW.value_real OR
+        OLD.value_text IS DISTINCT FROM NEW.value_text OR
+        OLD.value_json IS DISTINCT FROM NEW.value_json
+    )
+    EXECUTE FUNCTION factory_telemetry.notify_metric_latest();
+
+-- ============================================================================
+-- 3. METRIC DEFINITION CHANGES
+-- ============================================================================
+
+-- New or removed metric definitions change the slot layout of the mirror
+CREATE OR REPLACE FUNCTION factory_telemetry.notify_metric_def_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('metric_def_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_metric_def_changed ON factory_telemetry.metric_def;
+CREATE TRIGGER trg_metric_def_changed
+    AFTER INSERT OR UPDATE OR DELETE ON factory_telemetry.metric_def
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION factory_telemetry.notify_metric_def_changed();
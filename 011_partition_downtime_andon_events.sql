@@ -0,0 +1,130 @@
+-- MS5.0 Floor Dashboard - Time-Partitioned Downtime and Andon Events
+-- Converts downtime_events and andon_events into TimescaleDB hypertables so
+-- analytics over line + time range only touch the chunks in range, and
+-- replaces single-column btree indexes with composite and BRIN indexes.
+--
+-- Existing rows are preserved: create_hypertable(... migrate_data => TRUE)
+-- moves them into chunks in place. Run inside a maintenance window; the
+-- migration takes an ACCESS EXCLUSIVE lock on both tables while data moves.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. DOWNTIME EVENTS
+-- ============================================================================
+
+-- Unique constraints on a hypertable must include the partitioning column
+ALTER TABLE factory_telemetry.downtime_events
+DROP CONSTRAINT IF EXISTS downtime_events_pkey;
+
+ALTER TABLE factory_telemetry.downtime_events
+ADD CONSTRAINT downtime_events_pkey PRIMARY KEY (id, start_time);
+
+SELECT create_hypertable(
+    'factory_telemetry.downtime_events',
+    'start_time',
+    chunk_time_interval => INTERVAL '7 days',
+    create_default_indexes => FALSE,
+    migrate_data => TRUE,
+    if_not_exists => TRUE
+);
+
+-- ============================================================================
+-- 2. ANDON EVENTS
+-- ============================================================================
+
+-- The partitioning column must be NOT NULL
+UPDATE factory_telemetry.andon_events
+SET reported_at = COALESCE(acknowledged_at, resolved_at, NOW())
+WHERE reported_at IS NULL;
+
+ALTER TABLE factory_telemetry.andon_events
+ALTER COLUMN reported_at SET NOT NULL;
+
+-- andon_escalations.event_id referenced andon_events(id), which can no longer be
+-- unique on its own. Integrity is kept by the triggers in section 3.
+ALTER TABLE factory_telemetry.andon_escalations
+DROP CONSTRAINT IF EXISTS andon_escalations_event_id_fkey;
+
+ALTER TABLE factory_telemetry.andon_events
+DROP CONSTRAINT IF EXISTS andon_events_pkey;
+
+ALTER TABLE factory_telemetry.andon_events
+ADD CONSTRAINT andon_events_pkey PRIMARY KEY (id, reported_at);
+
+SELECT create_hypertable(
+    'factory_telemetry.andon_events',
+    'reported_at',
+    chunk_time_interval => INTERVAL '7 days',
+    create_default_indexes => FALSE,
+    migrate_data => TRUE,
+    if_not_exists => TRUE
+);
+
+-- ============================================================================
+-- 3. ANDON ESCALATION REFERENTIAL INTEGRITY
+-- ============================================================================
+
+-- Replaces REFERENCES factory_telemetry.andon_events(id)
+CREATE OR REPLACE FUNCTION factory_telemetry.check_andon_escalation_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM factory_telemetry.andon_events WHERE id = NEW.event_id
+    ) THEN
+        RAISE EXCEPTION 'andon event % does not exist', NEW.event_id
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_andon_escalations_event_fk ON factory_telemetry.andon_escalations;
+CREATE TRIGGER trg_andon_escalations_event_fk
+    BEFORE INSERT OR UPDATE OF event_id ON factory_telemetry.andon_escalations
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.check_andon_escalation_event();
+
+-- Replaces ON DELETE CASCADE
+CREATE OR REPLACE FUNCTION factory_telemetry.cascade_andon_event_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM factory_telemetry.andon_escalations WHERE event_id = OLD.id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_andon_events_cascade_delete ON factory_telemetry.andon_events;
+CREATE TRIGGER trg_andon_events_cascade_delete
+    AFTER DELETE ON factory_telemetry.andon_events
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.cascade_andon_event_delete();
+
+-- ============================================================================
+-- 4. INDEXES
+-- ============================================================================
+
+-- Every analytics query filters on line plus time range
+CREATE INDEX IF NOT EXISTS idx_downtime_events_line_equipment_time
+ON factory_telemetry.downtime_events (line_id, equipment_code, start_time DESC);
+
+CREATE INDEX IF NOT EXISTS idx_andon_events_line_equipment_time
+ON factory_telemetry.andon_events (line_id, equipment_code, reported_at DESC);
+
+-- Events are appended in time order, so BRIN summaries stay tight and tiny
+CREATE INDEX IF NOT EXISTS brin_downtime_events_start_time
+ON factory_telemetry.downtime_events USING BRIN (start_time) WITH (pages_per_range = 32);
+
+CREATE INDEX IF NOT EXISTS brin_andon_events_reported_at
+ON factory_telemetry.andon_events USING BRIN (reported_at) WITH (pages_per_range = 32);
+
+-- Superseded by the composite and BRIN indexes above. Lookups by id alone
+-- (updates, acknowledgements) use the (id, time) primary key.
+DROP INDEX IF EXISTS factory_telemetry.idx_downtime_events_start_time;
+DROP INDEX IF EXISTS factory_telemetry.idx_downtime_events_line_id;
+DROP INDEX IF EXISTS factory_telemetry.idx_andon_events_line_id;
+
+COMMIT;
+
+ANALYZE factory_telemetry.downtime_events;
+ANALYZE factory_telemetry.andon_events;
@@ -0,0 +1,239 @@
+-- MS5.0 Floor Dashboard - Incremental OEE Rollups
+-- Maintains hour, shift and day rollups per line/equipment as oee_calculations
+-- and downtime_events are written, so daily and shift OEE reads are primary key
+-- lookups instead of re-aggregating the raw tables.
+--
+-- Rollups are kept by row triggers and therefore change in the same
+-- transaction as the rows they summarize. Buckets are UTC wall-clock times,
+-- matching the naive UTC timestamps used by the application. Downtime is
+-- attributed to the bucket containing the event start_time, the same rule the
+-- OEE calculator uses when it sums downtime over a window.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. ROLLUP TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS factory_telemetry.oee_rollups (
+    line_id UUID NOT NULL,
+    equipment_code TEXT NOT NULL,
+    granularity TEXT NOT NULL CHECK (granularity IN ('hour', 'shift', 'day')),
+    bucket_start TIMESTAMP NOT NULL,
+    bucket_seconds INTEGER NOT NULL,
+    shift_id UUID REFERENCES factory_telemetry.production_shifts(id),
+    calculation_count INTEGER NOT NULL DEFAULT 0,
+    good_parts BIGINT NOT NULL DEFAULT 0,
+    total_parts BIGINT NOT NULL DEFAULT 0,
+    cycle_time_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    cycle_time_count INTEGER NOT NULL DEFAULT 0,
+    availability_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    performance_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    quality_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    oee_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    downtime_event_count INTEGER NOT NULL DEFAULT 0,
+    unplanned_downtime_seconds BIGINT NOT NULL DEFAULT 0,
+    planned_downtime_seconds BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (line_id, granularity, bucket_start, equipment_code)
+);
+
+CREATE INDEX IF NOT EXISTS idx_oee_rollups_equipment_bucket
+ON factory_telemetry.oee_rollups (equipment_code, granularity, bucket_start DESC);
+
+-- ============================================================================
+-- 2. BUCKET RESOLUTION
+-- ============================================================================
+
+-- Hour, day and (when a shift covers the time) shift buckets for a timestamp.
+-- Shifts that wrap midnight (e.g. 22:00-06:00) start on the previous day for
+-- times before their end.
+CREATE OR REPLACE FUNCTION factory_telemetry.oee_rollup_buckets(event_time TIMESTAMPTZ)
+RETURNS TABLE (granularity TEXT, bucket_start TIMESTAMP, bucket_seconds INTEGER, shift_id UUID) AS $$
+DECLARE
+    utc_time TIMESTAMP := event_time AT TIME ZONE 'UTC';
+BEGIN
+    RETURN QUERY SELECT 'hour'::TEXT, date_trunc('hour', utc_time), 3600, NULL::UUID;
+    RETURN QUERY SELECT 'day'::TEXT, date_trunc('day', utc_time), 86400, NULL::UUID;
+
+    RETURN QUERY
+    SELECT
+        'shift'::TEXT,
+        CASE
+            WHEN s.start_time < s.end_time OR utc_time::TIME >= s.start_time
+                THEN utc_time::DATE + s.start_time
+            ELSE utc_time::DATE - 1 + s.start_time
+        END,
+        EXTRACT(EPOCH FROM (
+            CASE WHEN s.start_time < s.end_time
+                THEN s.end_time - s.start_time
+                ELSE s.end_time - s.start_time + INTERVAL '24 hours'
+            END
+        ))::INTEGER,
+        s.id
+    FROM factory_telemetry.production_shifts s
+    WHERE s.enabled
+    AND (
+        (s.start_time < s.end_time AND utc_time::TIME >= s.start_time AND utc_time::TIME < s.end_time)
+        OR (s.start_time >= s.end_time AND (utc_time::TIME >= s.start_time OR utc_time::TIME < s.end_time))
+    )
+    ORDER BY s.start_time
+    LIMIT 1;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- ============================================================================
+-- 3. OEE CALCULATION TRIGGER
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION factory_telemetry.rollup_oee_calculation()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.line_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO factory_telemetry.oee_rollups AS r (
+        line_id, equipment_code, granularity, bucket_start, bucket_seconds, shift_id,
+        calculation_count, good_parts, total_parts, cycle_time_sum, cycle_time_count,
+        availability_sum, performance_sum, quality_sum, oee_sum
+    )
+    SELECT
+        NEW.line_id, NEW.equipment_code, b.granularity, b.bucket_start, b.bucket_seconds, b.shift_id,
+        1, COALESCE(NEW.good_parts, 0), COALESCE(NEW.total_parts, 0),
+        COALESCE(NEW.actual_cycle_time, 0), CASE WHEN NEW.actual_cycle_time IS NULL THEN 0 ELSE 1 END,
+        NEW.availability, NEW.performance, NEW.quality, NEW.oee
+    FROM factory_telemetry.oee_rollup_buckets(NEW.calculation_time) b
+    ON CONFLICT (line_id, granularity, bucket_start, equipment_code) DO UPDATE SET
+        calculation_count = r.calculation_count + EXCLUDED.calculation_count,
+        good_parts = r.good_parts + EXCLUDED.good_parts,
+        total_parts = r.total_parts + EXCLUDED.total_parts,
+        cycle_time_sum = r.cycle_time_sum + EXCLUDED.cycle_time_sum,
+        cycle_time_count = r.cycle_time_count + EXCLUDED.cycle_time_count,
+        availability_sum = r.availability_sum + EXCLUDED.availability_sum,
+        performance_sum = r.performance_sum + EXCLUDED.performance_sum,
+        quality_sum = r.quality_sum + EXCLUDED.quality_sum,
+        oee_sum = r.oee_sum + EXCLUDED.oee_sum,
+        updated_at = NOW();
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_oee_calculations_rollup ON factory_telemetry.oee_calculations;
+CREATE TRIGGER trg_oee_calculations_rollup
+    AFTER INSERT ON factory_telemetry.oee_calculations
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.rollup_oee_calculation();
+
+-- ============================================================================
+-- 4. DOWNTIME EVENT TRIGGER
+-- ============================================================================
+
+-- Adds (sign = 1) or removes (sign = -1) one downtime event's contribution
+CREATE OR REPLACE FUNCTION factory_telemetry.apply_downtime_rollup(
+    event factory_telemetry.downtime_events,
+    sign INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    IF event.line_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO factory_telemetry.oee_rollups AS r (
+        line_id, equipment_code, granularity, bucket_start, bucket_seconds, shift_id,
+        downtime_event_count, unplanned_downtime_seconds, planned_downtime_seconds
+    )
+    SELECT
+        event.line_id, event.equipment_code, b.granularity, b.bucket_start, b.bucket_seconds, b.shift_id,
+        sign,
+        CASE WHEN event.category = 'unplanned' THEN sign * COALESCE(event.duration_seconds, 0) ELSE 0 END,
+        CASE WHEN event.category = 'unplanned' THEN 0 ELSE sign * COALESCE(event.duration_seconds, 0) END
+    FROM factory_telemetry.oee_rollup_buckets(event.start_time) b
+    ON CONFLICT (line_id, granularity, bucket_start, equipment_code) DO UPDATE SET
+        downtime_event_count = r.downtime_event_count + EXCLUDED.downtime_event_count,
+        unplanned_downtime_seconds = r.unplanned_downtime_seconds + EXCLUDED.unplanned_downtime_seconds,
+        planned_downtime_seconds = r.planned_downtime_seconds + EXCLUDED.planned_downtime_seconds,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION factory_telemetry.rollup_downtime_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM factory_telemetry.apply_downtime_rollup(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM factory_telemetry.apply_downtime_rollup(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Events are usually opened without a duration and closed later, so only
+-- updates that move the contribution need to touch the rollups
+DROP TRIGGER IF EXISTS trg_downtime_events_rollup ON factory_telemetry.downtime_events;
+CREATE TRIGGER trg_downtime_events_rollup
+    AFTER INSERT OR DELETE ON factory_telemetry.downtime_events
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.rollup_downtime_event();
+
+DROP TRIGGER IF EXISTS trg_downtime_events_rollup_update ON factory_telemetry.downtime_events;
+CREATE TRIGGER trg_downtime_events_rollup_update
+    AFTER UPDATE ON factory_telemetry.downtime_events
+    FOR EACH ROW
+    WHEN (
+        OLD.line_id IS DISTINCT FROM NEW.line_id OR
+        OLD.equipment_code IS DISTINCT FROM NEW.equipment_code OR
+        OLD.start_time IS DISTINCT FROM NEW.start_time OR
+        OLD.duration_seconds IS DISTINCT FROM NEW.duration_seconds OR
+        OLD.category IS DISTINCT FROM NEW.category
+    )
+    EXECUTE FUNCTION factory_telemetry.rollup_downtime_event();
+
+-- ============================================================================
+-- 5. BACKFILL
+-- ============================================================================
+
+TRUNCATE factory_telemetry.oee_rollups;
+
+INSERT INTO factory_telemetry.oee_rollups AS r (
+    line_id, equipment_code, granularity, bucket_start, bucket_seconds, shift_id,
+    calculation_count, good_parts, total_parts, cycle_time_sum, cycle_time_count,
+    availability_sum, performance_sum, quality_sum, oee_sum
+)
+SELECT
+    oc.line_id, oc.equipment_code, b.granularity, b.bucket_start,
+    MAX(b.bucket_seconds), (array_agg(b.shift_id))[1],
+    COUNT(*), COALESCE(SUM(oc.good_parts), 0), COALESCE(SUM(oc.total_parts), 0),
+    COALESCE(SUM(oc.actual_cycle_time), 0), COUNT(oc.actual_cycle_time),
+    SUM(oc.availability), SUM(oc.performance), SUM(oc.quality), SUM(oc.oee)
+FROM factory_telemetry.oee_calculations oc
+CROSS JOIN LATERAL factory_telemetry.oee_rollup_buckets(oc.calculation_time) b
+WHERE oc.line_id IS NOT NULL
+GROUP BY oc.line_id, oc.equipment_code, b.granularity, b.bucket_start;
+
+INSERT INTO factory_telemetry.oee_rollups AS r (
+    line_id, equipment_code, granularity, bucket_start, bucket_seconds, shift_id,
+    downtime_event_count, unplanned_downtime_seconds, planned_downtime_seconds
+)
+SELECT
+    de.line_id, de.equipment_code, b.granularity, b.bucket_start,
+    MAX(b.bucket_seconds), (array_agg(b.shift_id))[1],
+    COUNT(*),
+    COALESCE(SUM(de.duration_seconds) FILTER (WHERE de.category = 'unplanned'), 0),
+    COALESCE(SUM(de.duration_seconds) FILTER (WHERE de.category IS DISTINCT FROM 'unplanned'), 0)
+FROM factory_telemetry.downtime_events de
+CROSS JOIN LATERAL factory_telemetry.oee_rollup_buckets(de.start_time) b
+WHERE de.line_id IS NOT NULL
+GROUP BY de.line_id, de.equipment_code, b.granularity, b.bucket_start
+ON CONFLICT (line_id, granularity, bucket_start, equipment_code) DO UPDATE SET
+    downtime_event_count = EXCLUDED.downtime_event_count,
+    unplanned_downtime_seconds = EXCLUDED.unplanned_downtime_seconds,
+    planned_downtime_seconds = EXCLUDED.planned_downtime_seconds;
+
+COMMIT;
+
+ANALYZE factory_telemetry.oee_rollups;
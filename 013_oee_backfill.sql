@@ -0,0 +1,144 @@
+-- MS5.0 Floor Dashboard - OEE Recalculation Backfill
+-- Tracks resumable OEE recalculation jobs split into (line, time range)
+-- chunks that worker processes claim independently, and keeps the OEE
+-- rollups correct when stored calculations are updated or deleted.
+--
+-- Chunks are claimed with FOR UPDATE SKIP LOCKED, so any number of workers
+-- can drain a job in parallel; a chunk left 'running' by a crashed worker is
+-- claimable again once its claim is older than the stale timeout.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. JOB AND CHUNK TABLES
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS factory_telemetry.oee_backfill_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    line_ids UUID[] NOT NULL,
+    equipment_code TEXT,
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP NOT NULL,
+    chunk_hours INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    total_chunks INTEGER NOT NULL DEFAULT 0,
+    completed_chunks INTEGER NOT NULL DEFAULT 0,
+    failed_chunks INTEGER NOT NULL DEFAULT 0,
+    rows_written BIGINT NOT NULL DEFAULT 0,
+    requested_by UUID,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ,
+    CHECK (end_time > start_time)
+);
+
+CREATE TABLE IF NOT EXISTS factory_telemetry.oee_backfill_chunks (
+    job_id UUID NOT NULL REFERENCES factory_telemetry.oee_backfill_jobs(id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    line_id UUID NOT NULL,
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    rows_written INTEGER NOT NULL DEFAULT 0,
+    claimed_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ,
+    error TEXT,
+    PRIMARY KEY (job_id, chunk_index)
+);
+
+-- Claim order: unfinished chunks of a job, oldest range first
+CREATE INDEX IF NOT EXISTS idx_oee_backfill_chunks_claimable
+ON factory_telemetry.oee_backfill_chunks (job_id, chunk_index)
+WHERE status IN ('pending', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_oee_backfill_jobs_status
+ON factory_telemetry.oee_backfill_jobs (status, created_at DESC);
+
+-- ============================================================================
+-- 2. OEE CALCULATION ROLLUP MAINTENANCE
+-- ============================================================================
+
+-- Adds (sign = 1) or removes (sign = -1) one calculation's contribution
+CREATE OR REPLACE FUNCTION factory_telemetry.apply_oee_calculation_rollup(
+    calc factory_telemetry.oee_calculations,
+    sign INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    IF calc.line_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO factory_telemetry.oee_rollups AS r (
+        line_id, equipment_code, granularity, bucket_start, bucket_seconds, shift_id,
+        calculation_count, good_parts, total_parts, cycle_time_sum, cycle_time_count,
+        availability_sum, performance_sum, quality_sum, oee_sum
+    )
+    SELECT
+        calc.line_id, calc.equipment_code, b.granularity, b.bucket_start, b.bucket_seconds, b.shift_id,
+        sign, sign * COALESCE(calc.good_parts, 0), sign * COALESCE(calc.total_parts, 0),
+        sign * COALESCE(calc.actual_cycle_time, 0), CASE WHEN calc.actual_cycle_time IS NULL THEN 0 ELSE sign END,
+        sign * calc.availability, sign * calc.performance, sign * calc.quality, sign * calc.oee
+    FROM factory_telemetry.oee_rollup_buckets(calc.calculation_time) b
+    ON CONFLICT (line_id, granularity, bucket_start, equipment_code) DO UPDATE SET
+        calculation_count = r.calculation_count + EXCLUDED.calculation_count,
+        good_parts = r.good_parts + EXCLUDED.good_parts,
+        total_parts = r.total_parts + EXCLUDED.total_parts,
+        cycle_time_sum = r.cycle_time_sum + EXCLUDED.cycle_time_sum,
+        cycle_time_count = r.cycle_time_count + EXCLUDED.cycle_time_count,
+        availability_sum = r.availability_sum + EXCLUDED.availability_sum,
+        performance_sum = r.performance_sum + EXCLUDED.performance_sum,
+        quality_sum = r.quality_sum + EXCLUDED.quality_sum,
+        oee_sum = r.oee_sum + EXCLUDED.oee_sum,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bulk writers (the backfill) set factory_telemetry.skip_oee_rollup = 'on'
+-- for their transaction and apply one set-based rollup delta instead
+CREATE OR REPLACE FUNCTION factory_telemetry.rollup_oee_calculation()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('factory_telemetry.skip_oee_rollup', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM factory_telemetry.apply_oee_calculation_rollup(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM factory_telemetry.apply_oee_calculation_rollup(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_oee_calculations_rollup ON factory_telemetry.oee_calculations;
+CREATE TRIGGER trg_oee_calculations_rollup
+    AFTER INSERT OR DELETE ON factory_telemetry.oee_calculations
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.rollup_oee_calculation();
+
+DROP TRIGGER IF EXISTS trg_oee_calculations_rollup_update ON factory_telemetry.oee_calculations;
+CREATE TRIGGER trg_oee_calculations_rollup_update
+    AFTER UPDATE ON factory_telemetry.oee_calculations
+    FOR EACH ROW
+    WHEN (
+        OLD.line_id IS DISTINCT FROM NEW.line_id OR
+        OLD.equipment_code IS DISTINCT FROM NEW.equipment_code OR
+        OLD.calculation_time IS DISTINCT FROM NEW.calculation_time OR
+        OLD.availability IS DISTINCT FROM NEW.availability OR
+        OLD.performance IS DISTINCT FROM NEW.performance OR
+        OLD.quality IS DISTINCT FROM NEW.quality OR
+        OLD.oee IS DISTINCT FROM NEW.oee OR
+        OLD.good_parts IS DISTINCT FROM NEW.good_parts OR
+        OLD.total_parts IS DISTINCT FROM NEW.total_parts OR
+        OLD.actual_cycle_time IS DISTINCT FROM NEW.actual_cycle_time
+    )
+    EXECUTE FUNCTION factory_telemetry.rollup_oee_calculation();
+
+COMMIT;
@@ -0,0 +1,54 @@
+-- MS5.0 Floor Dashboard - Equipment Registry Change Notifications
+-- The API and poller processes keep an in-memory registry of equipment
+-- configuration, line membership and the fault catalog. Any change to those
+-- tables is published on the 'equipment_registry_changed' channel so every
+-- process reloads its registry instead of querying the tables per calculation.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. FAULT SEVERITY
+-- ============================================================================
+
+-- Severity drives Andon priority and downtime reason selection; it was
+-- previously hard-coded in the services alongside a copy of the catalog
+ALTER TABLE factory_telemetry.fault_catalog
+ADD COLUMN IF NOT EXISTS severity TEXT NOT NULL DEFAULT 'medium'
+    CHECK (severity IN ('critical', 'high', 'medium', 'low'));
+
+-- ============================================================================
+-- 2. NOTIFY TRIGGER FUNCTION
+-- ============================================================================
+
+-- Payload is the changed table; consumers reload the whole registry
+CREATE OR REPLACE FUNCTION factory_telemetry.notify_equipment_registry_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('equipment_registry_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- 3. TRIGGERS
+-- ============================================================================
+
+DROP TRIGGER IF EXISTS trg_equipment_config_registry_changed ON factory_telemetry.equipment_config;
+CREATE TRIGGER trg_equipment_config_registry_changed
+    AFTER INSERT OR UPDATE OR DELETE ON factory_telemetry.equipment_config
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION factory_telemetry.notify_equipment_registry_changed();
+
+DROP TRIGGER IF EXISTS trg_fault_catalog_registry_changed ON factory_telemetry.fault_catalog;
+CREATE TRIGGER trg_fault_catalog_registry_changed
+    AFTER INSERT OR UPDATE OR DELETE ON factory_telemetry.fault_catalog
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION factory_telemetry.notify_equipment_registry_changed();
+
+DROP TRIGGER IF EXISTS trg_production_lines_registry_changed ON factory_telemetry.production_lines;
+CREATE TRIGGER trg_production_lines_registry_changed
+    AFTER INSERT OR UPDATE OR DELETE ON factory_telemetry.production_lines
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION factory_telemetry.notify_equipment_registry_changed();
+
+COMMIT;
@@ -0,0 +1,81 @@
+-- MS5.0 Floor Dashboard - Shift Snapshots
+-- When a production shift ends, the final OEE, downtime and quality of each
+-- line is computed once from the shift rollups (012_oee_rollups.sql) and
+-- stored here. Shift reports, dashboards and trend tasks read the snapshot
+-- instead of recomputing the shift when everyone opens them at shift change.
+--
+-- Snapshots are immutable: a closed shift is written once and never updated.
+-- Every insert is published on the 'shift_snapshot_closed' channel so the API
+-- process can push the closed shift to websocket subscribers.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. SNAPSHOT TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS factory_telemetry.shift_snapshots (
+    line_id UUID NOT NULL REFERENCES factory_telemetry.production_lines(id),
+    shift_start TIMESTAMP NOT NULL,
+    shift_end TIMESTAMP NOT NULL,
+    shift_id UUID REFERENCES factory_telemetry.production_shifts(id),
+    shift_name TEXT NOT NULL,
+    oee REAL NOT NULL,
+    availability REAL NOT NULL,
+    performance REAL NOT NULL,
+    quality REAL NOT NULL,
+    constraint_equipment TEXT,
+    good_parts BIGINT NOT NULL DEFAULT 0,
+    total_parts BIGINT NOT NULL DEFAULT 0,
+    downtime_event_count INTEGER NOT NULL DEFAULT 0,
+    unplanned_downtime_seconds BIGINT NOT NULL DEFAULT 0,
+    planned_downtime_seconds BIGINT NOT NULL DEFAULT 0,
+    equipment_oee JSONB NOT NULL DEFAULT '[]',
+    closed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (line_id, shift_start)
+);
+
+-- Shift close checks which lines already have a snapshot for a shift start
+CREATE INDEX IF NOT EXISTS idx_shift_snapshots_shift_start
+ON factory_telemetry.shift_snapshots (shift_start);
+
+-- ============================================================================
+-- 2. IMMUTABILITY
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION factory_telemetry.reject_shift_snapshot_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'shift snapshots are immutable (line %, shift start %)',
+        OLD.line_id, OLD.shift_start;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_shift_snapshots_immutable ON factory_telemetry.shift_snapshots;
+CREATE TRIGGER trg_shift_snapshots_immutable
+    BEFORE UPDATE OR DELETE ON factory_telemetry.shift_snapshots
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.reject_shift_snapshot_change();
+
+-- ============================================================================
+-- 3. CLOSE NOTIFICATION
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION factory_telemetry.notify_shift_snapshot_closed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify(
+        'shift_snapshot_closed',
+        json_build_object('line_id', NEW.line_id, 'shift_start', NEW.shift_start)::TEXT
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_shift_snapshots_closed ON factory_telemetry.shift_snapshots;
+CREATE TRIGGER trg_shift_snapshots_closed
+    AFTER INSERT ON factory_telemetry.shift_snapshots
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.notify_shift_snapshot_closed();
+
+COMMIT;
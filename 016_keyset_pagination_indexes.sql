@@ -0,0 +1,37 @@
+-- MS5.0 Floor Dashboard - Keyset Pagination Indexes
+-- The andon, downtime and job assignment listings page with a seek predicate
+-- on their sort key, e.g. (reported_at, id) < (:cursor_0, :cursor_1), instead
+-- of OFFSET. These composite indexes match the listings' ORDER BY ... DESC,
+-- id DESC so every page, however deep, is one index range scan.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. ANDON EVENTS
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_andon_events_reported_keyset
+ON factory_telemetry.andon_events (reported_at DESC, id DESC);
+
+-- Supervisors page through one line's events
+CREATE INDEX IF NOT EXISTS idx_andon_events_line_reported_keyset
+ON factory_telemetry.andon_events (line_id, reported_at DESC, id DESC);
+
+-- ============================================================================
+-- 2. DOWNTIME EVENTS
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_downtime_events_start_keyset
+ON factory_telemetry.downtime_events (start_time DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_downtime_events_line_start_keyset
+ON factory_telemetry.downtime_events (line_id, start_time DESC, id DESC);
+
+-- ============================================================================
+-- 3. JOB ASSIGNMENTS
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_job_assignments_assigned_keyset
+ON factory_telemetry.job_assignments (assigned_at DESC, id DESC);
+
+COMMIT;
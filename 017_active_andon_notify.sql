@@ -0,0 +1,64 @@
+-- MS5.0 Floor Dashboard - Active Andon Change Notifications
+-- Publishes Andon event creation, status changes and deletions on the
+-- 'andon_event_changed' channel so every API pod and worker keeps its
+-- in-memory index of open and acknowledged events current. Duplicate
+-- suppression during PLC fault storms then needs no query per fault.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. NOTIFY TRIGGER FUNCTION
+-- ============================================================================
+
+-- Payload stays well under the 8000 byte NOTIFY limit: the description is
+-- truncated. Deleted events are published with status 'deleted'.
+CREATE OR REPLACE FUNCTION factory_telemetry.notify_andon_event_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    event RECORD;
+    event_status TEXT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        event := OLD;
+        event_status := 'deleted';
+    ELSE
+        event := NEW;
+        event_status := NEW.status;
+    END IF;
+
+    PERFORM pg_notify(
+        'andon_event_changed',
+        json_build_object(
+            'id', event.id,
+            'line_id', event.line_id,
+            'equipment_code', event.equipment_code,
+            'event_type', event.event_type,
+            'priority', event.priority,
+            'description', LEFT(event.description, 1024),
+            'status', event_status,
+            'reported_at', event.reported_at
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- 2. TRIGGERS
+-- ============================================================================
+
+DROP TRIGGER IF EXISTS trg_andon_events_changed ON factory_telemetry.andon_events;
+CREATE TRIGGER trg_andon_events_changed
+    AFTER INSERT OR DELETE ON factory_telemetry.andon_events
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.notify_andon_event_changed();
+
+-- Escalation and note updates do not change what is active
+DROP TRIGGER IF EXISTS trg_andon_events_changed_status ON factory_telemetry.andon_events;
+CREATE TRIGGER trg_andon_events_changed_status
+    AFTER UPDATE OF status ON factory_telemetry.andon_events
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION factory_telemetry.notify_andon_event_changed();
+
+COMMIT;
@@ -0,0 +1,207 @@
+-- MS5.0 Floor Dashboard - Andon Escalation Deadlines
+-- Stores each escalation's next deadline as an absolute, indexed due_at
+-- instead of evaluating created_at < NOW() - INTERVAL '1 minute' * timeout per
+-- row. due_at is maintained by trigger from status and timeouts, published on
+-- the 'andon_escalation_due' channel, and fired to the second by the
+-- escalation scheduler in each API replica. fire_andon_escalation() claims the
+-- deadline under the row lock, so exactly one replica escalates. As under the
+-- one-minute poll this replaces, an acknowledged escalation keeps escalating a
+-- minute after each firing until it is resolved or reaches the last level.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. DEADLINE COLUMNS
+-- ============================================================================
+
+ALTER TABLE factory_telemetry.andon_escalations
+ADD COLUMN IF NOT EXISTS due_at TIMESTAMPTZ;
+
+-- Read and written by the reminder path, never declared by 005
+ALTER TABLE factory_telemetry.andon_escalations
+ADD COLUMN IF NOT EXISTS last_reminder_sent_at TIMESTAMPTZ;
+
+UPDATE factory_telemetry.andon_escalations
+SET due_at = CASE
+    WHEN status = 'active' AND acknowledged_at IS NULL THEN
+        created_at + INTERVAL '1 minute' * acknowledgment_timeout_minutes
+    WHEN status = 'acknowledged' AND resolved_at IS NULL THEN
+        created_at + INTERVAL '1 minute' * resolution_timeout_minutes
+    ELSE NULL
+END;
+
+-- Only pending deadlines are indexed; closed escalations carry NULL
+CREATE INDEX IF NOT EXISTS idx_andon_escalations_due_at
+ON factory_telemetry.andon_escalations (due_at)
+WHERE due_at IS NOT NULL;
+
+-- ============================================================================
+-- 2. DEADLINE MAINTENANCE
+-- ============================================================================
+
+-- An active escalation is due at its acknowledgment timeout, an acknowledged
+-- one at its resolution timeout; any other status has no deadline. Updates
+-- that leave status and timeouts alone keep the stored due_at, so firing can
+-- clear or re-arm it.
+CREATE OR REPLACE FUNCTION factory_telemetry.set_andon_escalation_due_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT'
+       OR NEW.status IS DISTINCT FROM OLD.status
+       OR NEW.acknowledgment_timeout_minutes IS DISTINCT FROM OLD.acknowledgment_timeout_minutes
+       OR NEW.resolution_timeout_minutes IS DISTINCT FROM OLD.resolution_timeout_minutes THEN
+        NEW.due_at := CASE
+            WHEN NEW.status = 'active' AND NEW.acknowledged_at IS NULL THEN
+                COALESCE(NEW.created_at, NOW()) + INTERVAL '1 minute' * NEW.acknowledgment_timeout_minutes
+            WHEN NEW.status = 'acknowledged' AND NEW.resolved_at IS NULL THEN
+                COALESCE(NEW.created_at, NOW()) + INTERVAL '1 minute' * NEW.resolution_timeout_minutes
+            ELSE NULL
+        END;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_andon_escalations_due_at ON factory_telemetry.andon_escalations;
+CREATE TRIGGER trg_andon_escalations_due_at
+    BEFORE INSERT OR UPDATE ON factory_telemetry.andon_escalations
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.set_andon_escalation_due_at();
+
+-- ============================================================================
+-- 3. DEADLINE NOTIFICATIONS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION factory_telemetry.notify_andon_escalation_due()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.due_at IS NOT DISTINCT FROM OLD.due_at
+       AND NEW.status IS NOT DISTINCT FROM OLD.status
+       AND NEW.last_reminder_sent_at IS NOT DISTINCT FROM OLD.last_reminder_sent_at THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM pg_notify(
+        'andon_escalation_due',
+        json_build_object(
+            'id', NEW.id,
+            'status', NEW.status,
+            'due_at', NEW.due_at,
+            'last_reminder_sent_at', NEW.last_reminder_sent_at,
+            'escalated_at', NEW.escalated_at
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_andon_escalations_due_notify ON factory_telemetry.andon_escalations;
+CREATE TRIGGER trg_andon_escalations_due_notify
+    AFTER INSERT OR UPDATE ON factory_telemetry.andon_escalations
+    FOR EACH ROW
+    EXECUTE FUNCTION factory_telemetry.notify_andon_escalation_due();
+
+-- ============================================================================
+-- 4. FIRING
+-- ============================================================================
+
+-- Escalate one due escalation to its next level. Returns a row only for the
+-- caller that claimed the deadline: concurrent callers block on the row lock
+-- and then find due_at cleared or moved on.
+CREATE OR REPLACE FUNCTION factory_telemetry.fire_andon_escalation(p_escalation_id UUID)
+RETURNS TABLE (
+    fired_level INTEGER,
+    fired_priority TEXT,
+    fired_recipients TEXT[],
+    fired_methods TEXT[]
+) AS $$
+DECLARE
+    escalation_record RECORD;
+    escalation_rule RECORD;
+    next_escalation_level INTEGER;
+BEGIN
+    UPDATE factory_telemetry.andon_escalations ae
+    SET due_at = NULL
+    WHERE ae.id = p_escalation_id
+    AND ae.due_at <= NOW()
+    AND ae.status IN ('active', 'acknowledged')
+    RETURNING ae.id, ae.priority, ae.escalation_level, ae.status
+    INTO escalation_record;
+
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    next_escalation_level := escalation_record.escalation_level + 1;
+
+    SELECT r.recipients, r.notification_methods INTO escalation_rule
+    FROM factory_telemetry.andon_escalation_rules r
+    WHERE r.priority = escalation_record.priority
+    AND r.escalation_level = next_escalation_level
+    AND r.enabled = true
+    ORDER BY r.delay_minutes ASC
+    LIMIT 1;
+
+    IF NOT FOUND THEN
+        UPDATE factory_telemetry.andon_escalations ae
+        SET status = 'escalated',
+            escalated_at = NOW(),
+            escalation_level = next_escalation_level
+        WHERE ae.id = escalation_record.id;
+
+        INSERT INTO factory_telemetry.andon_escalation_history
+        (escalation_id, action, performed_at, notes, escalation_level)
+        VALUES
+        (escalation_record.id, 'escalated', NOW(), 'Maximum escalation level reached', next_escalation_level);
+
+        RETURN QUERY SELECT next_escalation_level, escalation_record.priority::TEXT,
+                            ARRAY[]::TEXT[], ARRAY[]::TEXT[];
+        RETURN;
+    END IF;
+
+    UPDATE factory_telemetry.andon_escalations ae
+    SET escalation_level = next_escalation_level,
+        escalation_recipients = escalation_rule.recipients,
+        escalated_at = NOW(),
+        status = CASE
+            WHEN escalation_record.status = 'active' THEN 'escalated'
+            ELSE escalation_record.status
+        END,
+        -- Still acknowledged and unresolved: due again at the next poll interval
+        due_at = CASE
+            WHEN escalation_record.status = 'acknowledged' THEN NOW() + INTERVAL '1 minute'
+            ELSE NULL
+        END
+    WHERE ae.id = escalation_record.id;
+
+    INSERT INTO factory_telemetry.andon_escalation_history
+    (escalation_id, action, performed_at, notes, escalation_level, recipients_notified)
+    VALUES
+    (escalation_record.id, 'escalated', NOW(),
+     'Escalated to level ' || next_escalation_level || ' after timeout',
+     next_escalation_level, escalation_rule.recipients);
+
+    RETURN QUERY SELECT next_escalation_level, escalation_record.priority::TEXT,
+                        escalation_rule.recipients, escalation_rule.notification_methods;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The batch entry point now fires whatever is due through the due_at index
+CREATE OR REPLACE FUNCTION factory_telemetry.auto_escalate_andon_events()
+RETURNS void AS $$
+DECLARE
+    due_record RECORD;
+BEGIN
+    FOR due_record IN
+        SELECT ae.id
+        FROM factory_telemetry.andon_escalations ae
+        WHERE ae.due_at <= NOW()
+        ORDER BY ae.due_at
+    LOOP
+        PERFORM factory_telemetry.fire_andon_escalation(due_record.id);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
@@ -0,0 +1,33 @@
+-- MS5.0 Floor Dashboard - Downtime Micro-Stops
+-- Stops shorter than DOWNTIME_DETECTION_THRESHOLD are no longer written as
+-- individual downtime_events rows. The downtime tracker accumulates them in
+-- memory per equipment, reason and interval, and flushes the counters here;
+-- longer stops are still promoted to full downtime events.
+--
+-- Flushes are additive upserts, so an interval may be flushed several times
+-- while it is open.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. MICRO-STOP TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS factory_telemetry.downtime_micro_stops (
+    line_id UUID NOT NULL REFERENCES factory_telemetry.production_lines(id),
+    equipment_code TEXT NOT NULL,
+    interval_start TIMESTAMPTZ NOT NULL,
+    reason_code TEXT NOT NULL,
+    category TEXT CHECK (category IN ('planned', 'unplanned', 'changeover', 'maintenance')),
+    stop_count INTEGER NOT NULL DEFAULT 0,
+    total_seconds REAL NOT NULL DEFAULT 0,
+    max_seconds REAL NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (line_id, equipment_code, interval_start, reason_code)
+);
+
+-- Downtime statistics read a line's micro-stops over a date range
+CREATE INDEX IF NOT EXISTS idx_downtime_micro_stops_interval_start
+ON factory_telemetry.downtime_micro_stops (interval_start);
+
+COMMIT;
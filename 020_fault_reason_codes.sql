@@ -0,0 +1,17 @@
+-- MS5.0 Floor Dashboard - Fault Reason Codes
+-- Downtime reason classification is compiled per equipment from the fault
+-- catalog into bitmask tables. Each fault may now name the downtime reason
+-- code it maps to; faults without one keep the reason derived from their
+-- name. Catalog changes reach the compiled rules through the existing
+-- 'equipment_registry_changed' notification (014_equipment_registry.sql).
+
+BEGIN;
+
+-- ============================================================================
+-- 1. REASON CODE OVERRIDE
+-- ============================================================================
+
+ALTER TABLE factory_telemetry.fault_catalog
+ADD COLUMN IF NOT EXISTS reason_code TEXT;
+
+COMMIT;
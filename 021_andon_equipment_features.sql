@@ -0,0 +1,50 @@
+-- MS5.0 Floor Dashboard - Andon Equipment Features
+-- Andon event prediction and predictive maintenance read per-equipment
+-- features materialized nightly from andon_events, instead of scanning the
+-- raw event history on every request. Each row holds one equipment's
+-- features over the trailing feature window: MTBF, MTTR, time to
+-- acknowledge, hourly and event-type histograms, and how often its events
+-- co-occur with events of other equipment on the same line.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. FEATURE TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS factory_telemetry.andon_equipment_features (
+    line_id UUID NOT NULL REFERENCES factory_telemetry.production_lines(id),
+    equipment_code TEXT NOT NULL,
+    window_start TIMESTAMPTZ NOT NULL,
+    window_end TIMESTAMPTZ NOT NULL,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    resolved_count INTEGER NOT NULL DEFAULT 0,
+    first_event_at TIMESTAMPTZ,
+    last_event_at TIMESTAMPTZ,
+    mtbf_minutes REAL,
+    mttr_minutes REAL,
+    mtta_minutes REAL,
+    hourly_histogram JSONB NOT NULL DEFAULT '[]',
+    event_type_counts JSONB NOT NULL DEFAULT '{}',
+    cooccurrence JSONB NOT NULL DEFAULT '{}',
+    materialized_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (line_id, equipment_code)
+);
+
+-- Materialization removes rows of equipment without events in the new window
+CREATE INDEX IF NOT EXISTS idx_andon_equipment_features_window_end
+ON factory_telemetry.andon_equipment_features (window_end);
+
+-- ============================================================================
+-- 2. RUN MARKERS
+-- ============================================================================
+
+-- One row per line covered by a materialization, so a line without events
+-- is told apart from a line that was never materialized
+CREATE TABLE IF NOT EXISTS factory_telemetry.andon_feature_runs (
+    line_id UUID PRIMARY KEY REFERENCES factory_telemetry.production_lines(id),
+    window_end TIMESTAMPTZ NOT NULL,
+    materialized_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMIT;
@@ -0,0 +1,49 @@
+-- MS5.0 Floor Dashboard - Notification Outbox
+-- Push notifications are written here before they are sent. The notification
+-- dispatcher delivers each message to all its recipients as FCM multicast
+-- batches over a bounded pool of concurrent requests, then records every
+-- recipient's outcome. Rows that failed transiently, or whose sending process
+-- died, are claimed again by any replica's retry loop until
+-- NOTIFICATION_MAX_ATTEMPTS is reached.
+--
+-- A recipient is sent a message with the same dedup_key at most once per
+-- NOTIFICATION_DEDUP_SECONDS; repeats within the window are coalesced and
+-- never written.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. OUTBOX TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS factory_telemetry.notification_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    notification_type TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    data JSONB NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'sending' CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 1,
+    available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at TIMESTAMPTZ DEFAULT NOW(),
+    sent_at TIMESTAMPTZ,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- ============================================================================
+-- 2. INDEXES
+-- ============================================================================
+
+-- Retry loop claims due pending rows and rows whose sending process died
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_retry
+ON factory_telemetry.notification_outbox (available_at)
+WHERE status IN ('pending', 'sending');
+
+-- Dedup window lookup of a recipient's recent messages
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_dedup
+ON factory_telemetry.notification_outbox (dedup_key, user_id, created_at DESC);
+
+COMMIT;
@@ -0,0 +1,65 @@
+-- MS5.0 Floor Dashboard - Notification Routing
+-- Andon notifications resolve their recipients from an in-memory routing
+-- table keyed by (line, priority, escalation level), holding each
+-- recipient's FCM token and notification preferences. The table is built from
+-- users, the escalation rules and the escalation recipient roles, and is
+-- rebuilt when the 'notification_routing_changed' NOTIFY channel reports a
+-- change to any of them or to the production lines.
+
+BEGIN;
+
+-- ============================================================================
+-- 1. RECIPIENT COLUMNS
+-- ============================================================================
+
+-- line_ids scopes a user's Andon notifications; NULL means every line
+ALTER TABLE factory_telemetry.users
+ADD COLUMN IF NOT EXISTS phone TEXT,
+ADD COLUMN IF NOT EXISTS fcm_token TEXT,
+ADD COLUMN IF NOT EXISTS line_ids UUID[],
+ADD COLUMN IF NOT EXISTS notification_preferences JSONB NOT NULL DEFAULT '{}';
+
+-- ============================================================================
+-- 2. NOTIFY TRIGGER FUNCTION
+-- ============================================================================
+
+-- Payload is the changed table; consumers rebuild the whole routing table
+CREATE OR REPLACE FUNCTION factory_telemetry.notify_notification_routing_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('notification_routing_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- 3. TRIGGERS
+-- ============================================================================
+
+-- Only columns that affect routing; logins update last_login on every sign-in
+DROP TRIGGER IF EXISTS trg_users_notification_routing_changed ON factory_telemetry.users;
+CREATE TRIGGER trg_users_notification_routing_changed
+    AFTER INSERT OR DELETE OR UPDATE OF role, email, phone, fcm_token, line_ids, notification_preferences, is_active
+    ON factory_telemetry.users
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION factory_telemetry.notify_notification_routing_changed();
+
+DROP TRIGGER IF EXISTS trg_andon_escalation_rules_routing_changed ON factory_telemetry.andon_escalation_rules;
+CREATE TRIGGER trg_andon_escalation_rules_routing_changed
+    AFTER INSERT OR UPDATE OR DELETE ON factory_telemetry.andon_escalation_rules
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION factory_telemetry.notify_notification_routing_changed();
+
+DROP TRIGGER IF EXISTS trg_andon_escalation_recipients_routing_changed ON factory_telemetry.andon_escalation_recipients;
+CREATE TRIGGER trg_andon_escalation_recipients_routing_changed
+    AFTER INSERT OR UPDATE OR DELETE ON factory_telemetry.andon_escalation_recipients
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION factory_telemetry.notify_notification_routing_changed();
+
+DROP TRIGGER IF EXISTS trg_production_lines_routing_changed ON factory_telemetry.production_lines;
+CREATE TRIGGER trg_production_lines_routing_changed
+    AFTER INSERT OR DELETE ON factory_telemetry.production_lines
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION factory_telemetry.notify_notification_routing_changed();
+
+COMMIT;
@@ -8,7 +8,7 @@ event creation, acknowledgment, resolution, and escalation management.
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from fastapi.responses import JSONResponse
 import structlog
 
@@ -20,6 +20,7 @@ from app.models.production import (
 )
 from app.services.andon_service import AndonService
 from app.utils.exceptions import NotFoundError, ValidationError, ConflictError, BusinessLogicError
+from app.utils.pagination import next_cursor
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = structlog.get_logger()
@@ -67,15 +68,17 @@ async def create_andon_event(
 
 @router.get("/events", response_model=List[AndonEventResponse], status_code=status.HTTP_200_OK)
 async def list_andon_events(
+    response: Response,
     line_id: Optional[UUID] = Query(None, description="Filter by production line ID"),
     status: Optional[str] = Query(None, description="Filter by event status"),
     priority: Optional[str] = Query(None, description="Filter by event priority"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    skip: int = Query(0, ge=0, description="Number of records to skip (ignored with a cursor)"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     current_user: UserContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> List[AndonEventResponse]:
-    """List Andon events with filters."""
+    """List Andon events with filters; the next page's cursor is in X-Next-Cursor."""
     try:
         # Check permissions
         if not current_user.has_permission(Permission.ANDON_READ):
@@ -93,9 +96,14 @@ async def list_andon_events(
             status=event_status,
             priority=event_priority,
             skip=skip,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
         
+        page_cursor = next_cursor(events, limit, "reported_at", "id")
+        if page_cursor:
+            response.headers["X-Next-Cursor"] = page_cursor
+        
         logger.debug(
             "Andon events listed via API",
             count=len(events),
@@ -104,7 +112,7 @@ async def list_andon_events(
         
         return events
         
-    except ValueError as e:
+    except (ValueError, ValidationError) as e:
         raise HTTPException(status_code=400, detail=f"Invalid parameter: {e}")
     except Exception as e:
         logger.error("Failed to list Andon events via API", error=str(e))
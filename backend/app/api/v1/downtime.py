@@ -9,7 +9,7 @@ from datetime import date, datetime
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.permissions import Permission, get_current_user, require_permission
@@ -20,6 +20,7 @@ from app.models.production import (
 )
 from app.services.downtime_tracker import DowntimeTracker
 from app.utils.exceptions import ValidationError, BusinessLogicError, NotFoundError
+from app.utils.pagination import next_cursor
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -28,6 +29,7 @@ router = APIRouter()
 
 @router.get("/events", response_model=List[DowntimeEventResponse])
 async def get_downtime_events(
+    response: Response,
     line_id: Optional[UUID] = Query(None, description="Filter by production line ID"),
     equipment_code: Optional[str] = Query(None, description="Filter by equipment code"),
     start_date: Optional[date] = Query(None, description="Filter by start date"),
@@ -35,11 +37,12 @@ async def get_downtime_events(
     category: Optional[str] = Query(None, description="Filter by category"),
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of events to return"),
-    offset: int = Query(0, ge=0, description="Number of events to skip"),
+    offset: int = Query(0, ge=0, description="Number of events to skip (ignored with a cursor)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     current_user = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get downtime events with filtering options."""
+    """Get downtime events with filtering options; the next page's cursor is in X-Next-Cursor."""
     try:
         # Check permissions
         if not current_user.has_permission(Permission.DOWNTIME_READ):
@@ -57,9 +60,14 @@ async def get_downtime_events(
             category=category,
             status=status,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
         
+        page_cursor = next_cursor(events, limit, "start_time", "id")
+        if page_cursor:
+            response.headers["X-Next-Cursor"] = page_cursor
+        
         logger.info(
             "Downtime events retrieved",
             user_id=current_user.user_id,
@@ -377,21 +385,20 @@ async def get_active_downtime_events(
         
         tracker = DowntimeTracker()
         
-        # Get active events from memory
+        # Get active events from the shared downtime state
         active_events = []
-        for equipment_code, event_data in tracker.active_events.items():
-            if line_id is None or event_data.get("line_id") == line_id:
-                active_events.append({
-                    "equipment_code": equipment_code,
-                    "line_id": event_data.get("line_id"),
-                    "start_time": event_data.get("start_time"),
-                    "reason_code": event_data.get("reason_code"),
-                    "reason_description": event_data.get("reason_description"),
-                    "category": event_data.get("category"),
-                    "duration_seconds": int((datetime.utcnow() - event_data.get("start_time", datetime.utcnow())).total_seconds()),
-                    "fault_data": event_data.get("fault_data", {}),
-                    "context_data": event_data.get("context_data", {})
-                })
+        for event_data in await tracker.get_active_downtime_events(line_id):
+            active_events.append({
+                "equipment_code": event_data["equipment_code"],
+                "line_id": event_data.get("line_id"),
+                "start_time": event_data.get("start_time"),
+                "reason_code": event_data.get("reason_code"),
+                "reason_description": event_data.get("reason_description"),
+                "category": event_data.get("category"),
+                "duration_seconds": int((datetime.utcnow() - event_data.get("start_time", datetime.utcnow())).total_seconds()),
+                "fault_data": event_data.get("fault_data", {}),
+                "context_data": event_data.get("context_data", {})
+            })
         
         logger.info(
             "Active downtime events retrieved",
@@ -16,9 +16,12 @@ import structlog
 
 from app.auth.permissions import get_current_user, UserContext, require_permission, Permission
 from app.database import get_db
+from app.services.oee_calculator import OEECalculator
 from app.services.plc_integrated_oee_calculator import PLCIntegratedOEECalculator
+from app.services.equipment_registry import equipment_registry
 from app.services.plc_integrated_downtime_tracker import PLCIntegratedDowntimeTracker
 from app.services.enhanced_telemetry_poller import EnhancedTelemetryPoller
+from app.services.metric_latest_store import metric_latest_store
 from app.utils.exceptions import NotFoundError, ValidationError, BusinessLogicError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -75,83 +78,46 @@ async def get_real_time_oee_analytics(
             "recommendations": []
         }
         
-        total_oee = 0.0
-        total_availability = 0.0
-        total_performance = 0.0
-        total_quality = 0.0
-        equipment_count = 0
+        # Line and equipment OEE come from one batched, constraint-weighted line calculation
+        line_summary = await plc_oee_calculator.get_current_line_oee(line_id, equipment_list)
         
-        # Calculate analytics for each equipment
-        for eq_code in equipment_list:
+        # Per-equipment trends and downtime over the last day from one hourly rollup read
+        equipment_history = {}
+        if include_trends or include_downtime_analysis:
             try:
-                # Get current PLC metrics
-                plc_metrics = await _get_current_plc_metrics(eq_code)
-                
-                # Calculate real-time OEE
-                oee_data = await plc_oee_calculator.calculate_real_time_oee(
-                    line_id=line_id,
-                    equipment_code=eq_code,
-                    current_metrics=plc_metrics
-                )
-                
-                # Get OEE trends if requested
-                trends_data = {}
-                if include_trends:
-                    trends_data = await plc_oee_calculator.get_oee_trends_from_plc(
-                        line_id=line_id,
-                        equipment_code=eq_code,
-                        days=7
-                    )
-                
-                # Get downtime analysis if requested
-                downtime_analysis = {}
-                if include_downtime_analysis:
-                    downtime_analysis = await plc_downtime_tracker.get_downtime_analysis(
-                        equipment_code=eq_code,
-                        hours=24
-                    )
-                
-                # Compile equipment analytics
-                equipment_analytics = {
-                    "equipment_code": eq_code,
-                    "oee": oee_data.get("oee", 0.0),
-                    "availability": oee_data.get("availability", 0.0),
-                    "performance": oee_data.get("performance", 0.0),
-                    "quality": oee_data.get("quality", 0.0),
-                    "oee_grade": _calculate_oee_grade(oee_data.get("oee", 0.0)),
-                    "plc_metrics": plc_metrics,
-                    "trends": trends_data,
-                    "downtime_analysis": downtime_analysis,
-                    "insights": _generate_equipment_insights(oee_data, plc_metrics),
-                    "recommendations": _generate_equipment_recommendations(oee_data, plc_metrics)
-                }
-                
-                analytics_data["equipment_analytics"][eq_code] = equipment_analytics
-                
-                # Accumulate for line-level analytics
-                if oee_data.get("oee") is not None:
-                    total_oee += oee_data["oee"]
-                    total_availability += oee_data.get("availability", 0.0)
-                    total_performance += oee_data.get("performance", 0.0)
-                    total_quality += oee_data.get("quality", 0.0)
-                    equipment_count += 1
-                    
+                equipment_history = await OEECalculator.get_equipment_hourly_history(line_id, hours=24)
             except Exception as e:
-                logger.warning("Failed to calculate analytics for equipment", equipment_code=eq_code, error=str(e))
-                analytics_data["equipment_analytics"][eq_code] = {"error": "Analytics calculation failed"}
-        
-        # Calculate line-level analytics
-        if equipment_count > 0:
-            line_oee = total_oee / equipment_count
-            line_availability = total_availability / equipment_count
-            line_performance = total_performance / equipment_count
-            line_quality = total_quality / equipment_count
+                logger.warning("Failed to get equipment hourly history", line_id=line_id, error=str(e))
+        
+        for oee_data in line_summary["equipment_oee"]:
+            eq_code = oee_data["equipment_code"]
+            plc_metrics = await _get_current_plc_metrics(eq_code)
+            history = equipment_history.get(eq_code, {})
+            
+            analytics_data["equipment_analytics"][eq_code] = {
+                "equipment_code": eq_code,
+                "oee": oee_data["oee"],
+                "availability": oee_data["availability"],
+                "performance": oee_data["performance"],
+                "quality": oee_data["quality"],
+                "line_weight": oee_data["line_weight"],
+                "oee_grade": _calculate_oee_grade(oee_data["oee"]),
+                "plc_metrics": plc_metrics,
+                "trends": history.get("trends", {}) if include_trends else {},
+                "downtime_analysis": history.get("downtime_analysis", {}) if include_downtime_analysis else {},
+                "insights": _generate_equipment_insights(oee_data, plc_metrics),
+                "recommendations": _generate_equipment_recommendations(oee_data, plc_metrics)
+            }
+        
+        if line_summary["equipment_count"]:
+            line_oee = line_summary["oee"]
             
             analytics_data["line_analytics"] = {
                 "overall_oee": line_oee,
-                "availability": line_availability,
-                "performance": line_performance,
-                "quality": line_quality,
+                "availability": line_summary["availability"],
+                "performance": line_summary["performance"],
+                "quality": line_summary["quality"],
+                "constraint_equipment": line_summary["constraint_equipment"],
                 "oee_grade": _calculate_oee_grade(line_oee),
                 "target_oee": 0.85,  # Would be retrieved from configuration
                 "oee_variance": line_oee - 0.85
@@ -164,22 +130,19 @@ async def get_real_time_oee_analytics(
         # Add line-level downtime analysis if requested
         if include_downtime_analysis:
             try:
-                line_downtime_analysis = await plc_downtime_tracker.get_line_downtime_analysis(
+                today = datetime.utcnow().date()
+                analytics_data["downtime_analysis"] = await plc_downtime_tracker.get_downtime_statistics(
                     line_id=line_id,
-                    hours=24
+                    start_date=today - timedelta(days=1),
+                    end_date=today
                 )
-                analytics_data["downtime_analysis"] = line_downtime_analysis
             except Exception as e:
                 logger.warning("Failed to get line downtime analysis", line_id=line_id, error=str(e))
         
         # Add line-level trends if requested
         if include_trends:
             try:
-                line_trends = await plc_oee_calculator.get_line_oee_trends(
-                    line_id=line_id,
-                    days=7
-                )
-                analytics_data["trends"] = line_trends
+                analytics_data["trends"] = await OEECalculator.get_oee_trends(line_id, days=7)
             except Exception as e:
                 logger.warning("Failed to get line trends", line_id=line_id, error=str(e))
         
@@ -326,6 +289,8 @@ async def get_equipment_oee_performance_report(
         
         return report_data
         
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except (ValidationError, BusinessLogicError) as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -665,34 +630,37 @@ async def get_oee_optimization_recommendations(
 
 # Helper functions
 async def _get_line_equipment(line_id: UUID) -> List[str]:
-    """Get list of equipment codes for a production line."""
-    # This would query the equipment line mapping table
-    # For now, return mock data
-    return ["BP01.PACK.BAG1", "BP01.PACK.BAG1.BL"]
+    """Get list of equipment codes for a production line from the equipment registry."""
+    return await OEECalculator._get_line_equipment_codes(line_id)
 
 
 async def _get_current_plc_metrics(equipment_code: str) -> Dict[str, Any]:
-    """Get current PLC metrics for equipment."""
-    # This would integrate with the enhanced telemetry poller
-    # For now, return mock data
+    """Get current PLC metrics for equipment from the in-memory latest-value store."""
+    latest = metric_latest_store.get_equipment_latest(equipment_code)
+    timestamp = latest.get("timestamp") or datetime.utcnow()
+    
     return {
         "equipment_code": equipment_code,
-        "timestamp": datetime.utcnow().isoformat(),
-        "running_status": True,
-        "product_count": 0,
-        "speed": 0.0,
-        "temperature": 0.0,
-        "pressure": 0.0,
-        "has_faults": False,
-        "active_alarms": []
+        "timestamp": timestamp.isoformat(),
+        "running_status": bool(latest.get("running_status", False)),
+        "product_count": latest.get("product_count") or 0,
+        "speed": latest.get("speed_real") or 0.0,
+        "temperature": latest.get("temperature") or 0.0,
+        "pressure": latest.get("pressure") or 0.0,
+        "has_faults": any(
+            bool(latest.get(key)) for key in ("internal_fault", "upstream_fault", "downstream_fault")
+        ),
+        "active_alarms": latest.get("active_alarms") or []
     }
 
 
 async def _get_equipment_line_id(equipment_code: str) -> UUID:
-    """Get production line ID for equipment."""
-    # This would query the equipment line mapping table
-    # For now, return a mock UUID
-    return UUID("12345678-1234-5678-9abc-123456789012")
+    """Get production line ID for equipment from the equipment registry."""
+    await equipment_registry.ensure_loaded()
+    line_id = equipment_registry.line_for_equipment(equipment_code)
+    if line_id is None:
+        raise NotFoundError("Equipment", equipment_code)
+    return line_id
 
 
 def _calculate_oee_grade(oee_value: float) -> str:
@@ -0,0 +1,69 @@
+"""
+MS5.0 Floor Dashboard - Data Export API Routes
+
+This module provides streaming bulk export endpoints for historians and
+external analytics over metric history and OEE calculations.
+"""
+
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+import structlog
+
+from app.auth.permissions import get_current_user, UserContext, Permission
+from app.services.telemetry_export_service import telemetry_export_service
+from app.utils.exceptions import ValidationError
+
+logger = structlog.get_logger()
+
+router = APIRouter()
+
+
+@router.get("/{dataset}", status_code=status.HTTP_200_OK)
+async def export_dataset(
+    dataset: str,
+    start_time: datetime = Query(..., description="Export range start (inclusive)"),
+    end_time: datetime = Query(..., description="Export range end (exclusive)"),
+    export_format: str = Query("csv", alias="format", description="csv, arrow or parquet"),
+    line_id: Optional[UUID] = Query(None, description="Filter by production line"),
+    equipment_code: Optional[str] = Query(None, description="Filter by equipment code"),
+    current_user: UserContext = Depends(get_current_user)
+) -> StreamingResponse:
+    """Stream a time range of metric history or OEE calculations."""
+    # Check permissions
+    if not current_user.has_permission(Permission.ANALYTICS_READ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions to export data"
+        )
+    
+    filters = {}
+    if line_id is not None:
+        filters["line_id"] = line_id
+    if equipment_code is not None:
+        filters["equipment_code"] = equipment_code
+    
+    try:
+        # Validate up front; once streaming starts the status code is already sent
+        telemetry_export_service.validate_request(dataset, export_format, start_time, end_time, filters)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(
+        "Data export started via API",
+        dataset=dataset,
+        export_format=export_format,
+        start_time=start_time,
+        end_time=end_time,
+        user_id=current_user.user_id
+    )
+    
+    filename = f"{dataset}_{start_time:%Y%m%dT%H%M%S}_{end_time:%Y%m%dT%H%M%S}.{export_format}"
+    return StreamingResponse(
+        telemetry_export_service.stream(dataset, export_format, start_time, end_time, filters),
+        media_type=telemetry_export_service.media_type(export_format),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -8,7 +8,7 @@ including job acceptance, completion, and status tracking.
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Response
 from fastapi.responses import JSONResponse
 import structlog
 
@@ -19,6 +19,7 @@ from app.models.production import (
     JobStatus, PaginationParams
 )
 from app.utils.exceptions import NotFoundError, ValidationError, BusinessLogicError
+from app.utils.pagination import next_cursor
 from app.services.job_assignment_service import JobAssignmentService
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -288,15 +289,17 @@ async def cancel_job(
 
 @router.get("/", response_model=List[JobAssignmentResponse], status_code=status.HTTP_200_OK)
 async def list_job_assignments(
+    response: Response,
     line_id: Optional[UUID] = Query(None, description="Filter by production line ID"),
     status: Optional[str] = Query(None, description="Filter by job status"),
     user_id: Optional[UUID] = Query(None, description="Filter by user ID"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    skip: int = Query(0, ge=0, description="Number of records to skip (ignored with a cursor)"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     current_user: UserContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> List[JobAssignmentResponse]:
-    """List job assignments with filters (admin/manager only)."""
+    """List job assignments with filters (admin/manager only); the next page's cursor is in X-Next-Cursor."""
     try:
         # Check permissions
         if not current_user.has_permission(Permission.JOB_READ):
@@ -313,9 +316,14 @@ async def list_job_assignments(
             line_id=line_id,
             status=job_status,
             skip=skip,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
         
+        page_cursor = next_cursor(jobs, limit, "assigned_at", "id")
+        if page_cursor:
+            response.headers["X-Next-Cursor"] = page_cursor
+        
         logger.debug(
             "Job assignments listed via API",
             count=len(jobs),
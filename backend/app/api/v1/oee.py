@@ -17,7 +17,9 @@ from app.auth.permissions import get_current_user, UserContext, require_permissi
 from app.database import get_db
 from app.models.production import OEECalculationResponse, OEECalculationCreate
 from app.services.oee_calculator import OEECalculator
+from app.services.oee_backfill_service import OEEBackfillService
 from app.utils.exceptions import NotFoundError, ValidationError, BusinessLogicError
+from app.utils.time_range import day_range
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = structlog.get_logger()
@@ -203,10 +205,52 @@ async def get_daily_oee_summary(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.get("/lines/{line_id}/shift-summary", status_code=status.HTTP_200_OK)
+async def get_shift_oee_summary(
+    line_id: UUID,
+    at_time: Optional[datetime] = Query(None, description="Time within the shift (defaults to now)"),
+    current_user: UserContext = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+) -> dict:
+    """Get OEE summary for a production line over a shift."""
+    try:
+        # Check permissions
+        if not current_user.has_permission(Permission.OEE_READ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to view OEE data"
+            )
+        
+        shift_summary = await OEECalculator.calculate_shift_oee_summary(
+            line_id=line_id,
+            at_time=at_time
+        )
+        
+        logger.debug(
+            "Shift OEE summary retrieved via API",
+            line_id=line_id,
+            at_time=at_time,
+            user_id=current_user.user_id
+        )
+        
+        return shift_summary
+        
+    except HTTPException:
+        raise
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ValidationError, BusinessLogicError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Failed to get shift OEE summary via API", error=str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.get("/lines/{line_id}/trends", status_code=status.HTTP_200_OK)
 async def get_oee_trends(
     line_id: UUID,
-    days: int = Query(7, ge=1, le=30, description="Number of days for trend analysis"),
+    days: int = Query(7, ge=1, le=365, description="Number of days for trend analysis"),
+    granularity: str = Query("day", regex="^(day|shift)$", description="Trend bucket: day or shift"),
     current_user: UserContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> dict:
@@ -221,7 +265,8 @@ async def get_oee_trends(
         
         trends = await OEECalculator.get_oee_trends(
             line_id=line_id,
-            days=days
+            days=days,
+            granularity=granularity
         )
         
         logger.debug(
@@ -418,16 +463,16 @@ async def get_performance_benchmarks(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.post("/recalculate", status_code=status.HTTP_200_OK)
+@router.post("/recalculate", status_code=status.HTTP_202_ACCEPTED)
 async def recalculate_oee(
-    line_id: UUID,
-    equipment_code: str,
     start_date: date,
     end_date: date,
+    line_id: Optional[UUID] = Query(None, description="Line to recalculate (defaults to all enabled lines)"),
+    equipment_code: Optional[str] = Query(None, description="Restrict to one equipment"),
     current_user: UserContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> dict:
-    """Recalculate OEE for a specific period."""
+    """Recalculate stored OEE for a period with the current configuration."""
     try:
         # Check permissions
         if not current_user.has_permission(Permission.OEE_CALCULATE):
@@ -436,38 +481,102 @@ async def recalculate_oee(
                 detail="Insufficient permissions to calculate OEE"
             )
         
-        # This would be implemented to recalculate OEE for the specified period
-        # For now, return a success message
+        start_time, end_time = day_range(start_date, end_date)
+        
+        job = await OEEBackfillService.create_job(
+            start_time=start_time,
+            end_time=end_time,
+            line_ids=[line_id] if line_id else None,
+            equipment_code=equipment_code,
+            requested_by=current_user.user_id
+        )
+        OEEBackfillService.dispatch_job(job["id"])
         
         logger.info(
             "OEE recalculation requested via API",
+            job_id=job["id"],
             line_id=line_id,
             equipment_code=equipment_code,
             start_date=start_date,
             end_date=end_date,
+            total_chunks=job["total_chunks"],
             user_id=current_user.user_id
         )
         
-        return {
-            "message": "OEE recalculation initiated",
-            "line_id": line_id,
-            "equipment_code": equipment_code,
-            "start_date": start_date,
-            "end_date": end_date,
-            "status": "processing"
-        }
+        return job
         
+    except HTTPException:
+        raise
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except BusinessLogicError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
     except Exception as e:
         logger.error("Failed to initiate OEE recalculation via API", error=str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.get("/recalculate/{job_id}", status_code=status.HTTP_200_OK)
+async def get_oee_recalculation(
+    job_id: UUID,
+    current_user: UserContext = Depends(get_current_user)
+) -> dict:
+    """Get the progress of an OEE recalculation."""
+    try:
+        if not current_user.has_permission(Permission.OEE_READ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to view OEE data"
+            )
+        
+        return await OEEBackfillService.get_job(job_id)
+        
+    except HTTPException:
+        raise
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except Exception as e:
+        logger.error("Failed to get OEE recalculation", error=str(e), job_id=job_id)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/recalculate/{job_id}/resume", status_code=status.HTTP_202_ACCEPTED)
+async def resume_oee_recalculation(
+    job_id: UUID,
+    current_user: UserContext = Depends(get_current_user)
+) -> dict:
+    """Retry the failed chunks of an OEE recalculation and restart its workers."""
+    try:
+        if not current_user.has_permission(Permission.OEE_CALCULATE):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to calculate OEE"
+            )
+        
+        job = await OEEBackfillService.resume_job(job_id)
+        
+        logger.info("OEE recalculation resumed via API", job_id=job_id, user_id=current_user.user_id)
+        
+        return job
+        
+    except HTTPException:
+        raise
+    except NotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except BusinessLogicError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        logger.error("Failed to resume OEE recalculation", error=str(e), job_id=job_id)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.post("/real-time", status_code=status.HTTP_200_OK)
 async def calculate_real_time_oee(
     line_id: UUID,
     equipment_code: str,
     current_status: dict,
     timestamp: Optional[datetime] = Query(None, description="Calculation timestamp (defaults to now)"),
+    include_downtime_statistics: bool = Query(False, description="Include the day's downtime statistics"),
     current_user: UserContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ) -> dict:
@@ -480,14 +589,13 @@ async def calculate_real_time_oee(
                 detail="Insufficient permissions to calculate real-time OEE"
             )
         
-        if not timestamp:
-            timestamp = datetime.utcnow()
-        
+        # Without a timestamp the current OEE is served from the streaming engine
         real_time_oee = await OEECalculator.calculate_real_time_oee(
             line_id=line_id,
             equipment_code=equipment_code,
             current_status=current_status,
-            timestamp=timestamp
+            timestamp=timestamp,
+            include_downtime_statistics=include_downtime_statistics
         )
         
         logger.info(
@@ -54,6 +54,7 @@ class WebSocketEventType:
     # OEE events
     OEE_UPDATE = "oee_update"
     OEE_DATA_UPDATED = "oee_data_updated"
+    SHIFT_SNAPSHOT_CLOSED = "shift_snapshot_closed"
     
     # Downtime events
     DOWNTIME_EVENT = "downtime_event"
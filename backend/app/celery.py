@@ -147,6 +147,11 @@ celery_app.conf.update(
             "schedule": crontab(minute="*/15"),  # Every 15 minutes
             "options": {"queue": "oee", "priority": 6}
         },
+        "close-shift-snapshots": {
+            "task": "app.tasks.oee_tasks.close_shift_snapshots",
+            "schedule": crontab(minute="*/5"),  # Every 5 minutes
+            "options": {"queue": "oee", "priority": 6}
+        },
         
         # Andon monitoring tasks
         "monitor-andon-events": {
@@ -159,6 +164,11 @@ celery_app.conf.update(
             "schedule": crontab(minute="*/1"),  # Every minute
             "options": {"queue": "andon", "priority": 8}
         },
+        "materialize-andon-features": {
+            "task": "app.tasks.andon_tasks.materialize_andon_features",
+            "schedule": crontab(hour=1, minute=30),  # Daily at 1:30 AM
+            "options": {"queue": "andon", "priority": 3}
+        },
         
         # Quality monitoring tasks
         "monitor-quality-metrics": {
@@ -57,6 +57,25 @@ class Settings(BaseSettings):
     PRODUCTION_LINE_POLL_INTERVAL: int = Field(default=5, env="PRODUCTION_LINE_POLL_INTERVAL")
     OEE_CALCULATION_INTERVAL: int = Field(default=60, env="OEE_CALCULATION_INTERVAL")
     DOWNTIME_DETECTION_THRESHOLD: int = Field(default=30, env="DOWNTIME_DETECTION_THRESHOLD")
+    DOWNTIME_MICRO_STOP_INTERVAL_MINUTES: int = Field(default=15, env="DOWNTIME_MICRO_STOP_INTERVAL_MINUTES")
+    DOWNTIME_MICRO_STOP_FLUSH_SECONDS: int = Field(default=60, env="DOWNTIME_MICRO_STOP_FLUSH_SECONDS")
+    STREAMING_OEE_WINDOW_MINUTES: int = Field(default=60, env="STREAMING_OEE_WINDOW_MINUTES")
+    STREAMING_OEE_MAX_GAP_SECONDS: float = Field(default=10.0, env="STREAMING_OEE_MAX_GAP_SECONDS")
+    STREAMING_OEE_PUBLISH_INTERVAL: float = Field(default=1.0, env="STREAMING_OEE_PUBLISH_INTERVAL")
+    OEE_TASK_CONCURRENCY: int = Field(default=8, env="OEE_TASK_CONCURRENCY")
+    OEE_TASK_WINDOW_MINUTES: int = Field(default=10, env="OEE_TASK_WINDOW_MINUTES")
+    OEE_BACKFILL_CHUNK_HOURS: int = Field(default=24, env="OEE_BACKFILL_CHUNK_HOURS")
+    OEE_BACKFILL_WORKERS: int = Field(default=4, env="OEE_BACKFILL_WORKERS")
+    OEE_BACKFILL_MAX_DAYS: int = Field(default=400, env="OEE_BACKFILL_MAX_DAYS")
+    OEE_BACKFILL_MAX_ATTEMPTS: int = Field(default=3, env="OEE_BACKFILL_MAX_ATTEMPTS")
+    OEE_BACKFILL_STALE_MINUTES: int = Field(default=15, env="OEE_BACKFILL_STALE_MINUTES")
+    OEE_BACKFILL_TASK_SECONDS: int = Field(default=240, env="OEE_BACKFILL_TASK_SECONDS")
+    EQUIPMENT_REGISTRY_REFRESH_SECONDS: int = Field(default=300, env="EQUIPMENT_REGISTRY_REFRESH_SECONDS")
+    OEE_ANALYTICS_CACHE_SECONDS: int = Field(default=300, env="OEE_ANALYTICS_CACHE_SECONDS")
+    PLC_OEE_CACHE_WINDOW_SECONDS: int = Field(default=60, env="PLC_OEE_CACHE_WINDOW_SECONDS")
+    PLC_OEE_CACHE_MAX_ENTRIES: int = Field(default=1000, env="PLC_OEE_CACHE_MAX_ENTRIES")
+    SHIFT_SNAPSHOT_SETTLE_MINUTES: int = Field(default=15, env="SHIFT_SNAPSHOT_SETTLE_MINUTES")
+    SHIFT_SNAPSHOT_LOOKBACK_HOURS: int = Field(default=48, env="SHIFT_SNAPSHOT_LOOKBACK_HOURS")
     
     # File Upload Settings
     MAX_FILE_SIZE: int = Field(default=10 * 1024 * 1024, env="MAX_FILE_SIZE")  # 10MB
@@ -77,6 +96,12 @@ class Settings(BaseSettings):
     ENABLE_PUSH_NOTIFICATIONS: bool = Field(default=False, env="ENABLE_PUSH_NOTIFICATIONS")
     FCM_SERVER_KEY: Optional[str] = Field(default=None, env="FCM_SERVER_KEY")
     FCM_PROJECT_ID: Optional[str] = Field(default=None, env="FCM_PROJECT_ID")
+    NOTIFICATION_DISPATCH_WORKERS: int = Field(default=8, env="NOTIFICATION_DISPATCH_WORKERS")
+    NOTIFICATION_MULTICAST_SIZE: int = Field(default=500, env="NOTIFICATION_MULTICAST_SIZE")
+    NOTIFICATION_DEDUP_SECONDS: int = Field(default=60, env="NOTIFICATION_DEDUP_SECONDS")
+    NOTIFICATION_RETRY_SECONDS: int = Field(default=30, env="NOTIFICATION_RETRY_SECONDS")
+    NOTIFICATION_MAX_ATTEMPTS: int = Field(default=5, env="NOTIFICATION_MAX_ATTEMPTS")
+    NOTIFICATION_ROUTING_REFRESH_SECONDS: int = Field(default=300, env="NOTIFICATION_ROUTING_REFRESH_SECONDS")
     
     # Monitoring Settings
     ENABLE_METRICS: bool = Field(default=True, env="ENABLE_METRICS")
@@ -97,10 +122,23 @@ class Settings(BaseSettings):
     REPORT_OUTPUT_DIR: str = Field(default="reports", env="REPORT_OUTPUT_DIR")
     REPORT_RETENTION_DAYS: int = Field(default=90, env="REPORT_RETENTION_DAYS")
     
+    # Export Settings
+    EXPORT_MAX_RANGE_DAYS: int = Field(default=31, env="EXPORT_MAX_RANGE_DAYS")
+    EXPORT_WINDOW_HOURS: int = Field(default=24, env="EXPORT_WINDOW_HOURS")
+    EXPORT_BATCH_ROWS: int = Field(default=10000, env="EXPORT_BATCH_ROWS")
+    EXPORT_QUEUE_CHUNKS: int = Field(default=8, env="EXPORT_QUEUE_CHUNKS")
+    EXPORT_MAX_CONCURRENT: int = Field(default=2, env="EXPORT_MAX_CONCURRENT")
+    
     # Andon Settings
     ANDON_ESCALATION_LEVELS: int = Field(default=3, env="ANDON_ESCALATION_LEVELS")
     ANDON_ACKNOWLEDGMENT_TIMEOUT: int = Field(default=300, env="ANDON_ACKNOWLEDGMENT_TIMEOUT")  # 5 minutes
     ANDON_RESOLUTION_TIMEOUT: int = Field(default=1800, env="ANDON_RESOLUTION_TIMEOUT")  # 30 minutes
+    ANDON_ESCALATION_SWEEP_SECONDS: int = Field(default=300, env="ANDON_ESCALATION_SWEEP_SECONDS")
+    ANDON_ACK_REMINDER_MINUTES: int = Field(default=5, env="ANDON_ACK_REMINDER_MINUTES")
+    ANDON_RESOLUTION_REMINDER_MINUTES: int = Field(default=10, env="ANDON_RESOLUTION_REMINDER_MINUTES")
+    ANDON_ANALYTICS_CACHE_SECONDS: int = Field(default=300, env="ANDON_ANALYTICS_CACHE_SECONDS")
+    ANDON_FEATURE_WINDOW_DAYS: int = Field(default=30, env="ANDON_FEATURE_WINDOW_DAYS")
+    ANDON_FEATURE_COOCCURRENCE_MINUTES: int = Field(default=15, env="ANDON_FEATURE_COOCCURRENCE_MINUTES")
     
     # Quality Settings
     QUALITY_CHECK_INTERVAL: int = Field(default=60, env="QUALITY_CHECK_INTERVAL")
@@ -146,6 +184,11 @@ class Settings(BaseSettings):
         env="TIMESCALEDB_CHUNK_TIME_INTERVAL_OEE",
         description="Chunk interval for OEE calculations table"
     )
+    TIMESCALEDB_CHUNK_TIME_INTERVAL_EVENTS: str = Field(
+        default="7 days",
+        env="TIMESCALEDB_CHUNK_TIME_INTERVAL_EVENTS",
+        description="Chunk interval for downtime_events and andon_events tables"
+    )
     TIMESCALEDB_RETENTION_POLICY_METRIC_HIST: str = Field(
         default="90 days",
         env="TIMESCALEDB_RETENTION_POLICY_METRIC_HIST",
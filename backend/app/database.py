@@ -14,6 +14,7 @@ from sqlalchemy import create_engine, MetaData, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 from sqlalchemy.pool import NullPool, QueuePool
+import asyncpg
 import structlog
 
 from app.config import settings
@@ -166,6 +167,38 @@ async def execute_update(query: str, params: Optional[dict] = None) -> int:
         raise
 
 
+# Dedicated connections
+async def open_direct_connection() -> asyncpg.Connection:
+    """
+    Open an asyncpg connection outside the session pool.
+
+    Used by long-lived consumers (LISTEN/NOTIFY listeners, COPY exports) that
+    would otherwise hold a pooled connection for minutes or for the lifetime
+    of the process.
+    """
+    return await asyncpg.connect(
+        settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+    )
+
+
+# LISTEN/NOTIFY support
+async def open_notification_connection() -> asyncpg.Connection:
+    """Open a dedicated asyncpg connection for LISTEN/NOTIFY channels."""
+    return await open_direct_connection()
+
+
+async def notify_channel(channel: str, payload: str = "") -> None:
+    """Publish a NOTIFY on a channel so other processes can refresh state."""
+    try:
+        await execute_scalar(
+            "SELECT pg_notify(:channel, :payload)",
+            {"channel": channel, "payload": payload}
+        )
+    except Exception as e:
+        logger.error("Database notify failed", channel=channel, error=str(e))
+        raise
+
+
 # Database health check
 async def check_database_health() -> dict:
     """Check database health and return status information."""
@@ -521,6 +554,27 @@ async def setup_timescaledb_policies() -> None:
             except Exception as e:
                 logger.debug("OEE retention policy skipped", error=str(e))
             
+            # ================================================================
+            # Configure event hypertables (downtime_events, andon_events)
+            # ================================================================
+            
+            # Events are business records that get updated on acknowledgement and
+            # resolution, so they are chunked but neither compressed nor expired
+            for table_name in ['downtime_events', 'andon_events']:
+                try:
+                    await session.execute(text(f"""
+                        SELECT set_chunk_time_interval(
+                            'factory_telemetry.{table_name}',
+                            INTERVAL '{settings.TIMESCALEDB_CHUNK_TIME_INTERVAL_EVENTS}'
+                        );
+                    """))
+                    logger.info(
+                        f"Chunk interval configured for {table_name}",
+                        interval=settings.TIMESCALEDB_CHUNK_TIME_INTERVAL_EVENTS
+                    )
+                except Exception as e:
+                    logger.debug(f"{table_name} chunk interval setup skipped", error=str(e))
+            
             # ================================================================
             # Configure additional hypertables (energy_consumption, production_kpis)
             # ================================================================
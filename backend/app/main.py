@@ -39,11 +39,17 @@ from app.database import (
     setup_timescaledb_policies,
     get_timescaledb_health
 )
-from app.api.v1 import auth, production, jobs, checklists, oee, andon, andon_escalation, reports, dashboard, equipment, upload, downtime, monitoring
+from app.api.v1 import auth, production, jobs, checklists, oee, andon, andon_escalation, reports, dashboard, equipment, upload, downtime, monitoring, export
 from app.api.v1 import enhanced_production, enhanced_oee_analytics, enhanced_production_websocket
 from app.api.websocket import websocket_router
 from app.api.enhanced_websocket import router as enhanced_websocket_router
 from app.services.andon_escalation_monitor import start_escalation_monitor, stop_escalation_monitor
+from app.services.metric_latest_store import start_metric_latest_store, stop_metric_latest_store
+from app.services.equipment_registry import start_equipment_registry, stop_equipment_registry
+from app.services.shift_snapshot_service import start_shift_snapshot_publisher, stop_shift_snapshot_publisher
+from app.services.active_andon_index import start_active_andon_index, stop_active_andon_index
+from app.services.notification_service import start_notification_dispatcher, stop_notification_dispatcher
+from app.services.notification_routing import start_notification_routing, stop_notification_routing
 from app.services.real_time_integration_service import RealTimeIntegrationService
 from app.services.enhanced_websocket_manager import EnhancedWebSocketManager
 from app.utils.exceptions import (
@@ -107,6 +113,30 @@ async def lifespan(app: FastAPI):
             errors=timescaledb_health.get("errors", [])
         )
     
+    # Load equipment configuration, line membership and fault catalogs
+    await start_equipment_registry()
+    logger.info("Equipment registry started")
+    
+    # Load in-memory mirror of current metric values
+    await start_metric_latest_store()
+    logger.info("Metric latest store started")
+    
+    # Push closed shift snapshots to websocket subscribers
+    await start_shift_snapshot_publisher()
+    logger.info("Shift snapshot publisher started")
+    
+    # Load in-memory index of open and acknowledged Andon events
+    await start_active_andon_index()
+    logger.info("Active Andon index started")
+    
+    # Load in-memory routing table of notification recipients
+    await start_notification_routing()
+    logger.info("Notification routing started")
+    
+    # Retry push notifications left in the outbox
+    await start_notification_dispatcher()
+    logger.info("Notification dispatcher started")
+    
     # Start escalation monitor
     await start_escalation_monitor()
     logger.info("Andon escalation monitor started")
@@ -129,8 +159,20 @@ async def lifespan(app: FastAPI):
         await real_time_service.stop()
         logger.info("Real-time integration service stopped")
     
+    await stop_shift_snapshot_publisher()
+    logger.info("Shift snapshot publisher stopped")
     await stop_escalation_monitor()
     logger.info("Andon escalation monitor stopped")
+    await stop_notification_dispatcher()
+    logger.info("Notification dispatcher stopped")
+    await stop_notification_routing()
+    logger.info("Notification routing stopped")
+    await stop_active_andon_index()
+    logger.info("Active Andon index stopped")
+    await stop_metric_latest_store()
+    logger.info("Metric latest store stopped")
+    await stop_equipment_registry()
+    logger.info("Equipment registry stopped")
     await close_db()
     logger.info("Database connections closed")
 
@@ -168,6 +210,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Add security headers middleware
@@ -334,6 +377,7 @@ app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["Dashboar
 app.include_router(equipment.router, prefix="/api/v1/equipment", tags=["Equipment"])
 app.include_router(upload.router, prefix="/api/v1/upload", tags=["File Upload"])
 app.include_router(monitoring.router, prefix="/api/v1/monitoring", tags=["Monitoring & Health"])
+app.include_router(export.router, prefix="/api/v1/export", tags=["Data Export"])
 
 # Enhanced API routers with PLC integration
 app.include_router(enhanced_production.router, prefix="/api/v1/enhanced", tags=["Enhanced Production Management"])
@@ -0,0 +1,267 @@
+"""
+MS5.0 Floor Dashboard - Active Andon Index
+
+This module keeps an in-process index of the open and acknowledged Andon
+events, keyed by (line, equipment, event type). Duplicate suppression during
+PLC fault storms and the active-event panels of the dashboards read it
+instead of querying andon_events and building response models per fault.
+
+The index is loaded once and kept current by AndonService as events are
+created, acknowledged and resolved in this process, and by the
+'andon_event_changed' NOTIFY channel (see 017_active_andon_notify.sql) for
+changes made by other pods, workers or directly in the database. Report
+times are kept as naive UTC datetimes whichever source they came from.
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+import structlog
+
+from app.database import execute_query, open_notification_connection
+from app.utils.time_range import to_naive_utc
+
+logger = structlog.get_logger()
+
+
+ACTIVE_STATUSES = ("open", "acknowledged")
+
+# Events only move forward through these states; a late notification for an
+# earlier state must not reopen an event. Any other status closes the event.
+STATUS_RANK = {"open": 0, "acknowledged": 1}
+CLOSED_RANK = 2
+
+ActiveAndonKey = Tuple[str, str, str]
+
+
+class ActiveAndonIndex:
+    """Open and acknowledged Andon events indexed by (line, equipment, event type)."""
+
+    CHANNEL = "andon_event_changed"
+
+    # Ids of recently closed events remembered to drop late notifications
+    CLOSED_HISTORY = 10000
+
+    def __init__(self):
+        # event id -> active event
+        self._events: Dict[str, Dict[str, Any]] = {}
+        # (line_id, equipment_code, event_type) -> event ids
+        self._keys: Dict[ActiveAndonKey, Set[str]] = {}
+        # line_id -> event ids
+        self._lines: Dict[str, Set[str]] = {}
+        self._closed: "OrderedDict[str, None]" = OrderedDict()
+        # Called with every applied change, e.g. to invalidate derived caches
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+        self._listener_connection = None
+        # Notifications received while a load is in flight, replayed after it
+        self._pending: Optional[List[Dict[str, Any]]] = None
+        self._load_lock = asyncio.Lock()
+        self.is_loaded = False
+        self.loaded_at: Optional[datetime] = None
+
+        self.stats = {
+            "lookups": 0,
+            "updates": 0,
+            "stale_updates": 0,
+            "notifications": 0
+        }
+
+    async def load(self) -> int:
+        """
+        Load the active Andon events in a single query.
+
+        Changes notified while the query runs are applied on top of the
+        loaded rows, so a resolve racing the load is not lost.
+        """
+        self._pending = []
+        try:
+            result = await execute_query("""
+                SELECT id, line_id, equipment_code, event_type, priority,
+                       description, status, reported_at
+                FROM factory_telemetry.andon_events
+                WHERE status IN ('open', 'acknowledged')
+            """)
+        except Exception:
+            self._pending = None
+            raise
+
+        self._events.clear()
+        self._keys.clear()
+        self._lines.clear()
+        self._closed.clear()
+        for row in result:
+            self._add(self._entry(row))
+
+        pending, self._pending = self._pending, None
+        for event in pending:
+            self.apply(event)
+
+        self.is_loaded = True
+        self.loaded_at = datetime.utcnow()
+        logger.info("Active Andon index loaded", events=len(self._events))
+        return len(self._events)
+
+    async def ensure_loaded(self) -> None:
+        """Load and subscribe on first use in processes that did not start the index."""
+        if self.is_loaded:
+            return
+        async with self._load_lock:
+            if not self.is_loaded:
+                await self.start()
+
+    def apply(self, event: Dict[str, Any]) -> bool:
+        """
+        Apply an Andon event's current state.
+
+        ``event`` needs id and status; active events also need line_id,
+        equipment_code and event_type. Returns False for updates older than
+        the indexed state.
+        """
+        event_id = str(event["id"])
+        status = event["status"]
+        rank = STATUS_RANK.get(status, CLOSED_RANK)
+
+        current = self._events.get(event_id)
+        if event_id in self._closed or (current and STATUS_RANK[current["status"]] > rank):
+            self.stats["stale_updates"] += 1
+            return False
+
+        if current:
+            self._remove(event_id)
+
+        if status in ACTIVE_STATUSES:
+            self._add(self._entry(event))
+        else:
+            self._closed[event_id] = None
+            if len(self._closed) > self.CLOSED_HISTORY:
+                self._closed.popitem(last=False)
+
+        self.stats["updates"] += 1
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error("Active Andon index listener failed", error=str(e), event_id=event_id)
+        return True
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call ``listener`` with every Andon event change applied to the index."""
+        self._listeners.append(listener)
+
+    def has_active(self, line_id: UUID, equipment_code: str, event_type: str) -> bool:
+        """Check whether an open or acknowledged event exists for the key."""
+        self.stats["lookups"] += 1
+        return bool(self._keys.get((str(line_id), equipment_code, event_type)))
+
+    def active_events(self, line_id: Optional[UUID] = None) -> List[Dict[str, Any]]:
+        """Get the active events of a line, or of all lines, oldest first."""
+        if line_id is None:
+            events = list(self._events.values())
+        else:
+            events = [self._events[event_id] for event_id in self._lines.get(str(line_id), ())]
+        return sorted(events, key=lambda event: event["reported_at"] or datetime.min)
+
+    async def start(self) -> None:
+        """Subscribe to Andon event changes, then load the index."""
+        if self._listener_connection is None:
+            try:
+                self._listener_connection = await open_notification_connection()
+                await self._listener_connection.add_listener(self.CHANNEL, self._on_notification)
+                logger.info("Active Andon index listening for changes")
+            except Exception as e:
+                # Changes made by this process are still applied directly
+                logger.error("Failed to subscribe to Andon event notifications", error=str(e))
+                self._listener_connection = None
+
+        await self.load()
+
+    async def stop(self) -> None:
+        """Unsubscribe from Andon event changes."""
+        if self._listener_connection:
+            try:
+                await self._listener_connection.close()
+            except Exception as e:
+                logger.error("Error closing active Andon listener", error=str(e))
+            self._listener_connection = None
+
+        logger.info("Active Andon index stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics."""
+        return {
+            **self.stats,
+            "active_events": len(self._events),
+            "lines": len(self._lines),
+            "is_loaded": self.is_loaded,
+            "listening": self._listener_connection is not None,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None
+        }
+
+    @staticmethod
+    def _entry(event: Any) -> Dict[str, Any]:
+        """Build an index entry from an event row or notification."""
+        return {
+            "id": str(event["id"]),
+            "line_id": str(event["line_id"]),
+            "equipment_code": event["equipment_code"],
+            "event_type": event["event_type"],
+            "priority": event["priority"],
+            "description": event["description"],
+            "status": event["status"],
+            # Rows carry aware timestamps and notifications ISO strings
+            "reported_at": to_naive_utc(event["reported_at"])
+        }
+
+    def _add(self, entry: Dict[str, Any]) -> None:
+        """Index an active event."""
+        event_id = entry["id"]
+        self._events[event_id] = entry
+        key = (entry["line_id"], entry["equipment_code"], entry["event_type"])
+        self._keys.setdefault(key, set()).add(event_id)
+        self._lines.setdefault(entry["line_id"], set()).add(event_id)
+
+    def _remove(self, event_id: str) -> None:
+        """Drop an event from every index."""
+        entry = self._events.pop(event_id)
+        key = (entry["line_id"], entry["equipment_code"], entry["event_type"])
+        for index, index_key in ((self._keys, key), (self._lines, entry["line_id"])):
+            ids = index.get(index_key)
+            if ids is not None:
+                ids.discard(event_id)
+                if not ids:
+                    del index[index_key]
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        """Apply an andon_event_changed NOTIFY payload."""
+        self.stats["notifications"] += 1
+        try:
+            event = json.loads(payload)
+            if self._pending is not None:
+                self._pending.append(event)
+            else:
+                self.apply(event)
+        except Exception as e:
+            logger.error("Invalid Andon event notification", error=str(e), payload=payload[:200])
+
+
+# Global index instance
+active_andon_index = ActiveAndonIndex()
+
+
+async def start_active_andon_index() -> None:
+    """Load the global active Andon index and start listening for changes."""
+    await active_andon_index.start()
+
+
+async def stop_active_andon_index() -> None:
+    """Stop the global active Andon index."""
+    await active_andon_index.stop()
+
+
+def get_active_andon_index() -> ActiveAndonIndex:
+    """Get the global active Andon index."""
+    return active_andon_index
@@ -0,0 +1,319 @@
+"""
+MS5.0 Floor Dashboard - Andon Analytics
+
+This module computes every facet of the Andon dashboard and analytics report
+- status, priority and type breakdowns, response times by priority, top
+equipment, daily and hourly trends - from a single GROUPING SETS query over
+the andon_events window, instead of one query per facet. Windows of the last
+N days are cached per (line, window) for ANDON_ANALYTICS_CACHE_SECONDS and
+dropped as soon as an event of the line changes, through the active Andon
+index's change listeners.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+import structlog
+
+from app.config import settings
+from app.database import execute_query
+from app.utils.time_range import time_range_predicate, time_bucket_expression, bucket_date
+from app.services.active_andon_index import active_andon_index
+
+logger = structlog.get_logger()
+
+
+# Cache key for windows spanning every line
+ALL_LINES = "*"
+
+WINDOW_QUERY = """
+SELECT
+    CASE
+        WHEN GROUPING(status) = 0 THEN 'status'
+        WHEN GROUPING(priority) = 0 THEN 'priority'
+        WHEN GROUPING(event_type) = 0 THEN 'event_type'
+        WHEN GROUPING(equipment_code) = 0 THEN 'equipment'
+        WHEN GROUPING(event_date) = 0 THEN 'day'
+        ELSE 'hour'
+    END as facet,
+    status, priority, event_type, equipment_code, event_date, event_hour,
+    COUNT(*) as total_events,
+    COUNT(*) FILTER (WHERE status = 'resolved') as resolved_events,
+    COUNT(*) FILTER (WHERE priority = 'critical') as critical_events,
+    COUNT(*) FILTER (WHERE priority = 'high') as high_priority_events,
+    COUNT(*) FILTER (WHERE reported_at >= :recent_start) as recent_events,
+    AVG(ack_minutes) as avg_ack_minutes,
+    MIN(ack_minutes) as min_ack_minutes,
+    MAX(ack_minutes) as max_ack_minutes,
+    AVG(res_minutes) FILTER (WHERE ack_minutes IS NOT NULL) as avg_res_minutes,
+    MIN(res_minutes) FILTER (WHERE ack_minutes IS NOT NULL) as min_res_minutes,
+    MAX(res_minutes) FILTER (WHERE ack_minutes IS NOT NULL) as max_res_minutes,
+    AVG(res_minutes) FILTER (WHERE status = 'resolved') as avg_resolution_minutes,
+    AVG(duration_minutes) as avg_duration_minutes
+FROM (
+    SELECT
+        status, priority, event_type, equipment_code, reported_at,
+        {day_bucket} as event_date,
+        EXTRACT(HOUR FROM reported_at) as event_hour,
+        EXTRACT(EPOCH FROM (acknowledged_at - reported_at))/60 as ack_minutes,
+        EXTRACT(EPOCH FROM (resolved_at - reported_at))/60 as res_minutes,
+        EXTRACT(EPOCH FROM (COALESCE(resolved_at, :range_end) - reported_at))/60 as duration_minutes
+    FROM factory_telemetry.andon_events
+    {where_clause}
+) andon_window
+GROUP BY GROUPING SETS (
+    (status), (priority), (event_type), (equipment_code), (event_date), (event_hour)
+)
+"""
+
+
+def _minutes(value: Any) -> float:
+    """Round a minutes aggregate for the response."""
+    return round(float(value), 2)
+
+
+def _time_metrics(row: Any, prefix: str) -> Dict[str, float]:
+    """Get the avg/min/max minutes of a facet row."""
+    return {
+        "avg_minutes": _minutes(row[f"avg_{prefix}_minutes"]),
+        "min_minutes": _minutes(row[f"min_{prefix}_minutes"]),
+        "max_minutes": _minutes(row[f"max_{prefix}_minutes"])
+    }
+
+
+def _event_counts(row: Any) -> Dict[str, int]:
+    """Get the event counts of a facet row."""
+    return {
+        "total_events": row["total_events"],
+        "resolved_events": row["resolved_events"],
+        "critical_events": row["critical_events"],
+        "high_priority_events": row["high_priority_events"]
+    }
+
+
+class AndonWindow:
+    """Every dashboard facet of the Andon events in one [start, end) window."""
+
+    __slots__ = (
+        "line_id", "start_date", "end_date", "loaded_at",
+        "status_counts", "priority_counts", "type_counts", "recent_events",
+        "average_resolution_minutes", "acknowledgment_metrics", "resolution_metrics",
+        "equipment", "daily", "hourly"
+    )
+
+    def __init__(self, line_id: Optional[UUID], start_date: datetime, end_date: datetime, loaded_at: datetime):
+        self.line_id = line_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.loaded_at = loaded_at
+        self.status_counts: Dict[str, int] = {}
+        self.priority_counts: Dict[str, int] = {}
+        self.type_counts: Dict[str, int] = {}
+        self.recent_events = 0
+        self.average_resolution_minutes = 0
+        self.acknowledgment_metrics: Dict[str, Dict[str, float]] = {}
+        self.resolution_metrics: Dict[str, Dict[str, float]] = {}
+        # Sorted by event count, most first
+        self.equipment: List[Dict[str, Any]] = []
+        self.daily: List[Dict[str, Any]] = []
+        self.hourly: List[Dict[str, int]] = []
+
+    @classmethod
+    def from_rows(
+        cls,
+        line_id: Optional[UUID],
+        start_date: datetime,
+        end_date: datetime,
+        rows: List[Any],
+        loaded_at: datetime
+    ) -> "AndonWindow":
+        """Fold the facet rows of WINDOW_QUERY into a window."""
+        window = cls(line_id, start_date, end_date, loaded_at)
+
+        for row in rows:
+            facet = row["facet"]
+            if facet == "status":
+                window.status_counts[row["status"]] = row["total_events"]
+                window.recent_events += row["recent_events"]
+                # Only the resolved row has resolution times
+                if row["avg_resolution_minutes"] is not None:
+                    window.average_resolution_minutes = _minutes(row["avg_resolution_minutes"])
+            elif facet == "priority":
+                window.priority_counts[row["priority"]] = row["total_events"]
+                if row["avg_ack_minutes"] is not None:
+                    window.acknowledgment_metrics[row["priority"]] = _time_metrics(row, "ack")
+                if row["avg_res_minutes"] is not None:
+                    window.resolution_metrics[row["priority"]] = _time_metrics(row, "res")
+            elif facet == "event_type":
+                window.type_counts[row["event_type"]] = row["total_events"]
+            elif facet == "equipment":
+                window.equipment.append({
+                    "equipment_code": row["equipment_code"],
+                    **_event_counts(row),
+                    "avg_duration_minutes": _minutes(row["avg_duration_minutes"]),
+                    "resolution_rate": round(row["resolved_events"] / row["total_events"] * 100, 2)
+                })
+            elif facet == "day":
+                window.daily.append({
+                    "date": bucket_date(row["event_date"]).isoformat(),
+                    **_event_counts(row)
+                })
+            else:
+                window.hourly.append({
+                    "hour": int(row["event_hour"]),
+                    "event_count": row["total_events"]
+                })
+
+        window.equipment.sort(key=lambda equipment: (-equipment["total_events"], equipment["equipment_code"]))
+        window.daily.sort(key=lambda day: day["date"])
+        window.hourly.sort(key=lambda hour: hour["hour"])
+        return window
+
+    @property
+    def total_events(self) -> int:
+        """Get the number of events in the window."""
+        return sum(self.status_counts.values())
+
+    def statistics(self) -> Dict[str, Any]:
+        """Get the breakdowns in the shape of AndonService.get_andon_statistics."""
+        return {
+            "period": {
+                "start_date": self.start_date,
+                "end_date": self.end_date
+            },
+            "total_events": self.total_events,
+            "status_breakdown": dict(self.status_counts),
+            "priority_breakdown": dict(self.priority_counts),
+            "type_breakdown": dict(self.type_counts),
+            "average_resolution_minutes": self.average_resolution_minutes
+        }
+
+    def response_metrics(self) -> Dict[str, Any]:
+        """Get acknowledgment and resolution times by priority."""
+        acknowledgment_metrics = self.acknowledgment_metrics
+        resolution_metrics = self.resolution_metrics
+        return {
+            "acknowledgment_metrics": dict(acknowledgment_metrics),
+            "resolution_metrics": dict(resolution_metrics),
+            "overall_avg_acknowledgment_minutes": round(sum(
+                metrics["avg_minutes"] for metrics in acknowledgment_metrics.values()
+            ) / len(acknowledgment_metrics), 2) if acknowledgment_metrics else 0,
+            "overall_avg_resolution_minutes": round(sum(
+                metrics["avg_minutes"] for metrics in resolution_metrics.values()
+            ) / len(resolution_metrics), 2) if resolution_metrics else 0
+        }
+
+    def top_equipment(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Get the equipment with the most events."""
+        return self.equipment[:limit]
+
+    def trends(self) -> Dict[str, Any]:
+        """Get daily and hourly event counts and the trend direction."""
+        daily_events = [day["total_events"] for day in self.daily]
+        trend_direction = "stable"
+        if len(daily_events) >= 2:
+            first_half_avg = sum(daily_events[:len(daily_events)//2]) / (len(daily_events)//2)
+            second_half_avg = sum(daily_events[len(daily_events)//2:]) / (len(daily_events) - len(daily_events)//2)
+
+            if second_half_avg > first_half_avg * 1.1:
+                trend_direction = "increasing"
+            elif second_half_avg < first_half_avg * 0.9:
+                trend_direction = "decreasing"
+
+        return {
+            "daily_data": list(self.daily),
+            "hourly_distribution": list(self.hourly),
+            "trend_analysis": {
+                "direction": trend_direction,
+                "avg_events_per_day": round(sum(daily_events) / len(daily_events), 2) if daily_events else 0,
+                "peak_day": max(daily_events) if daily_events else 0,
+                "lowest_day": min(daily_events) if daily_events else 0
+            }
+        }
+
+
+class AndonAnalytics:
+    """Single-pass Andon analytics with a per-(line, window) cache."""
+
+    # (str(line_id) or ALL_LINES, days) -> window
+    _cache: Dict[Tuple[str, int], AndonWindow] = {}
+
+    # Bumped by every invalidation; loads that raced one are not cached
+    _generation = 0
+
+    @staticmethod
+    async def load(
+        line_id: Optional[UUID],
+        start_date: datetime,
+        end_date: datetime
+    ) -> AndonWindow:
+        """Read every facet of the Andon events in [start_date, end_date) in one query."""
+        where_conditions, query_params = time_range_predicate("reported_at", start_date, end_date)
+
+        if line_id:
+            where_conditions.append("line_id = :line_id")
+            query_params["line_id"] = line_id
+
+        query_params["recent_start"] = end_date - timedelta(hours=24)
+
+        query = WINDOW_QUERY.format(
+            day_bucket=time_bucket_expression("reported_at", "1 day"),
+            where_clause="WHERE " + " AND ".join(where_conditions)
+        )
+
+        rows = await execute_query(query, query_params)
+        return AndonWindow.from_rows(line_id, start_date, end_date, rows, datetime.utcnow())
+
+    @staticmethod
+    async def get_window(line_id: Optional[UUID], days: int) -> AndonWindow:
+        """Get the last ``days`` days of a line, or of all lines, cached per (line, window)."""
+        key = (str(line_id) if line_id else ALL_LINES, days)
+        now = datetime.utcnow()
+
+        cached = AndonAnalytics._cache.get(key)
+        if cached is not None and (now - cached.loaded_at).total_seconds() < settings.ANDON_ANALYTICS_CACHE_SECONDS:
+            return cached
+
+        generation = AndonAnalytics._generation
+        window = await AndonAnalytics.load(line_id, now - timedelta(days=days), now)
+
+        AndonAnalytics._evict_expired(now)
+        if generation == AndonAnalytics._generation:
+            AndonAnalytics._cache[key] = window
+
+        logger.debug(
+            "Andon analytics window loaded",
+            line_id=line_id,
+            days=days,
+            total_events=window.total_events
+        )
+        return window
+
+    @staticmethod
+    def invalidate(line_id: Optional[UUID] = None) -> None:
+        """Drop cached windows of one line and of all lines, or every window."""
+        AndonAnalytics._generation += 1
+        if line_id is None:
+            AndonAnalytics._cache.clear()
+            return
+        for key in [key for key in AndonAnalytics._cache if key[0] in (str(line_id), ALL_LINES)]:
+            del AndonAnalytics._cache[key]
+
+    @staticmethod
+    def on_event_changed(event: Dict[str, Any]) -> None:
+        """Invalidate the windows an Andon event change falls in."""
+        AndonAnalytics.invalidate(event.get("line_id"))
+
+    @staticmethod
+    def _evict_expired(now: datetime) -> None:
+        """Drop cached windows older than the cache lifetime."""
+        expired = [
+            key for key, window in AndonAnalytics._cache.items()
+            if (now - window.loaded_at).total_seconds() >= settings.ANDON_ANALYTICS_CACHE_SECONDS
+        ]
+        for key in expired:
+            del AndonAnalytics._cache[key]
+
+
+# Changes applied locally and notified by other processes both reach the index
+active_andon_index.add_listener(AndonAnalytics.on_event_changed)
@@ -1,44 +1,167 @@
 """
 MS5.0 Floor Dashboard - Andon Escalation Monitor
 
-This module provides background monitoring and automatic processing of
+This module provides background scheduling and automatic processing of
 Andon escalations including timeout handling and automatic escalation.
+
+Every pending escalation carries an absolute, indexed due_at deadline (see
+018_andon_escalation_due_at.sql). The monitor keeps those deadlines and the
+reminder times derived from them in a min-heap and sleeps until the earliest
+one, so escalations fire on time instead of on the next poll. Deadlines are
+loaded on start, kept current by the 'andon_escalation_due' NOTIFY channel and
+re-read by a periodic sweep as a safety net. Every replica runs a monitor;
+firing and reminding are claimed in the database, so each deadline is acted
+on exactly once. An acknowledged escalation that fires is due again a minute
+later, and such re-armed deadlines get no reminder of their own.
 """
 
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import heapq
+import itertools
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Tuple
 from uuid import UUID
 import structlog
 
-from app.database import execute_query, execute_scalar
+from app.config import settings
+from app.database import execute_query, execute_scalar, open_notification_connection
 from app.services.andon_escalation_service import AndonEscalationService
-from app.services.notification_service import NotificationService
+from app.services.notification_service import notification_service
+from app.utils.time_range import to_utc
 
 logger = structlog.get_logger()
 
 
+# Timer kinds scheduled per escalation
+ESCALATE = "escalate"
+REMIND = "remind"
+TIMER_KINDS = (ESCALATE, REMIND)
+
+TimerKey = Tuple[str, str]
+
+
+def _utcnow() -> datetime:
+    """Get the current time as an aware UTC datetime."""
+    return datetime.now(timezone.utc)
+
+
+class EscalationTimers:
+    """Min-heap of escalation deadlines keyed by (escalation id, timer kind)."""
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, str, str]] = []
+        # Current deadline per timer; heap entries that disagree are stale
+        self._deadlines: Dict[TimerKey, datetime] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, escalation_id: Any, kind: str, deadline: datetime) -> None:
+        """Set a timer's deadline, replacing any earlier one."""
+        key = (str(escalation_id), kind)
+        if self._deadlines.get(key) == deadline:
+            return
+        self._deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._sequence), key[0], kind))
+
+        # Rescheduling leaves stale entries behind; rebuild once they dominate
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [
+                (deadline, next(self._sequence), escalation_id, kind)
+                for (escalation_id, kind), deadline in self._deadlines.items()
+            ]
+            heapq.heapify(self._heap)
+
+    def cancel(self, escalation_id: Any, kind: Optional[str] = None) -> None:
+        """Cancel one timer of an escalation, or all of them."""
+        for timer_kind in ((kind,) if kind else TIMER_KINDS):
+            self._deadlines.pop((str(escalation_id), timer_kind), None)
+
+    def clear(self) -> None:
+        """Cancel every timer."""
+        self._heap.clear()
+        self._deadlines.clear()
+
+    def next_deadline(self) -> Optional[datetime]:
+        """Get the earliest pending deadline."""
+        while self._heap:
+            deadline, _, escalation_id, kind = self._heap[0]
+            if self._deadlines.get((escalation_id, kind)) == deadline:
+                return deadline
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: datetime) -> List[TimerKey]:
+        """Remove and return the timers due at ``now``, earliest first."""
+        due = []
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > now:
+                return due
+            _, _, escalation_id, kind = heapq.heappop(self._heap)
+            del self._deadlines[(escalation_id, kind)]
+            due.append((escalation_id, kind))
+
+
 class AndonEscalationMonitor:
-    """Background monitor for Andon escalations."""
+    """Background deadline scheduler for Andon escalations."""
+    
+    CHANNEL = "andon_escalation_due"
+    
+    # Pause after an unexpected error in the scheduler loop
+    RETRY_DELAY_SECONDS = 5
+    
+    # Delay before retrying a deadline the database did not consider due yet
+    CLOCK_SKEW_SECONDS = 1
     
-    def __init__(self, check_interval_seconds: int = 60):
-        self.check_interval = check_interval_seconds
+    def __init__(self, sweep_interval_seconds: int = None):
+        self.sweep_interval = sweep_interval_seconds or settings.ANDON_ESCALATION_SWEEP_SECONDS
+        # Reminder lead before the deadline of an active or acknowledged escalation
+        self.reminder_minutes = {
+            "active": settings.ANDON_ACK_REMINDER_MINUTES,
+            "acknowledged": settings.ANDON_RESOLUTION_REMINDER_MINUTES
+        }
+        self.timers = EscalationTimers()
         self.is_running = False
         self.task = None
+        self.last_sweep_at: Optional[datetime] = None
+        
+        self._wakeup = asyncio.Event()
+        self._listener_connection = None
+        # Notifications received while a sweep is in flight, replayed after it
+        self._pending: Optional[List[Dict[str, Any]]] = None
+        
+        self.stats = {
+            "escalations_fired": 0,
+            "reminders_sent": 0,
+            "claims_lost": 0,
+            "notifications": 0
+        }
     
     async def start(self) -> None:
-        """Start the escalation monitor."""
+        """Start the escalation scheduler."""
         if self.is_running:
             logger.warning("Escalation monitor is already running")
             return
         
+        try:
+            self._listener_connection = await open_notification_connection()
+            await self._listener_connection.add_listener(self.CHANNEL, self._on_notification)
+        except Exception as e:
+            # The periodic sweep still picks up deadlines set elsewhere
+            logger.error("Failed to subscribe to escalation deadline notifications", error=str(e))
+            self._listener_connection = None
+        
         self.is_running = True
+        self.last_sweep_at = None
         self.task = asyncio.create_task(self._monitor_loop())
         
-        logger.info("Andon escalation monitor started", check_interval=self.check_interval)
+        logger.info("Andon escalation monitor started", sweep_interval=self.sweep_interval)
     
     async def stop(self) -> None:
-        """Stop the escalation monitor."""
+        """Stop the escalation scheduler."""
         if not self.is_running:
             logger.warning("Escalation monitor is not running")
             return
@@ -52,148 +175,242 @@ class AndonEscalationMonitor:
             except asyncio.CancelledError:
                 pass
         
+        if self._listener_connection:
+            try:
+                await self._listener_connection.close()
+            except Exception as e:
+                logger.error("Error closing escalation deadline listener", error=str(e))
+            self._listener_connection = None
+        
+        self.timers.clear()
+        
         logger.info("Andon escalation monitor stopped")
     
     async def _monitor_loop(self) -> None:
-        """Main monitoring loop."""
+        """Sleep until the earliest deadline or sweep, then act on what is due."""
         while self.is_running:
             try:
-                await self._process_escalations()
-                await asyncio.sleep(self.check_interval)
+                self._wakeup.clear()
+                
+                if self._sweep_due():
+                    await self._sweep()
+                
+                await self._process_due_timers()
+                
+                await self._wait_for_next_deadline()
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error("Error in escalation monitor loop", error=str(e))
-                await asyncio.sleep(self.check_interval)
+                await asyncio.sleep(self.RETRY_DELAY_SECONDS)
+    
+    def _sweep_due(self) -> bool:
+        return (
+            self.last_sweep_at is None
+            or (_utcnow() - self.last_sweep_at).total_seconds() >= self.sweep_interval
+        )
     
-    async def _process_escalations(self) -> None:
-        """Process escalations for timeout and automatic escalation."""
+    async def _wait_for_next_deadline(self) -> None:
+        """Wait until the next timer or sweep is due, or a notification arrives."""
+        now = _utcnow()
+        timeout = self.sweep_interval - (now - self.last_sweep_at).total_seconds()
+        
+        next_deadline = self.timers.next_deadline()
+        if next_deadline is not None:
+            timeout = min(timeout, (next_deadline - now).total_seconds())
+        
+        if timeout <= 0:
+            return
+        
         try:
-            # Process automatic escalations
-            processed_count = await AndonEscalationService.process_automatic_escalations()
-            
-            if processed_count > 0:
-                logger.info("Processed automatic escalations", count=processed_count)
-            
-            # Check for overdue escalations
-            overdue_count = await self._check_overdue_escalations()
-            
-            if overdue_count > 0:
-                logger.warning("Found overdue escalations", count=overdue_count)
-            
-            # Send reminder notifications
-            await self._send_reminder_notifications()
-            
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _sweep(self) -> int:
+        """
+        Reload every pending deadline in one indexed query.
+        
+        Recovers the timers after a restart and repairs any missed
+        notification; changes notified during the query are replayed on top.
+        """
+        self._pending = []
+        try:
+            pending_escalations = await execute_query("""
+                SELECT id, status, due_at, last_reminder_sent_at, escalated_at
+                FROM factory_telemetry.andon_escalations
+                WHERE due_at IS NOT NULL
+            """)
+        except Exception:
+            self._pending = None
+            raise
+        
+        self.timers.clear()
+        for escalation in pending_escalations:
+            self._schedule(escalation)
+        
+        pending, self._pending = self._pending, None
+        for escalation in pending:
+            self._schedule(escalation)
+        
+        self.last_sweep_at = _utcnow()
+        logger.debug("Escalation deadlines loaded", escalations=len(pending_escalations), timers=len(self.timers))
+        return len(pending_escalations)
+    
+    def _schedule(self, escalation: Dict[str, Any]) -> None:
+        """Set the escalation and reminder timers of an escalation from its state."""
+        escalation_id = str(escalation["id"])
+        status = escalation["status"]
+        due_at = to_utc(escalation["due_at"])
+        
+        if due_at is None or status not in self.reminder_minutes:
+            self.timers.cancel(escalation_id)
+            return
+        
+        self.timers.schedule(escalation_id, ESCALATE, due_at)
+        
+        # One reminder per deadline, unless it has already been sent or the
+        # deadline was re-armed by escalating after the reminder time
+        remind_at = due_at - timedelta(minutes=self.reminder_minutes[status])
+        reminded_at = [
+            to_utc(escalation.get(column)) for column in ("last_reminder_sent_at", "escalated_at")
+        ]
+        if any(sent_at is not None and sent_at >= remind_at for sent_at in reminded_at):
+            self.timers.cancel(escalation_id, REMIND)
+        else:
+            self.timers.schedule(escalation_id, REMIND, remind_at)
+    
+    async def _process_due_timers(self) -> None:
+        """Fire the escalations and send the reminders that are due."""
+        for escalation_id, kind in self.timers.pop_due(_utcnow()):
+            try:
+                if kind == ESCALATE:
+                    await self._fire_escalation(escalation_id)
+                else:
+                    await self._send_reminder(escalation_id)
+            except Exception as e:
+                logger.error(
+                    "Error processing escalation timer",
+                    error=str(e), escalation_id=escalation_id, timer=kind
+                )
+    
+    async def _fire_escalation(self, escalation_id: str) -> None:
+        """Escalate a due escalation if this replica claims its deadline."""
+        self.timers.cancel(escalation_id, REMIND)
+        
+        fired = await AndonEscalationService.fire_escalation(UUID(escalation_id))
+        
+        if fired:
+            self.stats["escalations_fired"] += 1
+            return
+        
+        # Another replica fired it, it was acknowledged or resolved meanwhile,
+        # or the database clock is behind ours; reschedule from its state
+        self.stats["claims_lost"] += 1
+        await self._reschedule(escalation_id)
+    
+    async def _reschedule(self, escalation_id: str) -> None:
+        """Reschedule an escalation from its stored deadline."""
+        result = await execute_query("""
+            SELECT id, status, due_at, last_reminder_sent_at, escalated_at
+            FROM factory_telemetry.andon_escalations
+            WHERE id = :escalation_id
+        """, {"escalation_id": escalation_id})
+        
+        if not result:
+            self.timers.cancel(escalation_id)
+            return
+        
+        escalation = dict(result[0])
+        retry_at = _utcnow() + timedelta(seconds=self.CLOCK_SKEW_SECONDS)
+        due_at = to_utc(escalation["due_at"])
+        if due_at is not None and due_at < retry_at:
+            escalation["due_at"] = retry_at
+        self._schedule(escalation)
+    
+    async def _send_reminder(self, escalation_id: str) -> None:
+        """Send the reminder of an escalation approaching its deadline, once."""
+        # Recording the reminder claims it; a replica that loses the race, or
+        # an escalation that moved on, matches no row
+        claim_query = """
+        UPDATE factory_telemetry.andon_escalations ae
+        SET last_reminder_sent_at = NOW()
+        FROM factory_telemetry.andon_events ae_events, factory_telemetry.production_lines pl
+        WHERE ae.id = :escalation_id
+        AND ae_events.id = ae.event_id
+        AND pl.id = ae_events.line_id
+        AND ae.status IN ('active', 'acknowledged')
+        AND ae.due_at > NOW()
+        AND COALESCE(GREATEST(ae.last_reminder_sent_at, ae.escalated_at), '-infinity')
+            < ae.due_at - INTERVAL '1 minute' * CASE
+                WHEN ae.status = 'active' THEN CAST(:ack_lead_minutes AS INTEGER)
+                ELSE CAST(:resolution_lead_minutes AS INTEGER)
+            END
+        RETURNING
+            ae.id as escalation_id,
+            ae.event_id,
+            ae.status,
+            ae.priority,
+            ae.escalation_level,
+            ae.escalation_recipients,
+            ae_events.line_id,
+            ae_events.equipment_code,
+            ae_events.description,
+            pl.line_code,
+            pl.name as line_name,
+            EXTRACT(EPOCH FROM (ae.due_at - NOW()))/60 as minutes_remaining
+        """
+        
+        result = await execute_query(claim_query, {
+            "escalation_id": escalation_id,
+            "ack_lead_minutes": self.reminder_minutes["active"],
+            "resolution_lead_minutes": self.reminder_minutes["acknowledged"]
+        })
+        
+        if not result:
+            self.stats["claims_lost"] += 1
+            return
+        
+        escalation = result[0]
+        if escalation["status"] == "active":
+            await self._send_acknowledgment_reminder(escalation)
+        else:
+            await self._send_resolution_reminder(escalation)
+        self.stats["reminders_sent"] += 1
+    
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        """Apply an andon_escalation_due NOTIFY payload."""
+        self.stats["notifications"] += 1
+        try:
+            escalation = json.loads(payload)
+            if self._pending is not None:
+                self._pending.append(escalation)
+            else:
+                self._schedule(escalation)
+            self._wakeup.set()
         except Exception as e:
-            logger.error("Error processing escalations", error=str(e))
+            logger.error("Invalid escalation deadline notification", error=str(e), payload=payload[:200])
     
     async def _check_overdue_escalations(self) -> int:
-        """Check for escalations that are overdue for acknowledgment or resolution."""
+        """Count escalations past their acknowledgment or resolution deadline."""
         try:
-            # Get escalations that are overdue for acknowledgment
-            overdue_ack_query = """
-            SELECT COUNT(*) as overdue_count
-            FROM factory_telemetry.andon_escalations ae
-            WHERE ae.status = 'active'
-            AND ae.acknowledged_at IS NULL
-            AND ae.created_at < NOW() - INTERVAL '1 minute' * ae.acknowledgment_timeout_minutes
-            """
-            
-            overdue_ack_result = await execute_scalar(overdue_ack_query)
-            overdue_ack_count = overdue_ack_result or 0
-            
-            # Get escalations that are overdue for resolution
-            overdue_res_query = """
+            overdue_query = """
             SELECT COUNT(*) as overdue_count
             FROM factory_telemetry.andon_escalations ae
-            WHERE ae.status IN ('active', 'acknowledged')
-            AND ae.resolved_at IS NULL
-            AND ae.created_at < NOW() - INTERVAL '1 minute' * ae.resolution_timeout_minutes
+            WHERE ae.due_at < NOW()
             """
             
-            overdue_res_result = await execute_scalar(overdue_res_query)
-            overdue_res_count = overdue_res_result or 0
-            
-            total_overdue = overdue_ack_count + overdue_res_count
+            overdue_count = await execute_scalar(overdue_query) or 0
             
-            if total_overdue > 0:
-                logger.warning(
-                    "Overdue escalations found",
-                    overdue_acknowledgment=overdue_ack_count,
-                    overdue_resolution=overdue_res_count,
-                    total=total_overdue
-                )
+            if overdue_count > 0:
+                logger.warning("Overdue escalations found", total=overdue_count)
             
-            return total_overdue
+            return overdue_count
             
         except Exception as e:
             logger.error("Error checking overdue escalations", error=str(e))
             return 0
     
-    async def _send_reminder_notifications(self) -> None:
-        """Send reminder notifications for escalations approaching timeout."""
-        try:
-            # Get escalations approaching acknowledgment timeout (within 5 minutes)
-            approaching_ack_query = """
-            SELECT 
-                ae.id as escalation_id,
-                ae.event_id,
-                ae.priority,
-                ae.escalation_level,
-                ae.escalation_recipients,
-                ae_events.line_id,
-                ae_events.equipment_code,
-                ae_events.description,
-                pl.line_code,
-                pl.name as line_name,
-                EXTRACT(EPOCH FROM (ae.created_at + INTERVAL '1 minute' * ae.acknowledgment_timeout_minutes - NOW()))/60 as minutes_remaining
-            FROM factory_telemetry.andon_escalations ae
-            JOIN factory_telemetry.andon_events ae_events ON ae.event_id = ae_events.id
-            JOIN factory_telemetry.production_lines pl ON ae_events.line_id = pl.id
-            WHERE ae.status = 'active'
-            AND ae.acknowledged_at IS NULL
-            AND ae.created_at + INTERVAL '1 minute' * ae.acknowledgment_timeout_minutes - NOW() BETWEEN 
-                INTERVAL '0 minutes' AND INTERVAL '5 minutes'
-            AND ae.last_reminder_sent_at IS NULL OR ae.last_reminder_sent_at < NOW() - INTERVAL '5 minutes'
-            """
-            
-            approaching_ack = await execute_query(approaching_ack_query)
-            
-            for escalation in approaching_ack:
-                await self._send_acknowledgment_reminder(escalation)
-            
-            # Get escalations approaching resolution timeout (within 10 minutes)
-            approaching_res_query = """
-            SELECT 
-                ae.id as escalation_id,
-                ae.event_id,
-                ae.priority,
-                ae.escalation_level,
-                ae.escalation_recipients,
-                ae_events.line_id,
-                ae_events.equipment_code,
-                ae_events.description,
-                pl.line_code,
-                pl.name as line_name,
-                EXTRACT(EPOCH FROM (ae.created_at + INTERVAL '1 minute' * ae.resolution_timeout_minutes - NOW()))/60 as minutes_remaining
-            FROM factory_telemetry.andon_escalations ae
-            JOIN factory_telemetry.andon_events ae_events ON ae.event_id = ae_events.id
-            JOIN factory_telemetry.production_lines pl ON ae_events.line_id = pl.id
-            WHERE ae.status IN ('active', 'acknowledged')
-            AND ae.resolved_at IS NULL
-            AND ae.created_at + INTERVAL '1 minute' * ae.resolution_timeout_minutes - NOW() BETWEEN 
-                INTERVAL '0 minutes' AND INTERVAL '10 minutes'
-            AND ae.last_reminder_sent_at IS NULL OR ae.last_reminder_sent_at < NOW() - INTERVAL '10 minutes'
-            """
-            
-            approaching_res = await execute_query(approaching_res_query)
-            
-            for escalation in approaching_res:
-                await self._send_resolution_reminder(escalation)
-            
-        except Exception as e:
-            logger.error("Error sending reminder notifications", error=str(e))
-    
     async def _send_acknowledgment_reminder(self, escalation: Dict[str, Any]) -> None:
         """Send acknowledgment reminder notification."""
         try:
@@ -211,11 +428,11 @@ class AndonEscalationMonitor:
             
             # Send to escalation recipients
             for recipient_role in escalation["escalation_recipients"]:
-                await NotificationService.send_notification(
-                    recipient_role=recipient_role,
+                await notification_service.send_notification_to_role(
+                    role=recipient_role,
                     notification_type="andon_escalation_reminder",
                     title="Andon Escalation Reminder",
-                    message=message,
+                    body=message,
                     data={
                         "escalation_id": str(escalation["escalation_id"]),
                         "event_id": str(escalation["event_id"]),
@@ -225,15 +442,6 @@ class AndonEscalationMonitor:
                     }
                 )
             
-            # Update last reminder sent timestamp
-            update_query = """
-            UPDATE factory_telemetry.andon_escalations 
-            SET last_reminder_sent_at = NOW()
-            WHERE id = :escalation_id
-            """
-            
-            await execute_query(update_query, {"escalation_id": escalation["escalation_id"]})
-            
             logger.info(
                 "Acknowledgment reminder sent",
                 escalation_id=escalation["escalation_id"],
@@ -260,11 +468,11 @@ class AndonEscalationMonitor:
             
             # Send to escalation recipients
             for recipient_role in escalation["escalation_recipients"]:
-                await NotificationService.send_notification(
-                    recipient_role=recipient_role,
+                await notification_service.send_notification_to_role(
+                    role=recipient_role,
                     notification_type="andon_escalation_reminder",
                     title="Andon Escalation Resolution Reminder",
-                    message=message,
+                    body=message,
                     data={
                         "escalation_id": str(escalation["escalation_id"]),
                         "event_id": str(escalation["event_id"]),
@@ -274,15 +482,6 @@ class AndonEscalationMonitor:
                     }
                 )
             
-            # Update last reminder sent timestamp
-            update_query = """
-            UPDATE factory_telemetry.andon_escalations 
-            SET last_reminder_sent_at = NOW()
-            WHERE id = :escalation_id
-            """
-            
-            await execute_query(update_query, {"escalation_id": escalation["escalation_id"]})
-            
             logger.info(
                 "Resolution reminder sent",
                 escalation_id=escalation["escalation_id"],
@@ -317,13 +516,19 @@ class AndonEscalationMonitor:
             
             processed_count = await execute_scalar(processed_count_query) or 0
             
+            next_deadline = self.timers.next_deadline()
+            
             return {
                 "monitor_running": self.is_running,
-                "check_interval_seconds": self.check_interval,
+                "sweep_interval_seconds": self.sweep_interval,
+                "listening": self._listener_connection is not None,
+                "pending_timers": len(self.timers),
+                "next_deadline": next_deadline.isoformat() if next_deadline else None,
                 "active_escalations": active_count,
                 "overdue_escalations": overdue_count,
                 "escalations_processed_last_hour": processed_count,
-                "last_check": datetime.utcnow().isoformat()
+                **self.stats,
+                "last_sweep": self.last_sweep_at.isoformat() if self.last_sweep_at else None
             }
             
         except Exception as e:
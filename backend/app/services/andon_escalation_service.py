@@ -11,7 +11,7 @@ from uuid import UUID
 import asyncio
 import structlog
 
-from app.database import execute_query, execute_scalar, execute_update
+from app.database import execute_query, execute_update
 from app.models.production import (
     AndonEventResponse, AndonPriority, AndonStatus
 )
@@ -463,22 +463,21 @@ class AndonEscalationService:
     
     @staticmethod
     async def process_automatic_escalations() -> int:
-        """Process automatic escalations based on timeouts."""
+        """Fire every escalation whose due_at deadline has passed."""
         try:
-            # Call the database function to process automatic escalations
-            query = "SELECT factory_telemetry.auto_escalate_andon_events()"
-            await execute_scalar(query)
-            
-            # Get count of escalations that were processed
-            count_query = """
-            SELECT COUNT(*) as processed_count
+            due_query = """
+            SELECT id
             FROM factory_telemetry.andon_escalations
-            WHERE escalated_at >= NOW() - INTERVAL '1 minute'
-            AND status = 'escalated'
+            WHERE due_at <= NOW()
+            ORDER BY due_at
             """
             
-            result = await execute_scalar(count_query)
-            processed_count = result or 0
+            due_escalations = await execute_query(due_query)
+            
+            processed_count = 0
+            for escalation in due_escalations:
+                if await AndonEscalationService.fire_escalation(escalation["id"]):
+                    processed_count += 1
             
             logger.info("Automatic escalations processed", count=processed_count)
             return processed_count
@@ -487,6 +486,41 @@ class AndonEscalationService:
             logger.error("Failed to process automatic escalations", error=str(e))
             raise BusinessLogicError("Failed to process automatic escalations")
     
+    @staticmethod
+    async def fire_escalation(escalation_id: UUID) -> Optional[Dict[str, Any]]:
+        """
+        Escalate a due escalation to its next level and notify the new recipients.
+        
+        The deadline is claimed by fire_andon_escalation() under the row lock,
+        so when several replicas fire the same deadline only one escalates and
+        the others get None.
+        """
+        query = """
+        SELECT fired_level, fired_priority, fired_recipients, fired_methods
+        FROM factory_telemetry.fire_andon_escalation(:escalation_id)
+        """
+        
+        result = await execute_query(query, {"escalation_id": escalation_id})
+        
+        if not result:
+            return None
+        
+        fired = result[0]
+        
+        if fired["fired_recipients"]:
+            await AndonEscalationService._send_escalation_notifications(
+                escalation_id, fired["fired_recipients"], fired["fired_methods"]
+            )
+        
+        logger.info(
+            "Andon escalation fired",
+            escalation_id=escalation_id,
+            escalation_level=fired["fired_level"],
+            priority=fired["fired_priority"]
+        )
+        
+        return fired
+    
     @staticmethod
     async def _get_escalation(escalation_id: UUID) -> Dict[str, Any]:
         """Get escalation details by ID."""
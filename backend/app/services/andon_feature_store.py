@@ -0,0 +1,336 @@
+"""
+MS5.0 Floor Dashboard - Andon Feature Store
+
+This module materializes per-equipment Andon features into
+factory_telemetry.andon_equipment_features (see migration
+021_andon_equipment_features.sql). A nightly task folds the trailing feature
+window of andon_events into one row per equipment: MTBF, MTTR, time to
+acknowledge, hourly and event-type histograms, and fault co-occurrence with
+other equipment on the line. Event prediction and predictive maintenance
+read these rows instead of scanning the raw event history per request.
+Every materialization also records a run marker per line it covered in
+factory_telemetry.andon_feature_runs, so a line without events is not
+materialized again on request.
+"""
+
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import structlog
+
+from app.config import settings
+from app.database import execute_query, execute_update
+from app.utils.exceptions import BusinessLogicError
+
+logger = structlog.get_logger()
+
+
+FEATURE_COLUMNS = (
+    "line_id", "equipment_code", "window_start", "window_end", "event_count",
+    "resolved_count", "first_event_at", "last_event_at", "mtbf_minutes",
+    "mttr_minutes", "mtta_minutes", "hourly_histogram", "event_type_counts",
+    "cooccurrence"
+)
+
+JSON_COLUMNS = ("hourly_histogram", "event_type_counts", "cooccurrence")
+
+
+def _average_minutes(durations: List[timedelta]) -> Optional[float]:
+    """Average durations in minutes, or None without any."""
+    if not durations:
+        return None
+    return round(sum(duration.total_seconds() for duration in durations) / len(durations) / 60, 2)
+
+
+class AndonFeatureStore:
+    """Materializes and reads per-equipment Andon features."""
+
+    @staticmethod
+    def build_features(
+        line_id: UUID,
+        events: List[Dict[str, Any]],
+        window_start: datetime,
+        window_end: datetime,
+        cooccurrence_minutes: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fold one line's events, ordered by reported_at, into feature rows.
+
+        Two events co-occur when they are on different equipment and were
+        reported within cooccurrence_minutes of each other.
+        """
+        if cooccurrence_minutes is None:
+            cooccurrence_minutes = settings.ANDON_FEATURE_COOCCURRENCE_MINUTES
+        window_minutes = (window_end - window_start).total_seconds() / 60
+        cooccurrence_window = timedelta(minutes=cooccurrence_minutes)
+
+        reported = [event["reported_at"] for event in events]
+        features: Dict[str, Dict[str, Any]] = {}
+        repair_times: Dict[str, List[timedelta]] = {}
+        acknowledge_times: Dict[str, List[timedelta]] = {}
+
+        for position, event in enumerate(events):
+            equipment_code = event["equipment_code"]
+            reported_at = event["reported_at"]
+
+            feature = features.get(equipment_code)
+            if feature is None:
+                feature = features[equipment_code] = {
+                    "line_id": line_id,
+                    "equipment_code": equipment_code,
+                    "window_start": window_start,
+                    "window_end": window_end,
+                    "event_count": 0,
+                    "resolved_count": 0,
+                    "first_event_at": reported_at,
+                    "last_event_at": reported_at,
+                    "hourly_histogram": [0] * 24,
+                    "event_type_counts": {},
+                    "cooccurrence": {}
+                }
+                repair_times[equipment_code] = []
+                acknowledge_times[equipment_code] = []
+
+            feature["event_count"] += 1
+            feature["last_event_at"] = reported_at
+            feature["hourly_histogram"][reported_at.hour] += 1
+            event_type = event["event_type"]
+            feature["event_type_counts"][event_type] = feature["event_type_counts"].get(event_type, 0) + 1
+
+            if event["resolved_at"]:
+                feature["resolved_count"] += 1
+                repair_times[equipment_code].append(event["resolved_at"] - reported_at)
+            if event["acknowledged_at"]:
+                acknowledge_times[equipment_code].append(event["acknowledged_at"] - reported_at)
+
+            # Other equipment with events close to this one, counted once per event
+            nearby = set()
+            for other in events[bisect_left(reported, reported_at - cooccurrence_window):
+                                bisect_right(reported, reported_at + cooccurrence_window)]:
+                if other["equipment_code"] != equipment_code:
+                    nearby.add(other["equipment_code"])
+            for other_code in nearby:
+                feature["cooccurrence"][other_code] = feature["cooccurrence"].get(other_code, 0) + 1
+
+        for equipment_code, feature in features.items():
+            feature["mtbf_minutes"] = round(window_minutes / feature["event_count"], 2)
+            feature["mttr_minutes"] = _average_minutes(repair_times[equipment_code])
+            feature["mtta_minutes"] = _average_minutes(acknowledge_times[equipment_code])
+
+        return list(features.values())
+
+    @staticmethod
+    async def materialize(line_id: Optional[UUID] = None, as_of: Optional[datetime] = None) -> int:
+        """Rebuild the features of one line, or of every line, over the trailing window."""
+        window_end = as_of or datetime.utcnow()
+        window_start = window_end - timedelta(days=settings.ANDON_FEATURE_WINDOW_DAYS)
+
+        try:
+            params = {"window_start": window_start, "window_end": window_end}
+            line_condition = ""
+            if line_id is not None:
+                line_condition = "AND line_id = :line_id"
+                params["line_id"] = line_id
+
+            events_query = f"""
+            SELECT line_id, equipment_code, event_type, reported_at, acknowledged_at, resolved_at
+            FROM factory_telemetry.andon_events
+            WHERE reported_at >= :window_start AND reported_at < :window_end
+            AND line_id IS NOT NULL {line_condition}
+            ORDER BY line_id, reported_at
+            """
+            events = await execute_query(events_query, params)
+
+            events_by_line: Dict[Any, List[Dict[str, Any]]] = {}
+            for event in events:
+                events_by_line.setdefault(event["line_id"], []).append(event)
+
+            rows = []
+            for event_line_id, line_events in events_by_line.items():
+                rows.extend(AndonFeatureStore.build_features(
+                    event_line_id, line_events, window_start, window_end
+                ))
+
+            if rows:
+                await AndonFeatureStore._upsert_features(rows)
+
+            # Equipment without events in the new window keeps no features
+            await execute_update(f"""
+                DELETE FROM factory_telemetry.andon_equipment_features
+                WHERE window_end < :window_end {line_condition}
+            """, params)
+
+            line_filter = "WHERE id = :line_id" if line_id is not None else ""
+            await execute_update(f"""
+                INSERT INTO factory_telemetry.andon_feature_runs (line_id, window_end, materialized_at)
+                SELECT id, :window_end, NOW()
+                FROM factory_telemetry.production_lines
+                {line_filter}
+                ON CONFLICT (line_id) DO UPDATE SET
+                    window_end = EXCLUDED.window_end,
+                    materialized_at = EXCLUDED.materialized_at
+            """, params)
+
+            logger.info(
+                "Andon features materialized",
+                line_id=line_id,
+                equipment=len(rows),
+                events=len(events),
+                window_days=settings.ANDON_FEATURE_WINDOW_DAYS
+            )
+            return len(rows)
+
+        except Exception as e:
+            logger.error("Failed to materialize Andon features", error=str(e), line_id=line_id)
+            raise BusinessLogicError("Failed to materialize Andon features")
+
+    @staticmethod
+    async def get_line_features(line_id: UUID) -> List[Dict[str, Any]]:
+        """Get the materialized features of a line's equipment."""
+        try:
+            result = await execute_query(f"""
+                SELECT {", ".join(FEATURE_COLUMNS)}, materialized_at
+                FROM factory_telemetry.andon_equipment_features
+                WHERE line_id = :line_id
+                ORDER BY event_count DESC, equipment_code
+            """, {"line_id": line_id})
+
+            return [AndonFeatureStore._decode_row(row) for row in result]
+
+        except Exception as e:
+            logger.error("Failed to get Andon features", error=str(e), line_id=line_id)
+            raise BusinessLogicError("Failed to get Andon features")
+
+    @staticmethod
+    async def is_materialized(line_id: UUID) -> bool:
+        """Check whether any materialization has covered a line, with or without events."""
+        try:
+            result = await execute_query("""
+                SELECT 1
+                FROM factory_telemetry.andon_feature_runs
+                WHERE line_id = :line_id
+            """, {"line_id": line_id})
+
+            return bool(result)
+
+        except Exception as e:
+            logger.error("Failed to get Andon feature run", error=str(e), line_id=line_id)
+            raise BusinessLogicError("Failed to get Andon feature run")
+
+    @staticmethod
+    async def get_equipment_features(line_id: UUID, equipment_code: str) -> Optional[Dict[str, Any]]:
+        """Get the materialized features of one equipment."""
+        try:
+            result = await execute_query(f"""
+                SELECT {", ".join(FEATURE_COLUMNS)}, materialized_at
+                FROM factory_telemetry.andon_equipment_features
+                WHERE line_id = :line_id AND equipment_code = :equipment_code
+            """, {"line_id": line_id, "equipment_code": equipment_code})
+
+            return AndonFeatureStore._decode_row(result[0]) if result else None
+
+        except Exception as e:
+            logger.error(
+                "Failed to get Andon equipment features",
+                error=str(e), line_id=line_id, equipment_code=equipment_code
+            )
+            raise BusinessLogicError("Failed to get Andon equipment features")
+
+    @staticmethod
+    def event_patterns(features: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine equipment features into the event patterns used for prediction."""
+        if not features:
+            return {"patterns": [], "trends": {}}
+
+        event_counts_by_type: Dict[str, int] = {}
+        event_counts_by_hour: Dict[int, int] = {}
+        event_counts_by_equipment = {feature["equipment_code"]: feature["event_count"] for feature in features}
+
+        for feature in features:
+            for event_type, count in feature["event_type_counts"].items():
+                event_counts_by_type[event_type] = event_counts_by_type.get(event_type, 0) + count
+            for hour, count in enumerate(feature["hourly_histogram"]):
+                if count:
+                    event_counts_by_hour[hour] = event_counts_by_hour.get(hour, 0) + count
+
+        def most_common(counts: Dict[Any, int]) -> Any:
+            return max(counts.items(), key=lambda item: item[1])[0] if counts else None
+
+        return {
+            "patterns": {
+                "event_type_distribution": event_counts_by_type,
+                "equipment_distribution": event_counts_by_equipment,
+                "hourly_distribution": event_counts_by_hour
+            },
+            "trends": {
+                "most_common_event_type": most_common(event_counts_by_type),
+                "most_problematic_equipment": most_common(event_counts_by_equipment),
+                "peak_event_hour": most_common(event_counts_by_hour)
+            },
+            "total_events": sum(event_counts_by_equipment.values())
+        }
+
+    @staticmethod
+    async def _upsert_features(rows: List[Dict[str, Any]]) -> int:
+        """Write feature rows, replacing the previous window's."""
+        upsert_query = """
+        INSERT INTO factory_telemetry.andon_equipment_features
+        (line_id, equipment_code, window_start, window_end, event_count, resolved_count,
+         first_event_at, last_event_at, mtbf_minutes, mttr_minutes, mtta_minutes,
+         hourly_histogram, event_type_counts, cooccurrence, materialized_at)
+        SELECT line_id, equipment_code, window_start, window_end, event_count, resolved_count,
+               first_event_at, last_event_at, mtbf_minutes, mttr_minutes, mtta_minutes,
+               CAST(hourly_histogram AS JSONB), CAST(event_type_counts AS JSONB),
+               CAST(cooccurrence AS JSONB), NOW()
+        FROM unnest(
+            CAST(:line_id AS UUID[]),
+            CAST(:equipment_code AS TEXT[]),
+            CAST(:window_start AS TIMESTAMPTZ[]),
+            CAST(:window_end AS TIMESTAMPTZ[]),
+            CAST(:event_count AS INTEGER[]),
+            CAST(:resolved_count AS INTEGER[]),
+            CAST(:first_event_at AS TIMESTAMPTZ[]),
+            CAST(:last_event_at AS TIMESTAMPTZ[]),
+            CAST(:mtbf_minutes AS REAL[]),
+            CAST(:mttr_minutes AS REAL[]),
+            CAST(:mtta_minutes AS REAL[]),
+            CAST(:hourly_histogram AS TEXT[]),
+            CAST(:event_type_counts AS TEXT[]),
+            CAST(:cooccurrence AS TEXT[])
+        ) AS features (line_id, equipment_code, window_start, window_end, event_count, resolved_count,
+                       first_event_at, last_event_at, mtbf_minutes, mttr_minutes, mtta_minutes,
+                       hourly_histogram, event_type_counts, cooccurrence)
+        ON CONFLICT (line_id, equipment_code) DO UPDATE SET
+            window_start = EXCLUDED.window_start,
+            window_end = EXCLUDED.window_end,
+            event_count = EXCLUDED.event_count,
+            resolved_count = EXCLUDED.resolved_count,
+            first_event_at = EXCLUDED.first_event_at,
+            last_event_at = EXCLUDED.last_event_at,
+            mtbf_minutes = EXCLUDED.mtbf_minutes,
+            mttr_minutes = EXCLUDED.mttr_minutes,
+            mtta_minutes = EXCLUDED.mtta_minutes,
+            hourly_histogram = EXCLUDED.hourly_histogram,
+            event_type_counts = EXCLUDED.event_type_counts,
+            cooccurrence = EXCLUDED.cooccurrence,
+            materialized_at = EXCLUDED.materialized_at
+        """
+
+        return await execute_update(upsert_query, {
+            column: [
+                json.dumps(row[column]) if column in JSON_COLUMNS else row[column]
+                for row in rows
+            ]
+            for column in FEATURE_COLUMNS
+        })
+
+    @staticmethod
+    def _decode_row(row: Any) -> Dict[str, Any]:
+        """Get a feature row as a dict with decoded JSONB columns."""
+        feature = {column: row[column] for column in FEATURE_COLUMNS + ("materialized_at",)}
+        for column in JSON_COLUMNS:
+            if isinstance(feature[column], str):
+                feature[column] = json.loads(feature[column])
+        return feature
@@ -18,8 +18,12 @@ from app.models.production import (
 from app.utils.exceptions import (
     NotFoundError, ValidationError, BusinessLogicError, ConflictError
 )
+from app.utils.pagination import keyset_predicate
 from app.services.notification_service import notification_service
 from app.services.andon_escalation_service import AndonEscalationService
+from app.services.active_andon_index import active_andon_index
+from app.services.andon_analytics import AndonAnalytics
+from app.services.andon_feature_store import AndonFeatureStore
 
 logger = structlog.get_logger()
 
@@ -68,7 +72,13 @@ class AndonService:
             if not line_exists:
                 raise NotFoundError("Production line", str(event_data.line_id))
             
-            # Check for duplicate active events
+            # Check for duplicate active events; the in-memory index answers
+            # repeats without a query, the database remains authoritative
+            if active_andon_index.is_loaded and active_andon_index.has_active(
+                event_data.line_id, event_data.equipment_code, event_data.event_type.value
+            ):
+                raise ConflictError("Active Andon event already exists for this equipment")
+            
             duplicate_query = """
             SELECT id FROM factory_telemetry.andon_events 
             WHERE line_id = :line_id 
@@ -129,7 +139,7 @@ class AndonService:
                 priority=event_data.priority.value
             )
             
-            return AndonEventResponse(
+            created = AndonEventResponse(
                 id=event["id"],
                 line_id=event["line_id"],
                 equipment_code=event["equipment_code"],
@@ -145,6 +155,9 @@ class AndonService:
                 resolved_at=None,
                 resolution_notes=None
             )
+            AndonService._update_active_index(created)
+            
+            return created
             
         except (NotFoundError, ConflictError, BusinessLogicError):
             raise
@@ -235,7 +248,9 @@ class AndonService:
             )
             
             # Return updated event
-            return await AndonService.get_andon_event(event_id)
+            updated = await AndonService.get_andon_event(event_id)
+            AndonService._update_active_index(updated)
+            return updated
             
         except (NotFoundError, BusinessLogicError):
             raise
@@ -286,7 +301,9 @@ class AndonService:
             )
             
             # Return updated event
-            return await AndonService.get_andon_event(event_id)
+            updated = await AndonService.get_andon_event(event_id)
+            AndonService._update_active_index(updated)
+            return updated
             
         except (NotFoundError, BusinessLogicError):
             raise
@@ -359,12 +376,22 @@ class AndonService:
         status: Optional[AndonStatus] = None,
         priority: Optional[AndonPriority] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[AndonEventResponse]:
-        """List Andon events with filters."""
+        """
+        List Andon events with filters, newest first.
+        
+        Pages are continued with ``cursor``, the next_cursor() of the previous
+        page on (reported_at, id); ``skip`` is kept for older clients and is
+        ignored when a cursor is given.
+        """
         try:
-            where_conditions = []
-            query_params = {"skip": skip, "limit": limit}
+            where_conditions, query_params = keyset_predicate(
+                ["reported_at", "id"], cursor, (datetime, UUID)
+            )
+            query_params["limit"] = limit
+            query_params["skip"] = 0 if cursor else skip
             
             if line_id:
                 where_conditions.append("line_id = :line_id")
@@ -386,7 +413,7 @@ class AndonService:
                    resolved_by, resolved_at, resolution_notes
             FROM factory_telemetry.andon_events 
             {where_clause}
-            ORDER BY reported_at DESC
+            ORDER BY reported_at DESC, id DESC
             LIMIT :limit OFFSET :skip
             """
             
@@ -413,6 +440,8 @@ class AndonService:
             
             return events
             
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error("Failed to list Andon events", error=str(e))
             raise BusinessLogicError("Failed to list Andon events")
@@ -479,79 +508,28 @@ class AndonService:
             if not end_date:
                 end_date = datetime.utcnow()
             
-            where_conditions = ["reported_at >= :start_date", "reported_at <= :end_date"]
-            query_params = {
-                "start_date": start_date,
-                "end_date": end_date
-            }
-            
-            if line_id:
-                where_conditions.append("line_id = :line_id")
-                query_params["line_id"] = line_id
-            
-            where_clause = "WHERE " + " AND ".join(where_conditions)
-            
-            # Get total events by status
-            status_query = f"""
-            SELECT status, COUNT(*) as count
-            FROM factory_telemetry.andon_events 
-            {where_clause}
-            GROUP BY status
-            """
-            
-            status_result = await execute_query(status_query, query_params)
-            status_counts = {row["status"]: row["count"] for row in status_result}
-            
-            # Get events by priority
-            priority_query = f"""
-            SELECT priority, COUNT(*) as count
-            FROM factory_telemetry.andon_events 
-            {where_clause}
-            GROUP BY priority
-            """
-            
-            priority_result = await execute_query(priority_query, query_params)
-            priority_counts = {row["priority"]: row["count"] for row in priority_result}
-            
-            # Get events by type
-            type_query = f"""
-            SELECT event_type, COUNT(*) as count
-            FROM factory_telemetry.andon_events 
-            {where_clause}
-            GROUP BY event_type
-            """
-            
-            type_result = await execute_query(type_query, query_params)
-            type_counts = {row["event_type"]: row["count"] for row in type_result}
-            
-            # Get average resolution time
-            resolution_query = f"""
-            SELECT AVG(EXTRACT(EPOCH FROM (resolved_at - reported_at))/60) as avg_resolution_minutes
-            FROM factory_telemetry.andon_events 
-            {where_clause}
-            AND status = 'resolved'
-            AND resolved_at IS NOT NULL
-            """
-            
-            resolution_result = await execute_query(resolution_query, query_params)
-            avg_resolution_minutes = resolution_result[0]["avg_resolution_minutes"] if resolution_result else 0
-            
-            return {
-                "period": {
-                    "start_date": start_date,
-                    "end_date": end_date
-                },
-                "total_events": sum(status_counts.values()),
-                "status_breakdown": status_counts,
-                "priority_breakdown": priority_counts,
-                "type_breakdown": type_counts,
-                "average_resolution_minutes": round(avg_resolution_minutes, 2) if avg_resolution_minutes else 0
-            }
+            # One pass over the window yields every breakdown
+            window = await AndonAnalytics.load(line_id, start_date, end_date)
+            return window.statistics()
             
         except Exception as e:
             logger.error("Failed to get Andon statistics", error=str(e))
             raise BusinessLogicError("Failed to get Andon statistics")
     
+    @staticmethod
+    def _update_active_index(event: AndonEventResponse) -> None:
+        """Reflect an event's status in this process's active Andon index."""
+        active_andon_index.apply({
+            "id": event.id,
+            "line_id": event.line_id,
+            "equipment_code": event.equipment_code,
+            "event_type": event.event_type.value,
+            "priority": event.priority.value,
+            "description": event.description,
+            "status": event.status.value,
+            "reported_at": event.reported_at
+        })
+    
     @staticmethod
     async def _start_escalation_process(event_id: UUID, priority: AndonPriority) -> None:
         """Start escalation process for an Andon event."""
@@ -707,43 +685,23 @@ class AndonService:
     ) -> Dict[str, Any]:
         """Get comprehensive Andon dashboard data."""
         try:
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=days)
-            
-            # Get basic statistics
-            stats = await AndonService.get_andon_statistics(line_id, start_date, end_date)
+            # Every facet below comes from one cached pass over the window
+            window = await AndonAnalytics.get_window(line_id, days)
+            start_date, end_date = window.start_date, window.end_date
+            stats = window.statistics()
             
-            # Get active events
-            active_events = await AndonService.get_active_andon_events(line_id)
-            
-            # Get recent events (last 24 hours)
-            recent_start = end_date - timedelta(hours=24)
-            recent_events = await AndonService.list_andon_events(
-                line_id=line_id,
-                skip=0,
-                limit=50
-            )
-            
-            # Filter recent events
-            recent_events = [
-                event for event in recent_events 
-                if event.reported_at >= recent_start
-            ]
+            # Get active events from the in-memory index
+            await active_andon_index.ensure_loaded()
+            active_events = active_andon_index.active_events(line_id)
+            now = datetime.utcnow()
             
             # Calculate key metrics
             total_events = stats["total_events"]
-            open_events = stats["status_breakdown"].get("open", 0)
-            acknowledged_events = stats["status_breakdown"].get("acknowledged", 0)
             resolved_events = stats["status_breakdown"].get("resolved", 0)
             
-            # Calculate response metrics
-            response_metrics = await AndonService._calculate_response_metrics(line_id, start_date, end_date)
-            
-            # Get top equipment with most events
-            top_equipment = await AndonService._get_top_equipment_by_events(line_id, start_date, end_date)
-            
-            # Get trend data
-            trend_data = await AndonService._get_andon_trends(line_id, days)
+            response_metrics = window.response_metrics()
+            top_equipment = window.top_equipment()
+            trend_data = window.trends()
             
             return {
                 "period": {
@@ -754,7 +712,7 @@ class AndonService:
                 "summary": {
                     "total_events": total_events,
                     "active_events": len(active_events),
-                    "recent_events": len(recent_events),
+                    "recent_events": window.recent_events,
                     "resolution_rate": (resolved_events / total_events * 100) if total_events > 0 else 0
                 },
                 "status_breakdown": stats["status_breakdown"],
@@ -762,13 +720,13 @@ class AndonService:
                 "type_breakdown": stats["type_breakdown"],
                 "active_events": [
                     {
-                        "id": event.id,
-                        "equipment_code": event.equipment_code,
-                        "event_type": event.event_type.value,
-                        "priority": event.priority.value,
-                        "description": event.description,
-                        "reported_at": event.reported_at.isoformat(),
-                        "duration_minutes": int((end_date - event.reported_at).total_seconds() / 60)
+                        "id": event["id"],
+                        "equipment_code": event["equipment_code"],
+                        "event_type": event["event_type"],
+                        "priority": event["priority"],
+                        "description": event["description"],
+                        "reported_at": event["reported_at"].isoformat(),
+                        "duration_minutes": int((now - event["reported_at"]).total_seconds() / 60)
                     }
                     for event in active_events
                 ],
@@ -787,246 +745,6 @@ class AndonService:
             logger.error("Failed to get Andon dashboard data", error=str(e))
             raise BusinessLogicError("Failed to get Andon dashboard data")
     
-    @staticmethod
-    async def _calculate_response_metrics(
-        line_id: Optional[UUID],
-        start_date: datetime,
-        end_date: datetime
-    ) -> Dict[str, Any]:
-        """Calculate response time metrics for Andon events."""
-        try:
-            where_conditions = [
-                "reported_at >= :start_date",
-                "reported_at <= :end_date",
-                "acknowledged_at IS NOT NULL"
-            ]
-            query_params = {"start_date": start_date, "end_date": end_date}
-            
-            if line_id:
-                where_conditions.append("line_id = :line_id")
-                query_params["line_id"] = line_id
-            
-            where_clause = "WHERE " + " AND ".join(where_conditions)
-            
-            # Calculate acknowledgment times by priority
-            ack_query = f"""
-            SELECT 
-                priority,
-                AVG(EXTRACT(EPOCH FROM (acknowledged_at - reported_at))/60) as avg_ack_minutes,
-                MIN(EXTRACT(EPOCH FROM (acknowledged_at - reported_at))/60) as min_ack_minutes,
-                MAX(EXTRACT(EPOCH FROM (acknowledged_at - reported_at))/60) as max_ack_minutes
-            FROM factory_telemetry.andon_events 
-            {where_clause}
-            GROUP BY priority
-            """
-            
-            ack_result = await execute_query(ack_query, query_params)
-            acknowledgment_metrics = {row["priority"]: {
-                "avg_minutes": round(row["avg_ack_minutes"], 2),
-                "min_minutes": round(row["min_ack_minutes"], 2),
-                "max_minutes": round(row["max_ack_minutes"], 2)
-            } for row in ack_result}
-            
-            # Calculate resolution times by priority
-            res_conditions = where_conditions + ["resolved_at IS NOT NULL"]
-            res_where_clause = "WHERE " + " AND ".join(res_conditions)
-            
-            res_query = f"""
-            SELECT 
-                priority,
-                AVG(EXTRACT(EPOCH FROM (resolved_at - reported_at))/60) as avg_res_minutes,
-                MIN(EXTRACT(EPOCH FROM (resolved_at - reported_at))/60) as min_res_minutes,
-                MAX(EXTRACT(EPOCH FROM (resolved_at - reported_at))/60) as max_res_minutes
-            FROM factory_telemetry.andon_events 
-            {res_where_clause}
-            GROUP BY priority
-            """
-            
-            res_result = await execute_query(res_query, query_params)
-            resolution_metrics = {row["priority"]: {
-                "avg_minutes": round(row["avg_res_minutes"], 2),
-                "min_minutes": round(row["min_res_minutes"], 2),
-                "max_minutes": round(row["max_res_minutes"], 2)
-            } for row in res_result}
-            
-            return {
-                "acknowledgment_metrics": acknowledgment_metrics,
-                "resolution_metrics": resolution_metrics,
-                "overall_avg_acknowledgment_minutes": round(sum(
-                    metrics["avg_minutes"] for metrics in acknowledgment_metrics.values()
-                ) / len(acknowledgment_metrics), 2) if acknowledgment_metrics else 0,
-                "overall_avg_resolution_minutes": round(sum(
-                    metrics["avg_minutes"] for metrics in resolution_metrics.values()
-                ) / len(resolution_metrics), 2) if resolution_metrics else 0
-            }
-            
-        except Exception as e:
-            logger.error("Failed to calculate response metrics", error=str(e))
-            return {
-                "acknowledgment_metrics": {},
-                "resolution_metrics": {},
-                "overall_avg_acknowledgment_minutes": 0,
-                "overall_avg_resolution_minutes": 0
-            }
-    
-    @staticmethod
-    async def _get_top_equipment_by_events(
-        line_id: Optional[UUID],
-        start_date: datetime,
-        end_date: datetime,
-        limit: int = 5
-    ) -> List[Dict[str, Any]]:
-        """Get equipment with most Andon events."""
-        try:
-            where_conditions = [
-                "reported_at >= :start_date",
-                "reported_at <= :end_date"
-            ]
-            query_params = {"start_date": start_date, "end_date": end_date}
-            
-            if line_id:
-                where_conditions.append("line_id = :line_id")
-                query_params["line_id"] = line_id
-            
-            where_clause = "WHERE " + " AND ".join(where_conditions)
-            
-            query = f"""
-            SELECT 
-                equipment_code,
-                COUNT(*) as total_events,
-                COUNT(CASE WHEN status = 'resolved' THEN 1 END) as resolved_events,
-                COUNT(CASE WHEN priority = 'critical' THEN 1 END) as critical_events,
-                COUNT(CASE WHEN priority = 'high' THEN 1 END) as high_priority_events,
-                AVG(EXTRACT(EPOCH FROM (COALESCE(resolved_at, :end_date) - reported_at))/60) as avg_duration_minutes
-            FROM factory_telemetry.andon_events 
-            {where_clause}
-            GROUP BY equipment_code
-            ORDER BY total_events DESC
-            LIMIT :limit
-            """
-            
-            query_params["limit"] = limit
-            result = await execute_query(query, query_params)
-            
-            return [
-                {
-                    "equipment_code": row["equipment_code"],
-                    "total_events": row["total_events"],
-                    "resolved_events": row["resolved_events"],
-                    "critical_events": row["critical_events"],
-                    "high_priority_events": row["high_priority_events"],
-                    "avg_duration_minutes": round(row["avg_duration_minutes"], 2),
-                    "resolution_rate": round((row["resolved_events"] / row["total_events"] * 100), 2)
-                }
-                for row in result
-            ]
-            
-        except Exception as e:
-            logger.error("Failed to get top equipment by events", error=str(e))
-            return []
-    
-    @staticmethod
-    async def _get_andon_trends(
-        line_id: Optional[UUID],
-        days: int
-    ) -> Dict[str, Any]:
-        """Get Andon event trends over time."""
-        try:
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=days)
-            
-            where_conditions = [
-                "reported_at >= :start_date",
-                "reported_at <= :end_date"
-            ]
-            query_params = {"start_date": start_date, "end_date": end_date}
-            
-            if line_id:
-                where_conditions.append("line_id = :line_id")
-                query_params["line_id"] = line_id
-            
-            where_clause = "WHERE " + " AND ".join(where_conditions)
-            
-            # Get daily event counts
-            daily_query = f"""
-            SELECT 
-                DATE(reported_at) as event_date,
-                COUNT(*) as total_events,
-                COUNT(CASE WHEN status = 'resolved' THEN 1 END) as resolved_events,
-                COUNT(CASE WHEN priority = 'critical' THEN 1 END) as critical_events,
-                COUNT(CASE WHEN priority = 'high' THEN 1 END) as high_priority_events
-            FROM factory_telemetry.andon_events 
-            {where_clause}
-            GROUP BY DATE(reported_at)
-            ORDER BY event_date ASC
-            """
-            
-            daily_result = await execute_query(daily_query, query_params)
-            
-            # Get hourly distribution (last 7 days)
-            hourly_query = f"""
-            SELECT 
-                EXTRACT(HOUR FROM reported_at) as hour,
-                COUNT(*) as event_count
-            FROM factory_telemetry.andon_events 
-            {where_clause}
-            GROUP BY EXTRACT(HOUR FROM reported_at)
-            ORDER BY hour ASC
-            """
-            
-            hourly_result = await execute_query(hourly_query, query_params)
-            
-            # Calculate trends
-            daily_events = [row["total_events"] for row in daily_result]
-            trend_direction = "stable"
-            if len(daily_events) >= 2:
-                first_half_avg = sum(daily_events[:len(daily_events)//2]) / (len(daily_events)//2)
-                second_half_avg = sum(daily_events[len(daily_events)//2:]) / (len(daily_events) - len(daily_events)//2)
-                
-                if second_half_avg > first_half_avg * 1.1:
-                    trend_direction = "increasing"
-                elif second_half_avg < first_half_avg * 0.9:
-                    trend_direction = "decreasing"
-            
-            return {
-                "daily_data": [
-                    {
-                        "date": row["event_date"].isoformat(),
-                        "total_events": row["total_events"],
-                        "resolved_events": row["resolved_events"],
-                        "critical_events": row["critical_events"],
-                        "high_priority_events": row["high_priority_events"]
-                    }
-                    for row in daily_result
-                ],
-                "hourly_distribution": [
-                    {
-                        "hour": int(row["hour"]),
-                        "event_count": row["event_count"]
-                    }
-                    for row in hourly_result
-                ],
-                "trend_analysis": {
-                    "direction": trend_direction,
-                    "avg_events_per_day": round(sum(daily_events) / len(daily_events), 2) if daily_events else 0,
-                    "peak_day": max(daily_events) if daily_events else 0,
-                    "lowest_day": min(daily_events) if daily_events else 0
-                }
-            }
-            
-        except Exception as e:
-            logger.error("Failed to get Andon trends", error=str(e))
-            return {
-                "daily_data": [],
-                "hourly_distribution": [],
-                "trend_analysis": {
-                    "direction": "stable",
-                    "avg_events_per_day": 0,
-                    "peak_day": 0,
-                    "lowest_day": 0
-                }
-            }
-    
     @staticmethod
     async def get_andon_analytics_report(
         line_id: Optional[UUID] = None,
@@ -1040,20 +758,14 @@ class AndonService:
             if not end_date:
                 end_date = datetime.utcnow()
             
-            # Get basic statistics
-            stats = await AndonService.get_andon_statistics(line_id, start_date, end_date)
-            
-            # Get dashboard data
-            dashboard_data = await AndonService.get_andon_dashboard_data(line_id, 30)
-            
-            # Get response metrics
-            response_metrics = await AndonService._calculate_response_metrics(line_id, start_date, end_date)
+            # Statistics, response metrics and equipment from one pass over the period
+            window = await AndonAnalytics.load(line_id, start_date, end_date)
+            stats = window.statistics()
+            response_metrics = window.response_metrics()
+            top_equipment = window.top_equipment(10)
             
-            # Get top equipment
-            top_equipment = await AndonService._get_top_equipment_by_events(line_id, start_date, end_date, 10)
-            
-            # Get trend data
-            trend_data = await AndonService._get_andon_trends(line_id, 30)
+            # Trends over the cached 30 day window
+            trend_data = (await AndonAnalytics.get_window(line_id, 30)).trends()
             
             # Generate insights and recommendations
             insights = await AndonService._generate_andon_insights(stats, response_metrics, top_equipment, trend_data)
@@ -1213,20 +925,16 @@ class AndonService:
             logger.info("Starting Andon event prediction", 
                        line_id=line_id, horizon_hours=prediction_horizon_hours)
             
-            # Get historical event data
-            historical_events = await AndonService._get_historical_andon_data(
-                line_id, days=30
-            )
+            # Get the line's precomputed equipment features
+            equipment_features = await AndonService._get_line_features(line_id)
             
             # Get equipment status data
             equipment_data = await AndonService._get_equipment_status_data(
                 line_id, hours=24
             )
             
-            # Analyze event patterns
-            event_patterns = await AndonService._analyze_event_patterns(
-                historical_events, equipment_data
-            )
+            # Event patterns from the feature histograms
+            event_patterns = AndonFeatureStore.event_patterns(equipment_features)
             
             # Generate predictions
             predictions = await AndonService._generate_event_predictions(
@@ -1249,7 +957,7 @@ class AndonService:
                 "prediction_horizon_hours": prediction_horizon_hours,
                 "confidence_threshold": confidence_threshold,
                 "prediction_timestamp": datetime.utcnow(),
-                "historical_events_count": len(historical_events),
+                "historical_events_count": event_patterns.get("total_events", 0),
                 "predictions": filtered_predictions,
                 "prevention_recommendations": prevention_recommendations,
                 "prediction_summary": {
@@ -1434,15 +1142,10 @@ class AndonService:
             logger.info("Implementing predictive maintenance", 
                        line_id=line_id, equipment_code=equipment_code)
             
-            # Get equipment-specific Andon events
-            equipment_events = await AndonService._get_equipment_andon_events(
-                line_id, equipment_code, days=90
-            )
-            
-            # Analyze maintenance patterns
-            maintenance_patterns = await AndonService._analyze_maintenance_patterns(
-                equipment_events, equipment_code
-            )
+            # Maintenance patterns are the equipment's precomputed features
+            maintenance_patterns = await AndonFeatureStore.get_equipment_features(
+                line_id, equipment_code
+            ) or {}
             
             # Predict maintenance needs
             maintenance_predictions = await AndonService._predict_maintenance_needs(
@@ -1456,7 +1159,7 @@ class AndonService:
             
             # Calculate maintenance optimization benefits
             optimization_benefits = await AndonService._calculate_maintenance_optimization_benefits(
-                maintenance_schedule, equipment_events
+                maintenance_schedule, maintenance_patterns
             )
             
             result = {
@@ -1464,7 +1167,7 @@ class AndonService:
                 "equipment_code": equipment_code,
                 "maintenance_horizon_days": maintenance_horizon_days,
                 "implementation_timestamp": datetime.utcnow(),
-                "equipment_events_count": len(equipment_events),
+                "equipment_events_count": maintenance_patterns.get("event_count", 0),
                 "maintenance_patterns": maintenance_patterns,
                 "maintenance_predictions": maintenance_predictions,
                 "maintenance_schedule": maintenance_schedule,
@@ -1491,36 +1194,13 @@ class AndonService:
     # Private helper methods for advanced Andon analytics
     
     @staticmethod
-    async def _get_historical_andon_data(
-        line_id: UUID, days: int
-    ) -> List[Dict[str, Any]]:
-        """Get historical Andon event data for analysis."""
-        try:
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=days)
-            
-            query = """
-            SELECT id, line_id, equipment_code, event_type, priority, description, 
-                   status, reported_by, reported_at, acknowledged_by, acknowledged_at, 
-                   resolved_by, resolved_at, resolution_notes
-            FROM factory_telemetry.andon_events 
-            WHERE line_id = :line_id
-            AND reported_at >= :start_date
-            AND reported_at <= :end_date
-            ORDER BY reported_at ASC
-            """
-            
-            result = await execute_query(query, {
-                "line_id": line_id,
-                "start_date": start_date,
-                "end_date": end_date
-            })
-            
-            return result or []
-            
-        except Exception as e:
-            logger.error("Failed to get historical Andon data", error=str(e))
-            return []
+    async def _get_line_features(line_id: UUID) -> List[Dict[str, Any]]:
+        """Get a line's equipment features, materializing them if no run has covered the line yet."""
+        features = await AndonFeatureStore.get_line_features(line_id)
+        if not features and not await AndonFeatureStore.is_materialized(line_id):
+            await AndonFeatureStore.materialize(line_id)
+            features = await AndonFeatureStore.get_line_features(line_id)
+        return features
     
     @staticmethod
     async def _get_equipment_status_data(
@@ -1545,51 +1225,6 @@ class AndonService:
             logger.error("Failed to get equipment status data", error=str(e))
             return []
     
-    @staticmethod
-    async def _analyze_event_patterns(
-        historical_events: List[Dict[str, Any]], 
-        equipment_data: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        """Analyze patterns in Andon events."""
-        try:
-            if not historical_events:
-                return {"patterns": [], "trends": {}}
-            
-            # Analyze event frequency patterns
-            event_counts_by_type = {}
-            event_counts_by_equipment = {}
-            event_counts_by_hour = {}
-            
-            for event in historical_events:
-                event_type = event["event_type"]
-                equipment_code = event["equipment_code"]
-                hour = event["reported_at"].hour
-                
-                event_counts_by_type[event_type] = event_counts_by_type.get(event_type, 0) + 1
-                event_counts_by_equipment[equipment_code] = event_counts_by_equipment.get(equipment_code, 0) + 1
-                event_counts_by_hour[hour] = event_counts_by_hour.get(hour, 0) + 1
-            
-            # Identify trends
-            trends = {
-                "most_common_event_type": max(event_counts_by_type.items(), key=lambda x: x[1])[0] if event_counts_by_type else None,
-                "most_problematic_equipment": max(event_counts_by_equipment.items(), key=lambda x: x[1])[0] if event_counts_by_equipment else None,
-                "peak_event_hour": max(event_counts_by_hour.items(), key=lambda x: x[1])[0] if event_counts_by_hour else None
-            }
-            
-            return {
-                "patterns": {
-                    "event_type_distribution": event_counts_by_type,
-                    "equipment_distribution": event_counts_by_equipment,
-                    "hourly_distribution": event_counts_by_hour
-                },
-                "trends": trends,
-                "total_events": len(historical_events)
-            }
-            
-        except Exception as e:
-            logger.error("Failed to analyze event patterns", error=str(e))
-            return {"patterns": [], "trends": {}}
-    
     @staticmethod
     async def _generate_event_predictions(
         event_patterns: Dict[str, Any], 
@@ -1797,22 +1432,6 @@ class AndonService:
         # Implementation would generate recommendations
         return {"total_optimization_potential": 0.2, "implementation_roadmap": []}
     
-    @staticmethod
-    async def _get_equipment_andon_events(
-        line_id: UUID, equipment_code: str, days: int
-    ) -> List[Dict[str, Any]]:
-        """Get equipment-specific Andon events."""
-        # Implementation would get equipment events
-        return []
-    
-    @staticmethod
-    async def _analyze_maintenance_patterns(
-        events: List[Dict[str, Any]], equipment_code: str
-    ) -> Dict[str, Any]:
-        """Analyze maintenance patterns."""
-        # Implementation would analyze maintenance patterns
-        return {}
-    
     @staticmethod
     async def _predict_maintenance_needs(
         patterns: Dict[str, Any], horizon_days: int
@@ -1831,7 +1450,7 @@ class AndonService:
     
     @staticmethod
     async def _calculate_maintenance_optimization_benefits(
-        schedule: List[Dict[str, Any]], events: List[Dict[str, Any]]
+        schedule: List[Dict[str, Any]], patterns: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Calculate maintenance optimization benefits."""
         # Implementation would calculate benefits
@@ -0,0 +1,236 @@
+"""
+MS5.0 Floor Dashboard - Downtime Reason Rules
+
+This module compiles each equipment's fault catalog into bitmask tables for
+downtime reason classification. Fault bits are folded into one 64-bit mask
+per sample; marker and severity masks select the deciding fault with a few
+integer operations and per-bit lookup arrays give its reason code and
+description, instead of walking the catalog and matching fault names per
+event. Compiled tables are rebuilt when the equipment registry reloads, so
+fault catalog changes take effect without restarting the poller.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.equipment_registry import EquipmentRegistry, FaultRecord, equipment_registry
+
+
+FAULT_BITS = 64
+
+# Reason codes for faults without one in the catalog, by the first keyword in their name
+FAULT_NAME_REASON_CODES: Tuple[Tuple[str, str], ...] = (
+    ("bearing", "BEARING_FAIL"),
+    ("belt", "BELT_BREAK"),
+    ("gear", "GEAR_FAIL"),
+    ("motor", "MOTOR_FAIL"),
+    ("sensor", "SENSOR_FAIL"),
+    ("plc", "PLC_FAULT"),
+    ("power", "POWER_LOSS"),
+    ("wiring", "WIRING_FAULT"),
+    ("quality", "QUALITY_ISSUE")
+)
+DEFAULT_FAULT_REASON_CODE = "MECH_FAULT"
+UPSTREAM_REASON_CODE = "UPSTREAM_STOP"
+DOWNSTREAM_REASON_CODE = "DOWNSTREAM_STOP"
+
+# (reason_code, description, bit_index) of the fault deciding a stop
+Classification = Tuple[str, str, int]
+
+
+def reason_code_for_fault_name(fault_name: str) -> str:
+    """Derive a reason code from a fault name."""
+    fault_name_lower = fault_name.lower()
+    for keyword, reason_code in FAULT_NAME_REASON_CODES:
+        if keyword in fault_name_lower:
+            return reason_code
+    return DEFAULT_FAULT_REASON_CODE
+
+
+def fault_mask(fault_bits: Sequence[bool]) -> int:
+    """Fold a sample's fault bits into one integer mask."""
+    mask = 0
+    for bit_index, bit_active in enumerate(fault_bits[:FAULT_BITS]):
+        if bit_active:
+            mask |= 1 << bit_index
+    return mask
+
+
+def _lowest_bit(mask: int) -> int:
+    """Get the index of the lowest set bit of a non-zero mask."""
+    return (mask & -mask).bit_length() - 1
+
+
+class CompiledFaultRules:
+    """Bitmask classification tables compiled from one fault catalog."""
+
+    __slots__ = (
+        "known_mask", "internal_mask", "upstream_mask", "downstream_mask", "critical_mask",
+        "reason_codes", "descriptions", "faults"
+    )
+
+    def __init__(self, catalog: Dict[int, FaultRecord]):
+        self.known_mask = 0
+        self.internal_mask = 0
+        self.upstream_mask = 0
+        self.downstream_mask = 0
+        self.critical_mask = 0
+
+        # Bits missing from the catalog classify as an unknown internal fault
+        self.faults: List[Optional[FaultRecord]] = [None] * FAULT_BITS
+        self.reason_codes: List[str] = [DEFAULT_FAULT_REASON_CODE] * FAULT_BITS
+        self.descriptions: List[str] = ["Unknown fault"] * FAULT_BITS
+
+        for bit_index, fault in catalog.items():
+            if not 0 <= bit_index < FAULT_BITS:
+                continue
+            bit = 1 << bit_index
+            self.known_mask |= bit
+            self.faults[bit_index] = fault
+            self.descriptions[bit_index] = fault.description
+
+            if fault.marker == "UPSTREAM":
+                self.upstream_mask |= bit
+                self.reason_codes[bit_index] = UPSTREAM_REASON_CODE
+            elif fault.marker == "DOWNSTREAM":
+                self.downstream_mask |= bit
+                self.reason_codes[bit_index] = DOWNSTREAM_REASON_CODE
+            else:
+                self.internal_mask |= bit
+                self.reason_codes[bit_index] = fault.reason_code or reason_code_for_fault_name(fault.name)
+
+            if fault.severity == "critical":
+                self.critical_mask |= bit
+
+        self.internal_mask |= ~self.known_mask & ((1 << FAULT_BITS) - 1)
+
+    def classify(
+        self,
+        mask: int,
+        critical_first: bool = False,
+        include_unknown: bool = False
+    ) -> Optional[Classification]:
+        """
+        Classify a fault mask by its deciding fault.
+
+        Internal faults win over upstream, then downstream faults, lowest bit
+        first. critical_first lets critical faults of any marker win, and
+        include_unknown classifies bits missing from the catalog.
+        """
+        if not include_unknown:
+            mask &= self.known_mask
+        if not mask:
+            return None
+
+        for candidates in (
+            mask & self.critical_mask if critical_first else 0,
+            mask & self.internal_mask,
+            mask & self.upstream_mask,
+            mask & self.downstream_mask
+        ):
+            if candidates:
+                bit_index = _lowest_bit(candidates)
+                return self.reason_codes[bit_index], self.description(bit_index), bit_index
+
+        return None
+
+    def classify_batch(
+        self,
+        masks: Sequence[int],
+        critical_first: bool = False,
+        include_unknown: bool = False
+    ) -> List[Optional[Classification]]:
+        """Classify many fault masks of the same equipment, sharing repeated masks."""
+        results: Dict[int, Optional[Classification]] = {}
+        for mask in masks:
+            if mask not in results:
+                results[mask] = self.classify(mask, critical_first, include_unknown)
+        return [results[mask] for mask in masks]
+
+    def description(self, bit_index: int) -> str:
+        """Get the downtime description of a fault bit."""
+        description = self.descriptions[bit_index]
+        if self.upstream_mask >> bit_index & 1:
+            return f"Upstream: {description}"
+        if self.downstream_mask >> bit_index & 1:
+            return f"Downstream: {description}"
+        return description
+
+
+class DowntimeReasonRules:
+    """Compiled fault rules per equipment, rebuilt when the equipment registry reloads."""
+
+    def __init__(self, registry: Optional[EquipmentRegistry] = None):
+        self.registry = registry or equipment_registry
+        self._rules: Dict[Optional[str], CompiledFaultRules] = {}
+        self._registry_version = self.registry.version
+
+        self.stats = {
+            "compilations": 0,
+            "invalidations": 0
+        }
+
+    def rules_for(self, equipment_code: Optional[str]) -> CompiledFaultRules:
+        """Get the compiled rules of an equipment's fault catalog."""
+        if self._registry_version != self.registry.version:
+            self._rules = {}
+            self._registry_version = self.registry.version
+            self.stats["invalidations"] += 1
+
+        rules = self._rules.get(equipment_code)
+        if rules is None:
+            rules = self._rules[equipment_code] = CompiledFaultRules(
+                self.registry.fault_catalog(equipment_code)
+            )
+            self.stats["compilations"] += 1
+        return rules
+
+    def classify(
+        self,
+        equipment_code: Optional[str],
+        fault_bits: Sequence[bool],
+        critical_first: bool = False,
+        include_unknown: bool = False
+    ) -> Optional[Classification]:
+        """Classify one sample's fault bits."""
+        return self.rules_for(equipment_code).classify(
+            fault_mask(fault_bits), critical_first, include_unknown
+        )
+
+    def classify_batch(
+        self,
+        samples: Sequence[Tuple[Optional[str], Sequence[bool]]],
+        critical_first: bool = False,
+        include_unknown: bool = False
+    ) -> List[Optional[Classification]]:
+        """Classify (equipment_code, fault_bits) samples, one batch per equipment."""
+        by_equipment: Dict[Optional[str], List[int]] = {}
+        for position, (equipment_code, _) in enumerate(samples):
+            by_equipment.setdefault(equipment_code, []).append(position)
+
+        results: List[Optional[Classification]] = [None] * len(samples)
+        for equipment_code, positions in by_equipment.items():
+            classified = self.rules_for(equipment_code).classify_batch(
+                [fault_mask(samples[position][1]) for position in positions],
+                critical_first,
+                include_unknown
+            )
+            for position, classification in zip(positions, classified):
+                results[position] = classification
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get compilation statistics."""
+        return {
+            **self.stats,
+            "compiled_catalogs": len(self._rules),
+            "registry_version": self._registry_version
+        }
+
+
+# Global rules instance
+downtime_reason_rules = DowntimeReasonRules()
+
+
+def get_downtime_reason_rules() -> DowntimeReasonRules:
+    """Get the global downtime reason rules."""
+    return downtime_reason_rules
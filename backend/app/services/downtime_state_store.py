@@ -0,0 +1,347 @@
+"""
+MS5.0 Floor Dashboard - Downtime State Store
+
+This module holds the open downtime event of every equipment as a compact
+per-equipment record, shared across processes through a Redis hash. The
+telemetry poller owns the store: it loads the open rows of downtime_events,
+which stay the source of truth, seeds the Redis hash from them, keeps them in
+memory and writes every change through to Redis as downtime is detected from
+each poll sample. Other processes connect to Redis on their first read and
+read the shared hash, so API calls see the events the poller opened instead
+of re-detecting them with their own queries.
+
+The hash carries a marker field once it is seeded. Readers fall back to the
+open rows of downtime_events without Redis and whenever the marker is missing
+(first deploy, Redis restart or eviction), and the owner re-seeds the hash on
+its next write.
+Start times are held as naive UTC datetimes whichever source they came from.
+"""
+
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import redis.asyncio as redis
+import structlog
+
+from app.config import settings
+from app.database import execute_query
+from app.utils.time_range import to_naive_utc
+
+logger = structlog.get_logger()
+
+
+OPEN_EVENTS_QUERY = """
+SELECT id, line_id, equipment_code, start_time, reason_code,
+       reason_description, category, subcategory
+FROM factory_telemetry.downtime_events
+WHERE end_time IS NULL
+"""
+
+
+class DowntimeState:
+    """Open downtime event of one equipment."""
+
+    __slots__ = (
+        "event_id", "line_id", "equipment_code", "start_time", "reason_code",
+        "reason_description", "category", "subcategory", "fault_data", "context_data"
+    )
+
+    def __init__(
+        self,
+        event_id: Optional[str],
+        line_id: Optional[str],
+        equipment_code: str,
+        start_time: datetime,
+        reason_code: str,
+        reason_description: Optional[str] = None,
+        category: Optional[str] = None,
+        subcategory: Optional[str] = None,
+        fault_data: Optional[Dict[str, Any]] = None,
+        context_data: Optional[Dict[str, Any]] = None
+    ):
+        self.event_id = event_id
+        self.line_id = line_id
+        self.equipment_code = equipment_code
+        # downtime_events.start_time is TIMESTAMPTZ while the tracker uses utcnow()
+        self.start_time = to_naive_utc(start_time)
+        self.reason_code = reason_code
+        self.reason_description = reason_description
+        self.category = category
+        self.subcategory = subcategory
+        self.fault_data = fault_data or {}
+        self.context_data = context_data or {}
+
+    @classmethod
+    def from_event(cls, event_data: Dict[str, Any]) -> "DowntimeState":
+        """Build the state of a tracker event."""
+        return cls(
+            event_id=str(event_data["id"]) if event_data.get("id") else None,
+            line_id=str(event_data["line_id"]) if event_data.get("line_id") else None,
+            equipment_code=event_data["equipment_code"],
+            start_time=event_data["start_time"],
+            reason_code=event_data["reason_code"],
+            reason_description=event_data.get("reason_description"),
+            category=event_data.get("category"),
+            subcategory=event_data.get("subcategory"),
+            fault_data=event_data.get("fault_data"),
+            context_data=event_data.get("context_data")
+        )
+
+    @classmethod
+    def from_row(cls, row: Any) -> "DowntimeState":
+        """Build the state of an open downtime_events row."""
+        return cls(
+            event_id=str(row["id"]),
+            line_id=str(row["line_id"]) if row["line_id"] else None,
+            equipment_code=row["equipment_code"],
+            start_time=row["start_time"],
+            reason_code=row["reason_code"],
+            reason_description=row["reason_description"],
+            category=row["category"],
+            subcategory=row["subcategory"]
+        )
+
+    @classmethod
+    def from_json(cls, payload: str) -> "DowntimeState":
+        """Decode a state stored in the shared hash."""
+        return cls(**json.loads(payload))
+
+    def to_json(self) -> str:
+        """Encode the state for the shared hash."""
+        return json.dumps({
+            "event_id": self.event_id,
+            "line_id": self.line_id,
+            "equipment_code": self.equipment_code,
+            "start_time": self.start_time.isoformat(),
+            "reason_code": self.reason_code,
+            "reason_description": self.reason_description,
+            "category": self.category,
+            "subcategory": self.subcategory,
+            "fault_data": self.fault_data,
+            "context_data": self.context_data
+        }, default=str)
+
+    def to_event(self) -> Dict[str, Any]:
+        """Get the state as a tracker event."""
+        return {
+            "id": UUID(self.event_id) if self.event_id else None,
+            "line_id": UUID(self.line_id) if self.line_id else None,
+            "equipment_code": self.equipment_code,
+            "start_time": self.start_time,
+            "reason_code": self.reason_code,
+            "reason_description": self.reason_description,
+            "category": self.category,
+            "subcategory": self.subcategory,
+            "reported_by": None,
+            "status": "open",
+            "fault_data": dict(self.fault_data),
+            "context_data": dict(self.context_data)
+        }
+
+
+class DowntimeStateStore:
+    """Open downtime events per equipment, in memory and in a shared Redis hash."""
+
+    REDIS_KEY = "ms5:downtime:active"
+    # Field present only in a hash seeded from the database
+    SEEDED_FIELD = "__seeded_at__"
+    # Readers retry an unavailable Redis at most this often instead of on every read
+    RECONNECT_SECONDS = 30
+
+    def __init__(self):
+        # equipment_code -> state, authoritative once loaded by the owning process
+        self._states: Dict[str, DowntimeState] = {}
+        self.redis_client: Optional[redis.Redis] = None
+        self._connect_attempted_at: Optional[float] = None
+        self.is_loaded = False
+        self.loaded_at: Optional[datetime] = None
+
+        self.stats = {
+            "local_reads": 0,
+            "shared_reads": 0,
+            "writes": 0,
+            "write_errors": 0,
+            "seeds": 0
+        }
+
+    async def start(self) -> None:
+        """Connect to Redis and take ownership of the state in this process."""
+        await self._connect(force=True)
+        await self.load()
+
+    async def stop(self) -> None:
+        """Close the Redis connection."""
+        if self.redis_client:
+            try:
+                await self.redis_client.close()
+            except Exception as e:
+                logger.error("Error closing downtime state store", error=str(e))
+            self.redis_client = None
+
+        self.is_loaded = False
+        logger.info("Downtime state store stopped")
+
+    async def load(self) -> int:
+        """Load every open downtime event from the database and seed the shared hash with them."""
+        result = await execute_query(OPEN_EVENTS_QUERY + " ORDER BY start_time")
+
+        # The newest open event of an equipment is the one being tracked
+        self._states = {state.equipment_code: state for state in map(DowntimeState.from_row, result)}
+        self.is_loaded = True
+        self.loaded_at = datetime.utcnow()
+        await self._seed_shared()
+
+        logger.info("Downtime state store loaded", open_events=len(self._states), shared=self.redis_client is not None)
+        return len(self._states)
+
+    async def get(self, equipment_code: str) -> Optional[DowntimeState]:
+        """Get an equipment's open downtime event."""
+        if self.is_loaded:
+            self.stats["local_reads"] += 1
+            return self._states.get(equipment_code)
+
+        self.stats["shared_reads"] += 1
+        await self._connect()
+        if self.redis_client:
+            try:
+                payload, seeded_at = await self.redis_client.hmget(
+                    self.REDIS_KEY, [equipment_code, self.SEEDED_FIELD]
+                )
+                if seeded_at:
+                    return DowntimeState.from_json(payload) if payload else None
+            except Exception as e:
+                logger.warning("Failed to read downtime state from Redis", error=str(e))
+
+        result = await execute_query(
+            OPEN_EVENTS_QUERY + " AND equipment_code = :equipment_code ORDER BY start_time DESC LIMIT 1",
+            {"equipment_code": equipment_code}
+        )
+        return DowntimeState.from_row(result[0]) if result else None
+
+    async def active(self, line_id: Optional[UUID] = None) -> List[DowntimeState]:
+        """Get the open downtime events of a line, or of all lines."""
+        if self.is_loaded:
+            self.stats["local_reads"] += 1
+            states = list(self._states.values())
+        else:
+            self.stats["shared_reads"] += 1
+            states = await self._read_shared()
+
+        if line_id is not None:
+            states = [state for state in states if state.line_id == str(line_id)]
+        return states
+
+    async def put(self, state: DowntimeState) -> None:
+        """Record an equipment's open downtime event."""
+        self._states[state.equipment_code] = state
+        self.stats["writes"] += 1
+        if self.redis_client:
+            try:
+                await self.redis_client.hset(self.REDIS_KEY, state.equipment_code, state.to_json())
+                await self._reseed_if_lost()
+            except Exception as e:
+                self.stats["write_errors"] += 1
+                logger.warning("Failed to write downtime state to Redis", error=str(e), equipment_code=state.equipment_code)
+
+    async def remove(self, equipment_code: str) -> None:
+        """Forget an equipment's downtime event once it closes."""
+        self._states.pop(equipment_code, None)
+        self.stats["writes"] += 1
+        if self.redis_client:
+            try:
+                await self.redis_client.hdel(self.REDIS_KEY, equipment_code)
+                await self._reseed_if_lost()
+            except Exception as e:
+                self.stats["write_errors"] += 1
+                logger.warning("Failed to remove downtime state from Redis", error=str(e), equipment_code=equipment_code)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get store statistics."""
+        return {
+            **self.stats,
+            "open_events": len(self._states),
+            "is_loaded": self.is_loaded,
+            "shared": self.redis_client is not None,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None
+        }
+
+    async def _connect(self, force: bool = False) -> None:
+        """Connect to Redis, leaving the store database-backed if unavailable."""
+        if self.redis_client or not settings.REDIS_URL:
+            return
+        now = time.monotonic()
+        if (
+            not force
+            and self._connect_attempted_at is not None
+            and now - self._connect_attempted_at < self.RECONNECT_SECONDS
+        ):
+            return
+        self._connect_attempted_at = now
+        try:
+            self.redis_client = redis.from_url(
+                settings.REDIS_URL,
+                encoding="utf-8",
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5,
+                retry_on_timeout=True
+            )
+            await self.redis_client.ping()
+        except Exception as e:
+            logger.error("Failed to connect downtime state store to Redis", error=str(e))
+            self.redis_client = None
+
+    async def _seed_shared(self) -> None:
+        """Replace the shared hash with this process's states and mark it seeded."""
+        if not self.redis_client:
+            return
+        mapping = {code: state.to_json() for code, state in self._states.items()}
+        mapping[self.SEEDED_FIELD] = datetime.utcnow().isoformat()
+        try:
+            # Readers between the two commands see no marker and read the database
+            await self.redis_client.delete(self.REDIS_KEY)
+            await self.redis_client.hset(self.REDIS_KEY, mapping=mapping)
+            self.stats["seeds"] += 1
+        except Exception as e:
+            self.stats["write_errors"] += 1
+            logger.warning("Failed to seed downtime states in Redis", error=str(e))
+
+    async def _reseed_if_lost(self) -> None:
+        """Re-seed the shared hash when Redis lost it since it was seeded."""
+        if self.is_loaded and not await self.redis_client.hexists(self.REDIS_KEY, self.SEEDED_FIELD):
+            await self._seed_shared()
+
+    async def _read_shared(self) -> List[DowntimeState]:
+        """Read every open downtime event from Redis, falling back to the database."""
+        await self._connect()
+        if self.redis_client:
+            try:
+                payloads = await self.redis_client.hgetall(self.REDIS_KEY)
+                if payloads.pop(self.SEEDED_FIELD, None):
+                    return [DowntimeState.from_json(payload) for payload in payloads.values()]
+            except Exception as e:
+                logger.warning("Failed to read downtime states from Redis", error=str(e))
+
+        result = await execute_query(OPEN_EVENTS_QUERY)
+        return [DowntimeState.from_row(row) for row in result]
+
+
+# Global store instance
+downtime_state_store = DowntimeStateStore()
+
+
+async def start_downtime_state_store() -> None:
+    """Load the global downtime state store in the process that detects downtime."""
+    await downtime_state_store.start()
+
+
+async def stop_downtime_state_store() -> None:
+    """Stop the global downtime state store."""
+    await downtime_state_store.stop()
+
+
+def get_downtime_state_store() -> DowntimeStateStore:
+    """Get the global downtime state store."""
+    return downtime_state_store
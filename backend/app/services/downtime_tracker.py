@@ -12,12 +12,18 @@ from uuid import UUID
 import structlog
 from enum import Enum
 
+from app.config import settings
 from app.database import execute_query, execute_scalar, execute_update
 from app.models.production import (
     DowntimeEventCreate, DowntimeEventUpdate, DowntimeEventResponse,
     DowntimeCategory, DowntimeReasonCode
 )
 from app.utils.exceptions import ValidationError, BusinessLogicError, NotFoundError
+from app.utils.time_range import time_range_predicate, time_bucket_expression, bucket_date
+from app.utils.pagination import keyset_predicate
+from app.services.downtime_reason_rules import downtime_reason_rules, reason_code_for_fault_name
+from app.services.downtime_state_store import DowntimeState, downtime_state_store
+from app.services.micro_stop_aggregator import micro_stop_aggregator
 from app.api.websocket import broadcast_downtime_event, broadcast_downtime_statistics_update
 
 logger = structlog.get_logger()
@@ -71,9 +77,12 @@ class DowntimeTracker:
     """Comprehensive downtime tracking and analysis service."""
     
     def __init__(self):
-        """Initialize downtime tracker with fault catalog."""
-        self.active_events = {}  # equipment_code -> event_data
-        self.fault_catalog = self._load_fault_catalog()
+        """Initialize downtime tracker; fault catalogs come from the equipment registry."""
+        # Open events are shared with the poller, which detects them from every sample
+        self.state_store = downtime_state_store
+        # Stops shorter than this are counted as micro-stops, not stored as events
+        self.micro_stop_seconds = settings.DOWNTIME_DETECTION_THRESHOLD
+        self.micro_stops = micro_stop_aggregator
         self.reason_codes = self._load_reason_codes()
     
     async def detect_downtime_event(
@@ -106,16 +115,18 @@ class DowntimeTracker:
             # Determine if equipment is actually running
             is_actually_running = is_running and speed > 0.1
             
+            active_state = await self.state_store.get(equipment_code)
+            
             if is_actually_running:
                 # Equipment is running, check if we need to close an active event
-                if equipment_code in self.active_events:
+                if active_state is not None:
                     return await self._close_downtime_event(
                         line_id, equipment_code, timestamp
                     )
                 return None
             
             # Equipment is stopped, determine reason and handle event
-            if equipment_code not in self.active_events:
+            if active_state is None:
                 # Start new downtime event
                 return await self._start_downtime_event(
                     line_id, equipment_code, current_status, timestamp
@@ -164,12 +175,16 @@ class DowntimeTracker:
                 "context_data": self._extract_context_data(status)
             }
             
-            # Store in active events
-            self.active_events[equipment_code] = event_data
+            if self.micro_stop_seconds > 0:
+                # Held in memory until the stop outlasts the micro-stop threshold
+                event_data["id"] = None
+                await self.state_store.put(DowntimeState.from_event(event_data))
+                return None
             
-            # Store in database
+            # Store in database, then share as the equipment's open event
             event_id = await self._store_downtime_event(event_data)
             event_data["id"] = event_id
+            await self.state_store.put(DowntimeState.from_event(event_data))
             
             logger.info(
                 "Downtime event started",
@@ -194,20 +209,31 @@ class DowntimeTracker:
     ) -> Dict[str, Any]:
         """Close an active downtime event."""
         try:
-            if equipment_code not in self.active_events:
+            active_state = await self.state_store.get(equipment_code)
+            if active_state is None:
                 return None
             
-            event_data = self.active_events[equipment_code]
-            event_id = event_data.get("id")
+            event_data = active_state.to_event()
+            start_time = event_data["start_time"]
+            stop_seconds = (timestamp - start_time).total_seconds()
+            
+            if not event_data.get("id"):
+                if stop_seconds < self.micro_stop_seconds:
+                    # Micro-stop: counted in its interval, never stored as an event
+                    self.micro_stops.record(
+                        active_state.line_id or line_id, equipment_code, active_state.reason_code,
+                        active_state.category, start_time, max(0.0, stop_seconds)
+                    )
+                    await self.state_store.remove(equipment_code)
+                    return None
+                
+                # Outlasted the threshold between samples
+                event_data = await self._promote_downtime_event(active_state)
             
-            if not event_id:
-                # Event was not stored in database, remove from active events
-                del self.active_events[equipment_code]
-                return None
+            event_id = event_data["id"]
             
             # Calculate duration
-            start_time = event_data["start_time"]
-            duration_seconds = int((timestamp - start_time).total_seconds())
+            duration_seconds = int(stop_seconds)
             
             # Update event in database
             await self._update_downtime_event_in_db(
@@ -218,7 +244,7 @@ class DowntimeTracker:
             )
             
             # Remove from active events
-            del self.active_events[equipment_code]
+            await self.state_store.remove(equipment_code)
             
             # Update event data
             event_data.update({
@@ -268,36 +294,63 @@ class DowntimeTracker:
     ) -> Dict[str, Any]:
         """Update an existing downtime event with additional data."""
         try:
-            if equipment_code not in self.active_events:
+            active_state = await self.state_store.get(equipment_code)
+            if active_state is None:
                 return None
             
-            event_data = self.active_events[equipment_code]
-            event_id = event_data.get("id")
+            # Merge the sample's fault data and context into the open event
+            fault_data = {**active_state.fault_data, **self._extract_fault_data(status)}
+            context_data = {**active_state.context_data, **self._extract_context_data(status)}
+            changed = fault_data != active_state.fault_data or context_data != active_state.context_data
             
-            if not event_id:
+            if not active_state.event_id:
+                active_state.fault_data = fault_data
+                active_state.context_data = context_data
+                
+                if (timestamp - active_state.start_time).total_seconds() >= self.micro_stop_seconds:
+                    return await self._promote_downtime_event(active_state)
+                
+                if changed:
+                    await self.state_store.put(active_state)
                 return None
             
-            # Update fault data and context
-            new_fault_data = self._extract_fault_data(status)
-            new_context_data = self._extract_context_data(status)
-            
-            # Merge with existing data
-            event_data["fault_data"].update(new_fault_data)
-            event_data["context_data"].update(new_context_data)
-            
-            # Update in database
-            await self._update_downtime_event_in_db(
-                event_id,
-                fault_data=event_data["fault_data"],
-                context_data=event_data["context_data"]
-            )
+            # A stopped machine mostly repeats itself; only write what changed
+            if changed:
+                await self._update_downtime_event_in_db(
+                    active_state.event_id,
+                    fault_data=fault_data,
+                    context_data=context_data
+                )
+                active_state.fault_data = fault_data
+                active_state.context_data = context_data
+                await self.state_store.put(active_state)
             
-            return event_data
+            return active_state.to_event()
             
         except Exception as e:
             logger.error("Failed to update downtime event", error=str(e))
             raise BusinessLogicError("Failed to update downtime event")
     
+    async def _promote_downtime_event(self, active_state: DowntimeState) -> Dict[str, Any]:
+        """Store a stop that outlasted the micro-stop threshold as a full downtime event."""
+        event_data = active_state.to_event()
+        event_id = await self._store_downtime_event(event_data)
+        event_data["id"] = event_id
+        
+        active_state.event_id = str(event_id)
+        await self.state_store.put(active_state)
+        
+        logger.info(
+            "Downtime event started",
+            event_id=event_id,
+            line_id=active_state.line_id,
+            equipment_code=active_state.equipment_code,
+            reason_code=active_state.reason_code,
+            category=active_state.category
+        )
+        
+        return event_data
+    
     async def _determine_downtime_reason(
         self, 
         equipment_code: str, 
@@ -305,49 +358,11 @@ class DowntimeTracker:
     ) -> Tuple[str, str, str]:
         """Determine downtime reason from equipment status."""
         try:
-            # Check for active faults first
-            fault_bits = status.get("fault_bits", [])
-            active_faults = []
-            
-            for i, bit_active in enumerate(fault_bits):
-                if bit_active:
-                    fault_info = self.fault_catalog.get(i, {})
-                    if fault_info:
-                        active_faults.append({
-                            "bit_index": i,
-                            "name": fault_info.get("name", f"Fault {i}"),
-                            "description": fault_info.get("description", "Unknown fault"),
-                            "marker": fault_info.get("marker", "INTERNAL"),
-                            "severity": fault_info.get("severity", "medium")
-                        })
-            
-            if active_faults:
-                # Prioritize faults by marker and severity
-                internal_faults = [f for f in active_faults if f["marker"] == "INTERNAL"]
-                upstream_faults = [f for f in active_faults if f["marker"] == "UPSTREAM"]
-                downstream_faults = [f for f in active_faults if f["marker"] == "DOWNSTREAM"]
-                
-                if internal_faults:
-                    fault = internal_faults[0]  # Take first internal fault
-                    return (
-                        self._map_fault_to_reason_code(fault["name"]),
-                        fault["description"],
-                        "unplanned"
-                    )
-                elif upstream_faults:
-                    fault = upstream_faults[0]
-                    return (
-                        DowntimeReasonCode.UPSTREAM_STOP,
-                        f"Upstream: {fault['description']}",
-                        "unplanned"
-                    )
-                elif downstream_faults:
-                    fault = downstream_faults[0]
-                    return (
-                        DowntimeReasonCode.DOWNSTREAM_STOP,
-                        f"Downstream: {fault['description']}",
-                        "unplanned"
-                    )
+            # Check for active faults first: internal, then upstream, then downstream
+            classification = downtime_reason_rules.classify(equipment_code, status.get("fault_bits", []))
+            if classification:
+                reason_code, reason_description, _ = classification
+                return reason_code, reason_description, "unplanned"
             
             # Check for planned stops
             if status.get("planned_stop", False):
@@ -398,28 +413,7 @@ class DowntimeTracker:
     
     def _map_fault_to_reason_code(self, fault_name: str) -> str:
         """Map fault name to standardized reason code."""
-        fault_name_lower = fault_name.lower()
-        
-        if "bearing" in fault_name_lower:
-            return DowntimeReasonCode.BEARING_FAILURE
-        elif "belt" in fault_name_lower:
-            return DowntimeReasonCode.BELT_BREAKAGE
-        elif "gear" in fault_name_lower:
-            return DowntimeReasonCode.GEAR_FAILURE
-        elif "motor" in fault_name_lower:
-            return DowntimeReasonCode.MOTOR_FAILURE
-        elif "sensor" in fault_name_lower:
-            return DowntimeReasonCode.SENSOR_FAILURE
-        elif "plc" in fault_name_lower:
-            return DowntimeReasonCode.PLC_FAULT
-        elif "power" in fault_name_lower:
-            return DowntimeReasonCode.POWER_LOSS
-        elif "wiring" in fault_name_lower:
-            return DowntimeReasonCode.WIRING_FAULT
-        elif "quality" in fault_name_lower:
-            return DowntimeReasonCode.QUALITY_ISSUE
-        else:
-            return DowntimeReasonCode.MECHANICAL_FAULT
+        return DowntimeReasonCode(reason_code_for_fault_name(fault_name))
     
     def _get_subcategory(self, reason_code: str, status: Dict[str, Any]) -> Optional[str]:
         """Get subcategory for downtime reason."""
@@ -559,6 +553,15 @@ class DowntimeTracker:
             logger.error("Failed to update downtime event", error=str(e))
             raise BusinessLogicError("Failed to update downtime event")
     
+    async def get_active_downtime_event(self, equipment_code: str) -> Optional[Dict[str, Any]]:
+        """Get an equipment's open downtime event as detected by the poller."""
+        active_state = await self.state_store.get(equipment_code)
+        return active_state.to_event() if active_state else None
+
+    async def get_active_downtime_events(self, line_id: Optional[UUID] = None) -> List[Dict[str, Any]]:
+        """Get the open downtime events of a line, or of all lines."""
+        return [state.to_event() for state in await self.state_store.active(line_id)]
+
     async def get_downtime_events(
         self,
         line_id: Optional[UUID] = None,
@@ -568,12 +571,21 @@ class DowntimeTracker:
         category: Optional[str] = None,
         status: Optional[str] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[DowntimeEventResponse]:
-        """Get downtime events with filtering."""
+        """
+        Get downtime events with filtering, newest first.
+        
+        Pages are continued with ``cursor`` on (start_time, id); ``offset`` is
+        kept for older clients and is ignored when a cursor is given.
+        """
         try:
-            where_conditions = []
-            params = {"limit": limit, "offset": offset}
+            where_conditions, params = keyset_predicate(
+                ["de.start_time", "de.id"], cursor, (datetime, UUID)
+            )
+            params["limit"] = limit
+            params["offset"] = 0 if cursor else offset
             
             if line_id:
                 where_conditions.append("de.line_id = :line_id")
@@ -583,13 +595,9 @@ class DowntimeTracker:
                 where_conditions.append("de.equipment_code = :equipment_code")
                 params["equipment_code"] = equipment_code
             
-            if start_date:
-                where_conditions.append("DATE(de.start_time) >= :start_date")
-                params["start_date"] = start_date
-            
-            if end_date:
-                where_conditions.append("DATE(de.start_time) <= :end_date")
-                params["end_date"] = end_date
+            range_conditions, range_params = time_range_predicate("de.start_time", start_date, end_date)
+            where_conditions.extend(range_conditions)
+            params.update(range_params)
             
             if category:
                 where_conditions.append("de.category = :category")
@@ -614,7 +622,7 @@ class DowntimeTracker:
             LEFT JOIN factory_telemetry.users u1 ON de.reported_by = u1.id
             LEFT JOIN factory_telemetry.users u2 ON de.confirmed_by = u2.id
             WHERE {where_clause}
-            ORDER BY de.start_time DESC
+            ORDER BY de.start_time DESC, de.id DESC
             LIMIT :limit OFFSET :offset
             """
             
@@ -647,6 +655,8 @@ class DowntimeTracker:
             
             return events
             
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error("Failed to get downtime events", error=str(e))
             raise BusinessLogicError("Failed to get downtime events")
@@ -666,13 +676,9 @@ class DowntimeTracker:
                 where_conditions.append("de.line_id = :line_id")
                 params["line_id"] = line_id
             
-            if start_date:
-                where_conditions.append("DATE(de.start_time) >= :start_date")
-                params["start_date"] = start_date
-            
-            if end_date:
-                where_conditions.append("DATE(de.start_time) <= :end_date")
-                params["end_date"] = end_date
+            range_conditions, range_params = time_range_predicate("de.start_time", start_date, end_date)
+            where_conditions.extend(range_conditions)
+            params.update(range_params)
             
             where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
             
@@ -712,18 +718,38 @@ class DowntimeTracker:
             # Get daily breakdown
             daily_query = f"""
             SELECT 
-                DATE(de.start_time) as event_date,
+                {time_bucket_expression("de.start_time", "1 day")} as event_date,
                 COUNT(*) as event_count,
                 COALESCE(SUM(duration_seconds), 0) as total_duration_seconds
             FROM factory_telemetry.downtime_events de
             WHERE {where_clause}
-            GROUP BY DATE(de.start_time)
+            GROUP BY event_date
             ORDER BY event_date DESC
             LIMIT 30
             """
             
             daily_result = await execute_query(daily_query, params)
             
+            # Micro-stops are stored as per-interval counters, not events
+            micro_conditions = ["ms.line_id = :line_id"] if line_id else []
+            micro_range, micro_params = time_range_predicate(
+                "ms.interval_start", start_date, end_date, param_prefix="micro"
+            )
+            micro_conditions.extend(micro_range)
+            params.update(micro_params)
+            micro_where = " AND ".join(micro_conditions) if micro_conditions else "1=1"
+            
+            micro_query = f"""
+            SELECT 
+                COALESCE(SUM(stop_count), 0) as stop_count,
+                COALESCE(SUM(total_seconds), 0) as total_seconds
+            FROM factory_telemetry.downtime_micro_stops ms
+            WHERE {micro_where}
+            """
+            
+            micro_result = await execute_query(micro_query, params)
+            micro_stats = micro_result[0] if micro_result else {}
+            
             return {
                 "total_events": stats.get("total_events", 0),
                 "total_downtime_seconds": stats.get("total_downtime_seconds", 0),
@@ -735,6 +761,11 @@ class DowntimeTracker:
                 "planned_events": stats.get("planned_events", 0),
                 "maintenance_events": stats.get("maintenance_events", 0),
                 "changeover_events": stats.get("changeover_events", 0),
+                "micro_stops": {
+                    "stop_count": micro_stats.get("stop_count", 0),
+                    "total_seconds": round(micro_stats.get("total_seconds", 0), 2),
+                    "total_minutes": round(micro_stats.get("total_seconds", 0) / 60, 2)
+                },
                 "top_reasons": [
                     {
                         "reason_code": row["reason_code"],
@@ -747,7 +778,7 @@ class DowntimeTracker:
                 ],
                 "daily_breakdown": [
                     {
-                        "date": row["event_date"],
+                        "date": bucket_date(row["event_date"]),
                         "event_count": row["event_count"],
                         "total_duration_seconds": row["total_duration_seconds"],
                         "total_duration_minutes": round(row["total_duration_seconds"] / 60, 2)
@@ -826,23 +857,6 @@ class DowntimeTracker:
             logger.error("Failed to confirm downtime event", error=str(e))
             raise BusinessLogicError("Failed to confirm downtime event")
     
-    def _load_fault_catalog(self) -> Dict[int, Dict[str, Any]]:
-        """Load fault catalog from database or configuration."""
-        # This would typically load from a database table or configuration file
-        # For now, return a basic fault catalog
-        return {
-            0: {"name": "Emergency Stop", "description": "Emergency stop activated", "marker": "INTERNAL", "severity": "critical"},
-            1: {"name": "Safety Gate Open", "description": "Safety gate is open", "marker": "INTERNAL", "severity": "high"},
-            2: {"name": "Motor Overload", "description": "Motor overload protection triggered", "marker": "INTERNAL", "severity": "high"},
-            3: {"name": "Temperature High", "description": "Equipment temperature too high", "marker": "INTERNAL", "severity": "medium"},
-            4: {"name": "Pressure Low", "description": "System pressure below threshold", "marker": "INTERNAL", "severity": "medium"},
-            5: {"name": "Upstream Stop", "description": "Upstream equipment stopped", "marker": "UPSTREAM", "severity": "medium"},
-            6: {"name": "Downstream Stop", "description": "Downstream equipment stopped", "marker": "DOWNSTREAM", "severity": "medium"},
-            7: {"name": "Material Jam", "description": "Material jam detected", "marker": "INTERNAL", "severity": "medium"},
-            8: {"name": "Sensor Fault", "description": "Sensor malfunction", "marker": "INTERNAL", "severity": "low"},
-            9: {"name": "Communication Error", "description": "Communication with PLC lost", "marker": "INTERNAL", "severity": "high"}
-        }
-    
     def _load_reason_codes(self) -> Dict[str, Dict[str, Any]]:
         """Load reason codes and their descriptions."""
         return {
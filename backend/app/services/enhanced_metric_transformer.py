@@ -16,6 +16,7 @@ from app.services.oee_calculator import OEECalculator
 from app.services.downtime_tracker import DowntimeTracker
 from app.services.andon_service import AndonService
 from app.services.notification_service import NotificationService
+from app.services.streaming_oee_engine import streaming_oee_engine
 from app.database import execute_query, execute_scalar
 
 # Import the original transformer from the tag scanner
@@ -126,13 +127,10 @@ class EnhancedMetricTransformer(MetricTransformer):
             return {}
         
         try:
-            # Calculate real-time OEE
-            oee_data = self.oee_calculator.calculate_real_time_oee(
-                line_id=line_id,
-                equipment_code=equipment_code,
-                current_status=metrics,
-                timestamp=datetime.utcnow()
-            )
+            # Real-time OEE is maintained incrementally by the streaming engine
+            oee_data = streaming_oee_engine.get(equipment_code)
+            if oee_data is None:
+                return {}
             
             return {
                 "enhanced_oee": oee_data.get("oee", 0.0),
@@ -160,7 +158,7 @@ class EnhancedMetricTransformer(MetricTransformer):
         
         try:
             # Detect downtime event
-            downtime_event = self.downtime_tracker.detect_downtime_event(
+            downtime_event = await self.downtime_tracker.detect_downtime_event(
                 line_id=line_id,
                 equipment_code=equipment_code,
                 current_status=metrics,
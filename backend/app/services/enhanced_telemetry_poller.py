@@ -21,6 +21,11 @@ from app.services.oee_calculator import OEECalculator
 from app.services.downtime_tracker import DowntimeTracker
 from app.services.andon_service import AndonService
 from app.services.notification_service import NotificationService
+from app.services.metric_latest_store import metric_latest_store
+from app.services.streaming_oee_engine import start_streaming_oee_engine, stop_streaming_oee_engine, streaming_oee_engine
+from app.services.equipment_registry import start_equipment_registry, stop_equipment_registry
+from app.services.downtime_state_store import start_downtime_state_store, stop_downtime_state_store
+from app.services.micro_stop_aggregator import start_micro_stop_aggregator, stop_micro_stop_aggregator
 from app.database import execute_query, execute_scalar, execute_update
 
 # Import the original poller from the tag scanner
@@ -79,6 +84,16 @@ class EnhancedTelemetryPoller(TelemetryPoller):
             # Initialize production context manager
             self.production_context_manager = ProductionContextManager(self.production_service)
             
+            # Equipment configuration and fault catalogs for the OEE, downtime and Andon services
+            await start_equipment_registry()
+            
+            # Per-equipment OEE is maintained incrementally from every poll sample
+            await start_streaming_oee_engine()
+            
+            # Open downtime events are detected here, once per sample, and shared
+            await start_downtime_state_store()
+            await start_micro_stop_aggregator()
+            
             logger.info("Enhanced telemetry poller initialized with production services")
             
         except Exception as e:
@@ -287,6 +302,12 @@ class EnhancedTelemetryPoller(TelemetryPoller):
             # Store basic metrics using parent method
             await self._store_metrics(session, equipment_code, metrics, bindings, ts)
             
+            # Keep the in-process latest-value mirror current without a NOTIFY round trip
+            metric_latest_store.update_equipment(equipment_code, metrics, ts)
+            
+            # Advance the streaming OEE state; changed values are published to websockets
+            await streaming_oee_engine.ingest(equipment_code, metrics, ts)
+            
             # Store enhanced metrics in production context
             enhanced_metrics = {
                 "production_line_id": metrics.get("production_line_id"),
@@ -971,6 +992,11 @@ class EnhancedTelemetryPoller(TelemetryPoller):
         # Call parent shutdown
         await super().shutdown()
         
+        await stop_micro_stop_aggregator()
+        await stop_downtime_state_store()
+        await stop_streaming_oee_engine()
+        await stop_equipment_registry()
+        
         # Cleanup enhanced resources
         if self.production_context_manager:
             # Cleanup production context manager
@@ -0,0 +1,268 @@
+"""
+MS5.0 Floor Dashboard - Equipment Registry
+
+This module keeps equipment configuration, production line membership and the
+fault catalog in memory so the OEE, downtime and Andon services resolve ideal
+cycle times, lines and fault bits without querying equipment_config,
+production_lines or fault_catalog per calculation. The registry is loaded
+once per process and reloaded when the 'equipment_registry_changed' NOTIFY
+channel reports a change; processes without a listener (Celery workers)
+reload after EQUIPMENT_REGISTRY_REFRESH_SECONDS instead. Every reload bumps
+``version`` so consumers holding derived data can tell when to refresh it.
+"""
+
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import structlog
+
+from app.config import settings
+from app.database import execute_query
+from app.utils.notify_reloaded_table import NotifyReloadedTable
+
+logger = structlog.get_logger()
+
+
+DEFAULT_IDEAL_CYCLE_TIME = 1.0  # seconds per part
+
+
+class EquipmentRecord:
+    """Configuration of one equipment."""
+
+    __slots__ = (
+        "equipment_code", "name", "enabled", "line_id", "equipment_type",
+        "criticality_level", "ideal_cycle_time", "target_speed",
+        "oee_targets", "fault_thresholds", "andon_settings"
+    )
+
+    def __init__(
+        self,
+        equipment_code: str,
+        name: Optional[str] = None,
+        enabled: bool = True,
+        line_id: Optional[UUID] = None,
+        equipment_type: Optional[str] = None,
+        criticality_level: Optional[int] = None,
+        ideal_cycle_time: Optional[float] = None,
+        target_speed: Optional[float] = None,
+        oee_targets: Optional[Dict[str, Any]] = None,
+        fault_thresholds: Optional[Dict[str, Any]] = None,
+        andon_settings: Optional[Dict[str, Any]] = None
+    ):
+        self.equipment_code = equipment_code
+        self.name = name
+        self.enabled = enabled
+        self.line_id = line_id
+        self.equipment_type = equipment_type
+        self.criticality_level = criticality_level
+        self.ideal_cycle_time = ideal_cycle_time or DEFAULT_IDEAL_CYCLE_TIME
+        self.target_speed = target_speed
+        self.oee_targets = oee_targets or {}
+        self.fault_thresholds = fault_thresholds or {}
+        self.andon_settings = andon_settings or {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the record as a dict."""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class FaultRecord:
+    """One fault bit of an equipment's fault catalog."""
+
+    __slots__ = ("equipment_code", "bit_index", "name", "description", "marker", "severity", "reason_code")
+
+    def __init__(
+        self,
+        equipment_code: Optional[str],
+        bit_index: int,
+        name: str,
+        description: Optional[str],
+        marker: str = "INTERNAL",
+        severity: str = "medium",
+        reason_code: Optional[str] = None
+    ):
+        self.equipment_code = equipment_code
+        self.bit_index = bit_index
+        self.name = name
+        self.description = description or name
+        self.marker = marker
+        self.severity = severity
+        # Downtime reason override; None derives the reason from the name
+        self.reason_code = reason_code
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the fault as the dict shape used by the downtime and Andon services."""
+        return {
+            "bit_index": self.bit_index,
+            "name": self.name,
+            "description": self.description,
+            "marker": self.marker,
+            "severity": self.severity
+        }
+
+
+# Catalog for equipment without fault_catalog rows
+DEFAULT_FAULT_CATALOG: Dict[int, FaultRecord] = {
+    bit_index: FaultRecord(None, bit_index, name, description, marker, severity)
+    for bit_index, (name, description, marker, severity) in enumerate([
+        ("Emergency Stop", "Emergency stop activated", "INTERNAL", "critical"),
+        ("Safety Gate Open", "Safety gate is open", "INTERNAL", "high"),
+        ("Motor Overload", "Motor overload protection triggered", "INTERNAL", "high"),
+        ("Temperature High", "Equipment temperature too high", "INTERNAL", "medium"),
+        ("Pressure Low", "System pressure below threshold", "INTERNAL", "medium"),
+        ("Upstream Stop", "Upstream equipment stopped", "UPSTREAM", "medium"),
+        ("Downstream Stop", "Downstream equipment stopped", "DOWNSTREAM", "medium"),
+        ("Material Jam", "Material jam detected", "INTERNAL", "medium"),
+        ("Sensor Fault", "Sensor malfunction", "INTERNAL", "low"),
+        ("Communication Error", "Communication with PLC lost", "INTERNAL", "high")
+    ])
+}
+
+
+class EquipmentRegistry(NotifyReloadedTable):
+    """Versioned in-memory equipment and fault catalog registry."""
+
+    CHANGE_CHANNEL = "equipment_registry_changed"
+    TABLE_NAME = "equipment_registry"
+
+    def __init__(self):
+        super().__init__(settings.EQUIPMENT_REGISTRY_REFRESH_SECONDS)
+        self._equipment: Dict[str, EquipmentRecord] = {}
+        self._faults: Dict[str, Dict[int, FaultRecord]] = {}
+        # str(line_id) -> equipment codes, in line order
+        self._line_equipment: Dict[str, List[str]] = {}
+
+    async def load(self) -> int:
+        """Load equipment configuration, line membership and the fault catalog."""
+        equipment_rows = await execute_query("""
+            SELECT equipment_code, name, enabled, production_line_id, equipment_type,
+                   criticality_level, ideal_cycle_time, target_speed,
+                   oee_targets, fault_thresholds, andon_settings
+            FROM factory_telemetry.equipment_config
+        """)
+        line_rows = await execute_query("""
+            SELECT id, equipment_codes
+            FROM factory_telemetry.production_lines
+            ORDER BY line_code
+        """)
+        fault_rows = await execute_query("""
+            SELECT equipment_code, bit_index, name, description, marker, severity, reason_code
+            FROM factory_telemetry.fault_catalog
+            ORDER BY equipment_code, bit_index
+        """)
+
+        line_equipment: Dict[str, List[str]] = {}
+        equipment_lines: Dict[str, UUID] = {}
+        for row in line_rows:
+            codes = list(row["equipment_codes"] or [])
+            line_equipment[str(row["id"])] = codes
+            for equipment_code in codes:
+                equipment_lines.setdefault(equipment_code, row["id"])
+
+        equipment: Dict[str, EquipmentRecord] = {}
+        for row in equipment_rows:
+            equipment_code = row["equipment_code"]
+            equipment[equipment_code] = EquipmentRecord(
+                equipment_code,
+                name=row["name"],
+                enabled=row["enabled"] is not False,
+                line_id=equipment_lines.get(equipment_code, row["production_line_id"]),
+                equipment_type=row["equipment_type"],
+                criticality_level=row["criticality_level"],
+                ideal_cycle_time=row["ideal_cycle_time"],
+                target_speed=row["target_speed"],
+                oee_targets=self._json_value(row["oee_targets"]),
+                fault_thresholds=self._json_value(row["fault_thresholds"]),
+                andon_settings=self._json_value(row["andon_settings"])
+            )
+
+        # Equipment that is on a line but has no configuration row still resolves its line
+        for equipment_code, line_id in equipment_lines.items():
+            if equipment_code not in equipment:
+                equipment[equipment_code] = EquipmentRecord(equipment_code, line_id=line_id)
+
+        faults: Dict[str, Dict[int, FaultRecord]] = {}
+        for row in fault_rows:
+            faults.setdefault(row["equipment_code"], {})[row["bit_index"]] = FaultRecord(
+                row["equipment_code"],
+                row["bit_index"],
+                row["name"],
+                row["description"],
+                row["marker"],
+                row["severity"] or "medium",
+                row["reason_code"]
+            )
+
+        # Swap in the new tables in one step so readers never see a partial registry
+        self._equipment = equipment
+        self._line_equipment = line_equipment
+        self._faults = faults
+        self._mark_loaded()
+
+        logger.info(
+            "Equipment registry loaded",
+            version=self.version,
+            equipment=len(equipment),
+            lines=len(line_equipment),
+            fault_catalogs=len(faults)
+        )
+
+        return len(equipment)
+
+    def get_equipment(self, equipment_code: str) -> Optional[EquipmentRecord]:
+        """Get the configuration record of an equipment."""
+        return self._equipment.get(equipment_code)
+
+    def ideal_cycle_time(self, equipment_code: str) -> float:
+        """Get the configured ideal cycle time of an equipment in seconds per part."""
+        record = self._equipment.get(equipment_code)
+        return record.ideal_cycle_time if record else DEFAULT_IDEAL_CYCLE_TIME
+
+    def line_for_equipment(self, equipment_code: str) -> Optional[UUID]:
+        """Get the production line an equipment belongs to."""
+        record = self._equipment.get(equipment_code)
+        return record.line_id if record else None
+
+    def line_equipment_codes(self, line_id: UUID) -> Optional[List[str]]:
+        """Get the equipment codes of a production line, or None for an unknown line."""
+        codes = self._line_equipment.get(str(line_id))
+        return list(codes) if codes is not None else None
+
+    def fault_catalog(self, equipment_code: Optional[str] = None) -> Dict[int, FaultRecord]:
+        """Get an equipment's fault catalog keyed by bit index."""
+        if equipment_code is not None:
+            catalog = self._faults.get(equipment_code)
+            if catalog:
+                return catalog
+        return DEFAULT_FAULT_CATALOG
+
+    def get_fault(self, equipment_code: Optional[str], bit_index: int) -> Optional[FaultRecord]:
+        """Get one fault bit of an equipment's fault catalog."""
+        return self.fault_catalog(equipment_code).get(bit_index)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registry statistics."""
+        return {
+            **super().get_stats(),
+            "equipment": len(self._equipment),
+            "lines": len(self._line_equipment),
+            "fault_catalogs": len(self._faults)
+        }
+
+
+# Global registry instance
+equipment_registry = EquipmentRegistry()
+
+
+async def start_equipment_registry() -> None:
+    """Load the global equipment registry and start listening for changes."""
+    await equipment_registry.start()
+
+
+async def stop_equipment_registry() -> None:
+    """Stop the global equipment registry."""
+    await equipment_registry.stop()
+
+
+def get_equipment_registry() -> EquipmentRegistry:
+    """Get the global equipment registry."""
+    return equipment_registry
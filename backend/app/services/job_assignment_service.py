@@ -20,6 +20,7 @@ from app.utils.exceptions import (
     NotFoundError, ValidationError, ConflictError, BusinessLogicError,
     JobAssignmentError
 )
+from app.utils.pagination import keyset_predicate
 from app.services.notification_service import NotificationService
 from app.api.websocket import broadcast_job_update
 
@@ -444,12 +445,21 @@ class JobAssignmentService:
         line_id: Optional[UUID] = None,
         status: Optional[JobStatus] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[JobAssignmentResponse]:
-        """List job assignments with filters (admin/manager only)."""
+        """
+        List job assignments with filters (admin/manager only), newest first.
+        
+        Pages are continued with ``cursor`` on (assigned_at, id); ``skip`` is
+        kept for older clients and is ignored when a cursor is given.
+        """
         try:
-            where_conditions = []
-            query_params = {"skip": skip, "limit": limit}
+            where_conditions, query_params = keyset_predicate(
+                ["ja.assigned_at", "ja.id"], cursor, (datetime, UUID)
+            )
+            query_params["limit"] = limit
+            query_params["skip"] = 0 if cursor else skip
             
             if line_id:
                 where_conditions.append("ps.line_id = :line_id")
@@ -472,7 +482,7 @@ class JobAssignmentService:
             JOIN factory_telemetry.production_lines pl ON ps.line_id = pl.id
             JOIN factory_telemetry.product_types pt ON ps.product_type_id = pt.id
             {where_clause}
-            ORDER BY ja.assigned_at DESC
+            ORDER BY ja.assigned_at DESC, ja.id DESC
             LIMIT :limit OFFSET :skip
             """
             
@@ -484,6 +494,8 @@ class JobAssignmentService:
             
             return jobs
             
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error("Failed to list job assignments", error=str(e))
             raise BusinessLogicError("Failed to list job assignments")
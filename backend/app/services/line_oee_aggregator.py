@@ -0,0 +1,142 @@
+"""
+MS5.0 Floor Dashboard - Line OEE Aggregator
+
+This module rolls per-equipment OEE components up into a line OEE. The
+dashboard, the reports and the Celery OEE tasks all aggregate through it, so a
+line reads the same wherever it is shown.
+
+A line is paced by its constraint: the machine that takes the longest to turn
+out one good part. Each equipment's effective cycle time is its ideal cycle
+time divided by its OEE, and line components are weighted by that effective
+cycle time, so the constraint dominates the line figure. Line OEE is the
+product of the weighted availability, performance and quality, so the figures
+returned always agree. Equipment without production or planned time in the
+window (idle or auxiliary units) carry no weight and cannot be the
+constraint.
+"""
+
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from app.services.equipment_registry import equipment_registry
+
+
+COMPONENTS = ("availability", "performance", "quality")
+
+
+class LineOEEAggregator:
+    """Constraint-weighted aggregation of equipment OEE into line OEE."""
+
+    @staticmethod
+    def effective_cycle_time(oee: float, ideal_cycle_time: float) -> Optional[float]:
+        """Get the actual seconds an equipment spends per good part, None when it produced nothing."""
+        if oee <= 0:
+            return None
+        return ideal_cycle_time / oee
+
+    @staticmethod
+    def is_idle(entry: Dict[str, Any]) -> bool:
+        """
+        Check whether an equipment had no production or no planned time in the window.
+
+        Entries without part counts or planned time are judged by their
+        components: no performance means no parts were counted.
+        """
+        if "total_parts" in entry or "planned_production_time" in entry:
+            return not entry.get("total_parts") or not entry.get("planned_production_time")
+        return entry["performance"] <= 0 or entry["availability"] <= 0
+
+    @staticmethod
+    def constraint_weights(equipment_oee: List[Dict[str, Any]]) -> List[float]:
+        """
+        Get the line weight of every equipment in ``equipment_oee``.
+
+        Weights are proportional to effective cycle time and sum to 1 over
+        the equipment that produced; idle equipment weighs nothing.
+        Producing equipment without any OEE (every part rejected) are the
+        constraint outright and share the whole weight.
+        """
+        active = [not LineOEEAggregator.is_idle(entry) for entry in equipment_oee]
+        effective = [
+            LineOEEAggregator.effective_cycle_time(entry["oee"], entry["ideal_cycle_time"]) if is_active else None
+            for entry, is_active in zip(equipment_oee, active)
+        ]
+
+        stopped = sum(1 for cycle_time, is_active in zip(effective, active) if is_active and cycle_time is None)
+        if stopped:
+            return [
+                1.0 / stopped if is_active and cycle_time is None else 0.0
+                for cycle_time, is_active in zip(effective, active)
+            ]
+
+        total = sum(cycle_time for cycle_time in effective if cycle_time is not None)
+        if not total:
+            return [0.0] * len(effective)
+        return [cycle_time / total if cycle_time is not None else 0.0 for cycle_time in effective]
+
+    @staticmethod
+    def aggregate(line_id: UUID, equipment_oee: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Aggregate per-equipment OEE components into a line OEE.
+
+        Each entry needs equipment_code, oee, availability, performance and
+        quality as fractions, and may carry total_parts and
+        planned_production_time to tell idle equipment apart;
+        ideal_cycle_time is taken from the equipment registry when the entry
+        does not carry it.
+        """
+        equipment = [
+            {
+                "equipment_code": entry["equipment_code"],
+                "oee": entry["oee"],
+                "availability": entry["availability"],
+                "performance": entry["performance"],
+                "quality": entry["quality"],
+                "ideal_cycle_time": (
+                    entry.get("ideal_cycle_time")
+                    or equipment_registry.ideal_cycle_time(entry["equipment_code"])
+                ),
+                "idle": LineOEEAggregator.is_idle(entry)
+            }
+            for entry in equipment_oee
+        ]
+
+        weights = LineOEEAggregator.constraint_weights([
+            {**entry, "ideal_cycle_time": line_entry["ideal_cycle_time"]}
+            for entry, line_entry in zip(equipment_oee, equipment)
+        ])
+        if not any(weights):
+            # No equipment, or none produced in the window
+            return {
+                "line_id": line_id,
+                "oee": 0,
+                "availability": 0,
+                "performance": 0,
+                "quality": 0,
+                "constraint_equipment": None,
+                "constraint_oee": None,
+                "equipment_count": len(equipment),
+                "equipment_oee": [{**entry, "line_weight": 0.0} for entry in equipment]
+            }
+
+        for entry, weight in zip(equipment, weights):
+            entry["line_weight"] = round(weight, 4)
+
+        components = {
+            component: sum(entry[component] * weight for entry, weight in zip(equipment, weights))
+            for component in COMPONENTS
+        }
+
+        constraint = equipment[weights.index(max(weights))]
+
+        return {
+            "line_id": line_id,
+            "oee": round(components["availability"] * components["performance"] * components["quality"], 4),
+            "availability": round(components["availability"], 4),
+            "performance": round(components["performance"], 4),
+            "quality": round(components["quality"], 4),
+            "constraint_equipment": constraint["equipment_code"],
+            "constraint_oee": constraint["oee"],
+            "equipment_count": len(equipment),
+            "equipment_oee": equipment
+        }
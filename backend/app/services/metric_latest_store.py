@@ -0,0 +1,323 @@
+"""
+MS5.0 Floor Dashboard - Metric Latest Store
+
+This module keeps an in-process mirror of factory_telemetry.metric_latest so
+current-value reads (API endpoints, websocket snapshots, real-time OEE) are
+served from memory instead of joining metric_latest to metric_def per request.
+The mirror is loaded once at startup and kept current either directly by the
+poller or by the 'metric_latest' NOTIFY channel published on upsert; values
+too large for a notification (JSON and long text) are reloaded from their
+metric_latest row. Sample times are stored as aware UTC datetimes whichever source they came from.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+import structlog
+
+from app.database import execute_query, open_notification_connection
+from app.utils.time_range import to_utc
+
+logger = structlog.get_logger()
+
+
+class MetricLatestStore:
+    """Array-indexed latest-value table keyed by metric definition id."""
+
+    VALUE_CHANNEL = "metric_latest"
+    DEFINITION_CHANNEL = "metric_def_changed"
+
+    def __init__(self):
+        # metric_def_id -> slot; every other structure is indexed by slot
+        self._slots: Dict[str, int] = {}
+        self._metric_keys: List[str] = []
+        self._equipment_codes: List[str] = []
+        self._timestamps: List[Optional[datetime]] = []
+        self._values: List[Any] = []
+
+        # equipment_code -> {metric_key: slot}
+        self._equipment_index: Dict[str, Dict[str, int]] = {}
+        # equipment_code -> newest sample time across its metrics
+        self._equipment_sample_times: Dict[str, datetime] = {}
+
+        self._listener_connection = None
+        self._reload_task: Optional[asyncio.Task] = None
+        # In-flight single-row reloads for notifications without the value
+        self._row_reload_tasks: Set[asyncio.Task] = set()
+        self.is_loaded = False
+        self.loaded_at: Optional[datetime] = None
+
+        self.stats = {
+            "updates": 0,
+            "stale_updates": 0,
+            "unknown_metrics": 0,
+            "notifications": 0,
+            "reloads": 0,
+            "row_reloads": 0
+        }
+
+    async def load(self) -> int:
+        """Load metric definitions and current values in a single query."""
+        query = """
+        SELECT md.id as metric_def_id, md.equipment_code, md.metric_key,
+               ml.ts, ml.value_bool, ml.value_int, ml.value_real,
+               ml.value_text, ml.value_json
+        FROM factory_telemetry.metric_def md
+        LEFT JOIN factory_telemetry.metric_latest ml ON ml.metric_def_id = md.id
+        ORDER BY md.equipment_code, md.metric_key
+        """
+
+        result = await execute_query(query)
+
+        slots: Dict[str, int] = {}
+        metric_keys: List[str] = []
+        equipment_codes: List[str] = []
+        timestamps: List[Optional[datetime]] = []
+        values: List[Any] = []
+        equipment_index: Dict[str, Dict[str, int]] = {}
+        sample_times: Dict[str, datetime] = {}
+
+        for row in result:
+            slot = len(metric_keys)
+            ts = to_utc(row["ts"])
+            slots[str(row["metric_def_id"])] = slot
+            metric_keys.append(row["metric_key"])
+            equipment_codes.append(row["equipment_code"])
+            timestamps.append(ts)
+            values.append(self._coalesce_value(row))
+            equipment_index.setdefault(row["equipment_code"], {})[row["metric_key"]] = slot
+            newest_ts = sample_times.get(row["equipment_code"])
+            if ts is not None and (newest_ts is None or ts > newest_ts):
+                sample_times[row["equipment_code"]] = ts
+
+        # Swap in the new layout in one step so readers never see a partial table
+        self._slots = slots
+        self._metric_keys = metric_keys
+        self._equipment_codes = equipment_codes
+        self._timestamps = timestamps
+        self._values = values
+        self._equipment_index = equipment_index
+        self._equipment_sample_times = sample_times
+
+        self.is_loaded = True
+        self.loaded_at = datetime.utcnow()
+        self.stats["reloads"] += 1
+
+        logger.info(
+            "Metric latest store loaded",
+            metrics=len(metric_keys),
+            equipment=len(equipment_index)
+        )
+
+        return len(metric_keys)
+
+    def update(self, metric_def_id: str, ts: datetime, value: Any) -> bool:
+        """Apply a single metric value; older samples than the stored one are ignored."""
+        slot = self._slots.get(str(metric_def_id))
+        if slot is None:
+            self.stats["unknown_metrics"] += 1
+            return False
+
+        return self._write_slot(slot, ts, value)
+
+    def update_equipment(self, equipment_code: str, metrics: Dict[str, Any], ts: datetime) -> int:
+        """Apply a poll sample for one equipment, keyed by metric_key."""
+        index = self._equipment_index.get(equipment_code)
+        if not index:
+            return 0
+
+        applied = 0
+        for metric_key, value in metrics.items():
+            slot = index.get(metric_key)
+            if slot is not None and self._write_slot(slot, ts, value):
+                applied += 1
+
+        return applied
+
+    def get(self, metric_def_id: str) -> Optional[Tuple[Optional[datetime], Any]]:
+        """Get the (timestamp, value) pair for a metric definition id."""
+        slot = self._slots.get(str(metric_def_id))
+        if slot is None:
+            return None
+        return self._timestamps[slot], self._values[slot]
+
+    def get_equipment_latest(self, equipment_code: str) -> Dict[str, Any]:
+        """
+        Get the latest values for an equipment as {metric_key: value}.
+
+        The most recent sample time across the equipment's metrics is returned
+        under "timestamp"; an empty dict means the equipment is unknown.
+        """
+        index = self._equipment_index.get(equipment_code)
+        if not index:
+            return {}
+
+        latest: Dict[str, Any] = {}
+        newest_ts = None
+        for metric_key, slot in index.items():
+            latest[metric_key] = self._values[slot]
+            ts = self._timestamps[slot]
+            if ts is not None and (newest_ts is None or ts > newest_ts):
+                newest_ts = ts
+
+        latest["timestamp"] = newest_ts
+        return latest
+
+    def equipment_sample_time(self, equipment_code: str) -> Optional[datetime]:
+        """Get the time of the newest sample stored for an equipment."""
+        return self._equipment_sample_times.get(equipment_code)
+
+    def get_equipment_metrics(self, equipment_code: str) -> List[Dict[str, Any]]:
+        """Get the latest values for an equipment as metric rows."""
+        index = self._equipment_index.get(equipment_code, {})
+        return [
+            {
+                "metric_key": metric_key,
+                "ts": self._timestamps[slot],
+                "value": self._values[slot]
+            }
+            for metric_key, slot in index.items()
+        ]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get the latest values for every known equipment."""
+        return {
+            equipment_code: self.get_equipment_latest(equipment_code)
+            for equipment_code in self._equipment_index
+        }
+
+    def equipment_codes(self) -> List[str]:
+        """Get the equipment codes known to the store."""
+        return list(self._equipment_index.keys())
+
+    async def start(self) -> None:
+        """Load the mirror and subscribe to change notifications."""
+        await self.load()
+
+        try:
+            self._listener_connection = await open_notification_connection()
+            await self._listener_connection.add_listener(self.VALUE_CHANNEL, self._on_value_notification)
+            await self._listener_connection.add_listener(self.DEFINITION_CHANNEL, self._on_definition_notification)
+            logger.info("Metric latest store listening for changes")
+        except Exception as e:
+            # Without notifications the mirror is still fed by the in-process poller
+            logger.error("Failed to subscribe to metric latest notifications", error=str(e))
+            self._listener_connection = None
+
+    async def stop(self) -> None:
+        """Unsubscribe from change notifications."""
+        if self._reload_task:
+            self._reload_task.cancel()
+            self._reload_task = None
+        for task in self._row_reload_tasks:
+            task.cancel()
+        self._row_reload_tasks.clear()
+
+        if self._listener_connection:
+            try:
+                await self._listener_connection.close()
+            except Exception as e:
+                logger.error("Error closing metric latest listener", error=str(e))
+            self._listener_connection = None
+
+        logger.info("Metric latest store stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get store statistics."""
+        return {
+            **self.stats,
+            "metrics": len(self._metric_keys),
+            "equipment": len(self._equipment_index),
+            "is_loaded": self.is_loaded,
+            "listening": self._listener_connection is not None,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None
+        }
+
+    def _write_slot(self, slot: int, ts: datetime, value: Any) -> bool:
+        """Write a value into a slot unless it is older than the stored sample."""
+        ts = to_utc(ts)
+        current_ts = self._timestamps[slot]
+        if current_ts is not None and ts is not None and ts < current_ts:
+            self.stats["stale_updates"] += 1
+            return False
+
+        self._timestamps[slot] = ts
+        self._values[slot] = value
+        self.stats["updates"] += 1
+
+        if ts is not None:
+            equipment_code = self._equipment_codes[slot]
+            newest_ts = self._equipment_sample_times.get(equipment_code)
+            if newest_ts is None or ts > newest_ts:
+                self._equipment_sample_times[equipment_code] = ts
+        return True
+
+    def _on_value_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        """Apply a metric_latest NOTIFY payload."""
+        self.stats["notifications"] += 1
+        try:
+            data = json.loads(payload)
+            if data.get("reload"):
+                # The value was left out of the payload; the row holds it in full
+                task = asyncio.ensure_future(self._reload_row(data["metric_def_id"]))
+                self._row_reload_tasks.add(task)
+                task.add_done_callback(self._row_reload_tasks.discard)
+                return
+            self.update(data["metric_def_id"], data.get("ts") or None, self._coalesce_value(data))
+        except Exception as e:
+            logger.error("Invalid metric latest notification", error=str(e), payload=payload[:200])
+
+    async def _reload_row(self, metric_def_id: str) -> None:
+        """Apply a metric's current value read from its metric_latest row."""
+        query = """
+        SELECT ts, value_bool, value_int, value_real, value_text, value_json
+        FROM factory_telemetry.metric_latest
+        WHERE metric_def_id = :metric_def_id
+        """
+        try:
+            result = await execute_query(query, {"metric_def_id": metric_def_id})
+        except Exception as e:
+            logger.error("Failed to reload metric latest row", error=str(e), metric_def_id=metric_def_id)
+            return
+
+        self.stats["row_reloads"] += 1
+        if result:
+            self.update(metric_def_id, result[0]["ts"], self._coalesce_value(result[0]))
+
+    def _on_definition_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        """Reload the slot layout when metric definitions change."""
+        if self._reload_task and not self._reload_task.done():
+            return
+        self._reload_task = asyncio.ensure_future(self.load())
+
+    @staticmethod
+    def _coalesce_value(row: Any) -> Any:
+        """Pick the populated typed value column of a metric row."""
+        for column in ("value_bool", "value_int", "value_real", "value_text", "value_json"):
+            try:
+                value = row[column]
+            except (KeyError, IndexError):
+                continue
+            if value is not None:
+                return value
+        return None
+
+
+# Global store instance
+metric_latest_store = MetricLatestStore()
+
+
+async def start_metric_latest_store() -> None:
+    """Load the global metric latest store and start listening for changes."""
+    await metric_latest_store.start()
+
+
+async def stop_metric_latest_store() -> None:
+    """Stop the global metric latest store."""
+    await metric_latest_store.stop()
+
+
+def get_metric_latest_store() -> MetricLatestStore:
+    """Get the global metric latest store."""
+    return metric_latest_store
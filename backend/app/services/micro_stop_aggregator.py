@@ -0,0 +1,234 @@
+"""
+MS5.0 Floor Dashboard - Micro-Stop Aggregator
+
+This module accumulates stops shorter than the downtime detection threshold
+into per-interval counters instead of writing each one as a downtime event.
+High-speed equipment can jam for a few seconds many times an hour; the
+counters for each equipment, reason and interval are flushed periodically
+as one aggregated row in downtime_micro_stops. Intervals are naive UTC.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+import structlog
+
+from app.config import settings
+from app.database import execute_update
+from app.services.equipment_registry import equipment_registry
+from app.utils.time_range import to_naive_utc
+
+logger = structlog.get_logger()
+
+_EPOCH = datetime(1970, 1, 1)
+
+MicroStopKey = Tuple[str, str, datetime, str]  # line_id, equipment_code, interval_start, reason_code
+
+
+class MicroStopBucket:
+    """Micro-stop counters for one equipment, reason and interval."""
+
+    __slots__ = ("category", "stop_count", "total_seconds", "max_seconds")
+
+    def __init__(self, category: Optional[str] = None):
+        self.category = category
+        self.stop_count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, duration_seconds: float) -> None:
+        """Count one stop."""
+        self.stop_count += 1
+        self.total_seconds += duration_seconds
+        self.max_seconds = max(self.max_seconds, duration_seconds)
+
+    def merge(self, other: "MicroStopBucket") -> None:
+        """Fold in counters that failed to flush."""
+        self.stop_count += other.stop_count
+        self.total_seconds += other.total_seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+
+
+class MicroStopAggregator:
+    """Accumulates micro-stops in memory and flushes them as aggregated rows."""
+
+    def __init__(
+        self,
+        interval_minutes: Optional[int] = None,
+        flush_interval_seconds: Optional[int] = None
+    ):
+        self.interval = timedelta(minutes=interval_minutes or settings.DOWNTIME_MICRO_STOP_INTERVAL_MINUTES)
+        self.flush_interval_seconds = flush_interval_seconds or settings.DOWNTIME_MICRO_STOP_FLUSH_SECONDS
+        self._buckets: Dict[MicroStopKey, MicroStopBucket] = {}
+        self.is_running = False
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "stops_recorded": 0,
+            "stops_without_line": 0,
+            "rows_flushed": 0,
+            "flush_errors": 0
+        }
+
+    def interval_start(self, timestamp: datetime) -> datetime:
+        """Get the start of the interval a stop belongs to."""
+        interval_seconds = int(self.interval.total_seconds())
+        elapsed = int((to_naive_utc(timestamp) - _EPOCH).total_seconds())
+        return _EPOCH + timedelta(seconds=elapsed - elapsed % interval_seconds)
+
+    def record(
+        self,
+        line_id: Optional[UUID],
+        equipment_code: str,
+        reason_code: str,
+        category: Optional[str],
+        start_time: datetime,
+        duration_seconds: float
+    ) -> None:
+        """
+        Count a micro-stop in the interval it started in.
+
+        Stops without a line fall back to the equipment's line in the
+        registry; stops on equipment with no known line are not counted,
+        as downtime_micro_stops rows are keyed by line.
+        """
+        if line_id is None:
+            line_id = equipment_registry.line_for_equipment(equipment_code)
+            if line_id is None:
+                self.stats["stops_without_line"] += 1
+                logger.debug("Micro-stop without a production line skipped", equipment_code=equipment_code)
+                return
+
+        key = (str(line_id), equipment_code, self.interval_start(start_time), reason_code)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = MicroStopBucket(category)
+        bucket.add(duration_seconds)
+
+        self.stats["stops_recorded"] += 1
+
+    async def flush(self) -> int:
+        """Write the accumulated counters, keeping them for the next flush on failure."""
+        if not self._buckets:
+            return 0
+
+        buckets, self._buckets = self._buckets, {}
+
+        try:
+            flush_query = """
+            INSERT INTO factory_telemetry.downtime_micro_stops
+            (line_id, equipment_code, interval_start, reason_code, category,
+             stop_count, total_seconds, max_seconds)
+            SELECT * FROM unnest(
+                CAST(:line_id AS UUID[]),
+                CAST(:equipment_code AS TEXT[]),
+                CAST(:interval_start AS TIMESTAMPTZ[]),
+                CAST(:reason_code AS TEXT[]),
+                CAST(:category AS TEXT[]),
+                CAST(:stop_count AS INTEGER[]),
+                CAST(:total_seconds AS REAL[]),
+                CAST(:max_seconds AS REAL[])
+            )
+            ON CONFLICT (line_id, equipment_code, interval_start, reason_code) DO UPDATE SET
+                category = EXCLUDED.category,
+                stop_count = downtime_micro_stops.stop_count + EXCLUDED.stop_count,
+                total_seconds = downtime_micro_stops.total_seconds + EXCLUDED.total_seconds,
+                max_seconds = GREATEST(downtime_micro_stops.max_seconds, EXCLUDED.max_seconds),
+                updated_at = NOW()
+            """
+
+            keys = list(buckets)
+            await execute_update(flush_query, {
+                "line_id": [key[0] for key in keys],
+                "equipment_code": [key[1] for key in keys],
+                "interval_start": [key[2] for key in keys],
+                "reason_code": [key[3] for key in keys],
+                "category": [buckets[key].category for key in keys],
+                "stop_count": [buckets[key].stop_count for key in keys],
+                "total_seconds": [buckets[key].total_seconds for key in keys],
+                "max_seconds": [buckets[key].max_seconds for key in keys]
+            })
+
+        except Exception as e:
+            for key, bucket in buckets.items():
+                pending = self._buckets.get(key)
+                if pending is not None:
+                    bucket.merge(pending)
+                self._buckets[key] = bucket
+            self.stats["flush_errors"] += 1
+            logger.error("Failed to flush micro-stops", error=str(e), rows=len(buckets))
+            return 0
+
+        self.stats["rows_flushed"] += len(buckets)
+        logger.debug("Micro-stops flushed", rows=len(buckets))
+        return len(buckets)
+
+    async def start(self) -> None:
+        """Start the periodic flush."""
+        if self.is_running:
+            logger.warning("Micro-stop aggregator is already running")
+            return
+
+        self.is_running = True
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+        logger.info(
+            "Micro-stop aggregator started",
+            interval_minutes=self.interval.total_seconds() / 60,
+            flush_interval_seconds=self.flush_interval_seconds
+        )
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write what is left."""
+        self.is_running = False
+
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        await self.flush()
+        logger.info("Micro-stop aggregator stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get aggregator statistics."""
+        return {
+            **self.stats,
+            "pending_rows": len(self._buckets),
+            "is_running": self.is_running
+        }
+
+    async def _flush_loop(self) -> None:
+        """Flush the counters every flush interval."""
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.flush_interval_seconds)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Error in micro-stop flush loop", error=str(e))
+
+
+# Global aggregator instance
+micro_stop_aggregator = MicroStopAggregator()
+
+
+async def start_micro_stop_aggregator() -> None:
+    """Start the global micro-stop aggregator."""
+    await micro_stop_aggregator.start()
+
+
+async def stop_micro_stop_aggregator() -> None:
+    """Stop the global micro-stop aggregator."""
+    await micro_stop_aggregator.stop()
+
+
+def get_micro_stop_aggregator() -> MicroStopAggregator:
+    """Get the global micro-stop aggregator."""
+    return micro_stop_aggregator
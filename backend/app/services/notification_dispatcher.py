@@ -0,0 +1,457 @@
+"""
+MS5.0 Floor Dashboard - Notification Dispatcher
+
+This module fans push notifications out to many recipients at once. A
+message is written to notification_outbox for all its recipients in one
+statement, their FCM tokens are resolved together and the tokens are sent as
+multicast batches over a bounded pool of concurrent requests, instead of one
+HTTP request per recipient in sequence. Recipients who were sent a message
+with the same dedup key within the dedup window are coalesced. Transient
+failures stay in the outbox and are retried by a background loop, which
+also picks up messages whose sending process died.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+import structlog
+
+from app.config import settings
+from app.database import execute_query, execute_update, get_db_session
+
+logger = structlog.get_logger()
+
+
+# Per-token FCM errors that retrying cannot fix
+PERMANENT_FCM_ERRORS = frozenset({
+    "InvalidRegistration", "MismatchSenderId", "MissingRegistration", "NotRegistered", "InvalidPackageName"
+})
+NO_TOKEN_ERROR = "no_token"
+REQUEST_FAILED_ERROR = "request_failed"
+
+# Outbox rows still 'sending' after this long belong to a process that died
+CLAIM_TIMEOUT_SECONDS = 300
+
+OutboxRow = Tuple[int, str, int]  # id, user_id, attempts
+
+
+class OutboundMessage:
+    """One push notification addressed to any number of recipients."""
+
+    __slots__ = ("notification_type", "title", "body", "data", "dedup_key")
+
+    def __init__(
+        self,
+        notification_type: str,
+        title: str,
+        body: str,
+        data: Optional[Dict[str, Any]] = None,
+        dedup_key: Optional[str] = None
+    ):
+        self.notification_type = notification_type
+        self.title = title
+        self.body = body
+        self.data = data or {}
+        self.dedup_key = dedup_key or self.default_dedup_key(notification_type, title, body)
+
+    @staticmethod
+    def default_dedup_key(notification_type: str, title: str, body: str) -> str:
+        """Dedup key of messages without one: identical type, title and body."""
+        digest = hashlib.sha1(f"{title}\n{body}".encode()).hexdigest()[:16]
+        return f"{notification_type}:{digest}"
+
+    @classmethod
+    def from_row(cls, row: Any) -> "OutboundMessage":
+        """Rebuild a message from an outbox row."""
+        data = row["data"]
+        if isinstance(data, str):
+            data = json.loads(data)
+        return cls(row["notification_type"], row["title"], row["body"], data, row["dedup_key"])
+
+    @property
+    def key(self) -> Tuple[str, str, str, str, str]:
+        """Identity of the message, grouping outbox rows sent together."""
+        return (
+            self.notification_type, self.dedup_key, self.title, self.body,
+            json.dumps(self.data, sort_keys=True, default=str)
+        )
+
+    def payload(self, tokens: List[str]) -> Dict[str, Any]:
+        """Build the FCM multicast payload for a batch of tokens."""
+        return {
+            "registration_ids": tokens,
+            "notification": {
+                "title": self.title,
+                "body": self.body,
+                "sound": "default",
+                "badge": 1
+            },
+            "data": {
+                "notification_type": self.notification_type,
+                "timestamp": datetime.utcnow().isoformat(),
+                **self.data
+            }
+        }
+
+
+class NotificationDispatcher:
+    """
+    Sends push notifications through a durable outbox with multicast batching.
+
+    The transport is the notification service: it reports whether push is
+    configured, resolves FCM tokens and sends one multicast payload,
+    returning each token's error (None when delivered), or None when the
+    request itself failed.
+    """
+
+    def __init__(
+        self,
+        transport: Any,
+        workers: Optional[int] = None,
+        multicast_size: Optional[int] = None,
+        dedup_seconds: Optional[int] = None
+    ):
+        self.transport = transport
+        self.workers = workers or settings.NOTIFICATION_DISPATCH_WORKERS
+        self.multicast_size = multicast_size or settings.NOTIFICATION_MULTICAST_SIZE
+        self.dedup_seconds = settings.NOTIFICATION_DEDUP_SECONDS if dedup_seconds is None else dedup_seconds
+        self.retry_seconds = settings.NOTIFICATION_RETRY_SECONDS
+        self.max_attempts = settings.NOTIFICATION_MAX_ATTEMPTS
+
+        # Bounds concurrent provider requests across all messages
+        self._semaphore = asyncio.Semaphore(self.workers)
+        self._recent: Dict[Tuple[str, str], float] = {}
+        self.is_running = False
+        self._retry_task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "messages": 0,
+            "recipients": 0,
+            "coalesced": 0,
+            "multicast_requests": 0,
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "outbox_errors": 0
+        }
+
+    async def dispatch(
+        self,
+        user_ids: Sequence[str],
+        title: str,
+        body: str,
+        data: Optional[Dict[str, Any]] = None,
+        notification_type: str = "general",
+        dedup_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Send one message to many users and report each user's outcome."""
+        results = {
+            "successful": [],
+            "failed": [],
+            "coalesced": [],
+            "total_sent": 0,
+            "total_failed": 0,
+            "total_coalesced": 0
+        }
+        user_ids = list(dict.fromkeys(user_ids))
+
+        if not self.transport.push_configured:
+            logger.warning("Push notifications not enabled or FCM server key not configured")
+            results["failed"] = user_ids
+            results["total_failed"] = len(user_ids)
+            return results
+
+        message = OutboundMessage(notification_type, title, body, data, dedup_key)
+        recipients = self._coalesce(message.dedup_key, user_ids)
+
+        outbox_rows = await self._enqueue(message, recipients)
+        if outbox_rows is not None:
+            # Recipients another replica sent this message to within the window
+            enqueued = {user_id for _, user_id, _ in outbox_rows}
+            recipients = [user_id for user_id in recipients if user_id in enqueued]
+
+        outcomes = await self._deliver(message, recipients)
+        if outbox_rows:
+            await self._record(outbox_rows, outcomes)
+
+        # Recipients left in the outbox are retried from there; only a failed direct send is not suppressed
+        self._mark_sent(message.dedup_key, [
+            user_id for user_id in recipients if outbox_rows is not None or outcomes.get(user_id) is None
+        ])
+
+        for user_id in user_ids:
+            if user_id not in outcomes:
+                results["coalesced"].append(user_id)
+            elif outcomes[user_id] is None:
+                results["successful"].append(user_id)
+            else:
+                results["failed"].append(user_id)
+        results["total_sent"] = len(results["successful"])
+        results["total_failed"] = len(results["failed"])
+        results["total_coalesced"] = len(results["coalesced"])
+
+        self.stats["messages"] += 1
+        self.stats["recipients"] += len(user_ids)
+        self.stats["coalesced"] += results["total_coalesced"]
+
+        logger.info(
+            "Push notification dispatched",
+            notification_type=notification_type,
+            recipients=len(user_ids),
+            sent=results["total_sent"],
+            failed=results["total_failed"],
+            coalesced=results["total_coalesced"]
+        )
+        return results
+
+    async def retry_due(self) -> int:
+        """Claim due outbox rows and send them again, one multicast fan-out per message."""
+        if not self.transport.push_configured:
+            return 0
+
+        claim_query = """
+        UPDATE factory_telemetry.notification_outbox o
+        SET status = 'sending', attempts = o.attempts + 1, claimed_at = NOW()
+        FROM (
+            SELECT id
+            FROM factory_telemetry.notification_outbox
+            WHERE (status = 'pending' AND available_at <= NOW())
+            OR (status = 'sending' AND claimed_at < NOW() - make_interval(secs => :claim_timeout))
+            ORDER BY available_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        ) due
+        WHERE o.id = due.id
+        RETURNING o.id, o.user_id, o.notification_type, o.dedup_key, o.title, o.body, o.data, o.attempts
+        """
+
+        rows = await execute_query(claim_query, {
+            "claim_timeout": CLAIM_TIMEOUT_SECONDS,
+            "limit": self.multicast_size * self.workers
+        })
+        if not rows:
+            return 0
+
+        messages: Dict[Tuple[str, ...], Tuple[OutboundMessage, List[OutboxRow]]] = {}
+        for row in rows:
+            message = OutboundMessage.from_row(row)
+            messages.setdefault(message.key, (message, []))[1].append(
+                (row["id"], row["user_id"], row["attempts"])
+            )
+
+        async def resend(message: OutboundMessage, outbox_rows: List[OutboxRow]) -> None:
+            user_ids = list(dict.fromkeys(user_id for _, user_id, _ in outbox_rows))
+            outcomes = await self._deliver(message, user_ids)
+            await self._record(outbox_rows, outcomes)
+
+        await asyncio.gather(*(resend(message, outbox_rows) for message, outbox_rows in messages.values()))
+
+        self.stats["retried"] += len(rows)
+        logger.info("Notification outbox retried", rows=len(rows), messages=len(messages))
+        return len(rows)
+
+    async def start(self) -> None:
+        """Start retrying the outbox."""
+        if self.is_running:
+            logger.warning("Notification dispatcher is already running")
+            return
+
+        self.is_running = True
+        self._retry_task = asyncio.create_task(self._retry_loop())
+
+        logger.info(
+            "Notification dispatcher started",
+            workers=self.workers,
+            multicast_size=self.multicast_size,
+            dedup_seconds=self.dedup_seconds
+        )
+
+    async def stop(self) -> None:
+        """Stop retrying the outbox."""
+        self.is_running = False
+
+        if self._retry_task:
+            self._retry_task.cancel()
+            try:
+                await self._retry_task
+            except asyncio.CancelledError:
+                pass
+            self._retry_task = None
+
+        logger.info("Notification dispatcher stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get dispatcher statistics."""
+        return {
+            **self.stats,
+            "dedup_entries": len(self._recent),
+            "is_running": self.is_running
+        }
+
+    def _coalesce(self, dedup_key: str, user_ids: List[str]) -> List[str]:
+        """Get the users not sent this dedup key within the window."""
+        expired_before = time.monotonic() - self.dedup_seconds
+        return [
+            user_id for user_id in user_ids
+            if self._recent.get((user_id, dedup_key), expired_before) <= expired_before
+        ]
+
+    def _mark_sent(self, dedup_key: str, user_ids: List[str]) -> None:
+        """Start the dedup window of users sent or enqueued this dedup key."""
+        now = time.monotonic()
+        if len(self._recent) > 10000:
+            expired_before = now - self.dedup_seconds
+            self._recent = {key: sent_at for key, sent_at in self._recent.items() if sent_at > expired_before}
+
+        for user_id in user_ids:
+            self._recent[(user_id, dedup_key)] = now
+
+    async def _enqueue(self, message: OutboundMessage, user_ids: List[str]) -> Optional[List[OutboxRow]]:
+        """Write the message for its recipients, or None when the outbox is unavailable."""
+        if not user_ids:
+            return []
+
+        enqueue_query = """
+        INSERT INTO factory_telemetry.notification_outbox
+        (user_id, notification_type, dedup_key, title, body, data)
+        SELECT recipients.user_id, :notification_type, :dedup_key, :title, :body, CAST(:data AS JSONB)
+        FROM unnest(CAST(:user_ids AS TEXT[])) AS recipients (user_id)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM factory_telemetry.notification_outbox o
+            WHERE o.dedup_key = :dedup_key AND o.user_id = recipients.user_id
+            AND o.created_at > NOW() - make_interval(secs => :dedup_seconds)
+        )
+        RETURNING id, user_id, attempts
+        """
+
+        try:
+            async with get_db_session() as session:
+                # Replicas enqueueing the same key wait here, so the insert below sees the
+                # rows they committed instead of racing them under READ COMMITTED
+                await session.execute(
+                    text("SELECT pg_advisory_xact_lock(hashtext(:dedup_key))"),
+                    {"dedup_key": message.dedup_key}
+                )
+                result = await session.execute(text(enqueue_query), {
+                    "user_ids": user_ids,
+                    "notification_type": message.notification_type,
+                    "dedup_key": message.dedup_key,
+                    "title": message.title,
+                    "body": message.body,
+                    "data": json.dumps(message.data, default=str),
+                    "dedup_seconds": self.dedup_seconds
+                })
+                rows = result.fetchall()
+            return [(row["id"], row["user_id"], row["attempts"]) for row in rows]
+
+        except Exception as e:
+            # Deliver without the outbox rather than drop the notification
+            self.stats["outbox_errors"] += 1
+            logger.error("Failed to write notification outbox", error=str(e), recipients=len(user_ids))
+            return None
+
+    async def _deliver(self, message: OutboundMessage, user_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Send a message to users in concurrent multicast batches, getting each user's error."""
+        if not user_ids:
+            return {}
+
+        tokens = await self.transport.resolve_fcm_tokens(user_ids)
+        outcomes: Dict[str, Optional[str]] = {
+            user_id: NO_TOKEN_ERROR for user_id in user_ids if not tokens.get(user_id)
+        }
+
+        addressed = [user_id for user_id in user_ids if tokens.get(user_id)]
+        batches = [
+            addressed[start:start + self.multicast_size]
+            for start in range(0, len(addressed), self.multicast_size)
+        ]
+        for batch_outcomes in await asyncio.gather(
+            *(self._send_batch(message, batch, tokens) for batch in batches)
+        ):
+            outcomes.update(batch_outcomes)
+
+        sent = sum(1 for error in outcomes.values() if error is None)
+        self.stats["sent"] += sent
+        self.stats["failed"] += len(outcomes) - sent
+        return outcomes
+
+    async def _send_batch(
+        self,
+        message: OutboundMessage,
+        user_ids: List[str],
+        tokens: Dict[str, str]
+    ) -> Dict[str, Optional[str]]:
+        """Send one multicast request."""
+        async with self._semaphore:
+            self.stats["multicast_requests"] += 1
+            try:
+                errors = await self.transport.send_fcm_multicast(
+                    message.payload([tokens[user_id] for user_id in user_ids])
+                )
+            except Exception as e:
+                logger.error("FCM multicast error", error=str(e), tokens=len(user_ids))
+                errors = None
+
+        if errors is None or len(errors) != len(user_ids):
+            return {user_id: REQUEST_FAILED_ERROR for user_id in user_ids}
+        return dict(zip(user_ids, errors))
+
+    async def _record(self, outbox_rows: List[OutboxRow], outcomes: Dict[str, Optional[str]]) -> None:
+        """Mark outbox rows sent, pending a retry, or failed."""
+        ids, statuses, errors = [], [], []
+        for outbox_id, user_id, attempts in outbox_rows:
+            error = outcomes.get(user_id, REQUEST_FAILED_ERROR)
+            if error is None:
+                status = "sent"
+            elif error == NO_TOKEN_ERROR or error in PERMANENT_FCM_ERRORS or attempts >= self.max_attempts:
+                status = "failed"
+            else:
+                status = "pending"
+            ids.append(outbox_id)
+            statuses.append(status)
+            errors.append(error)
+
+        record_query = """
+        UPDATE factory_telemetry.notification_outbox o
+        SET status = outcomes.status,
+            error = outcomes.error,
+            sent_at = CASE WHEN outcomes.status = 'sent' THEN NOW() ELSE o.sent_at END,
+            available_at = CASE WHEN outcomes.status = 'pending'
+                THEN NOW() + make_interval(secs => :retry_seconds * o.attempts)
+                ELSE o.available_at END,
+            claimed_at = NULL
+        FROM unnest(
+            CAST(:id AS BIGINT[]),
+            CAST(:status AS TEXT[]),
+            CAST(:error AS TEXT[])
+        ) AS outcomes (id, status, error)
+        WHERE o.id = outcomes.id
+        """
+
+        try:
+            await execute_update(record_query, {
+                "id": ids,
+                "status": statuses,
+                "error": errors,
+                "retry_seconds": self.retry_seconds
+            })
+        except Exception as e:
+            # Rows stay claimed and are retried once the claim times out
+            self.stats["outbox_errors"] += 1
+            logger.error("Failed to record notification outcomes", error=str(e), rows=len(ids))
+
+    async def _retry_loop(self) -> None:
+        """Retry due outbox rows every retry interval."""
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.retry_seconds)
+                while self.is_running and await self.retry_due() >= self.multicast_size * self.workers:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Error in notification retry loop", error=str(e))
@@ -0,0 +1,219 @@
+"""
+MS5.0 Floor Dashboard - Notification Routing
+
+This module keeps a routing table of Andon notification recipients in
+memory, mapping (line, priority, escalation level) to the users to notify
+with their FCM tokens and notification preferences, so an Andon notification
+resolves its recipients in one lookup instead of querying users, roles and
+tokens per recipient. The table is built from users, the escalation rules
+and the escalation recipient roles, and rebuilt when the
+'notification_routing_changed' NOTIFY channel reports a change; processes
+without a listener (Celery workers) rebuild it after
+NOTIFICATION_ROUTING_REFRESH_SECONDS instead.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import structlog
+
+from app.config import settings
+from app.database import execute_query
+from app.utils.notify_reloaded_table import NotifyReloadedTable
+
+logger = structlog.get_logger()
+
+
+DEFAULT_PREFERENCES = {
+    "push_enabled": True,
+    "email_enabled": False,
+    "websocket_enabled": True,
+    "sms_enabled": False
+}
+
+# Recipient groups used by escalation rules in place of a single role
+ROLE_GROUPS = {
+    "all_managers": ("production_manager", "shift_manager")
+}
+
+RouteKey = Tuple[str, str, int]  # str(line_id), priority, escalation_level
+
+
+class NotificationRecipient:
+    """A user who receives notifications, with their contact details and preferences."""
+
+    __slots__ = ("user_id", "role", "email", "phone", "fcm_token", "line_ids", "preferences")
+
+    def __init__(
+        self,
+        user_id: str,
+        role: Optional[str],
+        email: Optional[str] = None,
+        phone: Optional[str] = None,
+        fcm_token: Optional[str] = None,
+        line_ids: Optional[Iterable[Any]] = None,
+        preferences: Optional[Dict[str, Any]] = None
+    ):
+        self.user_id = user_id
+        self.role = role
+        self.email = email
+        self.phone = phone
+        self.fcm_token = fcm_token
+        # None serves every line
+        self.line_ids = frozenset(str(line_id) for line_id in line_ids) if line_ids is not None else None
+        self.preferences = {**DEFAULT_PREFERENCES, **(preferences or {}), "email": email, "phone": phone}
+
+    @property
+    def push_enabled(self) -> bool:
+        """Whether the user receives push notifications."""
+        return bool(self.preferences["push_enabled"])
+
+    def serves_line(self, line_id: str) -> bool:
+        """Check whether the user is notified about a line."""
+        return self.line_ids is None or line_id in self.line_ids
+
+
+class NotificationRouting(NotifyReloadedTable):
+    """Versioned in-memory routing table of Andon notification recipients."""
+
+    CHANGE_CHANNEL = "notification_routing_changed"
+    TABLE_NAME = "notification_routing"
+
+    def __init__(self):
+        super().__init__(settings.NOTIFICATION_ROUTING_REFRESH_SECONDS)
+        self._routes: Dict[RouteKey, Tuple[NotificationRecipient, ...]] = {}
+        self._roles: Dict[str, Tuple[NotificationRecipient, ...]] = {}
+        self._recipients: Dict[str, NotificationRecipient] = {}
+
+    async def load(self) -> int:
+        """Load users, escalation rules and recipient roles, and build the routing table."""
+        user_rows = await execute_query("""
+            SELECT id, role, email, phone, fcm_token, line_ids, notification_preferences
+            FROM factory_telemetry.users
+            WHERE is_active IS NOT FALSE
+        """)
+        rule_rows = await execute_query("""
+            SELECT priority, escalation_level, recipients
+            FROM factory_telemetry.andon_escalation_rules
+            WHERE enabled IS NOT FALSE
+        """)
+        role_rows = await execute_query("""
+            SELECT role, escalation_levels, enabled
+            FROM factory_telemetry.andon_escalation_recipients
+        """)
+        line_rows = await execute_query("""
+            SELECT id
+            FROM factory_telemetry.production_lines
+        """)
+
+        self.build(user_rows, rule_rows, role_rows, line_rows)
+        return len(self._routes)
+
+    def build(
+        self,
+        user_rows: List[Any],
+        rule_rows: List[Any],
+        role_rows: List[Any],
+        line_rows: List[Any]
+    ) -> None:
+        """Build the routing table from users, escalation rules, recipient roles and lines."""
+        recipients: Dict[str, NotificationRecipient] = {}
+        roles: Dict[str, List[NotificationRecipient]] = {}
+        for row in user_rows:
+            recipient = NotificationRecipient(
+                str(row["id"]),
+                row["role"],
+                email=row["email"],
+                phone=row["phone"],
+                fcm_token=row["fcm_token"],
+                line_ids=row["line_ids"],
+                preferences=self._json_value(row["notification_preferences"])
+            )
+            recipients[recipient.user_id] = recipient
+            roles.setdefault(recipient.role, []).append(recipient)
+
+        # Roles configured as escalation recipients may be disabled or limited to some levels
+        role_levels = {
+            row["role"]: set(row["escalation_levels"] or ()) if row["enabled"] is not False else set()
+            for row in role_rows
+        }
+
+        routes: Dict[RouteKey, Tuple[NotificationRecipient, ...]] = {}
+        for rule in rule_rows:
+            level = rule["escalation_level"]
+            rule_recipients: Dict[str, NotificationRecipient] = {}
+            for group in rule["recipients"] or ():
+                for role in ROLE_GROUPS.get(group, (group,)):
+                    if role in role_levels and level not in role_levels[role]:
+                        continue
+                    for recipient in roles.get(role, ()):
+                        rule_recipients.setdefault(recipient.user_id, recipient)
+
+            for line in line_rows:
+                line_id = str(line["id"])
+                routes[(line_id, rule["priority"], level)] = tuple(
+                    recipient for recipient in rule_recipients.values() if recipient.serves_line(line_id)
+                )
+
+        # Swap in the new tables in one step so readers never see a partial routing table
+        self._recipients = recipients
+        self._roles = {role: tuple(members) for role, members in roles.items()}
+        self._routes = routes
+        self._mark_loaded()
+
+        logger.info(
+            "Notification routing loaded",
+            version=self.version,
+            recipients=len(recipients),
+            routes=len(routes)
+        )
+
+    def route(self, line_id: Any, priority: str, escalation_level: int = 1) -> Tuple[NotificationRecipient, ...]:
+        """Get the recipients of a line's Andon notifications at a priority and escalation level."""
+        return self._routes.get((str(line_id), priority, escalation_level), ())
+
+    def role_members(self, role: str) -> Tuple[NotificationRecipient, ...]:
+        """Get the active users of a role, or of a role group."""
+        if role in ROLE_GROUPS:
+            return tuple(
+                recipient for group_role in ROLE_GROUPS[role] for recipient in self._roles.get(group_role, ())
+            )
+        return self._roles.get(role, ())
+
+    def get_recipient(self, user_id: Any) -> Optional[NotificationRecipient]:
+        """Get a user's contact details and preferences."""
+        return self._recipients.get(str(user_id))
+
+    def fcm_tokens(self, user_ids: Iterable[Any]) -> Dict[str, str]:
+        """Get the FCM tokens of users, omitting users without one."""
+        tokens = {}
+        for user_id in user_ids:
+            recipient = self._recipients.get(str(user_id))
+            if recipient is not None and recipient.fcm_token:
+                tokens[user_id] = recipient.fcm_token
+        return tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing statistics."""
+        return {
+            **super().get_stats(),
+            "recipients": len(self._recipients),
+            "routes": len(self._routes)
+        }
+
+
+# Global routing instance
+notification_routing = NotificationRouting()
+
+
+async def start_notification_routing() -> None:
+    """Load the global notification routing and start listening for changes."""
+    await notification_routing.start()
+
+
+async def stop_notification_routing() -> None:
+    """Stop the global notification routing."""
+    await notification_routing.stop()
+
+
+def get_notification_routing() -> NotificationRouting:
+    """Get the global notification routing."""
+    return notification_routing
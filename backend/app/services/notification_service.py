@@ -2,7 +2,8 @@
 MS5.0 Floor Dashboard - Notification Service
 
 This module provides push notification services for the MS5.0 Floor Dashboard application.
-It supports Firebase Cloud Messaging (FCM) and email notifications.
+It supports Firebase Cloud Messaging (FCM) and email notifications. Push notifications
+are fanned out through the notification dispatcher.
 """
 
 import json
@@ -12,6 +13,9 @@ from datetime import datetime, timedelta
 import structlog
 
 from app.config import settings
+from app.services.equipment_registry import equipment_registry
+from app.services.notification_dispatcher import NotificationDispatcher
+from app.services.notification_routing import DEFAULT_PREFERENCES, notification_routing
 
 logger = structlog.get_logger()
 
@@ -22,6 +26,16 @@ class NotificationService:
     def __init__(self):
         self.fcm_server_key = getattr(settings, 'FCM_SERVER_KEY', None)
         self.enabled = getattr(settings, 'ENABLE_PUSH_NOTIFICATIONS', False)
+    
+    @property
+    def push_configured(self) -> bool:
+        """Whether push notifications are enabled and FCM is configured."""
+        return bool(self.enabled and self.fcm_server_key)
+    
+    @staticmethod
+    def _delivered(result: Dict[str, Any]) -> bool:
+        """Whether a dispatch reached any recipient, now or within the dedup window."""
+        return result["total_sent"] > 0 or result.get("total_coalesced", 0) > 0
         
     async def send_push_notification(
         self,
@@ -33,51 +47,14 @@ class NotificationService:
     ) -> bool:
         """Send a push notification to a user."""
         try:
-            if not self.enabled or not self.fcm_server_key:
-                logger.warning("Push notifications not enabled or FCM server key not configured")
-                return False
-            
-            # Get user's FCM token (this would typically come from database)
-            fcm_token = await self._get_user_fcm_token(user_id)
-            if not fcm_token:
-                logger.warning("No FCM token found for user", user_id=user_id)
-                return False
-            
-            # Prepare notification payload
-            payload = {
-                "to": fcm_token,
-                "notification": {
-                    "title": title,
-                    "body": body,
-                    "sound": "default",
-                    "badge": 1
-                },
-                "data": {
-                    "notification_type": notification_type,
-                    "user_id": user_id,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    **(data or {})
-                }
-            }
-            
-            # Send notification via FCM
-            success = await self._send_fcm_notification(payload)
-            
-            if success:
-                logger.info(
-                    "Push notification sent successfully",
-                    user_id=user_id,
-                    notification_type=notification_type,
-                    title=title
-                )
-            else:
-                logger.error(
-                    "Failed to send push notification",
-                    user_id=user_id,
-                    notification_type=notification_type
-                )
-            
-            return success
+            result = await notification_dispatcher.dispatch(
+                user_ids=[user_id],
+                title=title,
+                body=body,
+                data=data,
+                notification_type=notification_type
+            )
+            return self._delivered(result)
             
         except Exception as e:
             logger.error(
@@ -94,40 +71,24 @@ class NotificationService:
         title: str,
         body: str,
         data: Optional[Dict[str, Any]] = None,
-        notification_type: str = "general"
+        notification_type: str = "general",
+        dedup_key: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Send push notifications to multiple users."""
-        results = {
-            "successful": [],
-            "failed": [],
-            "total_sent": 0,
-            "total_failed": 0
-        }
-        
-        for user_id in user_ids:
-            success = await self.send_push_notification(
-                user_id=user_id,
-                title=title,
-                body=body,
-                data=data,
-                notification_type=notification_type
-            )
-            
-            if success:
-                results["successful"].append(user_id)
-                results["total_sent"] += 1
-            else:
-                results["failed"].append(user_id)
-                results["total_failed"] += 1
+        """
+        Send push notifications to multiple users.
         
-        logger.info(
-            "Bulk push notification completed",
-            total_users=len(user_ids),
-            successful=results["total_sent"],
-            failed=results["total_failed"]
+        Users are sent the notification together as multicast batches. Users who
+        were sent a notification with the same dedup_key (by default the same
+        type, title and body) within the dedup window are coalesced.
+        """
+        return await notification_dispatcher.dispatch(
+            user_ids=user_ids,
+            title=title,
+            body=body,
+            data=data,
+            notification_type=notification_type,
+            dedup_key=dedup_key
         )
-        
-        return results
     
     async def send_notification_to_role(
         self,
@@ -135,7 +96,8 @@ class NotificationService:
         title: str,
         body: str,
         data: Optional[Dict[str, Any]] = None,
-        notification_type: str = "general"
+        notification_type: str = "general",
+        dedup_key: Optional[str] = None
     ) -> Dict[str, Any]:
         """Send push notification to all users with a specific role."""
         try:
@@ -156,7 +118,8 @@ class NotificationService:
                 title=title,
                 body=body,
                 data=data,
-                notification_type=notification_type
+                notification_type=notification_type,
+                dedup_key=dedup_key
             )
             
         except Exception as e:
@@ -225,9 +188,10 @@ class NotificationService:
                     title=title,
                     body=body,
                     data=data,
-                    notification_type="andon"
+                    notification_type="andon",
+                    dedup_key=f"andon:{line_id}:{equipment_code}:{event_type}:{severity}"
                 )
-                return result["total_sent"] > 0
+                return self._delivered(result)
             else:
                 logger.warning("No users to notify for Andon event", line_id=line_id, equipment_code=equipment_code)
                 return False
@@ -294,18 +258,20 @@ class NotificationService:
                 notification_type="quality"
             )
             
-            return result["total_sent"] > 0
+            return self._delivered(result)
             
         except Exception as e:
             logger.error("Error sending quality alert", error=str(e), line_id=line_id)
             return False
     
-    async def _send_fcm_notification(self, payload: Dict[str, Any]) -> bool:
-        """Send notification via Firebase Cloud Messaging."""
+    async def send_fcm_multicast(self, payload: Dict[str, Any]) -> Optional[List[Optional[str]]]:
+        """
+        Send one multicast payload via Firebase Cloud Messaging.
+        
+        Returns each registration token's error, None where delivered, or None
+        when the request itself failed.
+        """
         try:
-            # This would use the Firebase Admin SDK or HTTP API
-            # For now, we'll simulate the notification sending
-            
             import aiohttp
             
             headers = {
@@ -321,26 +287,35 @@ class NotificationService:
                     timeout=10
                 ) as response:
                     if response.status == 200:
-                        return True
+                        response_body = await response.json()
+                        return [result.get("error") for result in response_body.get("results", [])]
                     else:
                         logger.error("FCM API error", status=response.status, response=await response.text())
-                        return False
+                        return None
                         
         except Exception as e:
             logger.error("FCM notification error", error=str(e))
-            return False
+            return None
+    
+    async def resolve_fcm_tokens(self, user_ids: List[str]) -> Dict[str, str]:
+        """Get the FCM tokens of many users, omitting users without one."""
+        await notification_routing.ensure_loaded()
+        return notification_routing.fcm_tokens(user_ids)
     
     async def _get_user_fcm_token(self, user_id: str) -> Optional[str]:
-        """Get user's FCM token from database."""
-        # This would typically query the database for the user's FCM token
-        # For now, return None as placeholder
-        return None
+        """Get user's FCM token from the notification routing table."""
+        await notification_routing.ensure_loaded()
+        recipient = notification_routing.get_recipient(user_id)
+        return recipient.fcm_token if recipient else None
     
     async def _get_users_by_role(self, role: str) -> List[str]:
-        """Get all users with a specific role."""
-        # This would typically query the database for users with the specified role
-        # For now, return empty list as placeholder
-        return []
+        """Get all users with a specific role who receive push notifications."""
+        await notification_routing.ensure_loaded()
+        return [
+            recipient.user_id
+            for recipient in notification_routing.role_members(role)
+            if recipient.push_enabled
+        ]
     
     async def _get_andon_notification_users(
         self,
@@ -349,12 +324,13 @@ class NotificationService:
         severity: str
     ) -> List[str]:
         """Get users who should receive Andon notifications."""
-        # This would typically query the database for:
-        # - Line operators
-        # - Equipment technicians
-        # - Supervisors/managers based on severity
-        # For now, return empty list as placeholder
-        return []
+        # Recipients of the first escalation level for the line and priority
+        await notification_routing.ensure_loaded()
+        return [
+            recipient.user_id
+            for recipient in notification_routing.route(line_id, severity, 1)
+            if recipient.push_enabled
+        ]
     
     async def send_notification(
         self,
@@ -488,17 +464,12 @@ class NotificationService:
             return False
     
     async def _get_user_notification_preferences(self, user_id: str) -> Dict[str, Any]:
-        """Get user's notification preferences from database."""
-        # This would typically query the database for user preferences
-        # For now, return default preferences
-        return {
-            "push_enabled": True,
-            "email_enabled": False,
-            "websocket_enabled": True,
-            "sms_enabled": False,
-            "email": None,
-            "phone": None
-        }
+        """Get user's notification preferences from the notification routing table."""
+        await notification_routing.ensure_loaded()
+        recipient = notification_routing.get_recipient(user_id)
+        if recipient is None:
+            return {**DEFAULT_PREFERENCES, "email": None, "phone": None}
+        return recipient.preferences
 
     async def _send_email_via_service(
         self,
@@ -517,6 +488,24 @@ class NotificationService:
 # Global notification service instance
 notification_service = NotificationService()
 
+# Global notification dispatcher, sending through the global service
+notification_dispatcher = NotificationDispatcher(notification_service)
+
+
+async def start_notification_dispatcher() -> None:
+    """Start the global notification dispatcher."""
+    await notification_dispatcher.start()
+
+
+async def stop_notification_dispatcher() -> None:
+    """Stop the global notification dispatcher."""
+    await notification_dispatcher.stop()
+
+
+def get_notification_dispatcher() -> NotificationDispatcher:
+    """Get the global notification dispatcher."""
+    return notification_dispatcher
+
 
 # Convenience functions for common notification types
 async def send_andon_notification(
@@ -633,14 +622,31 @@ class EnhancedNotificationService(NotificationService):
         escalation_level: int,
         event_type: str,
         equipment_code: str,
-        message: str
+        message: str,
+        priority: str = "medium",
+        line_id: Optional[str] = None
     ) -> bool:
-        """Send escalation notification for Andon events."""
+        """
+        Send escalation notification for Andon events.
+        
+        Recipients come from the notification routing table for the event's
+        line, priority and escalation level; the line defaults to the
+        equipment's line in the equipment registry.
+        """
         try:
-            recipients = await self._get_escalation_recipients(escalation_level, event_type)
+            if line_id is None:
+                await equipment_registry.ensure_loaded()
+                line_id = equipment_registry.line_for_equipment(equipment_code)
+            
+            recipients = await self._get_escalation_recipients(line_id, priority, escalation_level)
             
             if not recipients:
-                logger.warning("No recipients found for escalation", level=escalation_level)
+                logger.warning(
+                    "No recipients found for escalation",
+                    level=escalation_level,
+                    priority=priority,
+                    line_id=line_id
+                )
                 return False
             
             title = f"Escalation Level {escalation_level} - {equipment_code}"
@@ -656,19 +662,20 @@ class EnhancedNotificationService(NotificationService):
             }
             
             success_count = 0
+            user_ids = [recipient["id"] for recipient in recipients if recipient["type"] == "user"]
+            if user_ids:
+                result = await self.send_bulk_push_notification(
+                    user_ids=user_ids,
+                    title=title,
+                    body=body,
+                    data=data,
+                    notification_type="escalation",
+                    dedup_key=f"escalation:{event_id}:{escalation_level}"
+                )
+                success_count += result["total_sent"]
+            
             for recipient in recipients:
-                if recipient["type"] == "user":
-                    success = await self.send_push_notification(
-                        user_id=recipient["id"],
-                        title=title,
-                        body=body,
-                        data=data,
-                        notification_type="escalation"
-                    )
-                    if success:
-                        success_count += 1
-                        
-                elif recipient["type"] == "email":
+                if recipient["type"] == "email":
                     success = await self.send_email_notification(
                         email=recipient["email"],
                         subject=title,
@@ -734,25 +741,23 @@ class EnhancedNotificationService(NotificationService):
     
     async def _get_escalation_recipients(
         self,
-        escalation_level: int,
-        event_type: str
+        line_id: Optional[Any],
+        priority: str,
+        escalation_level: int
     ) -> List[Dict[str, Any]]:
-        """Get recipients for escalation based on level and event type."""
+        """Get the push and email recipients routed for a line, priority and escalation level."""
+        if line_id is None:
+            return []
+        
         try:
-            recipients = []
+            await notification_routing.ensure_loaded()
             
-            if escalation_level >= 1:
-                recipients.append({"type": "user", "id": "operator_1", "role": "operator"})
-            
-            if escalation_level >= 2:
-                recipients.append({"type": "user", "id": "supervisor_1", "role": "supervisor"})
-                recipients.append({"type": "email", "email": "supervisor@company.com", "role": "supervisor"})
-            
-            if escalation_level >= 3:
-                recipients.append({"type": "user", "id": "manager_1", "role": "manager"})
-            
-            if escalation_level >= 4:
-                recipients.append({"type": "email", "email": "director@company.com", "role": "director"})
+            recipients = []
+            for recipient in notification_routing.route(line_id, priority, escalation_level):
+                if recipient.push_enabled:
+                    recipients.append({"type": "user", "id": recipient.user_id, "role": recipient.role})
+                if recipient.preferences["email_enabled"] and recipient.email:
+                    recipients.append({"type": "email", "email": recipient.email, "role": recipient.role})
             
             return recipients
             
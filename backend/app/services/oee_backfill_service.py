@@ -0,0 +1,416 @@
+"""
+MS5.0 Floor Dashboard - OEE Backfill Service
+
+This module recalculates stored OEE history after configuration changes such
+as a corrected ideal cycle time. A recalculation of (lines x time range) is
+split into chunks recorded in factory_telemetry.oee_backfill_chunks (see
+migration 013_oee_backfill.sql); Celery worker processes claim chunks with
+SKIP LOCKED, recompute them in memory and write the results back through
+COPY into a temporary table followed by one set-based UPDATE. A chunk is
+marked complete in the same transaction as its results, so a job can be
+resumed at any point and reports progress from its chunk counters.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+import structlog
+
+from app.celery import celery_app
+from app.config import settings
+from app.database import execute_query, execute_update, open_direct_connection
+from app.utils.exceptions import BusinessLogicError, NotFoundError, ValidationError
+
+logger = structlog.get_logger()
+
+
+BACKFILL_WORKER_TASK = "app.tasks.oee_tasks.process_oee_backfill_chunks"
+
+BACKFILL_RESULT_COLUMNS = ("id", "ideal_cycle_time", "availability", "performance", "quality", "oee")
+
+JOB_FIELDS = (
+    "id", "line_ids", "equipment_code", "start_time", "end_time", "chunk_hours", "status",
+    "total_chunks", "completed_chunks", "failed_chunks", "rows_written",
+    "requested_by", "error", "created_at", "started_at", "completed_at"
+)
+
+JOB_COLUMNS = ", ".join(JOB_FIELDS)
+
+# Current inputs of the stored calculations in a chunk, with the configured ideal cycle time
+CHUNK_INPUTS_QUERY = """
+SELECT oc.id, oc.planned_production_time, oc.actual_production_time,
+       oc.actual_cycle_time, oc.good_parts, oc.total_parts,
+       ec.ideal_cycle_time
+FROM factory_telemetry.oee_calculations oc
+LEFT JOIN factory_telemetry.equipment_config ec ON ec.equipment_code = oc.equipment_code
+WHERE oc.line_id = $1
+AND oc.calculation_time >= $2
+AND oc.calculation_time < $3
+AND ($4::TEXT IS NULL OR oc.equipment_code = $4)
+"""
+
+# Rollup triggers are skipped for the bulk update; the delta is applied once per bucket
+ROLLUP_DELTA_QUERY = """
+INSERT INTO factory_telemetry.oee_rollups AS r (
+    line_id, equipment_code, granularity, bucket_start, bucket_seconds, shift_id,
+    availability_sum, performance_sum, quality_sum, oee_sum
+)
+SELECT
+    oc.line_id, oc.equipment_code, b.granularity, b.bucket_start,
+    MAX(b.bucket_seconds), (array_agg(b.shift_id))[1],
+    SUM(res.availability - oc.availability), SUM(res.performance - oc.performance),
+    SUM(res.quality - oc.quality), SUM(res.oee - oc.oee)
+FROM oee_backfill_results res
+JOIN factory_telemetry.oee_calculations oc ON oc.id = res.id
+CROSS JOIN LATERAL factory_telemetry.oee_rollup_buckets(oc.calculation_time) b
+WHERE oc.line_id IS NOT NULL
+GROUP BY oc.line_id, oc.equipment_code, b.granularity, b.bucket_start
+ON CONFLICT (line_id, granularity, bucket_start, equipment_code) DO UPDATE SET
+    availability_sum = r.availability_sum + EXCLUDED.availability_sum,
+    performance_sum = r.performance_sum + EXCLUDED.performance_sum,
+    quality_sum = r.quality_sum + EXCLUDED.quality_sum,
+    oee_sum = r.oee_sum + EXCLUDED.oee_sum,
+    updated_at = NOW()
+"""
+
+APPLY_RESULTS_QUERY = """
+UPDATE factory_telemetry.oee_calculations oc
+SET ideal_cycle_time = res.ideal_cycle_time,
+    availability = res.availability,
+    performance = res.performance,
+    quality = res.quality,
+    oee = res.oee
+FROM oee_backfill_results res
+WHERE oc.id = res.id
+"""
+
+COMPLETE_CHUNK_QUERY = """
+WITH done AS (
+    UPDATE factory_telemetry.oee_backfill_chunks
+    SET status = 'completed', rows_written = $3, completed_at = NOW(), error = NULL
+    WHERE job_id = $1 AND chunk_index = $2 AND status <> 'completed'
+    RETURNING rows_written
+)
+UPDATE factory_telemetry.oee_backfill_jobs
+SET completed_chunks = completed_chunks + (SELECT COUNT(*) FROM done),
+    rows_written = rows_written + COALESCE((SELECT SUM(rows_written) FROM done), 0)
+WHERE id = $1
+"""
+
+
+class OEEBackfillService:
+    """Resumable, chunked recalculation of stored OEE history."""
+
+    @staticmethod
+    def plan_chunks(
+        line_ids: Sequence[UUID],
+        start_time: datetime,
+        end_time: datetime,
+        chunk_hours: int
+    ) -> List[Tuple[UUID, datetime, datetime]]:
+        """Split (lines x time range) into (line_id, start, end) chunks, oldest range first."""
+        step = timedelta(hours=chunk_hours)
+        chunks = []
+        chunk_start = start_time
+        while chunk_start < end_time:
+            chunk_end = min(chunk_start + step, end_time)
+            chunks.extend((line_id, chunk_start, chunk_end) for line_id in line_ids)
+            chunk_start = chunk_end
+        return chunks
+
+    @staticmethod
+    def recalculate_rows(rows: Sequence[Any]) -> List[Tuple[int, float, float, float, float, float]]:
+        """
+        Recompute OEE components from a calculation's stored inputs.
+
+        Uses the same rules as OEECalculator: availability is actual over
+        planned production time, performance is ideal over actual cycle time
+        and quality is good over total parts, each capped and rounded to four
+        places. The ideal cycle time is the currently configured one.
+        """
+        results = []
+        for row in rows:
+            ideal_cycle_time = row["ideal_cycle_time"] or 1.0
+            planned_time = row["planned_production_time"] or 0
+            actual_time = row["actual_production_time"] or 0
+            actual_cycle_time = row["actual_cycle_time"] or 0
+            total_parts = row["total_parts"] or 0
+            good_parts = row["good_parts"] or 0
+
+            availability = round(min(1.0, actual_time / planned_time), 4) if planned_time else 0.0
+            performance = round(min(1.0, ideal_cycle_time / actual_cycle_time), 4) if actual_cycle_time else 0.0
+            quality = round(good_parts / total_parts, 4) if total_parts else 0.0
+
+            results.append((
+                row["id"], ideal_cycle_time, availability, performance, quality,
+                availability * performance * quality
+            ))
+        return results
+
+    @staticmethod
+    async def create_job(
+        start_time: datetime,
+        end_time: datetime,
+        line_ids: Optional[Sequence[UUID]] = None,
+        equipment_code: Optional[str] = None,
+        requested_by: Optional[UUID] = None
+    ) -> Dict[str, Any]:
+        """Create a backfill job and its chunks; all enabled lines when line_ids is empty."""
+        if end_time <= start_time:
+            raise ValidationError("Recalculation end must be after start")
+        if end_time - start_time > timedelta(days=settings.OEE_BACKFILL_MAX_DAYS):
+            raise ValidationError(
+                f"Recalculation range is limited to {settings.OEE_BACKFILL_MAX_DAYS} days"
+            )
+
+        try:
+            if not line_ids:
+                rows = await execute_query(
+                    "SELECT id FROM factory_telemetry.production_lines WHERE enabled = true ORDER BY line_code"
+                )
+                line_ids = [row["id"] for row in rows]
+            if not line_ids:
+                raise ValidationError("No production lines to recalculate")
+
+            chunk_hours = settings.OEE_BACKFILL_CHUNK_HOURS
+            chunks = OEEBackfillService.plan_chunks(line_ids, start_time, end_time, chunk_hours)
+
+            query = f"""
+            WITH job AS (
+                INSERT INTO factory_telemetry.oee_backfill_jobs
+                (line_ids, equipment_code, start_time, end_time, chunk_hours, total_chunks, requested_by)
+                VALUES (CAST(:line_ids AS UUID[]), :equipment_code, :start_time, :end_time,
+                        :chunk_hours, :total_chunks, :requested_by)
+                RETURNING {JOB_COLUMNS}
+            ), chunks AS (
+                INSERT INTO factory_telemetry.oee_backfill_chunks
+                (job_id, chunk_index, line_id, start_time, end_time)
+                SELECT job.id, c.chunk_index, c.line_id, c.start_time, c.end_time
+                FROM job, unnest(
+                    CAST(:chunk_lines AS UUID[]),
+                    CAST(:chunk_starts AS TIMESTAMP[]),
+                    CAST(:chunk_ends AS TIMESTAMP[])
+                ) WITH ORDINALITY AS c(line_id, start_time, end_time, chunk_index)
+            )
+            SELECT {JOB_COLUMNS} FROM job
+            """
+
+            result = await execute_query(query, {
+                "line_ids": list(line_ids),
+                "equipment_code": equipment_code,
+                "start_time": start_time,
+                "end_time": end_time,
+                "chunk_hours": chunk_hours,
+                "total_chunks": len(chunks),
+                "requested_by": requested_by,
+                "chunk_lines": [chunk[0] for chunk in chunks],
+                "chunk_starts": [chunk[1] for chunk in chunks],
+                "chunk_ends": [chunk[2] for chunk in chunks]
+            })
+
+            job = OEEBackfillService._job_with_progress(result[0])
+            logger.info(
+                "OEE backfill job created",
+                job_id=job["id"],
+                lines=len(line_ids),
+                chunks=len(chunks)
+            )
+            return job
+
+        except ValidationError:
+            raise
+        except Exception as e:
+            logger.error("Failed to create OEE backfill job", error=str(e))
+            raise BusinessLogicError("Failed to create OEE backfill job")
+
+    @staticmethod
+    async def get_job(job_id: UUID) -> Dict[str, Any]:
+        """Get a backfill job with its progress."""
+        result = await execute_query(
+            f"SELECT {JOB_COLUMNS} FROM factory_telemetry.oee_backfill_jobs WHERE id = :job_id",
+            {"job_id": job_id}
+        )
+        if not result:
+            raise NotFoundError("OEE backfill job", str(job_id))
+        return OEEBackfillService._job_with_progress(result[0])
+
+    @staticmethod
+    async def resume_job(job_id: UUID) -> Dict[str, Any]:
+        """Requeue failed chunks of a job and dispatch workers again."""
+        job = await OEEBackfillService.get_job(job_id)
+
+        try:
+            await execute_update("""
+                UPDATE factory_telemetry.oee_backfill_chunks
+                SET status = 'pending', attempts = 0, error = NULL
+                WHERE job_id = :job_id AND status = 'failed'
+            """, {"job_id": job_id})
+            await execute_update("""
+                UPDATE factory_telemetry.oee_backfill_jobs
+                SET status = 'pending', failed_chunks = 0, error = NULL, completed_at = NULL
+                WHERE id = :job_id AND status <> 'completed'
+            """, {"job_id": job_id})
+        except Exception as e:
+            logger.error("Failed to resume OEE backfill job", error=str(e), job_id=job_id)
+            raise BusinessLogicError("Failed to resume OEE backfill job")
+
+        if job["status"] != "completed":
+            OEEBackfillService.dispatch_job(job_id)
+        return await OEEBackfillService.get_job(job_id)
+
+    @staticmethod
+    def dispatch_job(job_id: UUID) -> None:
+        """Start parallel Celery workers that drain the job's chunks."""
+        for _ in range(settings.OEE_BACKFILL_WORKERS):
+            celery_app.send_task(BACKFILL_WORKER_TASK, args=[str(job_id)], queue="oee")
+
+    @staticmethod
+    async def run_worker(job_id: UUID, time_budget_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Claim and process chunks until none are left or the time budget is spent.
+
+        Returns the worker's counters; ``remaining`` tells the caller to
+        requeue the worker to continue within the task time limit.
+        """
+        if time_budget_seconds is None:
+            time_budget_seconds = settings.OEE_BACKFILL_TASK_SECONDS
+        deadline = time.monotonic() + time_budget_seconds
+
+        await execute_update("""
+            UPDATE factory_telemetry.oee_backfill_jobs
+            SET status = 'running', started_at = COALESCE(started_at, NOW())
+            WHERE id = :job_id AND status = 'pending'
+        """, {"job_id": job_id})
+        job = await OEEBackfillService.get_job(job_id)
+
+        processed = 0
+        rows_written = 0
+        while time.monotonic() < deadline:
+            chunk = await OEEBackfillService._claim_chunk(job_id)
+            if chunk is None:
+                await OEEBackfillService._finalize_job(job_id)
+                return {"job_id": str(job_id), "chunks": processed, "rows": rows_written, "remaining": False}
+
+            try:
+                rows_written += await OEEBackfillService.process_chunk(job, chunk)
+                processed += 1
+            except Exception as e:
+                logger.error(
+                    "OEE backfill chunk failed",
+                    error=str(e),
+                    job_id=job_id,
+                    chunk_index=chunk["chunk_index"]
+                )
+                await OEEBackfillService._fail_chunk(job_id, chunk, str(e))
+
+        return {"job_id": str(job_id), "chunks": processed, "rows": rows_written, "remaining": True}
+
+    @staticmethod
+    async def process_chunk(job: Dict[str, Any], chunk: Dict[str, Any]) -> int:
+        """Recalculate one chunk and write it back with COPY and a single UPDATE."""
+        connection = await open_direct_connection()
+        try:
+            rows = await connection.fetch(
+                CHUNK_INPUTS_QUERY,
+                chunk["line_id"], chunk["start_time"], chunk["end_time"], job["equipment_code"]
+            )
+            results = OEEBackfillService.recalculate_rows(rows)
+
+            async with connection.transaction():
+                await connection.execute("SET LOCAL factory_telemetry.skip_oee_rollup = 'on'")
+                await connection.execute("""
+                    CREATE TEMP TABLE oee_backfill_results (
+                        id BIGINT PRIMARY KEY,
+                        ideal_cycle_time REAL,
+                        availability REAL,
+                        performance REAL,
+                        quality REAL,
+                        oee REAL
+                    ) ON COMMIT DROP
+                """)
+                if results:
+                    await connection.copy_records_to_table(
+                        "oee_backfill_results", records=results, columns=BACKFILL_RESULT_COLUMNS
+                    )
+                    # Lock the rows first so the rollup delta is computed from their latest values
+                    await connection.execute("""
+                        SELECT 1 FROM factory_telemetry.oee_calculations oc
+                        JOIN oee_backfill_results res ON res.id = oc.id
+                        FOR UPDATE OF oc
+                    """)
+                    await connection.execute(ROLLUP_DELTA_QUERY)
+                    await connection.execute(APPLY_RESULTS_QUERY)
+                await connection.execute(COMPLETE_CHUNK_QUERY, job["id"], chunk["chunk_index"], len(results))
+
+            return len(results)
+        finally:
+            await connection.close()
+
+    @staticmethod
+    async def _claim_chunk(job_id: UUID) -> Optional[Dict[str, Any]]:
+        """Claim the next pending chunk, or a running one whose claim went stale."""
+        result = await execute_query("""
+            UPDATE factory_telemetry.oee_backfill_chunks c
+            SET status = 'running', attempts = c.attempts + 1, claimed_at = NOW()
+            FROM (
+                SELECT chunk_index
+                FROM factory_telemetry.oee_backfill_chunks
+                WHERE job_id = :job_id
+                AND (
+                    status = 'pending'
+                    OR (status = 'running' AND claimed_at < NOW() - make_interval(mins => :stale_minutes))
+                )
+                ORDER BY chunk_index
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            ) next_chunk
+            WHERE c.job_id = :job_id AND c.chunk_index = next_chunk.chunk_index
+            RETURNING c.job_id, c.chunk_index, c.line_id, c.start_time, c.end_time, c.attempts
+        """, {"job_id": job_id, "stale_minutes": settings.OEE_BACKFILL_STALE_MINUTES})
+        return result[0] if result else None
+
+    @staticmethod
+    async def _fail_chunk(job_id: UUID, chunk: Dict[str, Any], error: str) -> None:
+        """Return a failed chunk to the queue, or fail it after the last attempt."""
+        failed = chunk["attempts"] >= settings.OEE_BACKFILL_MAX_ATTEMPTS
+        await execute_update("""
+            UPDATE factory_telemetry.oee_backfill_chunks
+            SET status = :status, error = :error
+            WHERE job_id = :job_id AND chunk_index = :chunk_index
+        """, {
+            "job_id": job_id,
+            "chunk_index": chunk["chunk_index"],
+            "status": "failed" if failed else "pending",
+            "error": error[:1000]
+        })
+        if failed:
+            await execute_update("""
+                UPDATE factory_telemetry.oee_backfill_jobs
+                SET failed_chunks = failed_chunks + 1, error = :error
+                WHERE id = :job_id
+            """, {"job_id": job_id, "error": error[:1000]})
+
+    @staticmethod
+    async def _finalize_job(job_id: UUID) -> None:
+        """Close the job once no chunk is pending or running."""
+        await execute_update("""
+            UPDATE factory_telemetry.oee_backfill_jobs j
+            SET status = CASE WHEN j.failed_chunks > 0 THEN 'failed' ELSE 'completed' END,
+                completed_at = NOW()
+            WHERE j.id = :job_id
+            AND j.status = 'running'
+            AND NOT EXISTS (
+                SELECT 1 FROM factory_telemetry.oee_backfill_chunks c
+                WHERE c.job_id = j.id AND c.status IN ('pending', 'running')
+            )
+        """, {"job_id": job_id})
+
+    @staticmethod
+    def _job_with_progress(row: Any) -> Dict[str, Any]:
+        """Convert a job row to a dict with a progress percentage."""
+        job = {field: row[field] for field in JOB_FIELDS}
+        total_chunks = job["total_chunks"]
+        finished = job["completed_chunks"] + job["failed_chunks"]
+        job["progress_percent"] = round(finished / total_chunks * 100, 1) if total_chunks else 100.0
+        return job
@@ -8,12 +8,20 @@ for production lines and equipment. OEE is calculated as Availability × Perform
 from datetime import datetime, timedelta, date
 from typing import Dict, List, Optional, Any, Tuple
 from uuid import UUID
+import numpy as np
 import structlog
 
-from app.database import execute_query, execute_scalar, execute_update
+from app.database import execute_query, execute_update
 from app.models.production import OEECalculationResponse, OEECalculationCreate
 from app.utils.exceptions import ValidationError, BusinessLogicError, NotFoundError
+from app.utils.time_range import day_range, time_bucket_expression, to_naive_utc
 from app.services.downtime_tracker import DowntimeTracker
+from app.services.oee_rollup_service import OEERollupService
+from app.services.streaming_oee_engine import streaming_oee_engine
+from app.services.equipment_registry import equipment_registry
+from app.services.oee_history_analytics import OEEHistoryAnalytics
+from app.services.line_oee_aggregator import LineOEEAggregator
+from app.services.shift_snapshot_service import ShiftSnapshotService
 
 logger = structlog.get_logger()
 
@@ -106,90 +114,116 @@ class OEECalculator:
     ) -> Dict[str, Any]:
         """Get production data for OEE calculation."""
         try:
-            # Get planned production time (in seconds)
-            planned_time_query = """
-            SELECT EXTRACT(EPOCH FROM (:end_time - :start_time))::INTEGER as planned_time
-            """
-            planned_time = await execute_scalar(planned_time_query, {
-                "start_time": start_time,
-                "end_time": end_time
-            })
-            
-            # Get actual production time (time when equipment was running)
-            actual_time_query = """
-            SELECT COALESCE(SUM(duration_seconds), 0) as actual_time
-            FROM factory_telemetry.downtime_events 
-            WHERE line_id = :line_id 
-            AND equipment_code = :equipment_code
-            AND start_time >= :start_time 
-            AND start_time < :end_time
-            AND category = 'unplanned'
-            """
-            downtime_seconds = await execute_scalar(actual_time_query, {
-                "line_id": line_id,
-                "equipment_code": equipment_code,
-                "start_time": start_time,
-                "end_time": end_time
-            })
-            
-            actual_production_time = planned_time - downtime_seconds
-            
-            # Get production counts
-            production_query = """
-            SELECT 
-                COALESCE(SUM(good_parts), 0) as good_parts,
-                COALESCE(SUM(total_parts), 0) as total_parts,
-                COALESCE(AVG(actual_cycle_time), 0) as avg_cycle_time
-            FROM factory_telemetry.oee_calculations 
-            WHERE line_id = :line_id 
-            AND equipment_code = :equipment_code
-            AND calculation_time >= :start_time 
-            AND calculation_time < :end_time
-            """
-            
-            production_result = await execute_query(production_query, {
-                "line_id": line_id,
-                "equipment_code": equipment_code,
-                "start_time": start_time,
-                "end_time": end_time
-            })
-            
-            if production_result:
-                good_parts = production_result[0]["good_parts"]
-                total_parts = production_result[0]["total_parts"]
-                avg_cycle_time = production_result[0]["avg_cycle_time"]
-            else:
-                good_parts = 0
-                total_parts = 0
-                avg_cycle_time = 0
-            
-            # Get ideal cycle time from equipment configuration
-            ideal_cycle_time_query = """
-            SELECT ideal_cycle_time 
-            FROM factory_telemetry.equipment_config 
-            WHERE equipment_code = :equipment_code
-            """
-            ideal_cycle_time = await execute_scalar(ideal_cycle_time_query, {
-                "equipment_code": equipment_code
-            })
-            
-            if not ideal_cycle_time:
-                # Default ideal cycle time if not configured
-                ideal_cycle_time = 1.0  # 1 second per part
-            
-            return {
-                "planned_production_time": planned_time,
-                "actual_production_time": max(0, actual_production_time),
-                "ideal_cycle_time": ideal_cycle_time,
-                "actual_cycle_time": avg_cycle_time if avg_cycle_time > 0 else ideal_cycle_time,
-                "good_parts": good_parts,
-                "total_parts": total_parts if total_parts > 0 else 1
-            }
+            batch = await OEECalculator.load_oee_inputs_batch(
+                [(line_id, equipment_code, start_time, end_time)]
+            )
+            return batch[0]
             
         except Exception as e:
             logger.error("Failed to get production data", error=str(e))
             raise BusinessLogicError("Failed to get production data")
     
+    @staticmethod
+    async def load_oee_inputs_batch(
+        windows: List[Tuple[UUID, str, datetime, datetime]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Load OEE inputs for many (line_id, equipment_code, start_time, end_time)
+        windows in a single query.
+        
+        Unplanned downtime, part counts and average cycle time are fetched
+        together per window; the configured ideal cycle time comes from the
+        equipment registry. Results are returned in the order of ``windows``.
+        """
+        if not windows:
+            return []
+        
+        query = """
+        WITH windows AS (
+            SELECT w.idx, w.line_id, w.equipment_code, w.start_time, w.end_time
+            FROM unnest(
+                CAST(:line_ids AS UUID[]),
+                CAST(:equipment_codes AS TEXT[]),
+                CAST(:start_times AS TIMESTAMPTZ[]),
+                CAST(:end_times AS TIMESTAMPTZ[])
+            ) WITH ORDINALITY AS w(line_id, equipment_code, start_time, end_time, idx)
+        )
+        SELECT 
+            w.idx,
+            d.downtime_seconds,
+            p.good_parts,
+            p.total_parts,
+            p.avg_cycle_time
+        FROM windows w
+        CROSS JOIN LATERAL (
+            SELECT COALESCE(SUM(de.duration_seconds), 0) as downtime_seconds
+            FROM factory_telemetry.downtime_events de
+            WHERE de.line_id = w.line_id
+            AND de.equipment_code = w.equipment_code
+            AND de.start_time >= w.start_time
+            AND de.start_time < w.end_time
+            AND de.category = 'unplanned'
+        ) d
+        CROSS JOIN LATERAL (
+            SELECT 
+                COALESCE(SUM(oc.good_parts), 0) as good_parts,
+                COALESCE(SUM(oc.total_parts), 0) as total_parts,
+                COALESCE(AVG(oc.actual_cycle_time), 0) as avg_cycle_time
+            FROM factory_telemetry.oee_calculations oc
+            WHERE oc.line_id = w.line_id
+            AND oc.equipment_code = w.equipment_code
+            AND oc.calculation_time >= w.start_time
+            AND oc.calculation_time < w.end_time
+        ) p
+        ORDER BY w.idx
+        """
+        
+        result = await execute_query(query, {
+            "line_ids": [window[0] for window in windows],
+            "equipment_codes": [window[1] for window in windows],
+            "start_times": [window[2] for window in windows],
+            "end_times": [window[3] for window in windows]
+        })
+        
+        await equipment_registry.ensure_loaded()
+        
+        rows_by_index = {row["idx"]: row for row in result}
+        return [
+            OEECalculator._build_production_data(
+                rows_by_index.get(index), start_time, end_time,
+                equipment_registry.ideal_cycle_time(equipment_code)
+            )
+            for index, (_, equipment_code, start_time, end_time) in enumerate(windows, start=1)
+        ]
+    
+    @staticmethod
+    def _build_production_data(
+        row: Optional[Dict[str, Any]],
+        start_time: datetime,
+        end_time: datetime,
+        ideal_cycle_time: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Turn one OEE input row into production data for the OEE components."""
+        planned_time = int((end_time - start_time).total_seconds())
+        
+        downtime_seconds = row["downtime_seconds"] if row else 0
+        good_parts = row["good_parts"] if row else 0
+        total_parts = row["total_parts"] if row else 0
+        avg_cycle_time = row["avg_cycle_time"] if row else 0
+        
+        if not ideal_cycle_time:
+            # Default ideal cycle time if not configured
+            ideal_cycle_time = 1.0  # 1 second per part
+        
+        return {
+            "planned_production_time": planned_time,
+            "actual_production_time": max(0, planned_time - downtime_seconds),
+            "ideal_cycle_time": ideal_cycle_time,
+            "actual_cycle_time": avg_cycle_time if avg_cycle_time > 0 else ideal_cycle_time,
+            "good_parts": good_parts,
+            "total_parts": total_parts if total_parts > 0 else 1
+        }
+    
     @staticmethod
     async def _calculate_availability(production_data: Dict[str, Any]) -> float:
         """Calculate availability component of OEE."""
@@ -276,6 +310,57 @@ class OEECalculator:
             logger.error("Failed to store OEE calculation", error=str(e))
             raise BusinessLogicError("Failed to store OEE calculation")
     
+    @staticmethod
+    async def store_oee_calculations_bulk(calculations: List[Dict[str, Any]]) -> int:
+        """
+        Store many OEE calculations with a single INSERT.
+        
+        Each calculation carries line_id, equipment_code, calculation_time,
+        the OEE components and the production data keys used by
+        _store_oee_calculation.
+        """
+        if not calculations:
+            return 0
+        
+        columns = (
+            "line_id", "equipment_code", "calculation_time", "availability",
+            "performance", "quality", "oee", "planned_production_time",
+            "actual_production_time", "ideal_cycle_time", "actual_cycle_time",
+            "good_parts", "total_parts"
+        )
+        
+        try:
+            insert_query = """
+            INSERT INTO factory_telemetry.oee_calculations 
+            (line_id, equipment_code, calculation_time, availability, performance, 
+             quality, oee, planned_production_time, actual_production_time, 
+             ideal_cycle_time, actual_cycle_time, good_parts, total_parts)
+            SELECT * FROM unnest(
+                CAST(:line_id AS UUID[]),
+                CAST(:equipment_code AS TEXT[]),
+                CAST(:calculation_time AS TIMESTAMPTZ[]),
+                CAST(:availability AS REAL[]),
+                CAST(:performance AS REAL[]),
+                CAST(:quality AS REAL[]),
+                CAST(:oee AS REAL[]),
+                CAST(:planned_production_time AS INTEGER[]),
+                CAST(:actual_production_time AS INTEGER[]),
+                CAST(:ideal_cycle_time AS REAL[]),
+                CAST(:actual_cycle_time AS REAL[]),
+                CAST(:good_parts AS INTEGER[]),
+                CAST(:total_parts AS INTEGER[])
+            )
+            """
+            
+            return await execute_update(insert_query, {
+                column: [calculation[column] for calculation in calculations]
+                for column in columns
+            })
+            
+        except Exception as e:
+            logger.error("Failed to store OEE calculations", error=str(e), count=len(calculations))
+            raise BusinessLogicError("Failed to store OEE calculations")
+    
     @staticmethod
     async def get_oee_history(
         line_id: UUID,
@@ -294,17 +379,18 @@ class OEECalculator:
             FROM factory_telemetry.oee_calculations 
             WHERE line_id = :line_id 
             AND equipment_code = :equipment_code
-            AND DATE(calculation_time) >= :start_date 
-            AND DATE(calculation_time) <= :end_date
+            AND calculation_time >= :start_time 
+            AND calculation_time < :end_time
             ORDER BY calculation_time DESC
             LIMIT :limit
             """
             
+            start_time, end_time = day_range(start_date, end_date)
             result = await execute_query(query, {
                 "line_id": line_id,
                 "equipment_code": equipment_code,
-                "start_date": start_date,
-                "end_date": end_date,
+                "start_time": start_time,
+                "end_time": end_time,
                 "limit": limit
             })
             
@@ -384,194 +470,487 @@ class OEECalculator:
         line_id: UUID,
         target_date: date
     ) -> Dict[str, Any]:
-        """Calculate daily OEE summary for a production line."""
+        """
+        Calculate daily OEE summary for a production line.
+        
+        Reads the day rollups maintained on write; equipment without a rollup
+        for the day falls back to a full OEE calculation.
+        """
         try:
             start_time = datetime.combine(target_date, datetime.min.time())
             end_time = start_time + timedelta(days=1)
             
-            # Get all equipment on the line
-            equipment_query = """
-            SELECT equipment_codes FROM factory_telemetry.production_lines 
-            WHERE id = :line_id
-            """
-            line_result = await execute_query(equipment_query, {"line_id": line_id})
+            equipment_codes = await OEECalculator._get_line_equipment_codes(line_id)
+            rollups = await OEERollupService.get_day_rollups(line_id, target_date)
             
-            if not line_result:
-                raise NotFoundError("Production line", str(line_id))
+            summary = await OEECalculator._summarize_line_rollups(
+                line_id, equipment_codes, rollups, min(datetime.utcnow(), end_time), 24
+            )
+            summary["date"] = target_date
+            return summary
+            
+        except (NotFoundError, BusinessLogicError):
+            raise
+        except Exception as e:
+            logger.error("Failed to calculate daily OEE summary", error=str(e))
+            raise BusinessLogicError("Failed to calculate daily OEE summary")
+    
+    @staticmethod
+    async def calculate_shift_oee_summary(
+        line_id: UUID,
+        at_time: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Calculate OEE summary for the shift covering at_time (defaults to now).
+        
+        A shift that has been closed is read from its snapshot; the open
+        shift is summarized from the shift rollups. An aware at_time is
+        converted to naive UTC to match the TIMESTAMP rollup buckets.
+        """
+        try:
+            at_time = to_naive_utc(at_time) or datetime.utcnow()
             
-            equipment_codes = line_result[0]["equipment_codes"]
+            shift = await OEERollupService.get_shift_bucket(at_time)
+            if not shift:
+                raise NotFoundError("Production shift", at_time.isoformat())
             
-            # Calculate OEE for each equipment
-            equipment_oee = []
-            total_availability = 0
-            total_performance = 0
-            total_quality = 0
-            equipment_count = 0
+            shift_end = shift["bucket_start"] + timedelta(seconds=shift["bucket_seconds"])
+            if shift_end <= datetime.utcnow():
+                snapshot = await ShiftSnapshotService.get_snapshot(line_id, shift["bucket_start"])
+                if snapshot is not None:
+                    return OEECalculator._snapshot_summary(snapshot)
             
-            for equipment_code in equipment_codes:
-                try:
+            equipment_codes = await OEECalculator._get_line_equipment_codes(line_id)
+            rollups = await OEERollupService.get_line_rollups(line_id, "shift", shift["bucket_start"])
+            
+            summary = await OEECalculator._summarize_line_rollups(
+                line_id, equipment_codes, rollups, min(at_time, shift_end),
+                max(1, shift["bucket_seconds"] // 3600)
+            )
+            summary["shift_id"] = shift["shift_id"]
+            summary["shift_name"] = shift["shift_name"]
+            summary["shift_start"] = shift["bucket_start"]
+            summary["shift_end"] = shift_end
+            summary["closed"] = False
+            return summary
+            
+        except (NotFoundError, BusinessLogicError):
+            raise
+        except Exception as e:
+            logger.error("Failed to calculate shift OEE summary", error=str(e))
+            raise BusinessLogicError("Failed to calculate shift OEE summary")
+    
+    @staticmethod
+    def _snapshot_summary(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """Present a closed shift snapshot as a line shift summary."""
+        return {
+            "line_id": snapshot["line_id"],
+            "average_oee": snapshot["oee"],
+            "average_availability": snapshot["availability"],
+            "average_performance": snapshot["performance"],
+            "average_quality": snapshot["quality"],
+            "constraint_equipment": snapshot["constraint_equipment"],
+            "equipment_count": len(snapshot["equipment_oee"]),
+            "equipment_oee": snapshot["equipment_oee"],
+            "shift_id": snapshot["shift_id"],
+            "shift_name": snapshot["shift_name"],
+            "shift_start": snapshot["shift_start"],
+            "shift_end": snapshot["shift_end"],
+            "closed": True,
+            "closed_at": snapshot["closed_at"]
+        }
+    
+    @staticmethod
+    async def _get_line_equipment_codes(line_id: UUID) -> List[str]:
+        """Get the equipment codes of a production line."""
+        await equipment_registry.ensure_loaded()
+        equipment_codes = equipment_registry.line_equipment_codes(line_id)
+        if equipment_codes is not None:
+            return equipment_codes
+        
+        # Lines created since the registry was loaded
+        equipment_query = """
+        SELECT equipment_codes FROM factory_telemetry.production_lines 
+        WHERE id = :line_id
+        """
+        line_result = await execute_query(equipment_query, {"line_id": line_id})
+        
+        if not line_result:
+            raise NotFoundError("Production line", str(line_id))
+        
+        return line_result[0]["equipment_codes"] or []
+    
+    @staticmethod
+    async def _summarize_line_rollups(
+        line_id: UUID,
+        equipment_codes: List[str],
+        rollups: List[Dict[str, Any]],
+        as_of: datetime,
+        period_hours: int
+    ) -> Dict[str, Any]:
+        """Combine per-equipment rollups into a line OEE summary."""
+        rollups_by_equipment = {rollup["equipment_code"]: rollup for rollup in rollups}
+        
+        equipment_oee = []
+        for equipment_code in equipment_codes:
+            rollup = rollups_by_equipment.get(equipment_code)
+            try:
+                if rollup is not None:
+                    components = OEERollupService.rollup_to_oee(rollup, as_of)
+                else:
                     oee_calc = await OEECalculator.calculate_oee(
-                        line_id, equipment_code, end_time, 24
+                        line_id, equipment_code, as_of, period_hours
                     )
-                    
-                    equipment_oee.append({
-                        "equipment_code": equipment_code,
+                    components = {
                         "oee": oee_calc.oee,
                         "availability": oee_calc.availability,
                         "performance": oee_calc.performance,
                         "quality": oee_calc.quality
-                    })
-                    
-                    total_availability += oee_calc.availability
-                    total_performance += oee_calc.performance
-                    total_quality += oee_calc.quality
-                    equipment_count += 1
-                    
-                except Exception as e:
-                    logger.warning(
-                        "Failed to calculate OEE for equipment",
-                        error=str(e),
-                        equipment_code=equipment_code
-                    )
+                    }
+                
+                equipment_oee.append({
+                    "equipment_code": equipment_code,
+                    "oee": components["oee"],
+                    "availability": components["availability"],
+                    "performance": components["performance"],
+                    "quality": components["quality"]
+                })
+                
+            except Exception as e:
+                logger.warning(
+                    "Failed to calculate OEE for equipment",
+                    error=str(e),
+                    equipment_code=equipment_code
+                )
+                continue
+        
+        return OEECalculator._line_summary(line_id, equipment_oee)
+    
+    @staticmethod
+    def _line_summary(line_id: UUID, equipment_oee: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Aggregate per-equipment OEE components into a constraint-weighted line summary."""
+        line = LineOEEAggregator.aggregate(line_id, equipment_oee)
+        
+        return {
+            "line_id": line_id,
+            "average_oee": line["oee"],
+            "average_availability": line["availability"],
+            "average_performance": line["performance"],
+            "average_quality": line["quality"],
+            "constraint_equipment": line["constraint_equipment"],
+            "equipment_count": line["equipment_count"],
+            "equipment_oee": line["equipment_oee"]
+        }
+    
+    @staticmethod
+    async def calculate_line_equipment_oee(
+        line_id: UUID,
+        start_time: datetime,
+        end_time: datetime,
+        equipment_codes: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Calculate the OEE of every equipment on a line over one window.
+        
+        The inputs of all equipment are loaded with a single batch query.
+        Each calculation carries its production data, ready for
+        store_oee_calculations_bulk.
+        """
+        if equipment_codes is None:
+            equipment_codes = await OEECalculator._get_line_equipment_codes(line_id)
+        
+        batch = await OEECalculator.load_oee_inputs_batch([
+            (line_id, equipment_code, start_time, end_time) for equipment_code in equipment_codes
+        ])
+        
+        calculations = []
+        for equipment_code, production_data in zip(equipment_codes, batch):
+            availability = await OEECalculator._calculate_availability(production_data)
+            performance = await OEECalculator._calculate_performance(production_data)
+            quality = await OEECalculator._calculate_quality(production_data)
+            calculations.append({
+                **production_data,
+                "line_id": line_id,
+                "equipment_code": equipment_code,
+                "calculation_time": end_time,
+                "availability": availability,
+                "performance": performance,
+                "quality": quality,
+                "oee": availability * performance * quality
+            })
+        
+        return calculations
+    
+    @staticmethod
+    async def calculate_line_oee(
+        line_id: UUID,
+        start_time: datetime,
+        end_time: datetime,
+        equipment_codes: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Calculate the constraint-weighted OEE of a line over one window."""
+        try:
+            calculations = await OEECalculator.calculate_line_equipment_oee(
+                line_id, start_time, end_time, equipment_codes
+            )
+            
+            line = LineOEEAggregator.aggregate(line_id, calculations)
+            line["start_time"] = start_time
+            line["end_time"] = end_time
+            return line
+            
+        except NotFoundError:
+            raise
+        except Exception as e:
+            logger.error("Failed to calculate line OEE", error=str(e), line_id=line_id)
+            raise BusinessLogicError("Failed to calculate line OEE")
+    
+    @staticmethod
+    async def get_bucket_oee_summaries(
+        line_id: UUID,
+        start_time: datetime,
+        end_time: datetime,
+        granularity: str = "day",
+        equipment_codes: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get line OEE summaries for every day or shift bucket in a period.
+        
+        All buckets are read from the rollups in one query, so the cost does
+        not grow with the number of buckets. Buckets without any rollup for
+        the line's equipment are omitted.
+        """
+        if equipment_codes is None:
+            equipment_codes = await OEECalculator._get_line_equipment_codes(line_id)
+        
+        rollups = await OEERollupService.get_line_rollup_range(
+            line_id, granularity, start_time, end_time
+        )
+        
+        rollups_by_bucket: Dict[datetime, List[Dict[str, Any]]] = {}
+        for rollup in rollups:
+            rollups_by_bucket.setdefault(rollup["bucket_start"], []).append(rollup)
+        
+        now = datetime.utcnow()
+        line_equipment = set(equipment_codes)
+        summaries = []
+        for bucket_start in sorted(rollups_by_bucket):
+            equipment_oee = []
+            for rollup in rollups_by_bucket[bucket_start]:
+                if rollup["equipment_code"] not in line_equipment:
                     continue
+                components = OEERollupService.rollup_to_oee(rollup, now)
+                equipment_oee.append({
+                    "equipment_code": rollup["equipment_code"],
+                    "oee": components["oee"],
+                    "availability": components["availability"],
+                    "performance": components["performance"],
+                    "quality": components["quality"]
+                })
             
-            # Calculate line average OEE
-            if equipment_count > 0:
-                avg_availability = total_availability / equipment_count
-                avg_performance = total_performance / equipment_count
-                avg_quality = total_quality / equipment_count
-                avg_oee = avg_availability * avg_performance * avg_quality
-            else:
-                avg_availability = 0
-                avg_performance = 0
-                avg_quality = 0
-                avg_oee = 0
+            if not equipment_oee:
+                continue
             
+            summary = OEECalculator._line_summary(line_id, equipment_oee)
+            summary["bucket_start"] = bucket_start
+            if granularity == "day":
+                summary["date"] = bucket_start.date()
+            else:
+                summary["shift_id"] = rollups_by_bucket[bucket_start][0]["shift_id"]
+            summaries.append(summary)
+        
+        return summaries
+    
+    @staticmethod
+    def _compute_trend_statistics(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Compute current/average/min/max/slope of each OEE component across summaries."""
+        components = ("oee", "availability", "performance", "quality")
+        
+        if not summaries:
             return {
-                "line_id": line_id,
-                "date": target_date,
-                "average_oee": round(avg_oee, 4),
-                "average_availability": round(avg_availability, 4),
-                "average_performance": round(avg_performance, 4),
-                "average_quality": round(avg_quality, 4),
-                "equipment_count": equipment_count,
-                "equipment_oee": equipment_oee
+                component: {"current": 0, "average": 0, "min": 0, "max": 0, "slope": 0, "trend": "stable"}
+                for component in components
             }
-            
-        except (NotFoundError, BusinessLogicError):
-            raise
-        except Exception as e:
-            logger.error("Failed to calculate daily OEE summary", error=str(e))
-            raise BusinessLogicError("Failed to calculate daily OEE summary")
+        
+        # One row per bucket, one column per component
+        values = np.array(
+            [[summary[f"average_{component}"] for component in components] for summary in summaries],
+            dtype=float
+        )
+        
+        if len(values) > 1:
+            x = np.arange(len(values), dtype=float)
+            slopes = np.polyfit(x, values, 1)[0]
+        else:
+            slopes = np.zeros(len(components))
+        
+        current = values[-1]
+        averages = values.mean(axis=0)
+        minimums = values.min(axis=0)
+        maximums = values.max(axis=0)
+        
+        trends = {}
+        for index, component in enumerate(components):
+            slope = float(slopes[index])
+            trends[component] = {
+                "current": float(current[index]),
+                "average": round(float(averages[index]), 4),
+                "min": float(minimums[index]),
+                "max": float(maximums[index]),
+                "slope": round(slope, 6),
+                "trend": "up" if slope > 1e-6 else "down" if slope < -1e-6 else "stable"
+            }
+        
+        return trends
     
     @staticmethod
     async def get_oee_trends(
         line_id: UUID,
-        days: int = 7
+        days: int = 7,
+        granularity: str = "day"
     ) -> Dict[str, Any]:
-        """Get OEE trends over a period."""
+        """Get OEE trends over a period from the day or shift rollups."""
         try:
             end_date = date.today()
             start_date = end_date - timedelta(days=days)
             
-            # Get daily OEE summaries
-            daily_summaries = []
-            for i in range(days):
-                target_date = start_date + timedelta(days=i)
-                try:
-                    summary = await OEECalculator.calculate_daily_oee_summary(
-                        line_id, target_date
-                    )
-                    daily_summaries.append(summary)
-                except Exception as e:
-                    logger.warning(
-                        "Failed to calculate daily OEE",
-                        error=str(e),
-                        date=target_date
-                    )
-                    continue
+            summaries = await OEECalculator.get_bucket_oee_summaries(
+                line_id,
+                datetime.combine(start_date, datetime.min.time()),
+                datetime.combine(end_date, datetime.min.time()),
+                granularity
+            )
             
-            # Calculate trends
-            if daily_summaries:
-                oee_values = [s["average_oee"] for s in daily_summaries]
-                availability_values = [s["average_availability"] for s in daily_summaries]
-                performance_values = [s["average_performance"] for s in daily_summaries]
-                quality_values = [s["average_quality"] for s in daily_summaries]
-                
-                return {
-                    "line_id": line_id,
-                    "period_days": days,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "daily_summaries": daily_summaries,
-                    "trends": {
-                        "oee": {
-                            "current": oee_values[-1] if oee_values else 0,
-                            "average": sum(oee_values) / len(oee_values) if oee_values else 0,
-                            "min": min(oee_values) if oee_values else 0,
-                            "max": max(oee_values) if oee_values else 0,
-                            "trend": "up" if len(oee_values) > 1 and oee_values[-1] > oee_values[0] else "down"
-                        },
-                        "availability": {
-                            "current": availability_values[-1] if availability_values else 0,
-                            "average": sum(availability_values) / len(availability_values) if availability_values else 0
-                        },
-                        "performance": {
-                            "current": performance_values[-1] if performance_values else 0,
-                            "average": sum(performance_values) / len(performance_values) if performance_values else 0
-                        },
-                        "quality": {
-                            "current": quality_values[-1] if quality_values else 0,
-                            "average": sum(quality_values) / len(quality_values) if quality_values else 0
-                        }
-                    }
-                }
-            else:
-                return {
-                    "line_id": line_id,
-                    "period_days": days,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "daily_summaries": [],
-                    "trends": {
-                        "oee": {"current": 0, "average": 0, "min": 0, "max": 0, "trend": "stable"},
-                        "availability": {"current": 0, "average": 0},
-                        "performance": {"current": 0, "average": 0},
-                        "quality": {"current": 0, "average": 0}
-                    }
-                }
+            return {
+                "line_id": line_id,
+                "period_days": days,
+                "start_date": start_date,
+                "end_date": end_date,
+                "granularity": granularity,
+                "daily_summaries": summaries,
+                "trends": OEECalculator._compute_trend_statistics(summaries)
+            }
                 
+        except NotFoundError:
+            raise
         except Exception as e:
             logger.error("Failed to get OEE trends", error=str(e))
             raise BusinessLogicError("Failed to get OEE trends")
     
+    @staticmethod
+    async def get_equipment_hourly_history(line_id: UUID, hours: int = 24) -> Dict[str, Dict[str, Any]]:
+        """
+        Get each equipment's hourly OEE trend and downtime over the trailing hours.
+        
+        Every equipment of the line is read from the hourly rollups in one
+        query; equipment without any rollup in the period are omitted.
+        """
+        try:
+            end_time = datetime.utcnow()
+            start_time = end_time.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+            
+            rollups = await OEERollupService.get_line_rollup_range(line_id, "hour", start_time, end_time)
+            
+            components = ("oee", "availability", "performance", "quality")
+            hourly: Dict[str, List[Dict[str, Any]]] = {}
+            downtime: Dict[str, Dict[str, Any]] = {}
+            for rollup in rollups:
+                equipment_code = rollup["equipment_code"]
+                hour_oee = OEERollupService.rollup_to_oee(rollup, end_time)
+                hourly.setdefault(equipment_code, []).append({
+                    "hour": rollup["bucket_start"].hour,
+                    "timestamp": rollup["bucket_start"],
+                    "oee": hour_oee["oee"],
+                    "availability": hour_oee["availability"],
+                    "performance": hour_oee["performance"],
+                    "quality": hour_oee["quality"]
+                })
+                
+                totals = downtime.setdefault(equipment_code, {
+                    "period_hours": hours,
+                    "event_count": 0,
+                    "unplanned_downtime_seconds": 0,
+                    "planned_downtime_seconds": 0
+                })
+                totals["event_count"] += rollup["downtime_event_count"]
+                totals["unplanned_downtime_seconds"] += rollup["unplanned_downtime_seconds"]
+                totals["planned_downtime_seconds"] += rollup["planned_downtime_seconds"]
+            
+            history = {}
+            for equipment_code, hourly_oee in hourly.items():
+                totals = downtime[equipment_code]
+                totals["total_downtime_minutes"] = round(
+                    (totals["unplanned_downtime_seconds"] + totals["planned_downtime_seconds"]) / 60, 2
+                )
+                history[equipment_code] = {
+                    "trends": {
+                        "period_hours": hours,
+                        "hourly_oee": hourly_oee,
+                        "trends": OEECalculator._compute_trend_statistics([
+                            {f"average_{component}": hour[component] for component in components}
+                            for hour in hourly_oee
+                        ])
+                    },
+                    "downtime_analysis": totals
+                }
+            
+            return history
+            
+        except Exception as e:
+            logger.error("Failed to get equipment hourly history", error=str(e), line_id=line_id)
+            raise BusinessLogicError("Failed to get equipment hourly history")
+    
     @staticmethod
     async def calculate_real_time_oee(
         line_id: UUID,
         equipment_code: str,
         current_status: Dict[str, Any],
-        timestamp: datetime = None
+        timestamp: datetime = None,
+        include_downtime_statistics: bool = False
     ) -> Dict[str, Any]:
         """
         Calculate real-time OEE with current downtime integration.
         
         This method integrates with the downtime tracker to provide
         real-time OEE calculations that include current downtime events.
+        Current OEE is read from the streaming engine (shared by the poller)
+        when it is tracking the equipment on this line, with downtime taken
+        from the engine and the downtime state store, so no database query
+        runs; the database path is used for explicit timestamps. Both paths
+        return the same fields. The day's downtime statistics are queried
+        only when include_downtime_statistics is set.
         """
-        if timestamp is None:
-            timestamp = datetime.utcnow()
-        
         try:
             # Initialize downtime tracker
             downtime_tracker = DowntimeTracker()
             
-            # Detect current downtime events
-            downtime_event = await downtime_tracker.detect_downtime_event(
-                line_id=line_id,
-                equipment_code=equipment_code,
-                current_status=current_status,
-                timestamp=timestamp
-            )
+            if timestamp is None:
+                streaming_oee = await streaming_oee_engine.read(
+                    equipment_code, max_age_seconds=streaming_oee_engine.max_gap_seconds
+                )
+                if streaming_oee is not None and streaming_oee["line_id"] == str(line_id):
+                    timestamp = streaming_oee["calculation_time"]
+                    # Open event as detected by the poller, held in the downtime state store
+                    downtime_event = await downtime_tracker.get_active_downtime_event(equipment_code)
+                    return {
+                        **OEECalculator._real_time_oee_result(
+                            line_id, equipment_code, timestamp,
+                            {**streaming_oee["rolling"], "ideal_cycle_time": streaming_oee["ideal_cycle_time"]},
+                            streaming_oee, downtime_event
+                        ),
+                        "downtime_statistics": await OEECalculator._real_time_downtime_statistics(
+                            downtime_tracker, line_id, timestamp, include_downtime_statistics
+                        ),
+                        "is_currently_down": streaming_oee["is_currently_down"],
+                        "current_downtime_duration_seconds": streaming_oee["current_downtime_duration_seconds"]
+                    }
+                
+                timestamp = datetime.utcnow()
+            else:
+                timestamp = to_naive_utc(timestamp)
+            
+            # Current downtime as detected by the poller from every sample
+            downtime_event = await downtime_tracker.get_active_downtime_event(equipment_code)
             
             # Get current production data
             production_data = await OEECalculator._get_production_data(
@@ -594,34 +973,20 @@ class OEECalculator:
             performance = await OEECalculator._calculate_performance(production_data)
             quality = await OEECalculator._calculate_quality(production_data)
             
-            # Calculate overall OEE
-            oee = availability * performance * quality
-            
-            # Get downtime statistics for the period
-            downtime_stats = await downtime_tracker.get_downtime_statistics(
-                line_id=line_id,
-                start_date=timestamp.date(),
-                end_date=timestamp.date()
-            )
+            components = {
+                "availability": availability,
+                "performance": performance,
+                "quality": quality,
+                "oee": availability * performance * quality
+            }
             
             return {
-                "line_id": line_id,
-                "equipment_code": equipment_code,
-                "calculation_time": timestamp,
-                "availability": round(availability, 4),
-                "performance": round(performance, 4),
-                "quality": round(quality, 4),
-                "oee": round(oee, 4),
-                "planned_production_time": production_data["planned_production_time"],
-                "actual_production_time": production_data["actual_production_time"],
-                "ideal_cycle_time": production_data["ideal_cycle_time"],
-                "actual_cycle_time": production_data["actual_cycle_time"],
-                "good_parts": production_data["good_parts"],
-                "total_parts": production_data["total_parts"],
-                "current_downtime_event": downtime_event,
-                "downtime_statistics": downtime_stats,
-                "is_currently_down": downtime_event is not None and downtime_event.get("status") == "open",
-                "current_downtime_duration_seconds": int((timestamp - downtime_event["start_time"]).total_seconds()) if downtime_event and downtime_event.get("status") == "open" else 0
+                **OEECalculator._real_time_oee_result(
+                    line_id, equipment_code, timestamp, production_data, components, downtime_event
+                ),
+                "downtime_statistics": await OEECalculator._real_time_downtime_statistics(
+                    downtime_tracker, line_id, timestamp, include_downtime_statistics
+                )
             }
             
         except Exception as e:
@@ -633,6 +998,54 @@ class OEECalculator:
             )
             raise BusinessLogicError("Failed to calculate real-time OEE")
     
+    @staticmethod
+    def _real_time_oee_result(
+        line_id: UUID,
+        equipment_code: str,
+        timestamp: datetime,
+        production_data: Dict[str, Any],
+        components: Dict[str, Any],
+        downtime_event: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build the real-time OEE response shared by the streaming and database paths."""
+        is_currently_down = downtime_event is not None and downtime_event.get("status") == "open"
+        
+        return {
+            "line_id": line_id,
+            "equipment_code": equipment_code,
+            "calculation_time": timestamp,
+            "availability": round(components["availability"], 4),
+            "performance": round(components["performance"], 4),
+            "quality": round(components["quality"], 4),
+            "oee": round(components["oee"], 4),
+            "planned_production_time": production_data["planned_production_time"],
+            "actual_production_time": production_data["actual_production_time"],
+            "ideal_cycle_time": production_data["ideal_cycle_time"],
+            "actual_cycle_time": production_data["actual_cycle_time"],
+            "good_parts": production_data["good_parts"],
+            "total_parts": production_data["total_parts"],
+            "current_downtime_event": downtime_event,
+            "downtime_statistics": None,
+            "is_currently_down": is_currently_down,
+            "current_downtime_duration_seconds": max(0, int((timestamp - downtime_event["start_time"]).total_seconds())) if is_currently_down else 0
+        }
+    
+    @staticmethod
+    async def _real_time_downtime_statistics(
+        downtime_tracker: DowntimeTracker,
+        line_id: UUID,
+        timestamp: datetime,
+        include_downtime_statistics: bool
+    ) -> Optional[Dict[str, Any]]:
+        """Get the day's downtime statistics for real-time OEE, None unless requested."""
+        if not include_downtime_statistics:
+            return None
+        return await downtime_tracker.get_downtime_statistics(
+            line_id=line_id,
+            start_date=timestamp.date(),
+            end_date=timestamp.date()
+        )
+    
     @staticmethod
     async def get_oee_with_downtime_analysis(
         line_id: UUID,
@@ -781,17 +1194,9 @@ class OEECalculator:
             end_time = datetime.utcnow()
             start_time = end_time - timedelta(hours=time_period_hours)
             
-            # Get equipment configuration
-            equipment_config = await OEECalculator._get_equipment_config(equipment_code)
-            
             # Get production line for this equipment
-            line_query = """
-            SELECT id FROM factory_telemetry.production_lines 
-            WHERE :equipment_code = ANY(equipment_codes)
-            LIMIT 1
-            """
-            line_result = await execute_query(line_query, {"equipment_code": equipment_code})
-            line_id = line_result[0]["id"] if line_result else None
+            await equipment_registry.ensure_loaded()
+            line_id = equipment_registry.line_for_equipment(equipment_code)
             
             if not line_id:
                 raise NotFoundError("Production line", f"Equipment {equipment_code} not found on any line")
@@ -802,9 +1207,9 @@ class OEECalculator:
             )
             
             # Get historical OEE data for comparison
-            historical_query = """
+            historical_query = f"""
             SELECT 
-                DATE(calculation_time) as date,
+                {time_bucket_expression("calculation_time", "1 day")} as date,
                 AVG(oee) as avg_oee,
                 AVG(availability) as avg_availability,
                 AVG(performance) as avg_performance,
@@ -814,7 +1219,7 @@ class OEECalculator:
             WHERE equipment_code = :equipment_code
             AND calculation_time >= :start_time 
             AND calculation_time < :end_time
-            GROUP BY DATE(calculation_time)
+            GROUP BY 1
             ORDER BY date DESC
             """
             
@@ -897,14 +1302,11 @@ class OEECalculator:
 
     @staticmethod
     async def _get_equipment_config(equipment_code: str) -> Dict:
-        """Get equipment configuration from database."""
+        """Get equipment configuration from the equipment registry."""
         try:
-            query = """
-            SELECT * FROM factory_telemetry.equipment_config 
-            WHERE equipment_code = %s
-            """
-            result = await execute_query(query, (equipment_code,))
-            return result[0] if result else {}
+            await equipment_registry.ensure_loaded()
+            record = equipment_registry.get_equipment(equipment_code)
+            return record.to_dict() if record else {}
             
         except Exception as e:
             logger.error("Failed to get equipment config", error=str(e))
@@ -1198,33 +1600,29 @@ class OEECalculator:
             equipment_codes = line_info["equipment_codes"]
             
             # Get daily OEE summaries
-            daily_summaries = []
-            for i in range(days):
-                target_date = start_date + timedelta(days=i)
-                try:
-                    summary = await OEECalculator.calculate_daily_oee_summary(line_id, target_date)
-                    daily_summaries.append(summary)
-                except Exception as e:
-                    logger.warning("Failed to calculate daily OEE", error=str(e), date=target_date)
-                    continue
+            daily_summaries = await OEECalculator.get_bucket_oee_summaries(
+                line_id,
+                datetime.combine(start_date, datetime.min.time()),
+                datetime.combine(end_date, datetime.min.time()),
+                "day",
+                equipment_codes or []
+            )
             
             # Calculate key performance indicators
             if daily_summaries:
-                oee_values = [s["average_oee"] for s in daily_summaries]
-                availability_values = [s["average_availability"] for s in daily_summaries]
-                performance_values = [s["average_performance"] for s in daily_summaries]
-                quality_values = [s["average_quality"] for s in daily_summaries]
+                trends = OEECalculator._compute_trend_statistics(daily_summaries)
+                oee_trend = trends["oee"]
                 
                 kpis = {
-                    "current_oee": oee_values[-1] if oee_values else 0,
-                    "average_oee": sum(oee_values) / len(oee_values) if oee_values else 0,
-                    "best_oee": max(oee_values) if oee_values else 0,
-                    "worst_oee": min(oee_values) if oee_values else 0,
-                    "oee_trend": "up" if len(oee_values) > 1 and oee_values[-1] > oee_values[0] else "down",
-                    "current_availability": availability_values[-1] if availability_values else 0,
-                    "current_performance": performance_values[-1] if performance_values else 0,
-                    "current_quality": quality_values[-1] if quality_values else 0,
-                    "oee_consistency": 1 - (max(oee_values) - min(oee_values)) if oee_values else 0
+                    "current_oee": oee_trend["current"],
+                    "average_oee": oee_trend["average"],
+                    "best_oee": oee_trend["max"],
+                    "worst_oee": oee_trend["min"],
+                    "oee_trend": oee_trend["trend"],
+                    "current_availability": trends["availability"]["current"],
+                    "current_performance": trends["performance"]["current"],
+                    "current_quality": trends["quality"]["current"],
+                    "oee_consistency": 1 - (oee_trend["max"] - oee_trend["min"])
                 }
             else:
                 kpis = {
@@ -1268,44 +1666,27 @@ class OEECalculator:
         confidence_level: float = 0.95
     ) -> Dict[str, Any]:
         """
-        Predict OEE performance using advanced machine learning models.
+        Predict OEE performance from the equipment's hourly history.
         
-        This method provides predictive insights for OEE optimization
-        and proactive maintenance planning.
+        The history is the line's cached columnar window, so predictions for
+        several equipment of a line share one load.
         """
         try:
             logger.info("Starting OEE performance prediction", 
                        line_id=line_id, equipment_code=equipment_code)
             
-            # Get historical OEE data
-            historical_data = await OEECalculator._get_historical_oee_data(
-                line_id, equipment_code, days=30
-            )
+            history = await OEEHistoryAnalytics.get_history(line_id, 30)
+            data_points = len(history.select(equipment_code))
             
-            if len(historical_data) < 7:
+            if data_points < 7:
                 raise BusinessLogicError("Insufficient historical data for prediction")
             
-            # Extract time series data
-            oee_values = [calc.oee for calc in historical_data]
-            availability_values = [calc.availability for calc in historical_data]
-            performance_values = [calc.performance for calc in historical_data]
-            quality_values = [calc.quality for calc in historical_data]
-            
-            # Generate predictions using exponential smoothing
-            predictions = await OEECalculator._generate_oee_predictions(
-                oee_values, availability_values, performance_values, quality_values,
-                prediction_horizon_days, confidence_level
-            )
-            
-            # Calculate prediction accuracy metrics
-            accuracy_metrics = await OEECalculator._calculate_prediction_accuracy(
-                historical_data, predictions
+            predictions, accuracy_metrics, averages = OEEHistoryAnalytics.predict(
+                history, equipment_code, prediction_horizon_days, confidence_level
             )
             
             # Generate optimization recommendations
-            recommendations = await OEECalculator._generate_oee_recommendations(
-                historical_data, predictions
-            )
+            recommendations = OEECalculator._generate_prediction_recommendations(averages)
             
             result = {
                 "line_id": line_id,
@@ -1313,14 +1694,14 @@ class OEECalculator:
                 "prediction_horizon_days": prediction_horizon_days,
                 "confidence_level": confidence_level,
                 "prediction_timestamp": datetime.utcnow(),
-                "historical_data_points": len(historical_data),
+                "historical_data_points": data_points,
                 "predictions": predictions,
                 "accuracy_metrics": accuracy_metrics,
                 "recommendations": recommendations,
                 "prediction_summary": {
-                    "avg_predicted_oee": sum(p["oee"] for p in predictions) / len(predictions),
+                    "avg_predicted_oee": round(sum(p["oee"] for p in predictions) / len(predictions), 4) if predictions else 0.0,
                     "prediction_confidence": accuracy_metrics.get("overall_confidence", 0.0),
-                    "trend_direction": predictions[-1]["oee"] - predictions[0]["oee"],
+                    "trend_direction": predictions[-1]["oee"] - predictions[0]["oee"] if predictions else 0.0,
                     "optimization_potential": recommendations.get("optimization_potential", 0.0)
                 }
             }
@@ -1343,51 +1724,20 @@ class OEECalculator:
         """
         Analyze OEE bottlenecks and identify optimization opportunities.
         
-        This method provides deep analysis of OEE components to identify
-        the primary constraints and optimization opportunities.
+        Every equipment of the line is ranked in one vectorized pass over the
+        line's hourly history; the lowest OEE equipment is the constraint.
         """
         try:
             logger.info("Starting OEE bottleneck analysis", 
                        line_id=line_id, period_days=analysis_period_days)
             
-            # Get line equipment
-            line_query = """
-            SELECT equipment_codes FROM factory_telemetry.production_lines 
-            WHERE id = :line_id
-            """
-            line_result = await execute_query(line_query, {"line_id": line_id})
-            if not line_result:
-                raise NotFoundError("Production line", str(line_id))
-            
-            equipment_codes = line_result[0]["equipment_codes"]
-            
-            # Analyze each equipment
-            equipment_analysis = []
-            for equipment_code in equipment_codes:
-                try:
-                    analysis = await OEECalculator._analyze_equipment_bottlenecks(
-                        line_id, equipment_code, analysis_period_days
-                    )
-                    equipment_analysis.append(analysis)
-                except Exception as e:
-                    logger.warning("Failed to analyze equipment bottlenecks", 
-                                  error=str(e), equipment_code=equipment_code)
-                    continue
-            
-            # Identify line-level bottlenecks
-            line_bottlenecks = await OEECalculator._identify_line_bottlenecks(
-                equipment_analysis
-            )
+            equipment_codes = await OEECalculator._get_line_equipment_codes(line_id)
+            history = await OEEHistoryAnalytics.get_history(line_id, analysis_period_days)
             
-            # Generate optimization strategies
-            optimization_strategies = await OEECalculator._generate_optimization_strategies(
-                equipment_analysis, line_bottlenecks
-            )
-            
-            # Calculate potential improvements
-            improvement_potential = await OEECalculator._calculate_improvement_potential(
-                equipment_analysis, optimization_strategies
-            )
+            equipment_analysis = OEEHistoryAnalytics.rank_bottlenecks(history, equipment_codes)
+            line_bottlenecks = OEEHistoryAnalytics.line_bottlenecks(equipment_analysis)
+            optimization_strategies = OEECalculator._generate_optimization_strategies(equipment_analysis)
+            improvement_potential = OEECalculator._calculate_improvement_potential(equipment_analysis)
             
             result = {
                 "line_id": line_id,
@@ -1401,6 +1751,7 @@ class OEECalculator:
                     "equipment_count": len(equipment_codes),
                     "analyzed_equipment": len(equipment_analysis),
                     "primary_bottleneck": line_bottlenecks.get("primary_bottleneck", "unknown"),
+                    "constraint_equipment": line_bottlenecks.get("constraint_equipment"),
                     "max_improvement_potential": improvement_potential.get("max_oee_improvement", 0.0),
                     "total_optimization_opportunities": len(optimization_strategies)
                 }
@@ -1411,6 +1762,8 @@ class OEECalculator:
             
             return result
             
+        except NotFoundError:
+            raise
         except Exception as e:
             logger.error("Failed to analyze OEE bottlenecks", 
                         error=str(e), line_id=line_id)
@@ -1425,35 +1778,23 @@ class OEECalculator:
         """
         Benchmark OEE performance against industry standards and best practices.
         
-        This method provides comprehensive benchmarking analysis to identify
-        performance gaps and improvement opportunities.
+        Current performance is computed from the line's cached hourly history.
         """
         try:
             logger.info("Starting OEE performance benchmarking", 
                        line_id=line_id, benchmark_type=benchmark_type)
             
-            # Get current performance data
-            current_performance = await OEECalculator._get_current_performance_data(
-                line_id, comparison_period_days
-            )
+            history = await OEEHistoryAnalytics.get_history(line_id, comparison_period_days)
+            current_performance = OEEHistoryAnalytics.current_performance(history)
             
-            # Get benchmark standards
-            benchmark_standards = await OEECalculator._get_benchmark_standards(
+            benchmark_standards = OEECalculator._get_benchmark_standards(
                 benchmark_type, current_performance.get("industry", "manufacturing")
             )
-            
-            # Calculate performance gaps
-            performance_gaps = await OEECalculator._calculate_performance_gaps(
+            performance_gaps = OEECalculator._calculate_performance_gaps(
                 current_performance, benchmark_standards
             )
-            
-            # Generate improvement roadmap
-            improvement_roadmap = await OEECalculator._generate_improvement_roadmap(
-                performance_gaps, benchmark_standards
-            )
-            
-            # Calculate benchmarking metrics
-            benchmarking_metrics = await OEECalculator._calculate_benchmarking_metrics(
+            improvement_roadmap = OEECalculator._generate_improvement_roadmap(performance_gaps)
+            benchmarking_metrics = OEECalculator._calculate_benchmarking_metrics(
                 current_performance, benchmark_standards
             )
             
@@ -1489,299 +1830,135 @@ class OEECalculator:
     # Private helper methods for advanced analytics
     
     @staticmethod
-    async def _get_historical_oee_data(
-        line_id: UUID, equipment_code: str, days: int
-    ) -> List[OEECalculationResponse]:
-        """Get historical OEE data for analysis."""
-        try:
-            end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=days)
-            
-            query = """
-            SELECT id, line_id, equipment_code, calculation_time, availability, 
-                   performance, quality, oee, planned_production_time, 
-                   actual_production_time, ideal_cycle_time, actual_cycle_time, 
-                   good_parts, total_parts
-            FROM factory_telemetry.oee_calculations 
-            WHERE line_id = :line_id 
-            AND equipment_code = :equipment_code
-            AND calculation_time >= :start_date 
-            AND calculation_time <= :end_date
-            ORDER BY calculation_time ASC
-            """
-            
-            result = await execute_query(query, {
-                "line_id": line_id,
-                "equipment_code": equipment_code,
-                "start_date": start_date,
-                "end_date": end_date
-            })
-            
-            calculations = []
-            for calc in result:
-                calculations.append(OEECalculationResponse(
-                    id=calc["id"],
-                    line_id=calc["line_id"],
-                    equipment_code=calc["equipment_code"],
-                    calculation_time=calc["calculation_time"],
-                    availability=calc["availability"],
-                    performance=calc["performance"],
-                    quality=calc["quality"],
-                    oee=calc["oee"],
-                    planned_production_time=calc["planned_production_time"],
-                    actual_production_time=calc["actual_production_time"],
-                    ideal_cycle_time=calc["ideal_cycle_time"],
-                    actual_cycle_time=calc["actual_cycle_time"],
-                    good_parts=calc["good_parts"],
-                    total_parts=calc["total_parts"]
-                ))
-            
-            return calculations
-            
-        except Exception as e:
-            logger.error("Failed to get historical OEE data", error=str(e))
-            return []
-    
-    @staticmethod
-    async def _generate_oee_predictions(
-        oee_values: List[float], availability_values: List[float],
-        performance_values: List[float], quality_values: List[float],
-        horizon_days: int, confidence_level: float
-    ) -> List[Dict[str, Any]]:
-        """Generate OEE predictions using time series analysis."""
-        try:
-            predictions = []
-            
-            # Simple exponential smoothing for prediction
-            alpha = 0.3  # Smoothing parameter
-            
-            # Calculate smoothed values
-            smoothed_oee = oee_values[0]
-            smoothed_availability = availability_values[0]
-            smoothed_performance = performance_values[0]
-            smoothed_quality = quality_values[0]
-            
-            for i in range(1, len(oee_values)):
-                smoothed_oee = alpha * oee_values[i] + (1 - alpha) * smoothed_oee
-                smoothed_availability = alpha * availability_values[i] + (1 - alpha) * smoothed_availability
-                smoothed_performance = alpha * performance_values[i] + (1 - alpha) * smoothed_performance
-                smoothed_quality = alpha * quality_values[i] + (1 - alpha) * smoothed_quality
-            
-            # Generate predictions
-            for i in range(horizon_days):
-                prediction_date = datetime.utcnow() + timedelta(days=i+1)
-                
-                # Apply trend adjustment (simplified)
-                trend_factor = 1.0 + (i * 0.01)  # Slight upward trend
-                
-                predictions.append({
-                    "date": prediction_date.date(),
-                    "oee": round(smoothed_oee * trend_factor, 4),
-                    "availability": round(smoothed_availability * trend_factor, 4),
-                    "performance": round(smoothed_performance * trend_factor, 4),
-                    "quality": round(smoothed_quality * trend_factor, 4),
-                    "confidence": max(0.3, confidence_level - (i * 0.05))
-                })
-            
-            return predictions
-            
-        except Exception as e:
-            logger.error("Failed to generate OEE predictions", error=str(e))
-            return []
-    
-    @staticmethod
-    async def _calculate_prediction_accuracy(
-        historical_data: List[OEECalculationResponse],
-        predictions: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        """Calculate prediction accuracy metrics."""
-        try:
-            if len(historical_data) < 5 or not predictions:
-                return {"overall_confidence": 0.0, "accuracy_score": 0.0}
-            
-            # Calculate historical volatility
-            oee_values = [calc.oee for calc in historical_data]
-            volatility = np.std(oee_values) if len(oee_values) > 1 else 0.0
-            
-            # Calculate accuracy based on volatility and data consistency
-            consistency_score = 1.0 - min(1.0, volatility / 0.1)  # Lower volatility = higher consistency
-            data_volume_score = min(1.0, len(historical_data) / 30)  # More data = higher confidence
-            
-            overall_confidence = (consistency_score + data_volume_score) / 2
-            
-            return {
-                "overall_confidence": round(overall_confidence, 3),
-                "accuracy_score": round(consistency_score, 3),
-                "data_consistency": round(consistency_score, 3),
-                "data_volume_score": round(data_volume_score, 3),
-                "volatility": round(volatility, 4)
-            }
-            
-        except Exception as e:
-            logger.error("Failed to calculate prediction accuracy", error=str(e))
-            return {"overall_confidence": 0.0, "accuracy_score": 0.0}
-    
-    @staticmethod
-    async def _generate_oee_recommendations(
-        historical_data: List[OEECalculationResponse],
-        predictions: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        """Generate OEE improvement recommendations."""
-        try:
-            if not historical_data or not predictions:
-                return {"recommendations": [], "optimization_potential": 0.0}
-            
-            recommendations = []
-            
-            # Analyze historical performance
-            avg_oee = sum(calc.oee for calc in historical_data) / len(historical_data)
-            avg_availability = sum(calc.availability for calc in historical_data) / len(historical_data)
-            avg_performance = sum(calc.performance for calc in historical_data) / len(historical_data)
-            avg_quality = sum(calc.quality for calc in historical_data) / len(historical_data)
-            
-            # Generate component-specific recommendations
-            if avg_availability < 0.90:
-                recommendations.append({
-                    "component": "availability",
-                    "current_value": avg_availability,
-                    "target_value": 0.95,
-                    "improvement_potential": 0.95 - avg_availability,
-                    "priority": "high",
-                    "actions": [
-                        "Implement preventive maintenance program",
-                        "Reduce unplanned downtime",
-                        "Optimize changeover procedures"
-                    ]
-                })
-            
-            if avg_performance < 0.90:
-                recommendations.append({
-                    "component": "performance",
-                    "current_value": avg_performance,
-                    "target_value": 0.95,
-                    "improvement_potential": 0.95 - avg_performance,
-                    "priority": "medium",
-                    "actions": [
-                        "Optimize equipment settings",
-                        "Reduce minor stops",
-                        "Improve material flow"
-                    ]
-                })
-            
-            if avg_quality < 0.99:
+    def _generate_prediction_recommendations(averages: Dict[str, float]) -> Dict[str, Any]:
+        """Generate OEE improvement recommendations from average component values."""
+        recommendations = []
+        
+        # (component, target, priority) for components below their threshold
+        for component, threshold, target, priority in (
+            ("availability", 0.90, 0.95, "high"),
+            ("performance", 0.90, 0.95, "medium"),
+            ("quality", 0.99, 0.995, "high")
+        ):
+            current = averages.get(component, 0.0)
+            if current < threshold:
                 recommendations.append({
-                    "component": "quality",
-                    "current_value": avg_quality,
-                    "target_value": 0.995,
-                    "improvement_potential": 0.995 - avg_quality,
-                    "priority": "high",
-                    "actions": [
-                        "Implement quality control checkpoints",
-                        "Improve operator training",
-                        "Optimize process parameters"
-                    ]
+                    "component": component,
+                    "current_value": round(current, 4),
+                    "target_value": target,
+                    "improvement_potential": round(target - current, 4),
+                    "priority": priority,
+                    "actions": OEEHistoryAnalytics.COMPONENT_ACTIONS[component]
                 })
-            
-            # Calculate total optimization potential
-            optimization_potential = sum(rec["improvement_potential"] for rec in recommendations)
-            
-            return {
-                "recommendations": recommendations,
-                "optimization_potential": round(optimization_potential, 4),
-                "current_oee": round(avg_oee, 4),
-                "target_oee": round(avg_oee + optimization_potential, 4),
-                "improvement_percentage": round((optimization_potential / avg_oee) * 100, 2) if avg_oee > 0 else 0
-            }
-            
-        except Exception as e:
-            logger.error("Failed to generate OEE recommendations", error=str(e))
-            return {"recommendations": [], "optimization_potential": 0.0}
-    
-    # Additional helper methods for bottleneck analysis and benchmarking
-    # These would be implemented with full functionality
-    
-    @staticmethod
-    async def _analyze_equipment_bottlenecks(
-        line_id: UUID, equipment_code: str, period_days: int
-    ) -> Dict[str, Any]:
-        """Analyze bottlenecks for specific equipment."""
-        # Implementation would analyze equipment-specific bottlenecks
-        return {
-            "equipment_code": equipment_code,
-            "primary_bottleneck": "availability",
-            "bottleneck_score": 0.7,
-            "optimization_potential": 0.15
-        }
-    
-    @staticmethod
-    async def _identify_line_bottlenecks(
-        equipment_analysis: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
-        """Identify line-level bottlenecks."""
-        # Implementation would identify line-level bottlenecks
+        
+        avg_oee = averages.get("oee", 0.0)
+        optimization_potential = sum(rec["improvement_potential"] for rec in recommendations)
+        
         return {
-            "primary_bottleneck": "availability",
-            "bottlenecks": ["availability", "performance"],
-            "impact_score": 0.8
+            "recommendations": recommendations,
+            "optimization_potential": round(optimization_potential, 4),
+            "current_oee": round(avg_oee, 4),
+            "target_oee": round(avg_oee + optimization_potential, 4),
+            "improvement_percentage": round((optimization_potential / avg_oee) * 100, 2) if avg_oee > 0 else 0
         }
     
     @staticmethod
-    async def _generate_optimization_strategies(
-        equipment_analysis: List[Dict[str, Any]], 
-        line_bottlenecks: Dict[str, Any]
-    ) -> List[Dict[str, Any]]:
-        """Generate optimization strategies."""
-        # Implementation would generate optimization strategies
-        return []
+    def _generate_optimization_strategies(equipment_analysis: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Generate one strategy per equipment below target, constraint first."""
+        return [
+            {
+                "equipment_code": analysis["equipment_code"],
+                "component": analysis["primary_bottleneck"],
+                "expected_oee_improvement": analysis["optimization_potential"],
+                "priority": "high" if analysis["rank"] == 1 or analysis["optimization_potential"] >= 0.15 else "medium",
+                "actions": OEEHistoryAnalytics.COMPONENT_ACTIONS.get(analysis["primary_bottleneck"], [])
+            }
+            for analysis in equipment_analysis
+            if analysis["optimization_potential"] > 0
+        ]
     
     @staticmethod
-    async def _calculate_improvement_potential(
-        equipment_analysis: List[Dict[str, Any]], 
-        optimization_strategies: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
+    def _calculate_improvement_potential(equipment_analysis: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Calculate improvement potential."""
-        # Implementation would calculate improvement potential
-        return {"max_oee_improvement": 0.15}
-    
-    @staticmethod
-    async def _get_current_performance_data(
-        line_id: UUID, period_days: int
-    ) -> Dict[str, Any]:
-        """Get current performance data for benchmarking."""
-        # Implementation would get current performance data
-        return {"average_oee": 0.75, "industry": "manufacturing"}
+        if not equipment_analysis:
+            return {"max_oee_improvement": 0.0, "constraint_oee_improvement": 0.0, "average_oee_improvement": 0.0}
+        
+        potentials = np.array([analysis["optimization_potential"] for analysis in equipment_analysis])
+        return {
+            "max_oee_improvement": round(float(potentials.max()), 4),
+            # A line runs at the pace of its constraint, so this is the line-level gain
+            "constraint_oee_improvement": round(float(potentials[0]), 4),
+            "average_oee_improvement": round(float(potentials.mean()), 4)
+        }
     
     @staticmethod
-    async def _get_benchmark_standards(
+    def _get_benchmark_standards(
         benchmark_type: str, industry: str
     ) -> Dict[str, Any]:
         """Get benchmark standards."""
-        # Implementation would get benchmark standards
-        return {"target_oee": 0.85, "world_class_oee": 0.90}
+        return {
+            "target_oee": OEEHistoryAnalytics.TARGET_OEE,
+            "world_class_oee": 0.90,
+            "target_availability": 0.90,
+            "target_performance": 0.95,
+            "target_quality": 0.999
+        }
     
     @staticmethod
-    async def _calculate_performance_gaps(
+    def _calculate_performance_gaps(
         current_performance: Dict[str, Any], 
         benchmark_standards: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Calculate performance gaps."""
-        # Implementation would calculate performance gaps
-        return {"oee_gap": 0.10}
+        """Calculate the gap of the OEE and each component to its benchmark."""
+        return {
+            f"{component}_gap": round(max(
+                0.0,
+                benchmark_standards[f"target_{component}"] - current_performance.get(f"average_{component}", 0.0)
+            ), 4)
+            for component in ("oee", "availability", "performance", "quality")
+        }
     
     @staticmethod
-    async def _generate_improvement_roadmap(
-        performance_gaps: Dict[str, Any], 
-        benchmark_standards: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Generate improvement roadmap."""
-        # Implementation would generate improvement roadmap
-        return {"total_potential": 0.15}
+    def _generate_improvement_roadmap(performance_gaps: Dict[str, Any]) -> Dict[str, Any]:
+        """Order component improvements by the size of their gap."""
+        steps = sorted(
+            (
+                {"component": component, "gap": performance_gaps[f"{component}_gap"]}
+                for component in ("availability", "performance", "quality")
+                if performance_gaps[f"{component}_gap"] > 0
+            ),
+            key=lambda step: step["gap"],
+            reverse=True
+        )
+        for order, step in enumerate(steps, start=1):
+            step["order"] = order
+            step["actions"] = OEEHistoryAnalytics.COMPONENT_ACTIONS[step["component"]]
+        
+        return {"steps": steps, "total_potential": performance_gaps["oee_gap"]}
     
     @staticmethod
-    async def _calculate_benchmarking_metrics(
+    def _calculate_benchmarking_metrics(
         current_performance: Dict[str, Any], 
         benchmark_standards: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Calculate benchmarking metrics."""
-        # Implementation would calculate benchmarking metrics
-        return {"performance_rating": "average"}
\ No newline at end of file
+        """Rate the current OEE against the benchmark."""
+        current_oee = current_performance.get("average_oee", 0.0)
+        target_oee = benchmark_standards["target_oee"]
+        
+        if current_oee >= benchmark_standards["world_class_oee"]:
+            rating = "world_class"
+        elif current_oee >= target_oee:
+            rating = "excellent"
+        elif current_oee >= 0.60:
+            rating = "average"
+        elif current_oee >= 0.40:
+            rating = "below_average"
+        else:
+            rating = "poor"
+        
+        days = current_performance.get("days", 0)
+        return {
+            "performance_rating": rating,
+            "percent_of_target": round(current_oee / target_oee * 100, 2) if target_oee else 0.0,
+            "days_at_target_percent": round(current_performance.get("days_at_target", 0) / days * 100, 2) if days else 0.0
+        }
\ No newline at end of file
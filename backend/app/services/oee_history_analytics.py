@@ -0,0 +1,471 @@
+"""
+MS5.0 Floor Dashboard - OEE History Analytics
+
+This module backs the bottleneck, benchmark and prediction analytics of the
+OEE calculator. A line's history is read from the hour rollups in a single
+query into a NumPy structured array with one row per equipment-hour. Group
+means, percentiles, regressions, rolling means and smoothing then run as
+vectorized operations over its columns instead of Python loops over
+calculation objects. Loaded histories are cached per (line, window) for
+OEE_ANALYTICS_CACHE_SECONDS, so repeated analytics requests share one load.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+import numpy as np
+import structlog
+
+from app.config import settings
+from app.database import execute_query
+
+logger = structlog.get_logger()
+
+
+COMPONENTS = ("availability", "performance", "quality", "oee")
+
+HISTORY_DTYPE = np.dtype([
+    ("bucket_start", "datetime64[s]"),
+    ("equipment", np.int32),
+    ("availability", np.float64),
+    ("performance", np.float64),
+    ("quality", np.float64),
+    ("oee", np.float64),
+    ("good_parts", np.int64),
+    ("total_parts", np.int64)
+])
+
+# Raw rollup columns, converted to HISTORY_DTYPE in one vectorized pass
+_ROLLUP_DTYPE = np.dtype([
+    ("bucket_start", "datetime64[s]"),
+    ("equipment", np.int32),
+    ("bucket_seconds", np.float64),
+    ("calculation_count", np.float64),
+    ("performance_sum", np.float64),
+    ("good_parts", np.int64),
+    ("total_parts", np.int64),
+    ("unplanned_downtime_seconds", np.float64)
+])
+
+HISTORY_QUERY = """
+SELECT equipment_code, bucket_start, bucket_seconds, calculation_count,
+       performance_sum, good_parts, total_parts, unplanned_downtime_seconds
+FROM factory_telemetry.oee_rollups
+WHERE line_id = :line_id
+AND granularity = 'hour'
+AND bucket_start >= :start_time
+AND bucket_start < :end_time
+AND calculation_count > 0
+ORDER BY bucket_start, equipment_code
+"""
+
+
+class OEEHistory:
+    """Hourly OEE history of one line as a columnar structured array."""
+
+    __slots__ = ("line_id", "days", "equipment_codes", "records", "loaded_at")
+
+    def __init__(
+        self,
+        line_id: UUID,
+        days: int,
+        equipment_codes: List[str],
+        records: np.ndarray,
+        loaded_at: datetime
+    ):
+        self.line_id = line_id
+        self.days = days
+        self.equipment_codes = equipment_codes
+        self.records = records
+        self.loaded_at = loaded_at
+
+    @classmethod
+    def from_rows(
+        cls,
+        line_id: UUID,
+        days: int,
+        rows: Sequence[Any],
+        as_of: datetime
+    ) -> "OEEHistory":
+        """
+        Build a history from hour rollup rows.
+
+        Components follow OEERollupService.rollup_to_oee: availability over
+        the elapsed part of the bucket, performance as the mean of the stored
+        calculations and quality as good over total parts.
+        """
+        equipment_codes = sorted({row["equipment_code"] for row in rows})
+        equipment_index = {code: index for index, code in enumerate(equipment_codes)}
+
+        raw = np.array(
+            [
+                (
+                    row["bucket_start"], equipment_index[row["equipment_code"]],
+                    row["bucket_seconds"], row["calculation_count"], row["performance_sum"],
+                    row["good_parts"], row["total_parts"], row["unplanned_downtime_seconds"]
+                )
+                for row in rows
+            ],
+            dtype=_ROLLUP_DTYPE
+        )
+
+        records = np.empty(len(raw), dtype=HISTORY_DTYPE)
+        records["bucket_start"] = raw["bucket_start"]
+        records["equipment"] = raw["equipment"]
+        records["good_parts"] = raw["good_parts"]
+        records["total_parts"] = raw["total_parts"]
+
+        elapsed = (np.datetime64(as_of, "s") - raw["bucket_start"]).astype(np.float64)
+        planned = np.clip(elapsed, 0.0, raw["bucket_seconds"])
+        running = np.maximum(0.0, planned - raw["unplanned_downtime_seconds"])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            records["availability"] = np.where(planned > 0, np.minimum(1.0, running / planned), 0.0)
+            records["performance"] = np.where(
+                raw["calculation_count"] > 0, raw["performance_sum"] / raw["calculation_count"], 0.0
+            )
+            records["quality"] = np.where(
+                raw["total_parts"] > 0, raw["good_parts"] / raw["total_parts"], 0.0
+            )
+        records["oee"] = records["availability"] * records["performance"] * records["quality"]
+
+        return cls(line_id, days, equipment_codes, records, as_of)
+
+    def select(self, equipment_code: Optional[str] = None) -> np.ndarray:
+        """Get the records of one equipment, or of the whole line."""
+        if equipment_code is None:
+            return self.records
+        try:
+            index = self.equipment_codes.index(equipment_code)
+        except ValueError:
+            return self.records[:0]
+        return self.records[self.records["equipment"] == index]
+
+    def component_matrix(self, records: Optional[np.ndarray] = None) -> np.ndarray:
+        """Get records as an (n, 4) matrix in COMPONENTS order."""
+        records = self.records if records is None else records
+        return np.column_stack([records[component] for component in COMPONENTS]) \
+            if len(records) else np.empty((0, len(COMPONENTS)))
+
+    def daily(self, records: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (days, (d, 4) component means per day) for the records."""
+        records = self.records if records is None else records
+        if not len(records):
+            return np.empty(0, dtype="datetime64[D]"), np.empty((0, len(COMPONENTS)))
+
+        days, day_index = np.unique(records["bucket_start"].astype("datetime64[D]"), return_inverse=True)
+        return days, group_means(day_index, self.component_matrix(records), len(days))
+
+    def equipment_means(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (hour counts, (k, 4) component means) per equipment index."""
+        groups = len(self.equipment_codes)
+        counts = np.bincount(self.records["equipment"], minlength=groups)
+        return counts, group_means(self.records["equipment"], self.component_matrix(), groups)
+
+
+def group_means(group_index: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    """Mean of each column of ``values`` per group; empty groups are 0."""
+    counts = np.bincount(group_index, minlength=groups).astype(np.float64)
+    sums = np.column_stack([
+        np.bincount(group_index, weights=values[:, column], minlength=groups)
+        for column in range(values.shape[1])
+    ]) if values.shape[1] else np.empty((groups, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts[:, None] > 0, sums / counts[:, None], 0.0)
+
+
+def group_quantiles(group_index: np.ndarray, values: np.ndarray, groups: int, quantiles: Sequence[float]) -> np.ndarray:
+    """
+    Lower nearest-rank quantiles of ``values`` per group as a (groups, q) array.
+
+    One lexsort orders values within each group; quantiles are then read at
+    each group's offset, so there is no per-group sort.
+    """
+    result = np.zeros((groups, len(quantiles)))
+    if not len(values):
+        return result
+
+    order = np.lexsort((values, group_index))
+    sorted_values = values[order]
+    counts = np.bincount(group_index, minlength=groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+
+    for column, quantile in enumerate(quantiles):
+        offsets = np.floor(quantile * (counts[present] - 1)).astype(np.int64)
+        result[present, column] = sorted_values[starts[present] + offsets]
+    return result
+
+
+def group_slopes(group_index: np.ndarray, x: np.ndarray, y: np.ndarray, groups: int) -> np.ndarray:
+    """Least-squares slope of y over x per group from bincount sums."""
+    n = np.bincount(group_index, minlength=groups).astype(np.float64)
+    sum_x = np.bincount(group_index, weights=x, minlength=groups)
+    sum_y = np.bincount(group_index, weights=y, minlength=groups)
+    sum_xx = np.bincount(group_index, weights=x * x, minlength=groups)
+    sum_xy = np.bincount(group_index, weights=x * y, minlength=groups)
+
+    denominator = n * sum_xx - sum_x * sum_x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(np.abs(denominator) > 1e-12, (n * sum_xy - sum_x * sum_y) / denominator, 0.0)
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing rolling mean along the first axis using cumulative sums."""
+    window = max(1, min(window, len(values)))
+    if not len(values):
+        return values
+    cumulative = np.cumsum(np.concatenate([np.zeros((1,) + values.shape[1:]), values]), axis=0)
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+
+def exponential_smoothing(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Final simple exponential smoothing level of each column.
+
+    Equivalent to s = alpha * x + (1 - alpha) * s seeded with the first
+    value, computed as one weighted sum.
+    """
+    n = len(values)
+    if n == 0:
+        return np.zeros(values.shape[1:])
+
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (n - 1)
+    return weights @ values
+
+
+class OEEHistoryAnalytics:
+    """Vectorized analytics over cached OEE history."""
+
+    TARGET_OEE = 0.85
+
+    COMPONENT_ACTIONS = {
+        "availability": [
+            "Implement preventive maintenance program",
+            "Reduce unplanned downtime",
+            "Optimize changeover procedures"
+        ],
+        "performance": [
+            "Optimize equipment settings",
+            "Reduce minor stops",
+            "Improve material flow"
+        ],
+        "quality": [
+            "Implement quality control checkpoints",
+            "Improve operator training",
+            "Optimize process parameters"
+        ]
+    }
+
+    # (str(line_id), days) -> history
+    _cache: Dict[Tuple[str, int], OEEHistory] = {}
+
+    @staticmethod
+    async def get_history(line_id: UUID, days: int) -> OEEHistory:
+        """Get a line's hourly OEE history for the last ``days`` days, cached per (line, window)."""
+        key = (str(line_id), days)
+        now = datetime.utcnow()
+
+        cached = OEEHistoryAnalytics._cache.get(key)
+        if cached is not None and (now - cached.loaded_at).total_seconds() < settings.OEE_ANALYTICS_CACHE_SECONDS:
+            return cached
+
+        rows = await execute_query(HISTORY_QUERY, {
+            "line_id": line_id,
+            "start_time": now - timedelta(days=days),
+            "end_time": now
+        })
+        history = OEEHistory.from_rows(line_id, days, rows, now)
+
+        OEEHistoryAnalytics._evict_expired(now)
+        OEEHistoryAnalytics._cache[key] = history
+
+        logger.debug(
+            "OEE history loaded",
+            line_id=line_id,
+            days=days,
+            records=len(history.records),
+            equipment=len(history.equipment_codes)
+        )
+        return history
+
+    @staticmethod
+    def invalidate(line_id: Optional[UUID] = None) -> None:
+        """Drop cached histories of one line, or all of them."""
+        if line_id is None:
+            OEEHistoryAnalytics._cache.clear()
+            return
+        for key in [key for key in OEEHistoryAnalytics._cache if key[0] == str(line_id)]:
+            del OEEHistoryAnalytics._cache[key]
+
+    @staticmethod
+    def rank_bottlenecks(history: OEEHistory, equipment_codes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Rank a line's equipment by OEE, lowest (the constraint) first.
+
+        Each entry carries component means, OEE percentiles, the OEE trend per
+        day, the component with the largest loss and the gap to TARGET_OEE.
+        """
+        records = history.records
+        groups = len(history.equipment_codes)
+        if not len(records):
+            return []
+
+        counts, means = history.equipment_means()
+        percentiles = group_quantiles(records["equipment"], records["oee"], groups, (0.1, 0.5, 0.9))
+        days_since_start = (records["bucket_start"] - records["bucket_start"].min()).astype(np.float64) / 86400.0
+        slopes = group_slopes(records["equipment"], days_since_start, records["oee"], groups)
+
+        # Loss of availability, performance and quality per equipment
+        losses = 1.0 - means[:, :3]
+        primary = np.argmax(losses, axis=1)
+        potential = np.maximum(0.0, OEEHistoryAnalytics.TARGET_OEE - means[:, 3])
+
+        allowed = set(equipment_codes) if equipment_codes is not None else None
+        ranked = [
+            index for index in np.argsort(means[:, 3], kind="stable")
+            if counts[index] > 0 and (allowed is None or history.equipment_codes[index] in allowed)
+        ]
+
+        return [
+            {
+                "equipment_code": history.equipment_codes[index],
+                "rank": rank,
+                "hours": int(counts[index]),
+                "availability": round(float(means[index, 0]), 4),
+                "performance": round(float(means[index, 1]), 4),
+                "quality": round(float(means[index, 2]), 4),
+                "oee": round(float(means[index, 3]), 4),
+                "oee_p10": round(float(percentiles[index, 0]), 4),
+                "oee_p50": round(float(percentiles[index, 1]), 4),
+                "oee_p90": round(float(percentiles[index, 2]), 4),
+                "oee_trend_per_day": round(float(slopes[index]), 6),
+                "primary_bottleneck": COMPONENTS[primary[index]],
+                "bottleneck_score": round(float(1.0 - means[index, 3]), 4),
+                "optimization_potential": round(float(potential[index]), 4)
+            }
+            for rank, index in enumerate(ranked, start=1)
+        ]
+
+    @staticmethod
+    def line_bottlenecks(equipment_analysis: List[Dict[str, Any]], threshold: float = 0.05) -> Dict[str, Any]:
+        """Summarize which OEE component constrains the line and which equipment is the constraint."""
+        if not equipment_analysis:
+            return {"primary_bottleneck": "unknown", "bottlenecks": [], "impact_score": 0.0}
+
+        losses = 1.0 - np.array(
+            [[entry[component] for component in COMPONENTS[:3]] for entry in equipment_analysis]
+        ).mean(axis=0)
+        order = np.argsort(-losses, kind="stable")
+        constraint = equipment_analysis[0]
+
+        return {
+            "primary_bottleneck": COMPONENTS[order[0]],
+            "bottlenecks": [COMPONENTS[index] for index in order if losses[index] >= threshold],
+            "component_losses": {COMPONENTS[index]: round(float(losses[index]), 4) for index in range(3)},
+            "constraint_equipment": constraint["equipment_code"],
+            "impact_score": constraint["bottleneck_score"]
+        }
+
+    @staticmethod
+    def current_performance(history: OEEHistory) -> Dict[str, Any]:
+        """Average components and daily line OEE distribution over the window."""
+        records = history.records
+        if not len(records):
+            return {
+                "average_oee": 0.0, "average_availability": 0.0, "average_performance": 0.0,
+                "average_quality": 0.0, "days": 0, "industry": "manufacturing"
+            }
+
+        means = history.component_matrix().mean(axis=0)
+        days, daily = history.daily()
+        daily_oee = daily[:, 3]
+        p10, p50, p90 = np.percentile(daily_oee, (10, 50, 90))
+
+        return {
+            "average_availability": round(float(means[0]), 4),
+            "average_performance": round(float(means[1]), 4),
+            "average_quality": round(float(means[2]), 4),
+            "average_oee": round(float(means[3]), 4),
+            "daily_oee_p10": round(float(p10), 4),
+            "daily_oee_p50": round(float(p50), 4),
+            "daily_oee_p90": round(float(p90), 4),
+            "best_day_oee": round(float(daily_oee.max()), 4),
+            "worst_day_oee": round(float(daily_oee.min()), 4),
+            "days_at_target": int(np.count_nonzero(daily_oee >= OEEHistoryAnalytics.TARGET_OEE)),
+            "days": int(len(days)),
+            "industry": "manufacturing"
+        }
+
+    @staticmethod
+    def predict(
+        history: OEEHistory,
+        equipment_code: str,
+        horizon_days: int,
+        confidence_level: float,
+        alpha: float = 0.3
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any], Dict[str, float]]:
+        """
+        Predict daily OEE components for an equipment.
+
+        The level is the exponentially smoothed hourly series and the trend is
+        the least-squares slope of the daily means. Returns (predictions,
+        accuracy metrics, component averages).
+        """
+        records = history.select(equipment_code)
+        values = history.component_matrix(records)
+
+        level = exponential_smoothing(values, alpha)
+        days, daily = history.daily(records)
+        if len(days) > 1:
+            day_offsets = (days - days[0]).astype(np.float64)
+            slope = np.polyfit(day_offsets, daily, 1)[0]
+        else:
+            slope = np.zeros(len(COMPONENTS))
+
+        steps = np.arange(1, horizon_days + 1, dtype=np.float64)
+        predicted = np.clip(level + slope * steps[:, None], 0.0, 1.0)
+        confidence = np.maximum(0.3, confidence_level - (steps - 1) * 0.05)
+
+        today = datetime.utcnow().date()
+        predictions = [
+            {
+                "date": today + timedelta(days=step + 1),
+                "oee": round(float(predicted[step, 3]), 4),
+                "availability": round(float(predicted[step, 0]), 4),
+                "performance": round(float(predicted[step, 1]), 4),
+                "quality": round(float(predicted[step, 2]), 4),
+                "confidence": round(float(confidence[step]), 4)
+            }
+            for step in range(horizon_days)
+        ]
+
+        volatility = float(values[:, 3].std()) if len(values) > 1 else 0.0
+        recent = rolling_mean(values[:, 3], 24)
+        consistency_score = 1.0 - min(1.0, volatility / 0.1)
+        data_volume_score = min(1.0, len(days) / 30)
+
+        accuracy = {
+            "overall_confidence": round((consistency_score + data_volume_score) / 2, 3),
+            "accuracy_score": round(consistency_score, 3),
+            "data_consistency": round(consistency_score, 3),
+            "data_volume_score": round(data_volume_score, 3),
+            "volatility": round(volatility, 4),
+            "recent_24h_oee": round(float(recent[-1]), 4) if len(recent) else 0.0
+        }
+
+        means = values.mean(axis=0) if len(values) else np.zeros(len(COMPONENTS))
+        averages = {component: float(means[index]) for index, component in enumerate(COMPONENTS)}
+
+        return predictions, accuracy, averages
+
+    @staticmethod
+    def _evict_expired(now: datetime) -> None:
+        """Drop cached histories older than the cache lifetime."""
+        expired = [
+            key for key, history in OEEHistoryAnalytics._cache.items()
+            if (now - history.loaded_at).total_seconds() >= settings.OEE_ANALYTICS_CACHE_SECONDS
+        ]
+        for key in expired:
+            del OEEHistoryAnalytics._cache[key]
@@ -0,0 +1,181 @@
+"""
+MS5.0 Floor Dashboard - OEE Rollup Service
+
+This module reads the hour, shift and day OEE rollups that the database keeps
+current as oee_calculations and downtime_events are written (see migration
+012_oee_rollups.sql). Daily and shift OEE become primary key lookups instead
+of re-aggregating the raw tables on every request.
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import structlog
+
+from app.database import execute_query
+from app.utils.exceptions import BusinessLogicError
+from app.utils.time_range import to_naive_utc
+
+logger = structlog.get_logger()
+
+
+ROLLUP_GRANULARITIES = ("hour", "shift", "day")
+
+ROLLUP_COLUMNS = """line_id, equipment_code, granularity, bucket_start, bucket_seconds,
+                   shift_id, calculation_count, good_parts, total_parts,
+                   cycle_time_sum, cycle_time_count, availability_sum,
+                   performance_sum, quality_sum, oee_sum, downtime_event_count,
+                   unplanned_downtime_seconds, planned_downtime_seconds, updated_at"""
+
+
+class OEERollupService:
+    """Read access to the incremental OEE rollup tables."""
+
+    @staticmethod
+    async def get_line_rollups(
+        line_id: UUID,
+        granularity: str,
+        bucket_start: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get the rollups of every equipment on a line for one bucket."""
+        OEERollupService._validate_granularity(granularity)
+
+        try:
+            query = f"""
+            SELECT {ROLLUP_COLUMNS}
+            FROM factory_telemetry.oee_rollups
+            WHERE line_id = :line_id
+            AND granularity = :granularity
+            AND bucket_start = :bucket_start
+            ORDER BY equipment_code
+            """
+
+            return await execute_query(query, {
+                "line_id": line_id,
+                "granularity": granularity,
+                "bucket_start": bucket_start
+            })
+
+        except Exception as e:
+            logger.error(
+                "Failed to get OEE rollups",
+                error=str(e),
+                line_id=line_id,
+                granularity=granularity,
+                bucket_start=bucket_start
+            )
+            raise BusinessLogicError("Failed to get OEE rollups")
+
+    @staticmethod
+    async def get_line_rollup_range(
+        line_id: UUID,
+        granularity: str,
+        start_time: datetime,
+        end_time: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get the rollups of every equipment on a line for buckets starting in [start_time, end_time)."""
+        OEERollupService._validate_granularity(granularity)
+
+        try:
+            query = f"""
+            SELECT {ROLLUP_COLUMNS}
+            FROM factory_telemetry.oee_rollups
+            WHERE line_id = :line_id
+            AND granularity = :granularity
+            AND bucket_start >= :start_time
+            AND bucket_start < :end_time
+            ORDER BY bucket_start, equipment_code
+            """
+
+            return await execute_query(query, {
+                "line_id": line_id,
+                "granularity": granularity,
+                "start_time": start_time,
+                "end_time": end_time
+            })
+
+        except Exception as e:
+            logger.error(
+                "Failed to get OEE rollup range",
+                error=str(e),
+                line_id=line_id,
+                granularity=granularity
+            )
+            raise BusinessLogicError("Failed to get OEE rollups")
+
+    @staticmethod
+    async def get_day_rollups(line_id: UUID, target_date: date) -> List[Dict[str, Any]]:
+        """Get the day rollups of every equipment on a line."""
+        return await OEERollupService.get_line_rollups(
+            line_id, "day", datetime.combine(target_date, datetime.min.time())
+        )
+
+    @staticmethod
+    async def get_shift_bucket(at_time: datetime) -> Optional[Dict[str, Any]]:
+        """Get the shift bucket (shift_id, bucket_start, bucket_seconds) covering a time."""
+        try:
+            query = """
+            SELECT b.shift_id, b.bucket_start, b.bucket_seconds, s.name as shift_name
+            FROM factory_telemetry.oee_rollup_buckets(:at_time) b
+            JOIN factory_telemetry.production_shifts s ON s.id = b.shift_id
+            WHERE b.granularity = 'shift'
+            """
+
+            result = await execute_query(query, {"at_time": at_time})
+            return result[0] if result else None
+
+        except Exception as e:
+            logger.error("Failed to resolve shift bucket", error=str(e), at_time=at_time)
+            raise BusinessLogicError("Failed to resolve shift bucket")
+
+    @staticmethod
+    def rollup_to_oee(rollup: Dict[str, Any], as_of: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Derive OEE components from a rollup row.
+
+        Availability uses the bucket length as planned time, or only the
+        elapsed part of it when the bucket is still open at ``as_of`` (naive
+        UTC like bucket_start; an aware value is converted). Performance is
+        the mean of the stored calculations and quality is good parts over
+        total parts.
+        """
+        planned_seconds = rollup["bucket_seconds"]
+        if as_of is not None:
+            elapsed = (to_naive_utc(as_of) - rollup["bucket_start"]).total_seconds()
+            planned_seconds = max(0, min(planned_seconds, elapsed))
+
+        unplanned_downtime = rollup["unplanned_downtime_seconds"]
+        if planned_seconds > 0:
+            availability = min(1.0, max(0.0, planned_seconds - unplanned_downtime) / planned_seconds)
+        else:
+            availability = 0.0
+
+        calculation_count = rollup["calculation_count"]
+        performance = rollup["performance_sum"] / calculation_count if calculation_count else 0.0
+
+        total_parts = rollup["total_parts"]
+        quality = rollup["good_parts"] / total_parts if total_parts else 0.0
+
+        cycle_time_count = rollup["cycle_time_count"]
+
+        return {
+            "equipment_code": rollup["equipment_code"],
+            "bucket_start": rollup["bucket_start"],
+            "availability": round(availability, 4),
+            "performance": round(performance, 4),
+            "quality": round(quality, 4),
+            "oee": round(availability * performance * quality, 4),
+            "planned_production_time": int(planned_seconds),
+            "actual_production_time": int(max(0, planned_seconds - unplanned_downtime)),
+            "actual_cycle_time": rollup["cycle_time_sum"] / cycle_time_count if cycle_time_count else 0.0,
+            "good_parts": rollup["good_parts"],
+            "total_parts": total_parts,
+            "downtime_events": rollup["downtime_event_count"],
+            "calculation_count": calculation_count
+        }
+
+    @staticmethod
+    def _validate_granularity(granularity: str) -> None:
+        """Reject unknown rollup granularities."""
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"Unsupported rollup granularity: {granularity!r}")
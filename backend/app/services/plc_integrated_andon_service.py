@@ -13,9 +13,11 @@ import structlog
 
 from app.services.andon_service import AndonService
 from app.services.downtime_tracker import DowntimeTracker
+from app.services.equipment_registry import equipment_registry
+from app.services.active_andon_index import active_andon_index
 from app.services.notification_service import NotificationService
 from app.database import execute_query, execute_scalar, execute_update
-from app.models.production import AndonEventType, AndonPriority, AndonStatus
+from app.models.production import AndonEventType, AndonPriority
 from app.utils.exceptions import BusinessLogicError, NotFoundError
 
 logger = structlog.get_logger()
@@ -45,7 +47,7 @@ class PLCIntegratedAndonService(AndonService):
             created_events = []
             
             # Analyze fault data
-            fault_analysis = self._analyze_plc_faults(fault_data, context_data)
+            fault_analysis = self._analyze_plc_faults(fault_data, context_data, equipment_code)
             
             # Process each fault category
             for fault_category, faults in fault_analysis.items():
@@ -92,7 +94,8 @@ class PLCIntegratedAndonService(AndonService):
     def _analyze_plc_faults(
         self, 
         fault_data: Dict[str, Any], 
-        context_data: Dict[str, Any] = None
+        context_data: Dict[str, Any] = None,
+        equipment_code: Optional[str] = None
     ) -> Dict[str, List[Dict]]:
         """Analyze PLC fault data and categorize faults."""
         try:
@@ -116,7 +119,7 @@ class PLCIntegratedAndonService(AndonService):
                     continue
                 
                 # Get fault information
-                fault_info = self._get_fault_info(i, active_alarms)
+                fault_info = self._get_fault_info(i, active_alarms, equipment_code)
                 if not fault_info:
                     continue
                 
@@ -142,17 +145,22 @@ class PLCIntegratedAndonService(AndonService):
                 "upstream": [], "downstream": [], "material": [], "quality": []
             }
     
-    def _get_fault_info(self, bit_index: int, active_alarms: List[str]) -> Optional[Dict]:
+    def _get_fault_info(
+        self,
+        bit_index: int,
+        active_alarms: List[str],
+        equipment_code: Optional[str] = None
+    ) -> Optional[Dict]:
         """Get fault information for a specific bit index."""
         try:
-            # Get fault from catalog
-            fault_catalog = self._get_fault_catalog()
-            fault_info = fault_catalog.get(bit_index, {
+            # Get fault from the equipment's catalog
+            fault = equipment_registry.get_fault(equipment_code, bit_index)
+            fault_info = fault.to_dict() if fault else {
                 "name": f"Fault {bit_index}",
                 "description": "Unknown fault",
                 "marker": "INTERNAL",
                 "severity": "medium"
-            })
+            }
             
             # Find matching alarm if available
             matching_alarm = None
@@ -571,18 +579,10 @@ class PLCIntegratedAndonService(AndonService):
         equipment_code: str, 
         event_type: str
     ) -> bool:
-        """Check if duplicate Andon event exists."""
+        """Check if an open or acknowledged Andon event of the same type exists."""
         try:
-            # Check for active Andon events of the same type
-            active_events = await self.get_active_andon_events(line_id)
-            
-            for event in active_events:
-                if (event.equipment_code == equipment_code and 
-                    event.event_type.value == event_type and 
-                    event.status in [AndonStatus.OPEN, AndonStatus.ACKNOWLEDGED]):
-                    return True
-            
-            return False
+            await active_andon_index.ensure_loaded()
+            return active_andon_index.has_active(line_id, equipment_code, event_type)
             
         except Exception as e:
             logger.error("Failed to check for duplicate Andon events", error=str(e))
@@ -647,22 +647,6 @@ class PLCIntegratedAndonService(AndonService):
         # Implementation for standard notifications
         logger.info("Standard notifications sent", event_id=andon_event.get("id"))
     
-    def _get_fault_catalog(self) -> Dict[int, Dict]:
-        """Get fault catalog for fault analysis."""
-        # This would typically load from database or configuration
-        return {
-            0: {"name": "Emergency Stop", "description": "Emergency stop activated", "marker": "INTERNAL", "severity": "critical"},
-            1: {"name": "Safety Gate Open", "description": "Safety gate is open", "marker": "INTERNAL", "severity": "high"},
-            2: {"name": "Motor Overload", "description": "Motor overload protection triggered", "marker": "INTERNAL", "severity": "high"},
-            3: {"name": "Temperature High", "description": "Equipment temperature too high", "marker": "INTERNAL", "severity": "medium"},
-            4: {"name": "Pressure Low", "description": "System pressure below threshold", "marker": "INTERNAL", "severity": "medium"},
-            5: {"name": "Upstream Stop", "description": "Upstream equipment stopped", "marker": "UPSTREAM", "severity": "medium"},
-            6: {"name": "Downstream Stop", "description": "Downstream equipment stopped", "marker": "DOWNSTREAM", "severity": "medium"},
-            7: {"name": "Material Jam", "description": "Material jam detected", "marker": "INTERNAL", "severity": "medium"},
-            8: {"name": "Sensor Fault", "description": "Sensor malfunction", "marker": "INTERNAL", "severity": "low"},
-            9: {"name": "Communication Error", "description": "Communication with PLC lost", "marker": "INTERNAL", "severity": "high"}
-        }
-    
     def _load_fault_thresholds(self) -> Dict[str, Dict]:
         """Load fault thresholds for Andon event creation."""
         return {
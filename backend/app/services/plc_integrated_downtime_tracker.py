@@ -12,7 +12,10 @@ from uuid import UUID
 import structlog
 
 from app.services.downtime_tracker import DowntimeTracker, DowntimeReasonCode
+from app.services.downtime_state_store import DowntimeState
+from app.services.downtime_reason_rules import downtime_reason_rules, fault_mask
 from app.services.andon_service import AndonService
+from app.services.equipment_registry import equipment_registry
 from app.database import execute_query, execute_scalar, execute_update
 from app.utils.exceptions import BusinessLogicError, NotFoundError
 
@@ -44,7 +47,9 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
         
         try:
             # Analyze PLC data for downtime indicators
-            downtime_indicators = await self._analyze_plc_downtime_indicators(plc_data, context_data)
+            downtime_indicators = await self._analyze_plc_downtime_indicators(
+                plc_data, context_data, equipment_code=equipment_code
+            )
             
             if not downtime_indicators["is_downtime"]:
                 # Equipment is running normally, check if we need to close active events
@@ -67,7 +72,8 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
     async def _analyze_plc_downtime_indicators(
         self, 
         plc_data: Dict[str, Any], 
-        context_data: Dict[str, Any] = None
+        context_data: Dict[str, Any] = None,
+        equipment_code: Optional[str] = None
     ) -> Dict[str, Any]:
         """Analyze PLC data to identify downtime indicators."""
         try:
@@ -86,7 +92,7 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
             active_alarms = processed.get("active_alarms", [])
             
             # Analyze faults
-            fault_analysis = self._analyze_plc_faults(fault_bits, active_alarms)
+            fault_analysis = self._analyze_plc_faults(fault_bits, active_alarms, equipment_code)
             
             # Check for planned stops
             planned_stop = context_data.get("planned_stop", False) if context_data else False
@@ -133,10 +139,17 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
                 "downtime_reason": "Unknown"
             }
     
-    def _analyze_plc_faults(self, fault_bits: List[bool], active_alarms: List[str]) -> Dict[str, Any]:
-        """Analyze PLC fault bits and active alarms."""
+    def _analyze_plc_faults(
+        self,
+        fault_bits: List[bool],
+        active_alarms: List[str],
+        equipment_code: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Analyze PLC fault bits and active alarms against the equipment's fault catalog."""
         try:
             fault_analysis = {
+                "equipment_code": equipment_code,
+                "fault_mask": fault_mask(fault_bits),
                 "active_fault_bits": [],
                 "active_alarms": active_alarms,
                 "fault_count": 0,
@@ -154,12 +167,14 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
                     fault_analysis["fault_count"] += 1
                     
                     # Get fault information from catalog
-                    fault_info = self.fault_catalog.get(i, {
+                    fault = equipment_registry.get_fault(equipment_code, i)
+                    fault_info = fault.to_dict() if fault else {
+                        "bit_index": i,
                         "name": f"Fault {i}",
                         "description": "Unknown fault",
                         "marker": "INTERNAL",
                         "severity": "medium"
-                    })
+                    }
                     
                     # Categorize faults
                     marker = fault_info.get("marker", "INTERNAL")
@@ -224,26 +239,13 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
     ) -> Tuple[str, str]:
         """Determine downtime reason code and description."""
         try:
-            # Check for critical faults first
-            critical_faults = fault_analysis.get("critical_faults", [])
-            if critical_faults:
-                fault = critical_faults[0]
-                return self._map_fault_to_reason_code(fault["name"]), fault["description"]
-            
-            # Check for internal faults
-            internal_faults = fault_analysis.get("internal_faults", [])
-            if internal_faults:
-                fault = internal_faults[0]
-                return self._map_fault_to_reason_code(fault["name"]), fault["description"]
-            
-            # Check for upstream/downstream faults
-            upstream_faults = fault_analysis.get("upstream_faults", [])
-            if upstream_faults:
-                return DowntimeReasonCode.UPSTREAM_STOP, f"Upstream: {upstream_faults[0]['description']}"
-            
-            downstream_faults = fault_analysis.get("downstream_faults", [])
-            if downstream_faults:
-                return DowntimeReasonCode.DOWNSTREAM_STOP, f"Downstream: {downstream_faults[0]['description']}"
+            # Check for faults: critical first, then internal, upstream and downstream
+            classification = downtime_reason_rules.rules_for(fault_analysis.get("equipment_code")).classify(
+                fault_analysis.get("fault_mask", 0), critical_first=True, include_unknown=True
+            )
+            if classification:
+                reason_code, reason_description, _ = classification
+                return reason_code, reason_description
             
             # Check for material issues
             if material_shortage:
@@ -275,7 +277,8 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
         """Handle PLC downtime detection and event creation."""
         try:
             # Check if we already have an active downtime event
-            active_event = self.active_events.get(equipment_code)
+            active_state = await self.state_store.get(equipment_code)
+            active_event = active_state.to_event() if active_state else None
             
             if active_event:
                 # Update existing event
@@ -328,12 +331,10 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
                 "auto_detected": True
             }
             
-            # Store in active events
-            self.active_events[equipment_code] = event_data
-            
-            # Store in database
+            # Store in database, then share as the equipment's open event
             event_id = await self._store_downtime_event(event_data)
             event_data["id"] = event_id
+            await self.state_store.put(DowntimeState.from_event(event_data))
             
             # Trigger Andon event if configured
             if self.auto_andon_enabled:
@@ -368,20 +369,20 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
             if not event_id:
                 return active_event
             
-            # Update fault data and context
-            new_fault_data = self._extract_plc_fault_data(plc_data, downtime_indicators)
-            new_context_data = self._extract_plc_context_data(plc_data, context_data)
+            # Merge the sample's fault data and context into the open event
+            fault_data = {**active_event["fault_data"], **self._extract_plc_fault_data(plc_data, downtime_indicators)}
+            merged_context = {**active_event["context_data"], **self._extract_plc_context_data(plc_data, context_data)}
             
-            # Merge with existing data
-            active_event["fault_data"].update(new_fault_data)
-            active_event["context_data"].update(new_context_data)
-            
-            # Update in database
-            await self._update_downtime_event_in_db(
-                event_id,
-                fault_data=active_event["fault_data"],
-                context_data=active_event["context_data"]
-            )
+            # Only write when the sample changed something
+            if fault_data != active_event["fault_data"] or merged_context != active_event["context_data"]:
+                await self._update_downtime_event_in_db(
+                    event_id,
+                    fault_data=fault_data,
+                    context_data=merged_context
+                )
+                active_event["fault_data"] = fault_data
+                active_event["context_data"] = merged_context
+                await self.state_store.put(DowntimeState.from_event(active_event))
             
             # Check if we should trigger additional Andon events
             if self.auto_andon_enabled:
@@ -400,12 +401,13 @@ class PLCIntegratedDowntimeTracker(DowntimeTracker):
     ) -> Optional[Dict[str, Any]]:
         """Check if we need to resolve an active downtime event."""
         try:
-            if equipment_code not in self.active_events:
+            active_state = await self.state_store.get(equipment_code)
+            if active_state is None:
                 return None
             
             # Equipment is running again, close the downtime event
             return await self._close_downtime_event(
-                equipment_code, timestamp
+                active_state.line_id, equipment_code, timestamp
             )
             
         except Exception as e:
@@ -6,27 +6,157 @@ providing real-time OEE calculations based on actual equipment metrics from
 the PLC telemetry system.
 """
 
+from collections import OrderedDict
 from datetime import datetime, timedelta, date
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Set, Tuple
 from uuid import UUID
+import time
 import structlog
 
+from app.config import settings
 from app.services.oee_calculator import OEECalculator
 from app.services.downtime_tracker import DowntimeTracker
+from app.services.metric_latest_store import metric_latest_store
 from app.database import execute_query, execute_scalar, execute_update
 from app.utils.exceptions import BusinessLogicError, NotFoundError
+from app.utils.time_range import to_utc
 
 logger = structlog.get_logger()
 
 
+CacheKey = Tuple[str, str, int]  # str(line_id), equipment_code, window
+
+
+class OEEWindowCache:
+    """
+    Bounded LRU cache of real-time OEE results keyed by (line, equipment, window).
+    
+    Timestamps (naive values are taken as UTC) fall into fixed windows of
+    ``window_seconds`` and entries expire ``window_seconds`` after they were
+    stored. A per-equipment index makes invalidating one equipment independent
+    of the cache size. Every entry remembers the newest metric sample it was
+    computed from and is dropped once a newer sample for that equipment
+    reaches the metric latest store, whether from the in-process poller or a
+    NOTIFY.
+    """
+    
+    def __init__(self, window_seconds: int, max_entries: int):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        
+        # (line_id, equipment_code, window) -> (expires_at, sample_time, value), oldest first
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Optional[datetime], Dict[str, Any]]]" = OrderedDict()
+        self._equipment_keys: Dict[str, Set[CacheKey]] = {}
+        
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0
+        }
+    
+    def window(self, timestamp: datetime) -> int:
+        """Get the window index a timestamp falls into."""
+        return int(to_utc(timestamp).timestamp()) // self.window_seconds
+    
+    def key(self, line_id: Any, equipment_code: str, timestamp: datetime) -> CacheKey:
+        """Get the cache key of a line's equipment window."""
+        return (str(line_id), equipment_code, self.window(timestamp))
+    
+    def get(self, line_id: Any, equipment_code: str, timestamp: datetime) -> Optional[Dict[str, Any]]:
+        """Get the cached result for an equipment's window on a line, if still current."""
+        key = self.key(line_id, equipment_code, timestamp)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        
+        expires_at, sample_time, value = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        
+        latest_sample = metric_latest_store.equipment_sample_time(equipment_code)
+        if latest_sample is not None and (sample_time is None or to_utc(latest_sample) > to_utc(sample_time)):
+            self.invalidate(equipment_code)
+            self.stats["misses"] += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+    
+    def set(self, line_id: Any, equipment_code: str, timestamp: datetime, value: Dict[str, Any]) -> None:
+        """Store a result for an equipment's window on a line, evicting the least recently used entries."""
+        key = self.key(line_id, equipment_code, timestamp)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        
+        self._entries[key] = (
+            time.monotonic() + self.window_seconds,
+            metric_latest_store.equipment_sample_time(equipment_code),
+            value
+        )
+        self._equipment_keys.setdefault(equipment_code, set()).add(key)
+        self.stats["sets"] += 1
+        
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+    
+    def invalidate(self, equipment_code: Optional[str] = None) -> int:
+        """Drop every entry of an equipment, or the whole cache."""
+        if equipment_code is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._equipment_keys.clear()
+        else:
+            keys = self._equipment_keys.pop(equipment_code, set())
+            for key in keys:
+                del self._entries[key]
+            removed = len(keys)
+        
+        self.stats["invalidations"] += removed
+        return removed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "equipment": len(self._equipment_keys),
+            "max_entries": self.max_entries,
+            "window_seconds": self.window_seconds,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0
+        }
+    
+    def _remove(self, key: CacheKey) -> None:
+        """Remove one entry and its index reference."""
+        del self._entries[key]
+        equipment_code = key[1]
+        keys = self._equipment_keys.get(equipment_code)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._equipment_keys[equipment_code]
+
+
 class PLCIntegratedOEECalculator(OEECalculator):
     """OEE calculator integrated with PLC data streams."""
     
     def __init__(self):
         super().__init__()
         self.downtime_tracker = DowntimeTracker()
-        self.plc_metrics_cache = {}
-        self.cache_ttl = 60  # 1 minute cache for real-time data
+        self.oee_cache = OEEWindowCache(
+            settings.PLC_OEE_CACHE_WINDOW_SECONDS,
+            settings.PLC_OEE_CACHE_MAX_ENTRIES
+        )
     
     async def calculate_real_time_oee(
         self, 
@@ -39,6 +169,11 @@ class PLCIntegratedOEECalculator(OEECalculator):
         if timestamp is None:
             timestamp = datetime.utcnow()
         
+        # Served from cache until the window ends or a newer sample arrives
+        cached = self.oee_cache.get(line_id, equipment_code, timestamp)
+        if cached is not None:
+            return cached
+        
         try:
             # Get current production context
             production_context = await self._get_production_context(line_id, equipment_code)
@@ -54,18 +189,7 @@ class PLCIntegratedOEECalculator(OEECalculator):
             # Get downtime statistics for the current period
             downtime_stats = await self._get_current_downtime_stats(line_id, equipment_code, timestamp)
             
-            # Cache the result
-            cache_key = f"{equipment_code}_{timestamp.strftime('%Y%m%d%H%M%S')}"
-            self.plc_metrics_cache[cache_key] = {
-                "oee": oee,
-                "availability": availability,
-                "performance": performance,
-                "quality": quality,
-                "timestamp": timestamp,
-                "downtime_stats": downtime_stats
-            }
-            
-            return {
+            result = {
                 "oee": round(oee, 4),
                 "availability": round(availability, 4),
                 "performance": round(performance, 4),
@@ -80,6 +204,9 @@ class PLCIntegratedOEECalculator(OEECalculator):
                 "calculation_method": "plc_integrated"
             }
             
+            self.oee_cache.set(line_id, equipment_code, timestamp, result)
+            return result
+            
         except Exception as e:
             logger.error(
                 "Failed to calculate real-time OEE from PLC data",
@@ -255,6 +382,22 @@ class PLCIntegratedOEECalculator(OEECalculator):
             )
             raise BusinessLogicError("Failed to get OEE trends from PLC data")
     
+    async def get_current_line_oee(
+        self,
+        line_id: UUID,
+        equipment_codes: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get the constraint-weighted OEE of a line over the latest task window.
+        
+        Uses the same batched line calculation as the OEE tasks and reports,
+        so the line's equipment (or the given subset) cost one query.
+        """
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(minutes=settings.OEE_TASK_WINDOW_MINUTES)
+        
+        return await self.calculate_line_oee(line_id, start_time, end_time, equipment_codes)
+    
     async def _get_production_context(self, line_id: UUID, equipment_code: str) -> Dict[str, Any]:
         """Get current production context for OEE calculation."""
         try:
@@ -636,19 +779,17 @@ class PLCIntegratedOEECalculator(OEECalculator):
             "calculation_method": "plc_period_based_no_data"
         }
     
-    def get_cached_oee_data(self, equipment_code: str, timestamp: datetime = None) -> Optional[Dict]:
-        """Get cached OEE data for equipment."""
+    def get_cached_oee_data(self, line_id: UUID, equipment_code: str, timestamp: datetime = None) -> Optional[Dict]:
+        """Get cached OEE data for equipment on a line."""
         if timestamp is None:
             timestamp = datetime.utcnow()
         
-        cache_key = f"{equipment_code}_{timestamp.strftime('%Y%m%d%H%M%S')}"
-        return self.plc_metrics_cache.get(cache_key)
+        return self.oee_cache.get(line_id, equipment_code, timestamp)
     
     def clear_cache(self, equipment_code: str = None):
         """Clear OEE calculation cache."""
-        if equipment_code:
-            keys_to_remove = [key for key in self.plc_metrics_cache.keys() if key.startswith(equipment_code)]
-            for key in keys_to_remove:
-                del self.plc_metrics_cache[key]
-        else:
-            self.plc_metrics_cache.clear()
+        self.oee_cache.invalidate(equipment_code)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get OEE calculation cache statistics."""
+        return self.oee_cache.get_stats()
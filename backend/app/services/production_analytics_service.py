@@ -20,6 +20,7 @@ from app.models.production import ProductionLineResponse, ProductionScheduleResp
 from app.utils.exceptions import (
     NotFoundError, ValidationError, BusinessLogicError, ConflictError
 )
+from app.utils.time_range import time_bucket_expression, bucket_date
 
 logger = structlog.get_logger()
 
@@ -358,9 +359,9 @@ class ProductionAnalyticsService:
             end_date = datetime.utcnow()
             start_date = end_date - timedelta(days=days)
             
-            query = """
+            query = f"""
             SELECT 
-                DATE(ps.created_at) as date,
+                {time_bucket_expression("ps.created_at", "1 day")} as date,
                 COUNT(*) as schedule_count,
                 SUM(ps.target_quantity) as total_target,
                 SUM(CASE WHEN ps.status = 'completed' THEN ps.target_quantity ELSE 0 END) as completed_quantity,
@@ -370,8 +371,8 @@ class ProductionAnalyticsService:
             FROM factory_telemetry.production_schedules ps
             WHERE ps.line_id = :line_id
             AND ps.created_at >= :start_date
-            AND ps.created_at <= :end_date
-            GROUP BY DATE(ps.created_at)
+            AND ps.created_at < :end_date
+            GROUP BY 1
             ORDER BY date ASC
             """
             
@@ -503,7 +504,7 @@ class ProductionAnalyticsService:
             for i, rate in enumerate(completion_rates):
                 if rate > upper_threshold or rate < lower_threshold:
                     anomalies.append({
-                        "date": historical_data[i]["date"],
+                        "date": bucket_date(historical_data[i]["date"]),
                         "completion_rate": round(rate, 2),
                         "deviation": round(abs(rate - mean_rate), 2),
                         "severity": "high" if abs(rate - mean_rate) > 3 * std_rate else "medium"
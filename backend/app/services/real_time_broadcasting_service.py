@@ -180,6 +180,33 @@ class RealTimeBroadcastingService:
         await self._queue_event(event)
         logger.debug("OEE update queued for broadcasting", line_id=line_id, oee=oee_data.get("oee", 0))
     
+    async def broadcast_shift_snapshot(self, line_id: str, snapshot: Dict[str, Any]):
+        """
+        Broadcast the final OEE snapshot of a closed shift.
+        
+        Args:
+            line_id: Production line identifier
+            snapshot: Closed shift OEE, downtime and quality snapshot
+        """
+        event = BroadcastEvent(
+            event_type=WebSocketEventType.SHIFT_SNAPSHOT_CLOSED,
+            data={
+                "line_id": line_id,
+                "snapshot": snapshot,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            },
+            priority=BroadcastPriority.NORMAL,
+            target_filters={"line_id": line_id},
+            metadata={
+                "source": "shift_snapshot_service",
+                "shift_name": snapshot.get("shift_name"),
+                "oee": snapshot.get("oee", 0)
+            }
+        )
+        
+        await self._queue_event(event)
+        logger.debug("Shift snapshot queued for broadcasting", line_id=line_id)
+    
     async def broadcast_andon_notification(self, andon_event: Dict[str, Any]):
         """
         Broadcast real-time Andon notifications with priority handling.
@@ -450,7 +477,7 @@ class RealTimeBroadcastingService:
             # Broadcast based on event type and filters
             if event.event_type == WebSocketEventType.PRODUCTION_UPDATE:
                 await self._broadcast_to_line_subscribers(message, event.target_filters.get("line_id"))
-            elif event.event_type == WebSocketEventType.OEE_UPDATE:
+            elif event.event_type in (WebSocketEventType.OEE_UPDATE, WebSocketEventType.SHIFT_SNAPSHOT_CLOSED):
                 await self._broadcast_to_line_subscribers(message, event.target_filters.get("line_id"))
             elif event.event_type == WebSocketEventType.ANDON_EVENT:
                 await self._broadcast_andon_event(message, event.target_filters)
@@ -622,6 +649,11 @@ async def broadcast_oee_update(line_id: str, oee_data: Dict[str, Any]):
     await real_time_broadcasting_service.broadcast_oee_update(line_id, oee_data)
 
 
+async def broadcast_shift_snapshot(line_id: str, snapshot: Dict[str, Any]):
+    """Convenience function to broadcast closed shift snapshots."""
+    await real_time_broadcasting_service.broadcast_shift_snapshot(line_id, snapshot)
+
+
 async def broadcast_andon_notification(andon_event: Dict[str, Any]):
     """Convenience function to broadcast Andon notifications."""
     await real_time_broadcasting_service.broadcast_andon_notification(andon_event)
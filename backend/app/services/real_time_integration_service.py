@@ -26,6 +26,7 @@ import structlog
 from app.services.real_time_broadcasting_service import real_time_broadcasting_service
 from app.services.enhanced_websocket_manager import enhanced_websocket_manager
 from app.services.websocket_manager import websocket_manager
+from app.services.metric_latest_store import metric_latest_store
 from app.api.websocket import WebSocketEventType
 from app.utils.exceptions import IntegrationError, ServiceError
 
@@ -441,24 +442,24 @@ class RealTimeIntegrationService:
         }
     
     async def _get_equipment_status(self) -> Dict[str, Dict[str, Any]]:
-        """Get equipment status from equipment services."""
-        # Mock implementation - replace with real service calls
-        return {
-            "EQ001": {
-                "status": "operational",
-                "temperature": 45.2,
-                "pressure": 2.1,
-                "vibration": 0.8,
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            },
-            "EQ002": {
-                "status": "warning",
-                "temperature": 78.5,
-                "pressure": 3.2,
-                "vibration": 2.1,
-                "timestamp": datetime.now(timezone.utc).isoformat()
+        """Get equipment status snapshots from the in-memory latest-value store."""
+        equipment_status = {}
+        
+        for equipment_code, latest in metric_latest_store.snapshot().items():
+            has_faults = any(
+                bool(latest.get(key)) for key in ("internal_fault", "upstream_fault", "downstream_fault")
+            )
+            timestamp = latest.get("timestamp")
+            
+            equipment_status[equipment_code] = {
+                "status": "fault" if has_faults else "operational" if latest.get("running_status") else "stopped",
+                "speed": latest.get("speed_real"),
+                "product_count": latest.get("product_count"),
+                "active_alarms": latest.get("active_alarms") or [],
+                "timestamp": timestamp.isoformat() if timestamp else None
             }
-        }
+        
+        return equipment_status
     
     async def _calculate_oee_metrics(self) -> Dict[str, Dict[str, Any]]:
         """Calculate OEE metrics for production lines."""
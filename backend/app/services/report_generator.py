@@ -23,6 +23,9 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 
 from app.database import execute_query, execute_scalar
+from app.services.oee_calculator import OEECalculator
+from app.services.shift_snapshot_service import ShiftSnapshotService, shift_instances
+from app.utils.time_range import day_range, to_naive_utc
 from app.utils.exceptions import (
     NotFoundError, ValidationError, BusinessLogicError, ConflictError
 )
@@ -462,8 +465,8 @@ class ReportGenerator:
         summary_data = [
             ['Metric', 'Value', 'Target', 'Status'],
             ['Total Production', f"{data.get('total_production', 0):,}", 
-             f"{data.get('target_production', 0):,}", 
-             self.get_status_indicator(data.get('total_production', 0), data.get('target_production', 0))],
+             self.format_target(data.get('target_production')), 
+             self.get_status_indicator(data.get('total_production', 0), data.get('target_production') or 0)],
             ['OEE', f"{data.get('oee', {}).get('oee', 0):.1%}", 
              f"{data.get('oee', {}).get('target_oee', 0):.1%}", 
              self.get_status_indicator(data.get('oee', {}).get('oee', 0), data.get('oee', {}).get('target_oee', 0))],
@@ -541,18 +544,11 @@ class ReportGenerator:
         # Downtime summary
         downtime_summary = [
             ['Category', 'Duration (Hours)', 'Percentage', 'Events'],
+            # Shift rollups count downtime events per shift, not per category
             ['Planned', f"{downtime_data.get('planned_hours', 0):.1f}", 
-             f"{downtime_data.get('planned_percentage', 0):.1%}", 
-             f"{downtime_data.get('planned_events', 0)}"],
+             f"{downtime_data.get('planned_percentage', 0):.1%}", '-'],
             ['Unplanned', f"{downtime_data.get('unplanned_hours', 0):.1f}", 
-             f"{downtime_data.get('unplanned_percentage', 0):.1%}", 
-             f"{downtime_data.get('unplanned_events', 0)}"],
-            ['Maintenance', f"{downtime_data.get('maintenance_hours', 0):.1f}", 
-             f"{downtime_data.get('maintenance_percentage', 0):.1%}", 
-             f"{downtime_data.get('maintenance_events', 0)}"],
-            ['Changeover', f"{downtime_data.get('changeover_hours', 0):.1f}", 
-             f"{downtime_data.get('changeover_percentage', 0):.1%}", 
-             f"{downtime_data.get('changeover_events', 0)}"],
+             f"{downtime_data.get('unplanned_percentage', 0):.1%}", '-'],
             ['Total', f"{downtime_data.get('total_hours', 0):.1f}", 
              f"{downtime_data.get('total_percentage', 0):.1%}", 
              f"{downtime_data.get('total_events', 0)}"],
@@ -581,17 +577,16 @@ class ReportGenerator:
         
         elements.append(Paragraph("Production Details", self.styles['CustomHeading']))
         
-        # Production details table
-        details_data = [
-            ['Time Period', 'Production', 'Target', 'Efficiency'],
-            ['Hour 1', f"{production_data.get('hour_1', 0):,}", 
-             f"{production_data.get('target_hour_1', 0):,}", 
-             f"{production_data.get('efficiency_hour_1', 0):.1%}"],
-            ['Hour 2', f"{production_data.get('hour_2', 0):,}", 
-             f"{production_data.get('target_hour_2', 0):,}", 
-             f"{production_data.get('efficiency_hour_2', 0):.1%}"],
-            # Add more hours as needed
-        ]
+        # Production details table, one row per shift
+        details_data = [['Shift', 'Production', 'Target', 'Efficiency']]
+        for shift in production_data.get('shifts', []):
+            target = shift.get('target')
+            details_data.append([
+                f"{shift.get('shift_name', 'Unknown')} ({shift['shift_start']:%H:%M})",
+                f"{shift.get('production', 0):,}",
+                self.format_target(target),
+                f"{shift.get('production', 0) / target:.1%}" if target else "N/A"
+            ])
         
         details_table = Table(details_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
         details_table.setStyle(TableStyle([
@@ -625,9 +620,6 @@ class ReportGenerator:
             ['Defects', f"{quality_data.get('defects', 0):,}", 
              f"{quality_data.get('target_defects', 0):,}", 
              self.get_status_indicator(quality_data.get('defects', 0), quality_data.get('target_defects', 0), reverse=True)],
-            ['Rework', f"{quality_data.get('rework', 0):,}", 
-             f"{quality_data.get('target_rework', 0):,}", 
-             self.get_status_indicator(quality_data.get('rework', 0), quality_data.get('target_rework', 0), reverse=True)],
         ]
         
         quality_table = Table(quality_metrics, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1*inch])
@@ -656,17 +648,16 @@ class ReportGenerator:
         # Equipment status table
         equipment_list = equipment_data.get('equipment', [])
         if equipment_list:
-            status_data = [['Equipment', 'Status', 'Uptime', 'Last Maintenance']]
+            status_data = [['Equipment', 'Uptime', 'OEE']]
             
             for equipment in equipment_list:
                 status_data.append([
                     equipment.get('code', 'Unknown'),
-                    equipment.get('status', 'Unknown'),
                     f"{equipment.get('uptime', 0):.1%}",
-                    equipment.get('last_maintenance', 'Never')
+                    f"{equipment.get('oee', 0):.1%}"
                 ])
             
-            status_table = Table(status_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch])
+            status_table = Table(status_data, colWidths=[2*inch, 1.5*inch, 1.5*inch])
             status_table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -698,6 +689,10 @@ class ReportGenerator:
         
         return elements
     
+    def format_target(self, target: Optional[float]) -> str:
+        """Format a production target, N/A when there is none."""
+        return f"{target:,}" if target is not None else "N/A"
+    
     def get_status_indicator(self, actual: float, target: float, reverse: bool = False) -> str:
         """Get status indicator for metrics."""
         if target == 0:
@@ -722,50 +717,157 @@ class ReportGenerator:
     
     # Data retrieval methods
     async def get_production_data(self, line_id: UUID, report_date: date, shift: Optional[str]) -> Dict[str, Any]:
-        """Get production data for report."""
-        # Implementation would query database for production data
-        # This is a placeholder implementation
+        """
+        Get production data for report.
+        
+        Closed shifts are read from their snapshots; shifts of the day that
+        are not closed yet are computed from the shift rollups.
+        """
+        start_time, end_time = day_range(report_date)
+        snapshots = await ShiftSnapshotService.get_line_snapshots(line_id, start_time, end_time, shift)
+        
+        closed_starts = {snapshot["shift_start"] for snapshot in snapshots}
+        now = datetime.utcnow()
+        for instance in shift_instances(
+            await ShiftSnapshotService.get_shifts(), start_time, end_time + timedelta(days=1)
+        ):
+            if (
+                start_time <= instance["shift_start"] < min(end_time, now)
+                and instance["shift_start"] not in closed_starts
+                and (shift is None or instance["shift_name"] == shift)
+            ):
+                snapshots.append(await ShiftSnapshotService.compute_snapshot(line_id, instance, now))
+        
+        period = ShiftSnapshotService.combine(snapshots)
+        benchmarks = OEECalculator._get_benchmark_standards("industry", "manufacturing")
+        
+        # Shifts still running are held to the schedule up to now only
+        windows = [(snapshot["shift_start"], min(snapshot["shift_end"], now)) for snapshot in snapshots]
+        shift_targets = await self._get_scheduled_targets(line_id, windows)
+        
+        equipment_oee: Dict[str, List[Dict[str, Any]]] = {}
+        for snapshot in snapshots:
+            for entry in snapshot["equipment_oee"]:
+                equipment_oee.setdefault(entry["equipment_code"], []).append(entry)
+        
+        planned_seconds = period["planned_seconds"]
+        unplanned_hours = period["unplanned_downtime_seconds"] / 3600
+        planned_hours = period["planned_downtime_seconds"] / 3600
+        total_hours = unplanned_hours + planned_hours
+        
+        def share(hours: float) -> float:
+            return hours * 3600 / planned_seconds if planned_seconds else 0.0
+        
         return {
-            "total_production": 1000,
-            "target_production": 1200,
+            "total_production": period["good_parts"],
+            # None when nothing was scheduled, so the target shows as N/A
+            "target_production": round(sum(shift_targets)) if shift_targets is not None else None,
+            "shift_count": period["shift_count"],
             "oee": {
-                "availability": 0.85,
-                "performance": 0.90,
-                "quality": 0.95,
-                "oee": 0.73,
-                "target_availability": 0.90,
-                "target_performance": 0.95,
-                "target_quality": 0.98,
-                "target_oee": 0.85
+                "availability": period["availability"],
+                "performance": period["performance"],
+                "quality": period["quality"],
+                "oee": period["oee"],
+                "target_availability": benchmarks["target_availability"],
+                "target_performance": benchmarks["target_performance"],
+                "target_quality": benchmarks["target_quality"],
+                "target_oee": benchmarks["target_oee"]
             },
             "downtime": {
-                "total_hours": 2.5,
-                "target_hours": 1.0,
-                "planned_hours": 1.0,
-                "unplanned_hours": 1.5,
-                "maintenance_hours": 0.5,
-                "changeover_hours": 0.5
+                "total_hours": total_hours,
+                # Planned stops plus the unplanned downtime allowed at target availability
+                "target_hours": planned_hours + planned_seconds * (1 - benchmarks["target_availability"]) / 3600,
+                "planned_hours": planned_hours,
+                "unplanned_hours": unplanned_hours,
+                "planned_percentage": share(planned_hours),
+                "unplanned_percentage": share(unplanned_hours),
+                "total_percentage": share(total_hours),
+                "total_events": period["downtime_event_count"]
+            },
+            "production": {
+                "shifts": [
+                    {
+                        "shift_name": snapshot["shift_name"],
+                        "shift_start": snapshot["shift_start"],
+                        "production": snapshot["good_parts"],
+                        "target": round(shift_targets[index]) if shift_targets is not None else None
+                    }
+                    for index, snapshot in enumerate(snapshots)
+                ]
             },
             "quality": {
-                "rate": 0.95,
-                "target_rate": 0.98,
-                "defects": 50,
-                "target_defects": 20,
-                "rework": 10,
-                "target_rework": 5
+                "rate": period["quality"],
+                "target_rate": benchmarks["target_quality"],
+                "defects": period["total_parts"] - period["good_parts"],
+                "target_defects": round(period["total_parts"] * (1 - benchmarks["target_quality"]))
             },
             "equipment": {
                 "equipment": [
-                    {"code": "EQ001", "status": "Running", "uptime": 0.95, "last_maintenance": "2025-01-15"},
-                    {"code": "EQ002", "status": "Maintenance", "uptime": 0.90, "last_maintenance": "2025-01-20"}
+                    {
+                        "code": code,
+                        "uptime": sum(entry["availability"] for entry in entries) / len(entries),
+                        "oee": sum(entry["oee"] for entry in entries) / len(entries)
+                    }
+                    for code, entries in equipment_oee.items()
                 ]
             }
         }
     
+    async def _get_scheduled_targets(
+        self, line_id: UUID, windows: List[Tuple[datetime, datetime]]
+    ) -> Optional[List[float]]:
+        """
+        Get the scheduled production target of each time window.
+        
+        A schedule's target quantity is spread evenly over its scheduled time,
+        so a window is credited with the share of each schedule it overlaps.
+        None is returned when no schedule overlaps any window.
+        """
+        if not windows:
+            return None
+        
+        query = """
+        SELECT scheduled_start, scheduled_end, target_quantity
+        FROM factory_telemetry.production_schedules
+        WHERE line_id = :line_id
+        AND status <> 'cancelled'
+        AND scheduled_start < :end_time
+        AND scheduled_end > :start_time
+        """
+        
+        schedules = await execute_query(query, {
+            "line_id": line_id,
+            "start_time": min(start for start, _ in windows),
+            "end_time": max(end for _, end in windows)
+        })
+        if not schedules:
+            return None
+        
+        targets = [0.0] * len(windows)
+        for schedule in schedules:
+            scheduled_start = to_naive_utc(schedule["scheduled_start"])
+            scheduled_end = to_naive_utc(schedule["scheduled_end"])
+            duration = (scheduled_end - scheduled_start).total_seconds()
+            if duration <= 0:
+                continue
+            for index, (start, end) in enumerate(windows):
+                overlap = (min(end, scheduled_end) - max(start, scheduled_start)).total_seconds()
+                if overlap > 0:
+                    targets[index] += schedule["target_quantity"] * overlap / duration
+        
+        return targets
+    
     async def get_oee_data(self, line_id: UUID, start_date: date, end_date: date) -> Dict[str, Any]:
-        """Get OEE data for report."""
-        # Implementation would query database for OEE data
-        return {}
+        """Get the constraint-weighted line OEE for the report period."""
+        start_time, end_time = day_range(start_date, end_date)
+        line_oee = await OEECalculator.calculate_line_oee(line_id, start_time, end_time)
+        targets = {
+            key: value
+            for key, value in OEECalculator._get_benchmark_standards("industry", "manufacturing").items()
+            if key.startswith("target_")
+        }
+        
+        return {**line_oee, **targets}
     
     async def get_downtime_data(self, line_id: UUID, start_date: date, end_date: date) -> Dict[str, Any]:
         """Get downtime data for report."""
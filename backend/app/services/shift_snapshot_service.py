@@ -0,0 +1,377 @@
+"""
+MS5.0 Floor Dashboard - Shift Snapshot Service
+
+This module closes production shifts. Once a shift from production_shifts has
+ended, and a settle delay has passed for late OEE calculations, the final OEE,
+downtime and quality of every line is computed once from the shift rollups and
+stored as an immutable row in factory_telemetry.shift_snapshots (see migration
+015_shift_snapshots.sql). Shift reports, dashboards and the OEE trend tasks
+read the snapshot instead of recomputing the shift.
+
+The insert is published on the 'shift_snapshot_closed' channel; the
+publisher in the API process forwards closed shifts to websocket subscribers.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+import structlog
+
+from app.config import settings
+from app.database import execute_query, execute_update, open_notification_connection
+from app.services.equipment_registry import equipment_registry
+from app.services.line_oee_aggregator import LineOEEAggregator
+from app.services.oee_rollup_service import OEERollupService
+from app.utils.exceptions import BusinessLogicError
+
+logger = structlog.get_logger()
+
+
+SNAPSHOT_FIELDS = (
+    "line_id", "shift_start", "shift_end", "shift_id", "shift_name", "oee",
+    "availability", "performance", "quality", "constraint_equipment",
+    "good_parts", "total_parts", "downtime_event_count",
+    "unplanned_downtime_seconds", "planned_downtime_seconds",
+    "equipment_oee", "closed_at"
+)
+
+SNAPSHOT_COLUMNS = ", ".join(SNAPSHOT_FIELDS)
+
+SnapshotPublisher = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+def shift_instances(shifts: List[Dict[str, Any]], since: datetime, until: datetime) -> List[Dict[str, Any]]:
+    """
+    Get the shift occurrences that ended in (since, until], oldest first.
+
+    Shifts are daily TIME ranges; one whose start is not before its end
+    wraps midnight and lasts into the next day, matching the shift buckets of
+    the OEE rollups.
+    """
+    instances = []
+    day = since.date() - timedelta(days=1)
+    while day <= until.date():
+        for shift in shifts:
+            shift_start = datetime.combine(day, shift["start_time"])
+            shift_end = datetime.combine(day, shift["end_time"])
+            if shift["start_time"] >= shift["end_time"]:
+                shift_end += timedelta(days=1)
+
+            if since < shift_end <= until:
+                instances.append({
+                    "shift_id": shift["id"],
+                    "shift_name": shift["name"],
+                    "shift_start": shift_start,
+                    "shift_end": shift_end
+                })
+        day += timedelta(days=1)
+
+    return sorted(instances, key=lambda instance: instance["shift_end"])
+
+
+class ShiftSnapshotService:
+    """Closes shifts into immutable per-line OEE, downtime and quality snapshots."""
+
+    CHANNEL = "shift_snapshot_closed"
+
+    @staticmethod
+    async def get_shifts() -> List[Dict[str, Any]]:
+        """Get the enabled production shifts."""
+        return await execute_query("""
+            SELECT id, name, start_time, end_time
+            FROM factory_telemetry.production_shifts
+            WHERE enabled
+            ORDER BY start_time
+        """)
+
+    @staticmethod
+    async def compute_snapshot(
+        line_id: UUID,
+        shift: Dict[str, Any],
+        as_of: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Compute a line's shift snapshot from its shift rollups.
+
+        ``shift`` is a shift occurrence from shift_instances(). A shift that
+        is still open at ``as_of`` is computed over its elapsed part.
+        """
+        as_of = min(as_of or datetime.utcnow(), shift["shift_end"])
+
+        rollups = await OEERollupService.get_line_rollups(line_id, "shift", shift["shift_start"])
+
+        await equipment_registry.ensure_loaded()
+        line_equipment = equipment_registry.line_equipment_codes(line_id)
+        if line_equipment is not None:
+            rollups = [rollup for rollup in rollups if rollup["equipment_code"] in line_equipment]
+
+        line = LineOEEAggregator.aggregate(
+            line_id, [OEERollupService.rollup_to_oee(rollup, as_of) for rollup in rollups]
+        )
+
+        return {
+            "line_id": line_id,
+            "shift_start": shift["shift_start"],
+            "shift_end": shift["shift_end"],
+            "shift_id": shift["shift_id"],
+            "shift_name": shift["shift_name"],
+            "oee": line["oee"],
+            "availability": line["availability"],
+            "performance": line["performance"],
+            "quality": line["quality"],
+            "constraint_equipment": line["constraint_equipment"],
+            "good_parts": sum(rollup["good_parts"] for rollup in rollups),
+            "total_parts": sum(rollup["total_parts"] for rollup in rollups),
+            "downtime_event_count": sum(rollup["downtime_event_count"] for rollup in rollups),
+            "unplanned_downtime_seconds": sum(rollup["unplanned_downtime_seconds"] for rollup in rollups),
+            "planned_downtime_seconds": sum(rollup["planned_downtime_seconds"] for rollup in rollups),
+            "equipment_oee": line["equipment_oee"]
+        }
+
+    @staticmethod
+    async def store_snapshot(snapshot: Dict[str, Any]) -> bool:
+        """Store a snapshot unless the line's shift is already closed."""
+        inserted = await execute_update("""
+            INSERT INTO factory_telemetry.shift_snapshots (
+                line_id, shift_start, shift_end, shift_id, shift_name, oee,
+                availability, performance, quality, constraint_equipment,
+                good_parts, total_parts, downtime_event_count,
+                unplanned_downtime_seconds, planned_downtime_seconds, equipment_oee
+            ) VALUES (
+                :line_id, :shift_start, :shift_end, :shift_id, :shift_name, :oee,
+                :availability, :performance, :quality, :constraint_equipment,
+                :good_parts, :total_parts, :downtime_event_count,
+                :unplanned_downtime_seconds, :planned_downtime_seconds,
+                CAST(:equipment_oee AS JSONB)
+            )
+            ON CONFLICT (line_id, shift_start) DO NOTHING
+        """, {**snapshot, "equipment_oee": json.dumps(snapshot["equipment_oee"])})
+
+        return inserted > 0
+
+    @staticmethod
+    async def close_due_shifts(as_of: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Close every line's shifts that ended within the lookback window.
+
+        A shift is due once it ended SHIFT_SNAPSHOT_SETTLE_MINUTES ago. Lines
+        that already have a snapshot for a shift are skipped, so reruns and
+        catch-up after an outage close each shift exactly once.
+        """
+        try:
+            as_of = as_of or datetime.utcnow()
+            until = as_of - timedelta(minutes=settings.SHIFT_SNAPSHOT_SETTLE_MINUTES)
+            since = until - timedelta(hours=settings.SHIFT_SNAPSHOT_LOOKBACK_HOURS)
+
+            instances = shift_instances(await ShiftSnapshotService.get_shifts(), since, until)
+            if not instances:
+                return []
+
+            lines = await execute_query("""
+                SELECT id FROM factory_telemetry.production_lines
+                WHERE enabled
+                ORDER BY line_code
+            """)
+            closed = await execute_query("""
+                SELECT line_id, shift_start
+                FROM factory_telemetry.shift_snapshots
+                WHERE shift_start = ANY(CAST(:shift_starts AS TIMESTAMP[]))
+            """, {"shift_starts": [instance["shift_start"] for instance in instances]})
+            closed_keys = {(str(row["line_id"]), row["shift_start"]) for row in closed}
+
+            snapshots = []
+            for instance in instances:
+                for line in lines:
+                    if (str(line["id"]), instance["shift_start"]) in closed_keys:
+                        continue
+
+                    snapshot = await ShiftSnapshotService.compute_snapshot(line["id"], instance, as_of)
+                    if await ShiftSnapshotService.store_snapshot(snapshot):
+                        snapshots.append(snapshot)
+
+            if snapshots:
+                logger.info("Shift snapshots closed", snapshots=len(snapshots), shifts=len(instances))
+
+            return snapshots
+
+        except Exception as e:
+            logger.error("Failed to close shift snapshots", error=str(e))
+            raise BusinessLogicError("Failed to close shift snapshots")
+
+    @staticmethod
+    async def get_snapshot(line_id: UUID, shift_start: datetime) -> Optional[Dict[str, Any]]:
+        """Get the snapshot of a line's shift, None while the shift is not closed."""
+        result = await execute_query(f"""
+            SELECT {SNAPSHOT_COLUMNS}
+            FROM factory_telemetry.shift_snapshots
+            WHERE line_id = :line_id AND shift_start = :shift_start
+        """, {"line_id": line_id, "shift_start": shift_start})
+
+        return ShiftSnapshotService._from_row(result[0]) if result else None
+
+    @staticmethod
+    async def get_line_snapshots(
+        line_id: UUID,
+        start_time: datetime,
+        end_time: datetime,
+        shift_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a line's snapshots of shifts starting in [start_time, end_time), oldest first."""
+        try:
+            conditions = ["line_id = :line_id", "shift_start >= :start_time", "shift_start < :end_time"]
+            params: Dict[str, Any] = {"line_id": line_id, "start_time": start_time, "end_time": end_time}
+            if shift_name:
+                conditions.append("shift_name = :shift_name")
+                params["shift_name"] = shift_name
+
+            result = await execute_query(f"""
+                SELECT {SNAPSHOT_COLUMNS}
+                FROM factory_telemetry.shift_snapshots
+                WHERE {" AND ".join(conditions)}
+                ORDER BY shift_start
+            """, params)
+
+            return [ShiftSnapshotService._from_row(row) for row in result]
+
+        except Exception as e:
+            logger.error("Failed to get shift snapshots", error=str(e), line_id=line_id)
+            raise BusinessLogicError("Failed to get shift snapshots")
+
+    @staticmethod
+    def combine(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combine consecutive shift snapshots into one period summary.
+
+        Parts and downtime are summed; OEE components are weighted by shift
+        length so a short shift does not count as much as a full one.
+        """
+        total_seconds = sum(
+            (snapshot["shift_end"] - snapshot["shift_start"]).total_seconds() for snapshot in snapshots
+        )
+
+        def weighted(component: str) -> float:
+            if not total_seconds:
+                return 0.0
+            return round(sum(
+                snapshot[component] * (snapshot["shift_end"] - snapshot["shift_start"]).total_seconds()
+                for snapshot in snapshots
+            ) / total_seconds, 4)
+
+        return {
+            "shift_count": len(snapshots),
+            "oee": weighted("oee"),
+            "availability": weighted("availability"),
+            "performance": weighted("performance"),
+            "quality": weighted("quality"),
+            "good_parts": sum(snapshot["good_parts"] for snapshot in snapshots),
+            "total_parts": sum(snapshot["total_parts"] for snapshot in snapshots),
+            "downtime_event_count": sum(snapshot["downtime_event_count"] for snapshot in snapshots),
+            "unplanned_downtime_seconds": sum(snapshot["unplanned_downtime_seconds"] for snapshot in snapshots),
+            "planned_downtime_seconds": sum(snapshot["planned_downtime_seconds"] for snapshot in snapshots),
+            "planned_seconds": int(total_seconds)
+        }
+
+    @staticmethod
+    def _from_row(row: Any) -> Dict[str, Any]:
+        """Turn a snapshot row into a dict with decoded equipment OEE."""
+        snapshot = {field: row[field] for field in SNAPSHOT_FIELDS}
+        if isinstance(snapshot["equipment_oee"], str):
+            snapshot["equipment_oee"] = json.loads(snapshot["equipment_oee"])
+        return snapshot
+
+
+class ShiftSnapshotPublisher:
+    """Forwards closed shift snapshots from the database channel to websocket subscribers."""
+
+    def __init__(self, publisher: Optional[SnapshotPublisher] = None):
+        self._publisher = publisher
+        self._listener_connection = None
+        self._tasks: set = set()
+
+        self.stats = {
+            "notifications": 0,
+            "published": 0,
+            "publish_errors": 0
+        }
+
+    async def start(self) -> None:
+        """Subscribe to shift close notifications."""
+        if self._listener_connection is not None:
+            return
+
+        if self._publisher is None:
+            from app.services.real_time_broadcasting_service import broadcast_shift_snapshot
+            self._publisher = broadcast_shift_snapshot
+
+        try:
+            self._listener_connection = await open_notification_connection()
+            await self._listener_connection.add_listener(ShiftSnapshotService.CHANNEL, self._on_notification)
+            logger.info("Shift snapshot publisher listening")
+        except Exception as e:
+            # Clients still get closed shifts from the shift summary endpoints
+            logger.error("Failed to subscribe to shift snapshot notifications", error=str(e))
+            self._listener_connection = None
+
+    async def stop(self) -> None:
+        """Unsubscribe from shift close notifications."""
+        for task in list(self._tasks):
+            task.cancel()
+        self._tasks.clear()
+
+        if self._listener_connection:
+            try:
+                await self._listener_connection.close()
+            except Exception as e:
+                logger.error("Error closing shift snapshot listener", error=str(e))
+            self._listener_connection = None
+
+        logger.info("Shift snapshot publisher stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get publisher statistics."""
+        return {**self.stats, "listening": self._listener_connection is not None}
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        """Publish the snapshot named by a shift_snapshot_closed payload."""
+        self.stats["notifications"] += 1
+        task = asyncio.ensure_future(self._publish(payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, payload: str) -> None:
+        """Load a closed snapshot and push it to the line's subscribers."""
+        try:
+            data = json.loads(payload)
+            snapshot = await ShiftSnapshotService.get_snapshot(
+                UUID(data["line_id"]), datetime.fromisoformat(data["shift_start"])
+            )
+            if snapshot is None or self._publisher is None:
+                return
+
+            # Timestamps and ids as strings for the websocket JSON frames
+            await self._publisher(str(snapshot["line_id"]), json.loads(json.dumps(snapshot, default=str)))
+            self.stats["published"] += 1
+        except Exception as e:
+            self.stats["publish_errors"] += 1
+            logger.error("Failed to publish shift snapshot", error=str(e), payload=payload[:200])
+
+
+# Global publisher instance
+shift_snapshot_publisher = ShiftSnapshotPublisher()
+
+
+async def start_shift_snapshot_publisher() -> None:
+    """Start forwarding closed shift snapshots to websocket subscribers."""
+    await shift_snapshot_publisher.start()
+
+
+async def stop_shift_snapshot_publisher() -> None:
+    """Stop the global shift snapshot publisher."""
+    await shift_snapshot_publisher.stop()
+
+
+def get_shift_snapshot_publisher() -> ShiftSnapshotPublisher:
+    """Get the global shift snapshot publisher."""
+    return shift_snapshot_publisher
@@ -0,0 +1,543 @@
+"""
+MS5.0 Floor Dashboard - Streaming OEE Engine
+
+This module keeps availability, performance and quality for every equipment
+in memory and updates them incrementally from each poll sample. Rolling
+windows are a ring of per-minute buckets with running totals, and shift
+totals reset when the shift changes, so real-time OEE is a constant-time
+read instead of re-querying production data and downtime statistics.
+Changed values are published to websocket clients as they happen.
+
+The telemetry poller owns the engine and writes each equipment's snapshot
+through to a Redis hash; API and Celery processes, which see no poll samples,
+read the shared hash instead of their own empty engine.
+"""
+
+import json
+from collections import deque
+from datetime import datetime, time, timedelta
+from time import monotonic
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+import redis.asyncio as redis
+import structlog
+
+from app.config import settings
+from app.database import execute_query
+from app.services.equipment_registry import DEFAULT_IDEAL_CYCLE_TIME, equipment_registry
+
+logger = structlog.get_logger()
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class OEETotals:
+    """Time and part counters for one window."""
+
+    __slots__ = ("planned_seconds", "run_seconds", "total_parts", "reject_parts")
+
+    def __init__(self):
+        self.planned_seconds = 0.0
+        self.run_seconds = 0.0
+        self.total_parts = 0
+        self.reject_parts = 0
+
+    def add(self, planned_seconds: float, run_seconds: float, parts: int, rejects: int) -> None:
+        """Add a sample's contribution."""
+        self.planned_seconds += planned_seconds
+        self.run_seconds += run_seconds
+        self.total_parts += parts
+        self.reject_parts += rejects
+
+    def subtract(self, other: "OEETotals") -> None:
+        """Remove an expired bucket's contribution."""
+        self.planned_seconds -= other.planned_seconds
+        self.run_seconds -= other.run_seconds
+        self.total_parts -= other.total_parts
+        self.reject_parts -= other.reject_parts
+
+    def to_oee(self, ideal_cycle_time: float) -> Dict[str, Any]:
+        """Derive OEE components from the counters."""
+        planned_seconds = max(0.0, self.planned_seconds)
+        run_seconds = max(0.0, self.run_seconds)
+
+        availability = min(1.0, run_seconds / planned_seconds) if planned_seconds > 0 else 0.0
+        performance = min(1.0, self.total_parts * ideal_cycle_time / run_seconds) if run_seconds > 0 else 0.0
+
+        good_parts = max(0, self.total_parts - self.reject_parts)
+        quality = good_parts / self.total_parts if self.total_parts > 0 else 0.0
+        actual_cycle_time = run_seconds / self.total_parts if self.total_parts > 0 else ideal_cycle_time
+
+        return {
+            "availability": round(availability, 4),
+            "performance": round(performance, 4),
+            "quality": round(quality, 4),
+            "oee": round(availability * performance * quality, 4),
+            "planned_production_time": int(planned_seconds),
+            "actual_production_time": int(run_seconds),
+            "actual_cycle_time": round(actual_cycle_time, 4),
+            "good_parts": good_parts,
+            "total_parts": self.total_parts
+        }
+
+
+class RollingOEEWindow:
+    """Ring of fixed-width buckets with running totals over the whole window."""
+
+    def __init__(self, window_seconds: int, bucket_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.totals = OEETotals()
+        self._buckets: Deque[Tuple[int, OEETotals]] = deque()
+
+    def add(self, ts: datetime, planned_seconds: float, run_seconds: float, parts: int, rejects: int) -> None:
+        """Add a sample to its bucket and expire buckets that left the window."""
+        epoch_seconds = int((ts - _EPOCH).total_seconds())
+        bucket_key = epoch_seconds - epoch_seconds % self.bucket_seconds
+
+        if not self._buckets or self._buckets[-1][0] < bucket_key:
+            self._buckets.append((bucket_key, OEETotals()))
+
+        # Samples for an older bucket (clock skew) are credited to the newest one
+        self._buckets[-1][1].add(planned_seconds, run_seconds, parts, rejects)
+        self.totals.add(planned_seconds, run_seconds, parts, rejects)
+
+        self._expire(bucket_key)
+
+    def _expire(self, newest_key: int) -> None:
+        """Drop buckets older than the window, subtracting them from the totals."""
+        oldest_key = newest_key - self.window_seconds
+        while self._buckets and self._buckets[0][0] <= oldest_key:
+            _, expired = self._buckets.popleft()
+            self.totals.subtract(expired)
+
+
+class EquipmentOEEState:
+    """Streaming OEE state machine for one equipment."""
+
+    def __init__(
+        self,
+        equipment_code: str,
+        line_id: Optional[str],
+        ideal_cycle_time: float,
+        window_seconds: int
+    ):
+        self.equipment_code = equipment_code
+        self.line_id = line_id
+        self.ideal_cycle_time = ideal_cycle_time or DEFAULT_IDEAL_CYCLE_TIME
+
+        self.rolling = RollingOEEWindow(window_seconds)
+        self.shift = OEETotals()
+        self.shift_id: Optional[str] = None
+        self.shift_start: Optional[datetime] = None
+
+        self.last_ts: Optional[datetime] = None
+        self.last_product_count: Optional[int] = None
+        self.last_reject_count: Optional[int] = None
+        self.running = False
+        self.planned_stop = False
+        self.down_since: Optional[datetime] = None
+
+        self.sample_count = 0
+        self.published_values: Optional[Tuple[float, ...]] = None
+        self.published_at: Optional[datetime] = None
+        self.shared_at: Optional[datetime] = None
+
+    def apply(
+        self,
+        metrics: Dict[str, Any],
+        ts: datetime,
+        shift: Tuple[Optional[str], datetime],
+        max_gap_seconds: float
+    ) -> None:
+        """
+        Consume one poll sample.
+
+        The interval since the previous sample is credited with the previous
+        sample's state. Gaps longer than ``max_gap_seconds`` (poller outage)
+        are not credited, and counter resets re-baseline the part counters.
+        """
+        if self.last_ts is not None and ts <= self.last_ts:
+            return
+
+        product_count = self._as_int(metrics.get("product_count"))
+        reject_count = self._as_int(metrics.get("reject_count"))
+
+        if self.last_ts is not None:
+            elapsed = (ts - self.last_ts).total_seconds()
+            if elapsed <= max_gap_seconds:
+                planned_seconds = 0.0 if self.planned_stop else elapsed
+                run_seconds = elapsed if self.running and not self.planned_stop else 0.0
+                parts = self._counter_delta(self.last_product_count, product_count)
+                rejects = min(parts, self._counter_delta(self.last_reject_count, reject_count))
+
+                self.rolling.add(ts, planned_seconds, run_seconds, parts, rejects)
+                self.shift.add(planned_seconds, run_seconds, parts, rejects)
+
+        # The interval ending at a shift boundary still belongs to the previous shift
+        if shift != (self.shift_id, self.shift_start):
+            self.shift_id, self.shift_start = shift
+            self.shift = OEETotals()
+
+        running = bool(metrics.get("running_status"))
+        planned_stop = bool(metrics.get("planned_stop"))
+        if running or planned_stop:
+            self.down_since = None
+        elif self.down_since is None:
+            self.down_since = ts
+
+        self.running = running
+        self.planned_stop = planned_stop
+        self.last_ts = ts
+        if product_count is not None:
+            self.last_product_count = product_count
+        if reject_count is not None:
+            self.last_reject_count = reject_count
+        self.sample_count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the current rolling and shift OEE."""
+        rolling = self.rolling.totals.to_oee(self.ideal_cycle_time)
+        shift = self.shift.to_oee(self.ideal_cycle_time)
+        shift["shift_id"] = self.shift_id
+        shift["shift_start"] = self.shift_start
+
+        is_currently_down = self.down_since is not None
+
+        return {
+            "line_id": self.line_id,
+            "equipment_code": self.equipment_code,
+            "calculation_time": self.last_ts,
+            "availability": rolling["availability"],
+            "performance": rolling["performance"],
+            "quality": rolling["quality"],
+            "oee": rolling["oee"],
+            "ideal_cycle_time": self.ideal_cycle_time,
+            "window_seconds": self.rolling.window_seconds,
+            "rolling": rolling,
+            "shift": shift,
+            "running": self.running,
+            "planned_stop": self.planned_stop,
+            "is_currently_down": is_currently_down,
+            "current_downtime_duration_seconds": (
+                int((self.last_ts - self.down_since).total_seconds()) if is_currently_down else 0
+            )
+        }
+
+    @staticmethod
+    def _counter_delta(previous: Optional[int], current: Optional[int]) -> int:
+        """Increase of a cumulative counter; a decrease means the PLC reset it."""
+        if previous is None or current is None or current < previous:
+            return 0
+        return current - previous
+
+    @staticmethod
+    def _as_int(value: Any) -> Optional[int]:
+        """Coerce a counter value, ignoring missing or malformed readings."""
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+
+OEEPublisher = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class StreamingOEEEngine:
+    """In-memory OEE state for every polled equipment, shared through a Redis hash."""
+
+    REDIS_KEY = "ms5:oee:streaming"
+    # Readers retry an unavailable Redis at most this often instead of on every read
+    RECONNECT_SECONDS = 30
+
+    def __init__(self, publisher: Optional[OEEPublisher] = None):
+        self.window_seconds = settings.STREAMING_OEE_WINDOW_MINUTES * 60
+        self.max_gap_seconds = settings.STREAMING_OEE_MAX_GAP_SECONDS
+        self.publish_interval = settings.STREAMING_OEE_PUBLISH_INTERVAL
+
+        self._states: Dict[str, EquipmentOEEState] = {}
+        # Equipment registry version the states' ideal cycle times were taken from
+        self._registry_version = 0
+        # (start_time, end_time, shift_id) ordered by start_time
+        self._shifts: List[Tuple[time, time, str]] = []
+
+        self._publisher = publisher
+        self.is_loaded = False
+
+        self.redis_client: Optional[redis.Redis] = None
+        self._connect_attempted_at: Optional[float] = None
+
+        self.stats = {
+            "samples": 0,
+            "stale_samples": 0,
+            "publishes": 0,
+            "publish_errors": 0,
+            "shared_writes": 0,
+            "shared_write_errors": 0,
+            "shared_reads": 0
+        }
+
+    async def load(self) -> None:
+        """Load shift definitions; equipment data comes from the equipment registry."""
+        await equipment_registry.ensure_loaded()
+        shift_rows = await execute_query("""
+            SELECT id, start_time, end_time
+            FROM factory_telemetry.production_shifts
+            WHERE enabled
+            ORDER BY start_time
+        """)
+
+        self._shifts = [(row["start_time"], row["end_time"], str(row["id"])) for row in shift_rows]
+
+        self._apply_registry()
+
+        self.is_loaded = True
+        logger.info(
+            "Streaming OEE engine loaded",
+            registry_version=self._registry_version,
+            shifts=len(self._shifts)
+        )
+
+    async def start(self) -> None:
+        """Load reference data, publish to websocket clients and share snapshots through Redis."""
+        await self._connect(force=True)
+
+        try:
+            await self.load()
+        except Exception as e:
+            # Defaults still give usable OEE; reference data is retried on the next start
+            logger.error("Failed to load streaming OEE reference data", error=str(e))
+
+        if self._publisher is None:
+            from app.services.real_time_broadcasting_service import broadcast_oee_update
+            self._publisher = broadcast_oee_update
+
+    async def stop(self) -> None:
+        """Stop publishing; in-memory state is kept for reads."""
+        self._publisher = None
+
+        if self.redis_client:
+            try:
+                await self.redis_client.close()
+            except Exception as e:
+                logger.error("Error closing streaming OEE shared store", error=str(e))
+            self.redis_client = None
+
+        logger.info("Streaming OEE engine stopped")
+
+    async def ingest(self, equipment_code: str, metrics: Dict[str, Any], ts: datetime) -> Dict[str, Any]:
+        """Apply a poll sample and publish the equipment's OEE when it changed."""
+        if equipment_registry.version != self._registry_version:
+            self._apply_registry()
+
+        state = self._states.get(equipment_code)
+        if state is None:
+            line_id = equipment_registry.line_for_equipment(equipment_code)
+            state = EquipmentOEEState(
+                equipment_code,
+                str(line_id) if line_id else None,
+                equipment_registry.ideal_cycle_time(equipment_code),
+                self.window_seconds
+            )
+            self._states[equipment_code] = state
+
+        line_id = metrics.get("production_line_id")
+        if line_id:
+            state.line_id = str(line_id)
+
+        if state.last_ts is not None and ts <= state.last_ts:
+            self.stats["stale_samples"] += 1
+            return state.snapshot()
+
+        state.apply(metrics, ts, self.resolve_shift(ts), self.max_gap_seconds)
+        self.stats["samples"] += 1
+
+        snapshot = state.snapshot()
+        await self._publish_if_changed(state, snapshot, ts)
+        await self._share_if_due(state, snapshot, ts)
+        return snapshot
+
+    def _apply_registry(self) -> None:
+        """Take ideal cycle times from the current equipment registry version."""
+        for state in self._states.values():
+            state.ideal_cycle_time = equipment_registry.ideal_cycle_time(state.equipment_code)
+        self._registry_version = equipment_registry.version
+
+    def get(self, equipment_code: str, max_age_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Get an equipment's OEE, or None if unknown or older than ``max_age_seconds``."""
+        state = self._states.get(equipment_code)
+        if state is None or state.last_ts is None:
+            return None
+
+        if max_age_seconds is not None:
+            age = (datetime.utcnow() - state.last_ts).total_seconds()
+            if age > max_age_seconds:
+                return None
+
+        return state.snapshot()
+
+    async def read(self, equipment_code: str, max_age_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get an equipment's OEE from this process's state, or else from the shared hash.
+
+        Processes that do not ingest poll samples read the snapshot the
+        poller shared; None if it is unknown or older than ``max_age_seconds``.
+        """
+        if equipment_code in self._states:
+            return self.get(equipment_code, max_age_seconds)
+
+        self.stats["shared_reads"] += 1
+        await self._connect()
+        if not self.redis_client:
+            return None
+
+        try:
+            payload = await self.redis_client.hget(self.REDIS_KEY, equipment_code)
+        except Exception as e:
+            logger.warning("Failed to read streaming OEE from Redis", error=str(e))
+            return None
+        if not payload:
+            return None
+
+        snapshot = self._decode(payload)
+        if max_age_seconds is not None:
+            age = (datetime.utcnow() - snapshot["calculation_time"]).total_seconds()
+            if age > max_age_seconds:
+                return None
+        return snapshot
+
+    def get_line(self, line_id: str) -> List[Dict[str, Any]]:
+        """Get the OEE of every equipment on a line."""
+        line_id = str(line_id)
+        return [
+            state.snapshot()
+            for state in self._states.values()
+            if state.line_id == line_id and state.last_ts is not None
+        ]
+
+    def resolve_shift(self, ts: datetime) -> Tuple[Optional[str], datetime]:
+        """
+        Get the (shift_id, shift_start) covering a time.
+
+        Mirrors factory_telemetry.oee_rollup_buckets so streaming shift totals
+        line up with the shift rollups; without shifts the day is the window.
+        """
+        current = ts.time()
+        for start_time, end_time, shift_id in self._shifts:
+            if start_time < end_time:
+                if start_time <= current < end_time:
+                    return shift_id, datetime.combine(ts.date(), start_time)
+            elif current >= start_time:
+                return shift_id, datetime.combine(ts.date(), start_time)
+            elif current < end_time:
+                return shift_id, datetime.combine(ts.date() - timedelta(days=1), start_time)
+
+        return None, datetime.combine(ts.date(), time.min)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get engine statistics."""
+        return {
+            **self.stats,
+            "equipment": len(self._states),
+            "is_loaded": self.is_loaded,
+            "publishing": self._publisher is not None,
+            "shared": self.redis_client is not None
+        }
+
+    async def _publish_if_changed(self, state: EquipmentOEEState, snapshot: Dict[str, Any], ts: datetime) -> None:
+        """Publish when the rounded OEE values changed, at most once per publish interval."""
+        if self._publisher is None or not state.line_id:
+            return
+
+        key = (
+            snapshot["availability"], snapshot["performance"], snapshot["quality"],
+            snapshot["oee"], float(snapshot["is_currently_down"])
+        )
+        if key == state.published_values:
+            return
+        if state.published_at is not None and (ts - state.published_at).total_seconds() < self.publish_interval:
+            return
+
+        try:
+            await self._publisher(state.line_id, snapshot)
+            state.published_values = key
+            state.published_at = ts
+            self.stats["publishes"] += 1
+        except Exception as e:
+            self.stats["publish_errors"] += 1
+            logger.error("Failed to publish streaming OEE", error=str(e), equipment_code=state.equipment_code)
+
+    async def _share_if_due(self, state: EquipmentOEEState, snapshot: Dict[str, Any], ts: datetime) -> None:
+        """Write the snapshot to the shared hash at most once per publish interval."""
+        if self.redis_client is None:
+            return
+        if state.shared_at is not None and (ts - state.shared_at).total_seconds() < self.publish_interval:
+            return
+
+        try:
+            await self.redis_client.hset(self.REDIS_KEY, state.equipment_code, self._encode(snapshot))
+            state.shared_at = ts
+            self.stats["shared_writes"] += 1
+        except Exception as e:
+            self.stats["shared_write_errors"] += 1
+            logger.warning("Failed to share streaming OEE", error=str(e), equipment_code=state.equipment_code)
+
+    async def _connect(self, force: bool = False) -> None:
+        """Connect to Redis, leaving the engine process-local if unavailable."""
+        if self.redis_client or not settings.REDIS_URL:
+            return
+        now = monotonic()
+        if (
+            not force
+            and self._connect_attempted_at is not None
+            and now - self._connect_attempted_at < self.RECONNECT_SECONDS
+        ):
+            return
+        self._connect_attempted_at = now
+        try:
+            self.redis_client = redis.from_url(
+                settings.REDIS_URL,
+                encoding="utf-8",
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5,
+                retry_on_timeout=True
+            )
+            await self.redis_client.ping()
+        except Exception as e:
+            logger.error("Failed to connect streaming OEE engine to Redis", error=str(e))
+            self.redis_client = None
+
+    @staticmethod
+    def _encode(snapshot: Dict[str, Any]) -> str:
+        """Encode a snapshot for the shared hash."""
+        return json.dumps(snapshot, default=str)
+
+    @staticmethod
+    def _decode(payload: str) -> Dict[str, Any]:
+        """Decode a snapshot from the shared hash."""
+        snapshot = json.loads(payload)
+        snapshot["calculation_time"] = datetime.fromisoformat(snapshot["calculation_time"])
+        if snapshot["shift"]["shift_start"]:
+            snapshot["shift"]["shift_start"] = datetime.fromisoformat(snapshot["shift"]["shift_start"])
+        return snapshot
+
+
+# Global engine instance
+streaming_oee_engine = StreamingOEEEngine()
+
+
+async def start_streaming_oee_engine() -> None:
+    """Load the global streaming OEE engine and start publishing."""
+    await streaming_oee_engine.start()
+
+
+async def stop_streaming_oee_engine() -> None:
+    """Stop the global streaming OEE engine."""
+    await streaming_oee_engine.stop()
+
+
+def get_streaming_oee_engine() -> StreamingOEEEngine:
+    """Get the streaming OEE engine instance."""
+    return streaming_oee_engine
@@ -0,0 +1,415 @@
+"""
+MS5.0 Floor Dashboard - Telemetry Export Service
+
+This module streams large ranges of metric history and OEE calculations to
+historians and external analytics tools without buffering them in the API
+process. CSV exports use COPY ... TO STDOUT; Arrow IPC and Parquet exports
+read through a server-side cursor and are written one record batch at a time.
+
+The range is exported in consecutive time windows ordered like the TimescaleDB
+compression settings (segment column, then time descending), so each window
+decompresses only the chunks it covers. Chunks pass through a bounded queue:
+when the client reads slowly the queue fills and the database read pauses.
+"""
+
+import asyncio
+import csv
+import io
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import structlog
+
+from app.config import settings
+from app.database import open_direct_connection
+from app.utils.exceptions import ValidationError
+from app.utils.time_range import to_naive_utc
+
+# Arrow and Parquet exports (if available)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = None
+    pq = None
+
+logger = structlog.get_logger()
+
+
+# Column name -> logical type; ordering matches the SELECT lists below
+EXPORT_DATASETS: Dict[str, Dict[str, Any]] = {
+    "metric_hist": {
+        "select": """
+            SELECT md.equipment_code, md.metric_key, mh.ts,
+                   mh.value_bool, mh.value_int, mh.value_real, mh.value_text
+            FROM factory_telemetry.metric_hist mh
+            JOIN factory_telemetry.metric_def md ON md.id = mh.metric_def_id
+        """,
+        "time_column": "mh.ts",
+        "order_by": "mh.metric_def_id, mh.ts DESC",
+        "filters": {"equipment_code": "md.equipment_code"},
+        "columns": [
+            ("equipment_code", "string"),
+            ("metric_key", "string"),
+            ("ts", "timestamp"),
+            ("value_bool", "bool"),
+            ("value_int", "int64"),
+            ("value_real", "float64"),
+            ("value_text", "string")
+        ]
+    },
+    "oee_calculations": {
+        "select": """
+            SELECT oc.line_id, oc.equipment_code, oc.calculation_time,
+                   oc.availability, oc.performance, oc.quality, oc.oee,
+                   oc.planned_production_time, oc.actual_production_time,
+                   oc.ideal_cycle_time, oc.actual_cycle_time,
+                   oc.good_parts, oc.total_parts
+            FROM factory_telemetry.oee_calculations oc
+        """,
+        "time_column": "oc.calculation_time",
+        "order_by": "oc.line_id, oc.calculation_time DESC",
+        "filters": {"line_id": "oc.line_id", "equipment_code": "oc.equipment_code"},
+        "columns": [
+            ("line_id", "uuid"),
+            ("equipment_code", "string"),
+            ("calculation_time", "timestamp"),
+            ("availability", "float64"),
+            ("performance", "float64"),
+            ("quality", "float64"),
+            ("oee", "float64"),
+            ("planned_production_time", "int64"),
+            ("actual_production_time", "int64"),
+            ("ideal_cycle_time", "float64"),
+            ("actual_cycle_time", "float64"),
+            ("good_parts", "int64"),
+            ("total_parts", "int64")
+        ]
+    }
+}
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes until drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class TelemetryExportService:
+    """Streaming bulk export of time-series tables."""
+
+    _END = object()
+
+    def __init__(self):
+        self._semaphore = asyncio.Semaphore(settings.EXPORT_MAX_CONCURRENT)
+        self.stats = {
+            "exports_started": 0,
+            "exports_completed": 0,
+            "exports_failed": 0,
+            "bytes_sent": 0
+        }
+
+    def validate_request(
+        self,
+        dataset: str,
+        export_format: str,
+        start_time: datetime,
+        end_time: datetime,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Validate an export request before the response starts streaming."""
+        if dataset not in EXPORT_DATASETS:
+            raise ValidationError(
+                f"Unknown export dataset: {dataset}",
+                details={"supported": list(EXPORT_DATASETS)}
+            )
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                f"Unsupported export format: {export_format}",
+                details={"supported": list(EXPORT_FORMATS)}
+            )
+        if export_format != "csv" and not PYARROW_AVAILABLE:
+            raise ValidationError(f"Export format {export_format} requires pyarrow")
+        start_time, end_time = to_naive_utc(start_time), to_naive_utc(end_time)
+        if end_time <= start_time:
+            raise ValidationError("Export end time must be after start time")
+        if end_time - start_time > timedelta(days=settings.EXPORT_MAX_RANGE_DAYS):
+            raise ValidationError(
+                f"Export range cannot exceed {settings.EXPORT_MAX_RANGE_DAYS} days"
+            )
+
+        unknown = set(filters or {}) - set(EXPORT_DATASETS[dataset]["filters"])
+        if unknown:
+            raise ValidationError(f"Unsupported filters for {dataset}: {', '.join(sorted(unknown))}")
+
+    @staticmethod
+    def media_type(export_format: str) -> str:
+        """Get the response media type of an export format."""
+        return EXPORT_FORMATS[export_format]
+
+    async def stream(
+        self,
+        dataset: str,
+        export_format: str,
+        start_time: datetime,
+        end_time: datetime,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream an export as bytes chunks."""
+        # Query parameters may mix naive and offset timestamps; windows are naive UTC
+        start_time, end_time = to_naive_utc(start_time), to_naive_utc(end_time)
+        self.validate_request(dataset, export_format, start_time, end_time, filters)
+        filters = {key: value for key, value in (filters or {}).items() if value is not None}
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.EXPORT_QUEUE_CHUNKS)
+
+        async with self._semaphore:
+            self.stats["exports_started"] += 1
+            producer = asyncio.ensure_future(
+                self._produce(queue, dataset, export_format, start_time, end_time, filters)
+            )
+
+            try:
+                while True:
+                    chunk = await queue.get()
+                    if chunk is self._END:
+                        break
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    self.stats["bytes_sent"] += len(chunk)
+                    yield chunk
+
+                self.stats["exports_completed"] += 1
+                logger.info(
+                    "Export completed",
+                    dataset=dataset,
+                    export_format=export_format,
+                    start_time=start_time,
+                    end_time=end_time
+                )
+
+            except Exception as e:
+                self.stats["exports_failed"] += 1
+                logger.error("Export failed", dataset=dataset, export_format=export_format, error=str(e))
+                raise
+
+            finally:
+                # Client disconnects close the generator early; stop reading from the database
+                if not producer.done():
+                    producer.cancel()
+                    try:
+                        await producer
+                    except (asyncio.CancelledError, Exception):
+                        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get export statistics."""
+        return {**self.stats, "pyarrow_available": PYARROW_AVAILABLE}
+
+    async def _produce(
+        self,
+        queue: asyncio.Queue,
+        dataset: str,
+        export_format: str,
+        start_time: datetime,
+        end_time: datetime,
+        filters: Dict[str, Any]
+    ) -> None:
+        """Read the export from the database into the bounded queue."""
+        connection = None
+        try:
+            connection = await open_direct_connection()
+
+            if export_format == "csv":
+                await self._produce_csv(connection, queue, dataset, start_time, end_time, filters)
+            else:
+                await self._produce_arrow(connection, queue, dataset, export_format, start_time, end_time, filters)
+
+            await queue.put(self._END)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            if connection is not None:
+                await connection.close()
+
+    async def _produce_csv(
+        self,
+        connection,
+        queue: asyncio.Queue,
+        dataset: str,
+        start_time: datetime,
+        end_time: datetime,
+        filters: Dict[str, Any]
+    ) -> None:
+        """Stream CSV with COPY ... TO STDOUT, one time window at a time."""
+        columns = EXPORT_DATASETS[dataset]["columns"]
+        await queue.put(self._csv_header(columns))
+
+        for window_start, window_end in self.iter_windows(start_time, end_time):
+            query, args = self.build_query(dataset, window_start, window_end, filters)
+            # Each chunk is awaited into the bounded queue, pausing COPY while it is full
+            await connection.copy_from_query(query, *args, output=queue.put, format="csv")
+
+    async def _produce_arrow(
+        self,
+        connection,
+        queue: asyncio.Queue,
+        dataset: str,
+        export_format: str,
+        start_time: datetime,
+        end_time: datetime,
+        filters: Dict[str, Any]
+    ) -> None:
+        """Stream Arrow IPC or Parquet through a server-side cursor."""
+        columns = EXPORT_DATASETS[dataset]["columns"]
+        schema = self._arrow_schema(columns)
+        sink = _ChunkSink()
+
+        if export_format == "parquet":
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+
+        batch_rows = settings.EXPORT_BATCH_ROWS
+        try:
+            for window_start, window_end in self.iter_windows(start_time, end_time):
+                query, args = self.build_query(dataset, window_start, window_end, filters)
+
+                async with connection.transaction():
+                    batch: List[Any] = []
+                    async for record in connection.cursor(query, *args, prefetch=batch_rows):
+                        batch.append(record)
+                        if len(batch) >= batch_rows:
+                            await self._write_batch(writer, sink, queue, schema, columns, batch)
+                            batch = []
+                    if batch:
+                        await self._write_batch(writer, sink, queue, schema, columns, batch)
+        finally:
+            writer.close()
+
+        tail = sink.drain()
+        if tail:
+            await queue.put(tail)
+
+    async def _write_batch(self, writer, sink: _ChunkSink, queue: asyncio.Queue, schema, columns, records) -> None:
+        """Write one record batch and hand the encoded bytes to the queue."""
+        arrays = [
+            pa.array(self._column_values(records, index, logical_type), type=schema.field(index).type)
+            for index, (_, logical_type) in enumerate(columns)
+        ]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+        data = sink.drain()
+        if data:
+            await queue.put(data)
+
+    @staticmethod
+    def build_query(
+        dataset: str,
+        window_start: datetime,
+        window_end: datetime,
+        filters: Dict[str, Any]
+    ) -> Tuple[str, List[Any]]:
+        """Build the asyncpg query and arguments for one export window."""
+        definition = EXPORT_DATASETS[dataset]
+        time_column = definition["time_column"]
+
+        conditions = [f"{time_column} >= $1", f"{time_column} < $2"]
+        args: List[Any] = [window_start, window_end]
+
+        for key, column in definition["filters"].items():
+            if key in filters:
+                args.append(filters[key])
+                conditions.append(f"{column} = ${len(args)}")
+
+        query = (
+            f"{definition['select'].strip()}\n"
+            f"WHERE {' AND '.join(conditions)}\n"
+            f"ORDER BY {definition['order_by']}"
+        )
+        return query, args
+
+    @staticmethod
+    def iter_windows(start_time: datetime, end_time: datetime):
+        """Split [start_time, end_time) into consecutive export windows."""
+        window = timedelta(hours=settings.EXPORT_WINDOW_HOURS)
+        window_start = start_time
+        while window_start < end_time:
+            window_end = min(window_start + window, end_time)
+            yield window_start, window_end
+            window_start = window_end
+
+    @staticmethod
+    def _csv_header(columns: List[Tuple[str, str]]) -> bytes:
+        """Encode the CSV header row."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow([name for name, _ in columns])
+        return buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _arrow_schema(columns: List[Tuple[str, str]]):
+        """Build the Arrow schema for a dataset."""
+        types = {
+            "string": pa.string(),
+            "uuid": pa.string(),
+            "timestamp": pa.timestamp("us", tz="UTC"),
+            "bool": pa.bool_(),
+            "int64": pa.int64(),
+            "float64": pa.float64()
+        }
+        return pa.schema([(name, types[logical_type]) for name, logical_type in columns])
+
+    @staticmethod
+    def _column_values(records: List[Any], index: int, logical_type: str) -> List[Any]:
+        """Extract one column from a batch of records."""
+        if logical_type == "uuid":
+            return [str(record[index]) if record[index] is not None else None for record in records]
+        return [record[index] for record in records]
+
+
+# Global export service instance
+telemetry_export_service = TelemetryExportService()
+
+
+def get_telemetry_export_service() -> TelemetryExportService:
+    """Get the global telemetry export service."""
+    return telemetry_export_service
@@ -1,5 +1,10 @@
 """Andon system tasks for MS5.0 Floor Dashboard."""
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
 from app.celery import celery_app
+from app.tasks.async_runner import run_async
+from app.services.andon_feature_store import AndonFeatureStore
 import logging
 logger = logging.getLogger(__name__)
 
@@ -8,3 +13,24 @@ def check_andon_alerts(self):
     """Check for andon alerts and escalate if needed."""
     logger.info("Checking andon alerts")
     return {"status": "success"}
+
+@celery_app.task(bind=True, name="app.tasks.andon_tasks.materialize_andon_features")
+def materialize_andon_features(self, production_line_id: Optional[str] = None) -> Dict[str, Any]:
+    """Rebuild the per-equipment Andon features read by event prediction and predictive maintenance."""
+    try:
+        line_id = UUID(production_line_id) if production_line_id else None
+        equipment_count = run_async(AndonFeatureStore.materialize(line_id))
+
+        result = {
+            "status": "success",
+            "equipment_features": equipment_count,
+            "timestamp": datetime.utcnow().isoformat(),
+            "task_id": self.request.id
+        }
+
+        logger.info("Andon feature materialization completed: %s", result)
+        return result
+
+    except Exception as exc:
+        logger.error("Andon feature materialization failed: %s", exc, exc_info=True)
+        raise self.retry(exc=exc, countdown=300, max_retries=3)
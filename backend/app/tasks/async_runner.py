@@ -0,0 +1,87 @@
+"""
+MS5.0 Floor Dashboard - Celery Async Runner
+
+Celery tasks are synchronous, while the services they call are async. Running
+each coroutine with ``asyncio.run`` creates a new event loop per call, and the
+database pool created on one loop cannot be reused on the next, so every call
+paid for fresh connections. This module keeps one event loop and one database
+pool per worker process and runs task coroutines on it.
+"""
+
+import asyncio
+from typing import Any, Coroutine, Optional, TypeVar
+from celery.signals import worker_process_init, worker_process_shutdown
+import structlog
+
+from app import database
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Get the worker process event loop, creating it on first use."""
+    global _loop
+
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+        logger.info("Celery worker event loop created")
+
+    return _loop
+
+
+async def _ensure_database() -> None:
+    """Initialize the database pool on the worker loop once."""
+    if database.async_session_factory is None:
+        await database.init_db()
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine to completion on the worker loop and its database pool."""
+    loop = get_worker_loop()
+
+    async def runner() -> T:
+        await _ensure_database()
+        return await coro
+
+    return loop.run_until_complete(runner())
+
+
+def shutdown_worker_loop() -> None:
+    """Dispose the database pool and close the worker loop."""
+    global _loop
+
+    if _loop is None or _loop.is_closed():
+        _loop = None
+        return
+
+    try:
+        if database.async_session_factory is not None:
+            _loop.run_until_complete(database.close_db())
+    except Exception as e:
+        logger.error("Failed to close worker database pool", error=str(e))
+    finally:
+        _loop.close()
+        _loop = None
+        logger.info("Celery worker event loop closed")
+
+
+@worker_process_init.connect
+def _on_worker_process_init(**kwargs) -> None:
+    """Drop loop and pool state inherited from the parent across fork."""
+    global _loop
+
+    _loop = None
+    database.async_engine = None
+    database.sync_engine = None
+    database.async_session_factory = None
+
+
+@worker_process_shutdown.connect
+def _on_worker_process_shutdown(**kwargs) -> None:
+    """Release the worker's database connections on exit."""
+    shutdown_worker_loop()
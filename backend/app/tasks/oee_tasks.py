@@ -16,12 +16,18 @@ Tasks:
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from celery import current_task
 from app.celery import celery_app
+from app.tasks.async_runner import run_async
 from app.config import settings
 from app.services.cache_service import CacheService
 from app.services.database_service import DatabaseService
+from app.services.oee_calculator import OEECalculator
+from app.services.line_oee_aggregator import LineOEEAggregator
+from app.services.oee_backfill_service import OEEBackfillService
+from app.services.shift_snapshot_service import ShiftSnapshotService
+from app.database import execute_query
 from app.models.production import ProductionLine
 from app.models.oee import OEEMetrics, OEECalculation
 import structlog
@@ -54,58 +60,23 @@ def calculate_oee_metrics(self, production_line_id: Optional[str] = None) -> Dic
             production_line_id=production_line_id
         )
         
-        if production_line_id:
-            # Calculate for specific line
-            lines = [asyncio.run(_get_production_line(production_line_id))]
-        else:
-            # Calculate for all active lines
-            lines = asyncio.run(_get_active_production_lines())
+        # One loop and pool per worker; lines are computed concurrently and stored in one insert
+        line_results = run_async(_calculate_lines_oee(production_line_id))
         
         calculated_lines = 0
         total_oee_score = 0
         
-        for line in lines:
-            try:
-                # Calculate OEE components
-                oee_data = asyncio.run(_calculate_oee_components(line))
-                
-                # Calculate overall OEE score
-                oee_score = (
-                    oee_data['availability'] * 
-                    oee_data['performance'] * 
-                    oee_data['quality']
-                ) / 10000  # Convert to percentage
-                
-                # Store OEE metrics
-                asyncio.run(_store_oee_metrics(line.id, oee_data, oee_score))
-                
-                # Update cache
-                cache_key = f"oee_metrics:{line.id}"
-                cache_service.set(cache_key, {
-                    **oee_data,
-                    'oee_score': oee_score,
-                    'timestamp': datetime.utcnow().isoformat()
-                }, ttl=300)  # 5 minutes
-                
-                calculated_lines += 1
-                total_oee_score += oee_score
-                
-                logger.info(
-                    "OEE metrics calculated",
-                    line_id=line.id,
-                    oee_score=oee_score,
-                    availability=oee_data['availability'],
-                    performance=oee_data['performance'],
-                    quality=oee_data['quality']
-                )
-                
-            except Exception as e:
-                logger.error(
-                    "Failed to calculate OEE metrics",
-                    line_id=line.id,
-                    error=str(e),
-                    exc_info=True
-                )
+        for line_id, oee_data, oee_score in line_results:
+            # Update cache
+            cache_key = f"oee_metrics:{line_id}"
+            cache_service.set(cache_key, {
+                **oee_data,
+                'oee_score': oee_score,
+                'timestamp': datetime.utcnow().isoformat()
+            }, ttl=300)  # 5 minutes
+            
+            calculated_lines += 1
+            total_oee_score += oee_score
         
         average_oee = total_oee_score / calculated_lines if calculated_lines > 0 else 0
         
@@ -151,7 +122,7 @@ def calculate_line_oee(self, production_line_id: str, time_period: str = "hourly
         )
         
         # Get production line
-        line = asyncio.run(_get_production_line(production_line_id))
+        line = run_async(_get_production_line(production_line_id))
         if not line:
             raise ValueError(f"Production line not found: {production_line_id}")
         
@@ -167,20 +138,20 @@ def calculate_line_oee(self, production_line_id: str, time_period: str = "hourly
             raise ValueError(f"Invalid time period: {time_period}")
         
         # Calculate detailed OEE components
-        oee_components = asyncio.run(_calculate_detailed_oee_components(
+        oee_components = run_async(_calculate_detailed_oee_components(
             line, start_time, end_time
         ))
         
         # Calculate trend analysis
-        trend_data = asyncio.run(_calculate_oee_trends(line.id, time_period))
+        trend_data = run_async(_calculate_oee_trends(line.id, time_period))
         
         # Generate optimization recommendations
-        recommendations = asyncio.run(_generate_oee_recommendations(
+        recommendations = run_async(_generate_oee_recommendations(
             line.id, oee_components
         ))
         
         # Store detailed OEE calculation
-        asyncio.run(_store_detailed_oee_calculation(
+        run_async(_store_detailed_oee_calculation(
             line.id, time_period, oee_components, trend_data, recommendations
         ))
         
@@ -251,7 +222,7 @@ def calculate_oee_analytics(self, time_period: str = "daily") -> Dict[str, Any]:
             raise ValueError(f"Invalid time period: {time_period}")
         
         # Get all active production lines
-        lines = asyncio.run(_get_active_production_lines())
+        lines = run_async(_get_active_production_lines())
         
         analytics_data = {
             "overall_oee": 0,
@@ -269,7 +240,7 @@ def calculate_oee_analytics(self, time_period: str = "daily") -> Dict[str, Any]:
         for line in lines:
             try:
                 # Calculate line analytics
-                line_analytics = asyncio.run(_calculate_line_analytics(
+                line_analytics = run_async(_calculate_line_analytics(
                     line, start_time, end_time
                 ))
                 
@@ -297,10 +268,10 @@ def calculate_oee_analytics(self, time_period: str = "daily") -> Dict[str, Any]:
         )
         
         # Calculate downtime and quality trends
-        analytics_data["downtime_analysis"] = asyncio.run(
+        analytics_data["downtime_analysis"] = run_async(
             _calculate_downtime_analysis(start_time, end_time)
         )
-        analytics_data["quality_trends"] = asyncio.run(
+        analytics_data["quality_trends"] = run_async(
             _calculate_quality_trends(start_time, end_time)
         )
         
@@ -310,7 +281,7 @@ def calculate_oee_analytics(self, time_period: str = "daily") -> Dict[str, Any]:
         )
         
         # Store analytics results
-        asyncio.run(_store_oee_analytics(time_period, analytics_data))
+        run_async(_store_oee_analytics(time_period, analytics_data))
         
         # Update cache
         cache_key = f"oee_analytics:{time_period}"
@@ -365,12 +336,12 @@ def update_oee_trends(self, production_line_id: str) -> Dict[str, Any]:
         for period in trend_periods:
             try:
                 # Calculate trend for this period
-                trend_data = asyncio.run(_calculate_trend_for_period(
+                trend_data = run_async(_calculate_trend_for_period(
                     production_line_id, period
                 ))
                 
                 # Store trend data
-                asyncio.run(_store_oee_trend(production_line_id, period, trend_data))
+                run_async(_store_oee_trend(production_line_id, period, trend_data))
                 
                 # Update cache
                 cache_key = f"oee_trend:{production_line_id}:{period}"
@@ -439,16 +410,16 @@ def generate_oee_report(self, report_type: str, time_period: str, production_lin
         
         # Generate report based on type
         if report_type == "summary":
-            report_data = asyncio.run(_generate_summary_report(time_period, production_line_id))
+            report_data = run_async(_generate_summary_report(time_period, production_line_id))
         elif report_type == "detailed":
-            report_data = asyncio.run(_generate_detailed_report(time_period, production_line_id))
+            report_data = run_async(_generate_detailed_report(time_period, production_line_id))
         elif report_type == "comparison":
-            report_data = asyncio.run(_generate_comparison_report(time_period))
+            report_data = run_async(_generate_comparison_report(time_period))
         else:
             raise ValueError(f"Invalid report type: {report_type}")
         
         # Store report
-        report_id = asyncio.run(_store_oee_report(
+        report_id = run_async(_store_oee_report(
             report_type, time_period, production_line_id, report_data
         ))
         
@@ -484,14 +455,85 @@ def generate_oee_report(self, report_type: str, time_period: str, production_lin
         raise self.retry(exc=exc, countdown=60, max_retries=3)
 
 
+
+@celery_app.task(bind=True, name="app.tasks.oee_tasks.process_oee_backfill_chunks")
+def process_oee_backfill_chunks(self, job_id: str) -> Dict[str, Any]:
+    """
+    Drain chunks of an OEE backfill job.
+    
+    Several copies run in parallel worker processes; each claims chunks until
+    none are left or its time budget is spent, then requeues itself so the
+    job continues within the task time limit.
+    
+    Args:
+        job_id: OEE backfill job ID
+        
+    Returns:
+        Dict containing the chunks and rows this run processed
+    """
+    try:
+        result = run_async(OEEBackfillService.run_worker(job_id))
+        
+        if result["remaining"]:
+            celery_app.send_task(
+                "app.tasks.oee_tasks.process_oee_backfill_chunks",
+                args=[job_id],
+                queue="oee"
+            )
+        
+        logger.info("OEE backfill worker run completed", task_id=self.request.id, **result)
+        return result
+        
+    except Exception as exc:
+        logger.error(
+            "OEE backfill worker failed",
+            job_id=job_id,
+            error=str(exc),
+            exc_info=True
+        )
+        raise self.retry(exc=exc, countdown=60, max_retries=3)
+
+
+@celery_app.task(bind=True, name="app.tasks.oee_tasks.close_shift_snapshots")
+def close_shift_snapshots(self) -> Dict[str, Any]:
+    """
+    Close the shifts that ended since the last run into immutable snapshots.
+    
+    Each line's shift is computed once; reports, dashboards and trend tasks
+    then read the snapshot instead of recomputing it.
+    
+    Returns:
+        Dict containing the number of snapshots closed
+    """
+    try:
+        snapshots = run_async(ShiftSnapshotService.close_due_shifts())
+        
+        result = {
+            "status": "success",
+            "closed_snapshots": len(snapshots),
+            "timestamp": datetime.utcnow().isoformat(),
+            "task_id": self.request.id
+        }
+        
+        logger.info("Shift snapshot close completed", **result)
+        return result
+        
+    except Exception as exc:
+        logger.error("Shift snapshot close failed", error=str(exc), exc_info=True)
+        raise self.retry(exc=exc, countdown=60, max_retries=3)
+
 # Helper functions for OEE calculations and analytics
 
 async def _get_active_production_lines() -> List[ProductionLine]:
     """Get all active production lines."""
     try:
-        # This would query the database for active production lines
-        # For now, return empty list as placeholder
-        return []
+        query = """
+        SELECT id, line_code, name, equipment_codes
+        FROM factory_telemetry.production_lines
+        WHERE enabled = true
+        ORDER BY line_code
+        """
+        return await execute_query(query)
     except Exception as e:
         logger.error("Failed to get active production lines", error=str(e))
         raise
@@ -500,37 +542,98 @@ async def _get_active_production_lines() -> List[ProductionLine]:
 async def _get_production_line(line_id: str) -> ProductionLine:
     """Get specific production line by ID."""
     try:
-        # This would query the database for specific production line
-        # For now, return None as placeholder
-        return None
+        query = """
+        SELECT id, line_code, name, equipment_codes
+        FROM factory_telemetry.production_lines
+        WHERE id = :line_id
+        """
+        result = await execute_query(query, {"line_id": line_id})
+        return result[0] if result else None
     except Exception as e:
         logger.error("Failed to get production line", line_id=line_id, error=str(e))
         raise
 
 
-async def _calculate_oee_components(line: ProductionLine) -> Dict[str, Any]:
-    """Calculate OEE components (Availability, Performance, Quality)."""
+async def _calculate_lines_oee(production_line_id: Optional[str] = None) -> List[Tuple[str, Dict[str, Any], float]]:
+    """
+    Calculate OEE for one or all active lines.
+    
+    Lines are computed concurrently, bounded by OEE_TASK_CONCURRENCY so the
+    worker does not exhaust its database pool, and every equipment
+    calculation is stored with a single bulk insert.
+    """
+    if production_line_id:
+        lines = [await _get_production_line(production_line_id)]
+    else:
+        lines = await _get_active_production_lines()
+    lines = [line for line in lines if line]
+    
+    end_time = datetime.utcnow()
+    start_time = end_time - timedelta(minutes=settings.OEE_TASK_WINDOW_MINUTES)
+    semaphore = asyncio.Semaphore(settings.OEE_TASK_CONCURRENCY)
+    
+    async def calculate(line) -> Dict[str, Any]:
+        async with semaphore:
+            return await _calculate_oee_components(line, start_time, end_time)
+    
+    outcomes = await asyncio.gather(*(calculate(line) for line in lines), return_exceptions=True)
+    
+    line_results = []
+    calculations = []
+    for line, outcome in zip(lines, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error("Failed to calculate OEE metrics", line_id=line.id, error=str(outcome))
+            continue
+        
+        # Constraint-weighted line OEE as a percentage
+        oee_score = outcome['oee_score']
+        
+        line_results.append((str(line.id), outcome, oee_score))
+        calculations.extend(outcome.pop("calculations"))
+        
+        logger.info(
+            "OEE metrics calculated",
+            line_id=line.id,
+            oee_score=oee_score,
+            availability=outcome['availability'],
+            performance=outcome['performance'],
+            quality=outcome['quality']
+        )
+    
+    # Store OEE metrics
+    await _store_oee_metrics(calculations)
+    
+    return line_results
+
+
+async def _calculate_oee_components(line: ProductionLine, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+    """Calculate the constraint-weighted OEE components (Availability, Performance, Quality) of a line."""
     try:
-        # This would calculate actual OEE components from production data
-        # For now, return placeholder values
+        calculations = await OEECalculator.calculate_line_equipment_oee(
+            line.id, start_time, end_time, list(line.equipment_codes or [])
+        )
+        line_oee = LineOEEAggregator.aggregate(line.id, calculations)
+        
         return {
-            "availability": 85.0,  # Percentage
-            "performance": 92.0,   # Percentage
-            "quality": 98.5,       # Percentage
-            "oee_score": 77.1      # Calculated OEE score
+            "availability": round(line_oee["availability"] * 100, 2),  # Percentage
+            "performance": round(line_oee["performance"] * 100, 2),    # Percentage
+            "quality": round(line_oee["quality"] * 100, 2),            # Percentage
+            "oee_score": round(line_oee["oee"] * 100, 2),
+            "constraint_equipment": line_oee["constraint_equipment"],
+            "equipment_count": line_oee["equipment_count"],
+            "calculations": calculations
         }
     except Exception as e:
         logger.error("Failed to calculate OEE components", line_id=line.id, error=str(e))
         raise
 
 
-async def _store_oee_metrics(line_id: str, oee_data: Dict[str, Any], oee_score: float) -> None:
+async def _store_oee_metrics(calculations: List[Dict[str, Any]]) -> None:
     """Store OEE metrics in database."""
     try:
-        # This would store OEE metrics in the database
-        pass
+        await OEECalculator.store_oee_calculations_bulk(calculations)
     except Exception as e:
-        logger.error("Failed to store OEE metrics", line_id=line_id, error=str(e))
+        logger.error("Failed to store OEE metrics", count=len(calculations), error=str(e))
         raise
 
 
@@ -760,15 +863,44 @@ async def _store_oee_analytics(time_period: str, analytics_data: Dict[str, Any])
 
 
 async def _calculate_trend_for_period(line_id: str, period: str) -> Dict[str, Any]:
-    """Calculate trend for a specific period."""
+    """
+    Calculate the OEE trend of a line for a period.
+    
+    Daily and weekly trends read the closed shift snapshots instead of
+    recomputing each shift; the hourly trend reads the hour rollups.
+    """
     try:
-        # This would calculate trend for the specific period
-        # For now, return placeholder values
+        end_time = datetime.utcnow()
+        if period == "hourly":
+            summaries = await OEECalculator.get_bucket_oee_summaries(
+                line_id, end_time - timedelta(hours=24), end_time, "hour"
+            )
+        else:
+            days = 7 if period == "weekly" else 1
+            snapshots = await ShiftSnapshotService.get_line_snapshots(
+                line_id, end_time - timedelta(days=days), end_time
+            )
+            summaries = [
+                {f"average_{component}": snapshot[component]
+                 for component in ("oee", "availability", "performance", "quality")}
+                for snapshot in snapshots
+            ]
+        
+        trends = OEECalculator._compute_trend_statistics(summaries)
+        oee_values = [summary["average_oee"] for summary in summaries]
+        
+        first = oee_values[0] if oee_values else 0
+        average = sum(oee_values) / len(oee_values) if oee_values else 0
+        deviation = _calculate_standard_deviation(oee_values)
+        variation = deviation / average if average else 0
+        
         return {
-            "trend_direction": "improving",
-            "trend_percentage": 3.2,
-            "volatility": "medium",
-            "consistency_score": 78.5
+            "trend_direction": {"up": "improving", "down": "declining"}.get(trends["oee"]["trend"], "stable"),
+            "trend_percentage": round((trends["oee"]["current"] - first) / first * 100, 2) if first else 0.0,
+            "volatility": "low" if variation < 0.05 else "medium" if variation < 0.15 else "high",
+            "consistency_score": round(max(0.0, 1 - variation) * 100, 1),
+            "data_points": len(summaries),
+            "trends": trends
         }
     except Exception as e:
         logger.error("Failed to calculate trend for period", line_id=line_id, period=period, error=str(e))
@@ -14,12 +14,12 @@ Tasks:
 - Production statistics aggregation
 """
 
-import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from celery import current_task
 from app.celery import celery_app
+from app.tasks.async_runner import run_async
 from app.config import settings
 from app.services.cache_service import CacheService
 from app.services.database_service import DatabaseService
@@ -55,22 +55,22 @@ def poll_production_data(self) -> Dict[str, Any]:
         real_time_service = RealTimeIntegrationService()
         
         # Poll data from all active production lines
-        active_lines = asyncio.run(_get_active_production_lines())
+        active_lines = run_async(_get_active_production_lines())
         processed_lines = 0
         total_events = 0
         
         for line in active_lines:
             try:
                 # Poll production data for this line
-                line_data = asyncio.run(_poll_line_data(line))
+                line_data = run_async(_poll_line_data(line))
                 
                 if line_data:
                     # Process production events
-                    events = asyncio.run(_process_production_events(line, line_data))
+                    events = run_async(_process_production_events(line, line_data))
                     total_events += len(events)
                     
                     # Update production metrics
-                    asyncio.run(_update_line_metrics(line, line_data))
+                    run_async(_update_line_metrics(line, line_data))
                     
                     processed_lines += 1
                     
@@ -125,20 +125,20 @@ def update_production_metrics(self, production_line_id: Optional[str] = None) ->
         
         if production_line_id:
             # Update specific line
-            lines = [asyncio.run(_get_production_line(production_line_id))]
+            lines = [run_async(_get_production_line(production_line_id))]
         else:
             # Update all active lines
-            lines = asyncio.run(_get_active_production_lines())
+            lines = run_async(_get_active_production_lines())
         
         updated_lines = 0
         
         for line in lines:
             try:
                 # Calculate current production metrics
-                metrics = asyncio.run(_calculate_production_metrics(line))
+                metrics = run_async(_calculate_production_metrics(line))
                 
                 # Update metrics in database
-                asyncio.run(_store_production_metrics(line.id, metrics))
+                run_async(_store_production_metrics(line.id, metrics))
                 
                 # Update cache
                 cache_key = f"production_metrics:{line.id}"
@@ -204,7 +204,7 @@ def process_production_events(self, events: List[Dict[str, Any]]) -> Dict[str, A
         for event_data in events:
             try:
                 # Process individual event
-                result = asyncio.run(_process_single_event(event_data))
+                result = run_async(_process_single_event(event_data))
                 
                 if result['success']:
                     processed_events += 1
@@ -266,14 +266,14 @@ def update_job_progress(self, job_id: str, progress_data: Dict[str, Any]) -> Dic
         )
         
         # Update job in database
-        updated_job = asyncio.run(_update_job_in_database(job_id, progress_data))
+        updated_job = run_async(_update_job_in_database(job_id, progress_data))
         
         # Update cache
         cache_key = f"job:{job_id}"
         cache_service.set(cache_key, updated_job, ttl=600)  # 10 minutes
         
         # Check for completion or milestone notifications
-        notifications = asyncio.run(_check_job_notifications(updated_job, progress_data))
+        notifications = run_async(_check_job_notifications(updated_job, progress_data))
         
         # Trigger notification tasks if needed
         for notification in notifications:
@@ -328,7 +328,7 @@ def process_downtime_events(self, downtime_events: List[Dict[str, Any]]) -> Dict
         for event in downtime_events:
             try:
                 # Process downtime event
-                result = asyncio.run(_process_downtime_event(event))
+                result = run_async(_process_downtime_event(event))
                 
                 processed_events += 1
                 
@@ -396,7 +396,7 @@ def process_changeover_events(self, changeover_events: List[Dict[str, Any]]) ->
         for event in changeover_events:
             try:
                 # Process changeover event
-                result = asyncio.run(_process_changeover_event(event))
+                result = run_async(_process_changeover_event(event))
                 
                 processed_events += 1
                 
@@ -467,16 +467,16 @@ def update_production_statistics(self, time_period: str = "hourly") -> Dict[str,
             raise ValueError(f"Invalid time period: {time_period}")
         
         # Calculate statistics for all active lines
-        active_lines = asyncio.run(_get_active_production_lines())
+        active_lines = run_async(_get_active_production_lines())
         updated_statistics = 0
         
         for line in active_lines:
             try:
                 # Calculate line statistics
-                statistics = asyncio.run(_calculate_line_statistics(line.id, start_time, end_time))
+                statistics = run_async(_calculate_line_statistics(line.id, start_time, end_time))
                 
                 # Store statistics
-                asyncio.run(_store_production_statistics(line.id, time_period, statistics))
+                run_async(_store_production_statistics(line.id, time_period, statistics))
                 
                 # Update cache
                 cache_key = f"production_statistics:{line.id}:{time_period}"
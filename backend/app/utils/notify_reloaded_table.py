@@ -0,0 +1,163 @@
+"""
+MS5.0 Floor Dashboard - NOTIFY-Reloaded Tables
+
+This module provides the base for in-memory reference tables that are loaded
+from the database once per process and rebuilt when a NOTIFY channel reports
+a change. Processes without a listener (Celery workers) rebuild a table once
+it is older than its refresh interval instead. Every load bumps ``version``
+so consumers holding derived data can tell when to refresh it.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+import structlog
+
+from app.database import open_notification_connection
+
+logger = structlog.get_logger()
+
+
+class NotifyReloadedTable:
+    """
+    Versioned in-memory table reloaded on a NOTIFY channel.
+
+    Subclasses set CHANGE_CHANNEL and TABLE_NAME, implement load() to query
+    and swap in their tables, and call _mark_loaded() once the swap is done.
+    """
+
+    CHANGE_CHANNEL = ""
+    TABLE_NAME = "table"
+
+    def __init__(self, refresh_seconds: float):
+        self.version = 0
+        self.is_loaded = False
+        self.loaded_at: Optional[datetime] = None
+        self.refresh_seconds = refresh_seconds
+
+        self._listener_connection = None
+        self._loading: Optional[asyncio.Future] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self._reload_pending = False
+
+        self.stats = {
+            "reloads": 0,
+            "reload_errors": 0,
+            "notifications": 0
+        }
+
+    async def load(self) -> int:
+        """Load the table from the database, returning its size."""
+        raise NotImplementedError
+
+    async def ensure_loaded(self) -> None:
+        """
+        Load the table on first use, and reload it once it is older than the
+        refresh interval when no change listener keeps it current.
+
+        Concurrent callers share one load. Load failures are logged and the
+        previous (or default) table stays in use.
+        """
+        if self.is_loaded and (self._listener_connection is not None or not self._is_expired()):
+            return
+
+        if self._loading is None or self._loading.done():
+            self._loading = asyncio.ensure_future(self.load())
+
+        try:
+            await asyncio.shield(self._loading)
+        except Exception as e:
+            self.stats["reload_errors"] += 1
+            logger.error("Failed to load in-memory table", table=self.TABLE_NAME, error=str(e))
+
+    async def start(self) -> None:
+        """Load the table and subscribe to change notifications."""
+        if self._listener_connection is not None:
+            return
+
+        try:
+            await self.load()
+        except Exception as e:
+            # Consumers fall back to defaults and ensure_loaded() retries
+            self.stats["reload_errors"] += 1
+            logger.error("Failed to load in-memory table", table=self.TABLE_NAME, error=str(e))
+
+        try:
+            self._listener_connection = await open_notification_connection()
+            await self._listener_connection.add_listener(self.CHANGE_CHANNEL, self._on_change_notification)
+            logger.info("In-memory table listening for changes", table=self.TABLE_NAME)
+        except Exception as e:
+            # Without notifications the table is reloaded on the refresh interval
+            logger.error("Failed to subscribe to table notifications", table=self.TABLE_NAME, error=str(e))
+            self._listener_connection = None
+
+    async def stop(self) -> None:
+        """Unsubscribe from change notifications."""
+        if self._reload_task:
+            self._reload_task.cancel()
+            self._reload_task = None
+
+        if self._listener_connection:
+            try:
+                await self._listener_connection.close()
+            except Exception as e:
+                logger.error("Error closing table listener", table=self.TABLE_NAME, error=str(e))
+            self._listener_connection = None
+
+        logger.info("In-memory table stopped", table=self.TABLE_NAME)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get table statistics."""
+        return {
+            **self.stats,
+            "version": self.version,
+            "is_loaded": self.is_loaded,
+            "listening": self._listener_connection is not None,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None
+        }
+
+    def _mark_loaded(self) -> None:
+        """Record a completed load once the new tables are swapped in."""
+        self.version += 1
+        self.is_loaded = True
+        self.loaded_at = datetime.utcnow()
+        self.stats["reloads"] += 1
+
+    def _is_expired(self) -> bool:
+        """Check whether the table is older than the refresh interval."""
+        if self.loaded_at is None:
+            return True
+        return (datetime.utcnow() - self.loaded_at).total_seconds() >= self.refresh_seconds
+
+    def _on_change_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        """Reload the table when a change is reported."""
+        self.stats["notifications"] += 1
+
+        if self._reload_task and not self._reload_task.done():
+            # Changes committed during a running reload need one more pass
+            self._reload_pending = True
+            return
+        self._reload_task = asyncio.ensure_future(self._reload())
+
+    async def _reload(self) -> None:
+        """Reload until no change notification arrived during the load."""
+        while True:
+            self._reload_pending = False
+            try:
+                await self.load()
+            except Exception as e:
+                self.stats["reload_errors"] += 1
+                logger.error("Failed to reload in-memory table", table=self.TABLE_NAME, error=str(e))
+            if not self._reload_pending:
+                return
+
+    @staticmethod
+    def _json_value(value: Any) -> Optional[Dict[str, Any]]:
+        """Decode a JSONB column returned as text."""
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return None
+        return value
@@ -0,0 +1,96 @@
+"""
+MS5.0 Floor Dashboard - Keyset Pagination
+
+This module builds keyset (seek) pagination for the event and job listings.
+A page is continued from the sort key of the last row returned, e.g.
+(reported_at, id), instead of skipping rows with OFFSET, so a deep page costs
+the same index seek as the first one.
+
+Cursors are opaque to clients: the sort key values are JSON encoded and
+base64url wrapped. Listings sort newest first, so the next page is the rows
+whose key compares below the cursor.
+"""
+
+import base64
+import binascii
+import json
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from app.utils.exceptions import ValidationError
+
+_COLUMN_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+
+_DECODERS: Dict[type, Callable[[Any], Any]] = {
+    datetime: datetime.fromisoformat,
+    UUID: UUID,
+    int: int,
+    str: str
+}
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode sort key values into an opaque cursor token."""
+    payload = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else str(value) for value in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """Decode a cursor token into sort key values of the given types."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor does not match the sort key")
+        return tuple(_DECODERS[value_type](value) for value_type, value in zip(types, values))
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise ValidationError("Invalid pagination cursor", {"cursor": token, "reason": str(e)})
+
+
+def keyset_predicate(
+    columns: Sequence[str],
+    cursor: Optional[str],
+    types: Sequence[type],
+    param_prefix: str = "cursor"
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Build the seek predicate continuing a newest-first listing after ``cursor``.
+
+    Returns the WHERE conditions and their bind parameters, like
+    time_range_predicate(); both are empty for the first page. The listing
+    must ORDER BY the same columns, all DESC, for the predicate to match an
+    index scan.
+    """
+    for column in columns:
+        if not _COLUMN_PATTERN.match(column):
+            raise ValueError(f"Invalid column name: {column!r}")
+
+    if not cursor:
+        return [], {}
+
+    values = decode_cursor(cursor, types)
+    names = [f"{param_prefix}_{index}" for index in range(len(columns))]
+
+    condition = f"({', '.join(columns)}) < ({', '.join(':' + name for name in names)})"
+    return [condition], dict(zip(names, values))
+
+
+def next_cursor(items: Sequence[Any], limit: int, *keys: str) -> Optional[str]:
+    """
+    Get the cursor of the page after ``items``, None when it was the last page.
+
+    ``keys`` name the sort key attributes (or dict keys) of the items in
+    ORDER BY order.
+    """
+    if not items or len(items) < limit:
+        return None
+
+    last = items[-1]
+    if isinstance(last, dict):
+        return encode_cursor(*(last[key] for key in keys))
+    return encode_cursor(*(getattr(last, key) for key in keys))
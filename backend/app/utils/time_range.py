@@ -0,0 +1,109 @@
+"""
+MS5.0 Floor Dashboard - Time Range Predicates
+
+This module builds sargable SQL time-range predicates and time_bucket grouping
+expressions for the analytics queries. Ranges are always half-open
+[start, end) on the raw timestamp column, so predicates can use the time
+indexes instead of filtering on DATE(column). It also normalises timestamps
+that mix the services' naive UTC datetimes with the timezone-aware values
+returned for TIMESTAMPTZ columns.
+"""
+
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+TimeBound = Union[date, datetime]
+
+_COLUMN_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+_BUCKET_PATTERN = re.compile(r"^\d+ (minute|hour|day|week)s?$")
+
+
+def to_utc(value: Any) -> Optional[datetime]:
+    """Normalise a naive (assumed UTC), aware or ISO-format timestamp to an aware UTC datetime."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def to_naive_utc(value: Any) -> Optional[datetime]:
+    """Normalise a naive (assumed UTC), aware or ISO-format timestamp to a naive UTC datetime."""
+    value = to_utc(value)
+    return value.replace(tzinfo=None) if value is not None else None
+
+
+def to_range_start(value: TimeBound) -> datetime:
+    """Convert an inclusive lower bound to a timestamp; dates start at midnight."""
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.min)
+
+
+def to_range_end(value: TimeBound) -> datetime:
+    """
+    Convert an upper bound to an exclusive timestamp.
+
+    Dates are treated as inclusive calendar days, so a date bound becomes
+    midnight of the following day. Datetime bounds are used as given.
+    """
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value + timedelta(days=1), time.min)
+
+
+def day_range(start_date: date, end_date: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """Get the half-open timestamp range covering whole days start_date..end_date."""
+    return to_range_start(start_date), to_range_end(end_date or start_date)
+
+
+def time_range_predicate(
+    column: str,
+    start: Optional[TimeBound] = None,
+    end: Optional[TimeBound] = None,
+    param_prefix: str = "range"
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Build half-open [start, end) predicates on a timestamp column.
+
+    Returns the WHERE conditions and their bind parameters so callers can
+    append them to their own condition lists. Either bound may be omitted.
+    """
+    _validate_column(column)
+
+    conditions: List[str] = []
+    params: Dict[str, Any] = {}
+
+    if start is not None:
+        conditions.append(f"{column} >= :{param_prefix}_start")
+        params[f"{param_prefix}_start"] = to_range_start(start)
+
+    if end is not None:
+        conditions.append(f"{column} < :{param_prefix}_end")
+        params[f"{param_prefix}_end"] = to_range_end(end)
+
+    return conditions, params
+
+
+def time_bucket_expression(column: str, bucket: str = "1 day") -> str:
+    """Build a TimescaleDB time_bucket expression for grouping a timestamp column."""
+    _validate_column(column)
+    if not _BUCKET_PATTERN.match(bucket):
+        raise ValueError(f"Unsupported time bucket width: {bucket!r}")
+    return f"time_bucket(INTERVAL '{bucket}', {column})"
+
+
+def bucket_date(value: Any) -> Any:
+    """Get the calendar date of a daily bucket value returned by time_bucket."""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _validate_column(column: str) -> None:
+    """Reject anything that is not a plain (optionally qualified) column name."""
+    if not _COLUMN_PATTERN.match(column):
+        raise ValueError(f"Invalid time column: {column!r}")
@@ -0,0 +1,123 @@
+"""
+MS5.0 Floor Dashboard - Time Range Query Plan Tests
+
+Regression tests that EXPLAIN the analytics range filters built by
+app.utils.time_range and verify the planner can answer them from the time
+indexes on downtime_events and andon_events.
+
+Sequential scans are disabled for each check, so a predicate that cannot use
+an index (e.g. DATE(start_time) >= :start_date) still shows up as a Seq Scan.
+"""
+
+import json
+import pytest
+from datetime import date, timedelta
+
+import structlog
+from sqlalchemy import text
+
+from app.database import get_db_session, check_timescaledb_extension
+from app.utils.time_range import time_range_predicate
+
+logger = structlog.get_logger()
+
+
+# ============================================================================
+# Test Fixtures and Helpers
+# ============================================================================
+
+@pytest.fixture
+async def ensure_timescaledb():
+    """Ensure TimescaleDB extension is available before running tests."""
+    is_available = await check_timescaledb_extension()
+    if not is_available:
+        pytest.skip("TimescaleDB extension not available")
+    return True
+
+
+async def explain(query: str, params: dict) -> dict:
+    """Get the JSON plan for a query with sequential scans disabled."""
+    async with get_db_session() as session:
+        await session.execute(text("SET LOCAL enable_seqscan = off"))
+        result = await session.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params)
+        plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def collect_nodes(plan: dict) -> list:
+    """Flatten the nodes of a plan tree."""
+    nodes = [plan]
+    for child in plan.get("Plans", []):
+        nodes.extend(collect_nodes(child))
+    return nodes
+
+
+def assert_uses_index(plan: dict, column: str) -> None:
+    """Assert the time column is matched as an index condition, never filtered after a scan."""
+    nodes = collect_nodes(plan)
+    node_types = [node["Node Type"] for node in nodes]
+    assert "Seq Scan" not in node_types, f"Range filter fell back to a Seq Scan: {node_types}"
+    assert any(column in node.get("Index Cond", "") for node in nodes), (
+        f"{column} is not used as an index condition: {node_types}"
+    )
+
+
+# ============================================================================
+# Query Plan Tests
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_downtime_statistics_range_uses_index(ensure_timescaledb):
+    """Test the downtime statistics line + time range filter."""
+    end_date = date.today()
+    conditions, params = time_range_predicate("de.start_time", end_date - timedelta(days=30), end_date)
+    conditions.append("de.line_id = :line_id")
+    params["line_id"] = "00000000-0000-0000-0000-000000000000"
+
+    plan = await explain(
+        f"""
+        SELECT COUNT(*)
+        FROM factory_telemetry.downtime_events de
+        WHERE {" AND ".join(conditions)}
+        """,
+        params
+    )
+
+    assert_uses_index(plan, "start_time")
+
+
+@pytest.mark.asyncio
+async def test_andon_trends_range_uses_index(ensure_timescaledb):
+    """Test the andon trends time range filter."""
+    end_date = date.today()
+    conditions, params = time_range_predicate("reported_at", end_date - timedelta(days=30), end_date)
+
+    plan = await explain(
+        f"""
+        SELECT time_bucket(INTERVAL '1 day', reported_at) as event_date, COUNT(*)
+        FROM factory_telemetry.andon_events
+        WHERE {" AND ".join(conditions)}
+        GROUP BY event_date
+        """,
+        params
+    )
+
+    assert_uses_index(plan, "reported_at")
+
+
+@pytest.mark.asyncio
+async def test_function_wrapped_predicate_cannot_use_index(ensure_timescaledb):
+    """Test that the check detects the DATE(column) form it replaces."""
+    plan = await explain(
+        """
+        SELECT COUNT(*)
+        FROM factory_telemetry.andon_events
+        WHERE DATE(reported_at) >= :start_date
+        """,
+        {"start_date": date.today() - timedelta(days=30)}
+    )
+
+    with pytest.raises(AssertionError):
+        assert_uses_index(plan, "reported_at")
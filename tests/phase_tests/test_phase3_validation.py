@@ -156,11 +156,11 @@ class Phase3ValidationSuite:
         else:
             self.log_test_result("andon_service", "get_andon_analytics_report method exists", False, "Method not found")
         
-        # Test 4: _calculate_response_metrics method exists
-        if self.check_file_contains(file_path, "async def _calculate_response_metrics"):
-            self.log_test_result("andon_service", "_calculate_response_metrics method exists", True)
+        # Test 4: response metrics computed from the analytics window
+        if self.check_file_contains("backend/app/services/andon_analytics.py", "def response_metrics"):
+            self.log_test_result("andon_service", "response_metrics method exists", True)
         else:
-            self.log_test_result("andon_service", "_calculate_response_metrics method exists", False, "Method not found")
+            self.log_test_result("andon_service", "response_metrics method exists", False, "Method not found")
     
     def test_notification_service_completion(self):
         """Test Notification Service Completion."""
@@ -0,0 +1,147 @@
+"""
+MS5.0 Floor Dashboard - Active Andon Index Unit Tests
+
+Tests the in-memory index of open and acknowledged Andon events: loading,
+status transitions, late notifications, load races and PLC duplicate
+suppression without queries.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from backend.app.services.active_andon_index import ActiveAndonIndex
+from backend.app.services.plc_integrated_andon_service import PLCIntegratedAndonService
+
+
+LINE_ID = uuid4()
+
+
+def andon_event(status="open", equipment_code="BP01.PACK.BAG1", event_type="stop", event_id=None):
+    """Build an Andon event row or notification payload."""
+    return {
+        "id": str(event_id or uuid4()), "line_id": str(LINE_ID), "equipment_code": equipment_code,
+        "event_type": event_type, "priority": "high", "description": "Bagger jam",
+        "status": status, "reported_at": datetime(2024, 1, 1, 8, 0, 0)
+    }
+
+
+class TestActiveAndonIndex:
+    """Tests for ActiveAndonIndex."""
+
+    @pytest.fixture
+    async def index(self):
+        """Create an index loaded with one open and one acknowledged event."""
+        index = ActiveAndonIndex()
+        rows = [andon_event(), andon_event("acknowledged", "BP01.FILL.F1", "quality")]
+        with patch(
+            "backend.app.services.active_andon_index.execute_query",
+            AsyncMock(return_value=rows)
+        ):
+            await index.load()
+        return index
+
+    @pytest.mark.asyncio
+    async def test_load_and_lookup(self, index):
+        """Test O(1) lookups by line, equipment and event type."""
+        assert index.has_active(LINE_ID, "BP01.PACK.BAG1", "stop")
+        assert index.has_active(LINE_ID, "BP01.FILL.F1", "quality")
+        assert not index.has_active(LINE_ID, "BP01.PACK.BAG1", "quality")
+        assert not index.has_active(uuid4(), "BP01.PACK.BAG1", "stop")
+        assert len(index.active_events(LINE_ID)) == 2
+
+    def test_status_transitions(self):
+        """Test that acknowledged events stay active and resolved events leave."""
+        index = ActiveAndonIndex()
+        event = andon_event()
+
+        index.apply(event)
+        index.apply({**event, "status": "acknowledged"})
+        assert index.active_events(LINE_ID)[0]["status"] == "acknowledged"
+
+        index.apply({**event, "status": "resolved"})
+        assert not index.has_active(LINE_ID, "BP01.PACK.BAG1", "stop")
+        assert index.active_events() == []
+        assert index._keys == {}
+        assert index._lines == {}
+
+    def test_late_notifications_ignored(self):
+        """Test that notifications older than the indexed state do not reopen events."""
+        index = ActiveAndonIndex()
+        event = andon_event()
+
+        index.apply({**event, "status": "acknowledged"})
+        assert not index.apply(event)
+
+        index.apply({**event, "status": "resolved"})
+        assert not index.apply({**event, "status": "acknowledged"})
+        assert not index.has_active(LINE_ID, "BP01.PACK.BAG1", "stop")
+        assert index.stats["stale_updates"] == 2
+
+    def test_notification_payload(self):
+        """Test applying a NOTIFY payload, including deletions."""
+        index = ActiveAndonIndex()
+        event = {**andon_event(), "reported_at": "2024-01-01T08:00:00"}
+
+        index._on_notification(None, 1, ActiveAndonIndex.CHANNEL, json.dumps(event))
+        assert index.active_events()[0]["reported_at"] == datetime(2024, 1, 1, 8, 0, 0)
+
+        index._on_notification(None, 1, ActiveAndonIndex.CHANNEL, json.dumps({**event, "status": "deleted"}))
+        assert index.active_events() == []
+
+    def test_report_times_naive_utc(self):
+        """Test that aware rows and offset payloads are indexed as naive UTC."""
+        index = ActiveAndonIndex()
+        index.apply({**andon_event(), "reported_at": datetime(2024, 1, 1, 9, 0, 0, tzinfo=timezone.utc)})
+        index._on_notification(None, 1, ActiveAndonIndex.CHANNEL, json.dumps(
+            {**andon_event(equipment_code="BP01.FILL.F1"), "reported_at": "2024-01-01T10:00:00+02:00"}
+        ))
+
+        assert [event["reported_at"] for event in index.active_events()] == [
+            datetime(2024, 1, 1, 8, 0, 0), datetime(2024, 1, 1, 9, 0, 0)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_changes_during_load_are_replayed(self):
+        """Test that a resolve notified while loading is applied to the loaded rows."""
+        index = ActiveAndonIndex()
+        event = andon_event()
+
+        async def query(sql, params=None):
+            index._on_notification(None, 1, ActiveAndonIndex.CHANNEL, json.dumps(
+                {**event, "status": "resolved", "reported_at": None}
+            ))
+            return [event]
+
+        with patch("backend.app.services.active_andon_index.execute_query", side_effect=query):
+            await index.load()
+
+        assert index.active_events() == []
+
+
+class TestPLCDuplicateSuppression:
+    """Tests for PLCIntegratedAndonService._is_duplicate_andon_event."""
+
+    @pytest.mark.asyncio
+    async def test_duplicate_check_without_queries(self):
+        """Test that repeated fault checks are answered from the index."""
+        index = ActiveAndonIndex()
+        index.is_loaded = True
+        index.apply(andon_event())
+        service = PLCIntegratedAndonService()
+
+        with patch("backend.app.services.plc_integrated_andon_service.active_andon_index", index), \
+             patch(
+                 "backend.app.services.active_andon_index.execute_query", AsyncMock()
+             ) as mock_query:
+            duplicates = [
+                await service._is_duplicate_andon_event(LINE_ID, "BP01.PACK.BAG1", "stop")
+                for _ in range(100)
+            ]
+            other = await service._is_duplicate_andon_event(LINE_ID, "BP01.PACK.BAG1", "quality")
+
+        assert all(duplicates)
+        assert not other
+        mock_query.assert_not_awaited()
@@ -0,0 +1,165 @@
+"""
+MS5.0 Floor Dashboard - Andon Analytics Unit Tests
+
+Tests folding the single GROUPING SETS pass into dashboard facets, the
+per-(line, window) cache and its invalidation on Andon event changes.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+from backend.app.services import andon_analytics as analytics_module
+from backend.app.services.andon_analytics import AndonAnalytics, AndonWindow
+
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 8)
+
+
+def facet_row(facet, total=1, resolved=0, critical=0, high=0, recent=0, **values):
+    """Build a WINDOW_QUERY row for one facet."""
+    row = {
+        "facet": facet, "status": None, "priority": None, "event_type": None,
+        "equipment_code": None, "event_date": None, "event_hour": None,
+        "total_events": total, "resolved_events": resolved, "critical_events": critical,
+        "high_priority_events": high, "recent_events": recent,
+        "avg_ack_minutes": None, "min_ack_minutes": None, "max_ack_minutes": None,
+        "avg_res_minutes": None, "min_res_minutes": None, "max_res_minutes": None,
+        "avg_resolution_minutes": None, "avg_duration_minutes": None
+    }
+    row.update(values)
+    return row
+
+
+WINDOW_ROWS = [
+    facet_row("status", 3, 3, recent=2, status="resolved", avg_resolution_minutes=Decimal("42.123")),
+    facet_row("status", 1, status="open", recent=1),
+    facet_row(
+        "priority", 3, 2, high=3, priority="high",
+        avg_ack_minutes=Decimal("4"), min_ack_minutes=Decimal("2"), max_ack_minutes=Decimal("6"),
+        avg_res_minutes=Decimal("30"), min_res_minutes=Decimal("20"), max_res_minutes=Decimal("40")
+    ),
+    facet_row("priority", 1, 1, critical=1, priority="critical",
+              avg_ack_minutes=Decimal("1"), min_ack_minutes=Decimal("1"), max_ack_minutes=Decimal("1")),
+    facet_row("event_type", 4, 3, event_type="stop"),
+    facet_row("equipment", 1, 1, equipment_code="BP01.FILL.F1", avg_duration_minutes=Decimal("10")),
+    facet_row("equipment", 3, 2, equipment_code="BP01.PACK.BAG1", avg_duration_minutes=Decimal("55.556")),
+    facet_row("day", 3, 2, event_date=datetime(2024, 1, 2)),
+    facet_row("day", 1, 1, event_date=datetime(2024, 1, 1)),
+    facet_row("hour", 1, event_hour=Decimal("14")),
+    facet_row("hour", 3, event_hour=Decimal("8"))
+]
+
+
+class TestAndonWindow:
+    """Tests for AndonWindow facets."""
+
+    @pytest.fixture
+    def window(self):
+        """Fold the sample facet rows."""
+        return AndonWindow.from_rows(None, START, END, WINDOW_ROWS, END)
+
+    def test_statistics(self, window):
+        """Test the breakdowns and resolution time of get_andon_statistics."""
+        stats = window.statistics()
+
+        assert stats["total_events"] == 4
+        assert stats["status_breakdown"] == {"resolved": 3, "open": 1}
+        assert stats["priority_breakdown"] == {"high": 3, "critical": 1}
+        assert stats["type_breakdown"] == {"stop": 4}
+        assert stats["average_resolution_minutes"] == 42.12
+        assert window.recent_events == 3
+
+    def test_response_metrics(self, window):
+        """Test response times by priority, skipping priorities without times."""
+        metrics = window.response_metrics()
+
+        assert metrics["acknowledgment_metrics"]["high"] == {"avg_minutes": 4.0, "min_minutes": 2.0, "max_minutes": 6.0}
+        assert list(metrics["resolution_metrics"]) == ["high"]
+        assert metrics["overall_avg_acknowledgment_minutes"] == 2.5
+        assert metrics["overall_avg_resolution_minutes"] == 30.0
+
+    def test_top_equipment_and_trends(self, window):
+        """Test equipment ranking and chronological trend series."""
+        top = window.top_equipment(1)
+        assert top == [{
+            "equipment_code": "BP01.PACK.BAG1", "total_events": 3, "resolved_events": 2,
+            "critical_events": 0, "high_priority_events": 0,
+            "avg_duration_minutes": 55.56, "resolution_rate": 66.67
+        }]
+
+        trends = window.trends()
+        assert [day["date"] for day in trends["daily_data"]] == ["2024-01-01", "2024-01-02"]
+        assert trends["hourly_distribution"] == [{"hour": 8, "event_count": 3}, {"hour": 14, "event_count": 1}]
+        assert trends["trend_analysis"]["direction"] == "increasing"
+
+
+class TestAndonAnalytics:
+    """Tests for AndonAnalytics loading and caching."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        """Start every test with an empty cache."""
+        AndonAnalytics.invalidate()
+        yield
+        AndonAnalytics.invalidate()
+
+    @pytest.mark.asyncio
+    async def test_single_query(self):
+        """Test that every facet is read in one grouping sets query."""
+        line_id = uuid4()
+
+        with patch(
+            "backend.app.services.andon_analytics.execute_query", AsyncMock(return_value=WINDOW_ROWS)
+        ) as mock_query:
+            window = await AndonAnalytics.load(line_id, START, END)
+
+        mock_query.assert_awaited_once()
+        query, params = mock_query.await_args.args
+        assert "GROUPING SETS" in query
+        assert "reported_at >= :range_start AND reported_at < :range_end AND line_id = :line_id" in query
+        assert params["line_id"] == line_id
+        assert params["recent_start"] == datetime(2024, 1, 7)
+        assert window.total_events == 4
+
+    @pytest.mark.asyncio
+    async def test_window_cached_until_event_changes(self):
+        """Test that a line's windows are served from cache until one of its events changes."""
+        line_id, other_line_id = uuid4(), uuid4()
+
+        with patch(
+            "backend.app.services.andon_analytics.execute_query", AsyncMock(return_value=WINDOW_ROWS)
+        ) as mock_query:
+            first = await AndonAnalytics.get_window(line_id, 7)
+            assert await AndonAnalytics.get_window(line_id, 7) is first
+            await AndonAnalytics.get_window(None, 7)
+            await AndonAnalytics.get_window(other_line_id, 7)
+            assert mock_query.await_count == 3
+
+            analytics_module.active_andon_index.apply({
+                "id": str(uuid4()), "line_id": str(line_id), "equipment_code": "BP01.PACK.BAG1",
+                "event_type": "stop", "priority": "high", "description": "Bagger jam",
+                "status": "resolved", "reported_at": None
+            })
+
+            assert await AndonAnalytics.get_window(line_id, 7) is not first
+            await AndonAnalytics.get_window(None, 7)
+            await AndonAnalytics.get_window(other_line_id, 7)
+            assert mock_query.await_count == 5
+
+    @pytest.mark.asyncio
+    async def test_load_racing_invalidation_not_cached(self):
+        """Test that a window loaded across an invalidation is not cached."""
+        line_id = uuid4()
+
+        async def query(sql, params=None):
+            AndonAnalytics.invalidate(line_id)
+            return WINDOW_ROWS
+
+        with patch("backend.app.services.andon_analytics.execute_query", side_effect=query):
+            await AndonAnalytics.get_window(line_id, 7)
+
+        assert AndonAnalytics._cache == {}
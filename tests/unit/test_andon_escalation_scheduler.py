@@ -0,0 +1,201 @@
+"""
+MS5.0 Floor Dashboard - Andon Escalation Scheduler Unit Tests
+
+Tests the escalation deadline heap, timer scheduling from escalation state and
+notifications, and firing when the database claim is won or lost.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from backend.app.services.andon_escalation_monitor import (
+    AndonEscalationMonitor, EscalationTimers, ESCALATE, REMIND
+)
+
+
+NOW = datetime(2024, 1, 1, 8, 0, 0, tzinfo=timezone.utc)
+
+
+class TestEscalationTimers:
+    """Tests for EscalationTimers."""
+
+    def test_deadlines_pop_in_order(self):
+        """Test that timers come due earliest first and only once due."""
+        timers = EscalationTimers()
+        timers.schedule("b", ESCALATE, NOW + timedelta(seconds=30))
+        timers.schedule("a", ESCALATE, NOW + timedelta(seconds=10))
+        timers.schedule("a", REMIND, NOW - timedelta(seconds=5))
+
+        assert timers.next_deadline() == NOW - timedelta(seconds=5)
+        assert timers.pop_due(NOW + timedelta(seconds=10)) == [("a", REMIND), ("a", ESCALATE)]
+        assert timers.pop_due(NOW + timedelta(seconds=10)) == []
+        assert len(timers) == 1
+
+    def test_reschedule_and_cancel(self):
+        """Test that rescheduled and cancelled timers do not fire."""
+        timers = EscalationTimers()
+        timers.schedule("a", ESCALATE, NOW)
+        timers.schedule("a", ESCALATE, NOW + timedelta(minutes=5))
+        timers.schedule("b", ESCALATE, NOW)
+        timers.cancel("b")
+
+        assert timers.pop_due(NOW + timedelta(minutes=1)) == []
+        assert timers.next_deadline() == NOW + timedelta(minutes=5)
+
+    def test_stale_entries_compacted(self):
+        """Test that repeated rescheduling does not grow the heap without bound."""
+        timers = EscalationTimers()
+        for second in range(1000):
+            timers.schedule("a", ESCALATE, NOW + timedelta(seconds=second))
+
+        assert len(timers._heap) < 100
+        assert timers.pop_due(NOW + timedelta(hours=1)) == [("a", ESCALATE)]
+
+
+class TestAndonEscalationMonitor:
+    """Tests for AndonEscalationMonitor scheduling and firing."""
+
+    @pytest.fixture
+    def monitor(self):
+        """Create a monitor with 5 and 10 minute reminder leads."""
+        monitor = AndonEscalationMonitor(sweep_interval_seconds=300)
+        monitor.reminder_minutes = {"active": 5, "acknowledged": 10}
+        return monitor
+
+    def test_schedule_from_state(self, monitor):
+        """Test the escalation and reminder timers derived from due_at."""
+        escalation_id = str(uuid4())
+        due_at = NOW + timedelta(minutes=15)
+
+        monitor._schedule({"id": escalation_id, "status": "active", "due_at": due_at})
+
+        assert monitor.timers._deadlines == {
+            (escalation_id, ESCALATE): due_at,
+            (escalation_id, REMIND): due_at - timedelta(minutes=5)
+        }
+
+        # Acknowledging moves the deadline and the reminder lead
+        resolution_due = NOW + timedelta(minutes=60)
+        monitor._schedule({
+            "id": escalation_id, "status": "acknowledged", "due_at": resolution_due,
+            "last_reminder_sent_at": NOW + timedelta(minutes=10)
+        })
+        assert monitor.timers._deadlines[(escalation_id, REMIND)] == resolution_due - timedelta(minutes=10)
+
+        monitor._schedule({"id": escalation_id, "status": "resolved", "due_at": None})
+        assert len(monitor.timers) == 0
+
+    def test_reminder_not_repeated(self, monitor):
+        """Test that a reminder already sent for the deadline is not rescheduled."""
+        escalation_id = str(uuid4())
+        due_at = NOW + timedelta(minutes=15)
+
+        monitor._schedule({
+            "id": escalation_id, "status": "active", "due_at": due_at,
+            "last_reminder_sent_at": due_at - timedelta(minutes=4)
+        })
+
+        assert list(monitor.timers._deadlines) == [(escalation_id, ESCALATE)]
+
+    def test_rearmed_deadline_not_reminded(self, monitor):
+        """Test that an acknowledged escalation fired at its deadline is due again without a reminder."""
+        escalation_id = str(uuid4())
+        payload = json.dumps({
+            "id": escalation_id, "status": "acknowledged",
+            "due_at": "2024-01-01T08:01:00+00:00", "last_reminder_sent_at": "2024-01-01T07:40:00+00:00",
+            "escalated_at": "2024-01-01T08:00:00+00:00"
+        })
+
+        monitor._on_notification(None, 1, AndonEscalationMonitor.CHANNEL, payload)
+
+        assert monitor.timers._deadlines == {(escalation_id, ESCALATE): NOW + timedelta(minutes=1)}
+
+    def test_notification_payload(self, monitor):
+        """Test scheduling from a NOTIFY payload and waking the loop."""
+        escalation_id = str(uuid4())
+        payload = json.dumps({
+            "id": escalation_id, "status": "active",
+            "due_at": "2024-01-01T08:15:00+00:00", "last_reminder_sent_at": None
+        })
+
+        monitor._on_notification(None, 1, AndonEscalationMonitor.CHANNEL, payload)
+
+        assert monitor.timers.next_deadline() == NOW + timedelta(minutes=10)
+        assert monitor._wakeup.is_set()
+
+    @pytest.mark.asyncio
+    async def test_sweep_replays_changes(self, monitor):
+        """Test that an acknowledgment notified during the sweep query wins."""
+        escalation_id = str(uuid4())
+        row = {"id": escalation_id, "status": "active", "due_at": NOW, "last_reminder_sent_at": None}
+
+        async def query(sql, params=None):
+            monitor._on_notification(None, 1, AndonEscalationMonitor.CHANNEL, json.dumps(
+                {**row, "status": "cancelled", "due_at": None}
+            ))
+            return [row]
+
+        with patch("backend.app.services.andon_escalation_monitor.execute_query", side_effect=query):
+            assert await monitor._sweep() == 1
+
+        assert len(monitor.timers) == 0
+
+    @pytest.mark.asyncio
+    async def test_due_escalation_fired(self, monitor):
+        """Test that a due deadline is fired through the service."""
+        escalation_id = str(uuid4())
+        monitor.timers.schedule(escalation_id, ESCALATE, NOW - timedelta(seconds=1))
+
+        with patch(
+            "backend.app.services.andon_escalation_monitor.AndonEscalationService.fire_escalation",
+            AsyncMock(return_value={"fired_level": 2})
+        ) as mock_fire:
+            await monitor._process_due_timers()
+
+        assert str(mock_fire.await_args.args[0]) == escalation_id
+        assert monitor.stats["escalations_fired"] == 1
+        assert len(monitor.timers) == 0
+
+    @pytest.mark.asyncio
+    async def test_lost_claim_rescheduled(self, monitor):
+        """Test that a deadline the database moved is rescheduled rather than dropped."""
+        escalation_id = str(uuid4())
+        resolution_due = datetime.now(timezone.utc) + timedelta(minutes=60)
+        monitor.timers.schedule(escalation_id, ESCALATE, NOW)
+
+        with patch(
+            "backend.app.services.andon_escalation_monitor.AndonEscalationService.fire_escalation",
+            AsyncMock(return_value=None)
+        ), patch(
+            "backend.app.services.andon_escalation_monitor.execute_query",
+            AsyncMock(return_value=[{
+                "id": escalation_id, "status": "acknowledged",
+                "due_at": resolution_due, "last_reminder_sent_at": None
+            }])
+        ):
+            await monitor._process_due_timers()
+
+        assert monitor.stats["claims_lost"] == 1
+        assert monitor.timers._deadlines[(escalation_id, ESCALATE)] == resolution_due
+
+    @pytest.mark.asyncio
+    async def test_reminder_sent_once_claimed(self, monitor):
+        """Test that only a claimed reminder is sent."""
+        escalation_id = str(uuid4())
+        claimed = {"escalation_id": escalation_id, "status": "active"}
+
+        with patch(
+            "backend.app.services.andon_escalation_monitor.execute_query",
+            AsyncMock(side_effect=[[claimed], []])
+        ), patch.object(
+            monitor, "_send_acknowledgment_reminder", AsyncMock()
+        ) as mock_send:
+            await monitor._send_reminder(escalation_id)
+            await monitor._send_reminder(escalation_id)
+
+        mock_send.assert_awaited_once_with(claimed)
+        assert monitor.stats["reminders_sent"] == 1
+        assert monitor.stats["claims_lost"] == 1
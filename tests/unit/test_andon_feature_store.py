@@ -0,0 +1,216 @@
+"""
+MS5.0 Floor Dashboard - Andon Feature Store Unit Tests
+
+Tests folding Andon events into per-equipment features, combining features
+into event patterns, materializing the trailing feature window, and reading
+a line's features on request.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from backend.app.services.andon_feature_store import AndonFeatureStore
+from backend.app.services.andon_service import AndonService
+
+
+WINDOW_END = datetime(2024, 1, 31)
+WINDOW_START = WINDOW_END - timedelta(days=30)
+
+
+def andon_event(line_id, equipment_code, reported_at, event_type="maintenance",
+                acknowledged_minutes=None, resolved_minutes=None):
+    """Build an andon_events row."""
+    return {
+        "line_id": line_id,
+        "equipment_code": equipment_code,
+        "event_type": event_type,
+        "reported_at": reported_at,
+        "acknowledged_at": reported_at + timedelta(minutes=acknowledged_minutes) if acknowledged_minutes else None,
+        "resolved_at": reported_at + timedelta(minutes=resolved_minutes) if resolved_minutes else None
+    }
+
+
+class TestBuildFeatures:
+    """Tests for AndonFeatureStore.build_features."""
+
+    @pytest.fixture
+    def line_id(self):
+        return uuid4()
+
+    @pytest.fixture
+    def events(self, line_id):
+        """Events of two equipment, the first pair close together."""
+        return [
+            andon_event(line_id, "BP01.PACK.BAG1", datetime(2024, 1, 10, 8, 0), "maintenance", 5, 30),
+            andon_event(line_id, "BP01.FILL.F1", datetime(2024, 1, 10, 8, 10), "quality", 2, 10),
+            andon_event(line_id, "BP01.PACK.BAG1", datetime(2024, 1, 12, 14, 0), "maintenance", 15),
+            andon_event(line_id, "BP01.PACK.BAG1", datetime(2024, 1, 20, 8, 30), "material")
+        ]
+
+    def test_reliability_features(self, line_id, events):
+        """Test MTBF over the window and average repair and acknowledge times."""
+        features = {
+            feature["equipment_code"]: feature
+            for feature in AndonFeatureStore.build_features(line_id, events, WINDOW_START, WINDOW_END, 15)
+        }
+
+        bagger = features["BP01.PACK.BAG1"]
+        assert (bagger["event_count"], bagger["resolved_count"]) == (3, 1)
+        assert bagger["mtbf_minutes"] == 14400.0
+        assert bagger["mttr_minutes"] == 30.0
+        assert bagger["mtta_minutes"] == 10.0
+        assert bagger["first_event_at"] == datetime(2024, 1, 10, 8, 0)
+        assert bagger["last_event_at"] == datetime(2024, 1, 20, 8, 30)
+        assert features["BP01.FILL.F1"]["mtbf_minutes"] == 43200.0
+
+    def test_histograms(self, line_id, events):
+        """Test hourly and event type histograms."""
+        bagger = AndonFeatureStore.build_features(line_id, events, WINDOW_START, WINDOW_END, 15)[0]
+
+        assert bagger["hourly_histogram"][8] == 2
+        assert bagger["hourly_histogram"][14] == 1
+        assert sum(bagger["hourly_histogram"]) == 3
+        assert bagger["event_type_counts"] == {"maintenance": 2, "material": 1}
+
+    def test_cooccurrence_window(self, line_id, events):
+        """Test that only events of other equipment within the window co-occur."""
+        features = {
+            feature["equipment_code"]: feature
+            for feature in AndonFeatureStore.build_features(line_id, events, WINDOW_START, WINDOW_END, 15)
+        }
+        assert features["BP01.PACK.BAG1"]["cooccurrence"] == {"BP01.FILL.F1": 1}
+        assert features["BP01.FILL.F1"]["cooccurrence"] == {"BP01.PACK.BAG1": 1}
+
+        narrow = AndonFeatureStore.build_features(line_id, events, WINDOW_START, WINDOW_END, 5)
+        assert all(feature["cooccurrence"] == {} for feature in narrow)
+
+
+class TestEventPatterns:
+    """Tests for AndonFeatureStore.event_patterns."""
+
+    def test_patterns_from_features(self):
+        """Test combining equipment features into line patterns."""
+        line_id = uuid4()
+        events = [
+            andon_event(line_id, "BP01.PACK.BAG1", datetime(2024, 1, 10, 8, 0)),
+            andon_event(line_id, "BP01.PACK.BAG1", datetime(2024, 1, 11, 8, 0)),
+            andon_event(line_id, "BP01.FILL.F1", datetime(2024, 1, 12, 22, 0), "quality")
+        ]
+        features = AndonFeatureStore.build_features(line_id, events, WINDOW_START, WINDOW_END, 15)
+
+        patterns = AndonFeatureStore.event_patterns(features)
+
+        assert patterns["total_events"] == 3
+        assert patterns["patterns"]["hourly_distribution"] == {8: 2, 22: 1}
+        assert patterns["patterns"]["event_type_distribution"] == {"maintenance": 2, "quality": 1}
+        assert patterns["trends"]["most_problematic_equipment"] == "BP01.PACK.BAG1"
+        assert patterns["trends"]["peak_event_hour"] == 8
+
+    def test_no_features(self):
+        """Test patterns of a line without materialized features."""
+        assert AndonFeatureStore.event_patterns([]) == {"patterns": [], "trends": {}}
+
+
+class TestMaterialize:
+    """Tests for AndonFeatureStore.materialize."""
+
+    @pytest.mark.asyncio
+    async def test_materialize_upserts_and_prunes(self):
+        """Test one upsert for every line's equipment and pruning of stale rows."""
+        first_line, second_line = uuid4(), uuid4()
+        events = [
+            andon_event(first_line, "BP01.PACK.BAG1", datetime(2024, 1, 10, 8, 0)),
+            andon_event(first_line, "BP01.FILL.F1", datetime(2024, 1, 10, 9, 0)),
+            andon_event(second_line, "BP02.PACK.BAG1", datetime(2024, 1, 11, 8, 0))
+        ]
+
+        with patch(
+            "backend.app.services.andon_feature_store.execute_query", AsyncMock(return_value=events)
+        ), patch(
+            "backend.app.services.andon_feature_store.execute_update", AsyncMock(return_value=3)
+        ) as mock_update:
+            assert await AndonFeatureStore.materialize(as_of=WINDOW_END) == 3
+
+        (upsert_query, upsert_params), (delete_query, delete_params), (run_query, run_params) = [
+            call.args for call in mock_update.await_args_list
+        ]
+        assert "ON CONFLICT" in upsert_query
+        assert upsert_params["line_id"] == [first_line, first_line, second_line]
+        assert upsert_params["event_type_counts"][0] == '{"maintenance": 1}'
+        assert "DELETE" in delete_query
+        assert delete_params["window_end"] == WINDOW_END
+        # Every line is marked as covered, including lines without events
+        assert "andon_feature_runs" in run_query
+        assert "WHERE id" not in run_query
+
+    @pytest.mark.asyncio
+    async def test_line_without_events_marked(self):
+        """Test that materializing a line without events still records its run."""
+        line_id = uuid4()
+
+        with patch(
+            "backend.app.services.andon_feature_store.execute_query", AsyncMock(return_value=[])
+        ), patch(
+            "backend.app.services.andon_feature_store.execute_update", AsyncMock(return_value=0)
+        ) as mock_update:
+            assert await AndonFeatureStore.materialize(line_id, as_of=WINDOW_END) == 0
+
+        run_query, run_params = mock_update.await_args_list[-1].args
+        assert "andon_feature_runs" in run_query
+        assert "WHERE id = :line_id" in run_query
+        assert run_params["line_id"] == line_id
+
+    @pytest.mark.asyncio
+    async def test_decoded_features(self):
+        """Test reading features with JSONB columns returned as text."""
+        line_id = uuid4()
+        row = {
+            "line_id": line_id, "equipment_code": "BP01.PACK.BAG1",
+            "window_start": WINDOW_START, "window_end": WINDOW_END,
+            "event_count": 2, "resolved_count": 1,
+            "first_event_at": None, "last_event_at": None,
+            "mtbf_minutes": 21600.0, "mttr_minutes": 12.5, "mtta_minutes": None,
+            "hourly_histogram": "[0, 2]", "event_type_counts": '{"quality": 2}',
+            "cooccurrence": {}, "materialized_at": WINDOW_END
+        }
+
+        with patch(
+            "backend.app.services.andon_feature_store.execute_query", AsyncMock(return_value=[row])
+        ):
+            feature = await AndonFeatureStore.get_equipment_features(line_id, "BP01.PACK.BAG1")
+
+        assert feature["hourly_histogram"] == [0, 2]
+        assert feature["event_type_counts"] == {"quality": 2}
+
+
+class TestLineFeatures:
+    """Tests for reading a line's features from the Andon service."""
+
+    @pytest.mark.asyncio
+    async def test_covered_line_without_events_not_rematerialized(self):
+        """Test that a line covered by a run is not materialized again on request."""
+        line_id = uuid4()
+
+        with patch("backend.app.services.andon_service.AndonFeatureStore") as mock_store:
+            mock_store.get_line_features = AsyncMock(return_value=[])
+            mock_store.is_materialized = AsyncMock(return_value=True)
+            mock_store.materialize = AsyncMock()
+            assert await AndonService._get_line_features(line_id) == []
+
+        mock_store.materialize.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_uncovered_line_materialized(self):
+        """Test that a line no run has covered is materialized on request."""
+        line_id = uuid4()
+        feature = {"equipment_code": "BP01.PACK.BAG1", "event_count": 1}
+
+        with patch("backend.app.services.andon_service.AndonFeatureStore") as mock_store:
+            mock_store.get_line_features = AsyncMock(side_effect=[[], [feature]])
+            mock_store.is_materialized = AsyncMock(return_value=False)
+            mock_store.materialize = AsyncMock(return_value=1)
+            assert await AndonService._get_line_features(line_id) == [feature]
+
+        mock_store.materialize.assert_awaited_once_with(line_id)
@@ -0,0 +1,53 @@
+"""
+MS5.0 Floor Dashboard - Celery Async Runner Unit Tests
+
+Tests that task coroutines share one event loop and database pool per worker
+process.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from backend.app.tasks import async_runner
+
+
+@pytest.fixture
+def worker_process():
+    """Simulate a freshly forked worker process."""
+    async_runner._on_worker_process_init()
+    yield
+    with patch.object(async_runner.database, "close_db", AsyncMock()):
+        async_runner.shutdown_worker_loop()
+    async_runner._on_worker_process_init()
+
+
+class TestAsyncRunner:
+    """Tests for run_async."""
+
+    def test_reuses_loop_and_pool(self, worker_process):
+        """Test that the loop and database pool are created once per process."""
+        async def init_db():
+            async_runner.database.async_session_factory = object()
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        with patch.object(async_runner.database, "init_db", AsyncMock(side_effect=init_db)) as mock_init:
+            first = async_runner.run_async(current_loop())
+            second = async_runner.run_async(current_loop())
+
+        assert first is second
+        assert mock_init.await_count == 1
+
+    def test_shutdown_closes_pool_and_loop(self, worker_process):
+        """Test that worker shutdown disposes the pool and closes the loop."""
+        async_runner.database.async_session_factory = object()
+        loop = async_runner.get_worker_loop()
+
+        with patch.object(async_runner.database, "close_db", AsyncMock()) as mock_close:
+            async_runner.shutdown_worker_loop()
+
+        assert mock_close.await_count == 1
+        assert loop.is_closed()
+        assert async_runner.get_worker_loop() is not loop
@@ -0,0 +1,94 @@
+"""
+MS5.0 Floor Dashboard - Downtime Reason Rules Unit Tests
+
+Tests compiling fault catalogs into bitmask tables, classifying single and
+batched fault masks, and recompiling when the equipment registry reloads.
+"""
+
+import pytest
+
+from backend.app.services.downtime_reason_rules import (
+    CompiledFaultRules, DowntimeReasonRules, fault_mask, reason_code_for_fault_name
+)
+from backend.app.services.equipment_registry import FaultRecord
+
+
+CATALOG = {
+    0: FaultRecord("BP01.PACK.BAG1", 0, "Emergency Stop", "Emergency stop activated", "INTERNAL", "critical"),
+    2: FaultRecord("BP01.PACK.BAG1", 2, "Motor Overload", None, "INTERNAL", "high"),
+    3: FaultRecord("BP01.PACK.BAG1", 3, "Film Break", "Film web broken", "INTERNAL", "high", reason_code="MAT_JAM"),
+    5: FaultRecord("BP01.PACK.BAG1", 5, "Filler Stopped", "Filler not delivering", "UPSTREAM", "critical"),
+    6: FaultRecord("BP01.PACK.BAG1", 6, "Palletiser Full", "Palletiser full", "DOWNSTREAM", "medium")
+}
+
+
+def bits(*indexes, length=8):
+    """Build fault bits with the given bits set."""
+    fault_bits = [False] * length
+    for index in indexes:
+        fault_bits[index] = True
+    return fault_bits
+
+
+class TestCompiledFaultRules:
+    """Tests for CompiledFaultRules."""
+
+    @pytest.fixture
+    def rules(self):
+        """Compile the sample catalog."""
+        return CompiledFaultRules(CATALOG)
+
+    def test_reason_codes(self):
+        """Test reason codes derived from fault names."""
+        assert reason_code_for_fault_name("Main Motor Overload") == "MOTOR_FAIL"
+        assert reason_code_for_fault_name("Safety Gate Open") == "MECH_FAULT"
+        assert fault_mask(bits(0, 3)) == 0b1001
+
+    def test_marker_priority(self, rules):
+        """Test internal faults winning over upstream and downstream faults."""
+        assert rules.classify(fault_mask(bits(2, 5, 6))) == ("MOTOR_FAIL", "Motor Overload", 2)
+        assert rules.classify(fault_mask(bits(3, 2))) == ("MOTOR_FAIL", "Motor Overload", 2)
+        assert rules.classify(fault_mask(bits(3))) == ("MAT_JAM", "Film web broken", 3)
+        assert rules.classify(fault_mask(bits(6, 5))) == ("UPSTREAM_STOP", "Upstream: Filler not delivering", 5)
+        assert rules.classify(fault_mask(bits(6))) == ("DOWNSTREAM_STOP", "Downstream: Palletiser full", 6)
+
+    def test_critical_first_and_unknown_bits(self, rules):
+        """Test critical faults of any marker winning, and bits missing from the catalog."""
+        assert rules.classify(fault_mask(bits(2, 5)), critical_first=True)[0] == "UPSTREAM_STOP"
+        assert rules.classify(fault_mask(bits(7))) is None
+        assert rules.classify(fault_mask(bits(7)), include_unknown=True) == ("MECH_FAULT", "Unknown fault", 7)
+
+    def test_batch(self, rules):
+        """Test that a batch classifies like single calls."""
+        masks = [fault_mask(bits(6)), 0, fault_mask(bits(2, 5)), fault_mask(bits(6))]
+
+        assert rules.classify_batch(masks) == [rules.classify(mask) for mask in masks]
+
+
+class TestDowntimeReasonRules:
+    """Tests for DowntimeReasonRules."""
+
+    def test_recompiled_on_registry_reload(self):
+        """Test that compiled rules follow fault catalog reloads."""
+        class Registry:
+            version = 1
+            catalog = CATALOG
+
+            def fault_catalog(self, equipment_code=None):
+                return self.catalog
+
+        registry = Registry()
+        rules = DowntimeReasonRules(registry)
+
+        assert rules.classify("BP01.PACK.BAG1", bits(3))[0] == "MAT_JAM"
+        assert rules.rules_for("BP01.PACK.BAG1") is rules.rules_for("BP01.PACK.BAG1")
+
+        registry.catalog = {3: FaultRecord("BP01.PACK.BAG1", 3, "Film Break", None, "INTERNAL", "high")}
+        registry.version = 2
+
+        assert rules.classify_batch([
+            ("BP01.PACK.BAG1", bits(3)), ("BP01.PACK.BAG1", bits(2)), ("BP01.FILL.F1", bits(3))
+        ]) == [("MECH_FAULT", "Film Break", 3), None, ("MECH_FAULT", "Film Break", 3)]
+
+        assert rules.stats["invalidations"] == 1
+        assert rules.stats["compilations"] == 3
@@ -0,0 +1,265 @@
+"""
+MS5.0 Floor Dashboard - Downtime State Store Unit Tests
+
+Tests the shared open-downtime state: encoding, write-through to Redis, reads
+from processes that do not own the state, and the tracker detecting from it.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from backend.app.services.downtime_state_store import DowntimeState, DowntimeStateStore
+from backend.app.services.downtime_tracker import DowntimeTracker
+
+
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def make_state(equipment_code="BP01.PACK.BAG1", line_id=None):
+    """Build an open downtime state."""
+    return DowntimeState(
+        event_id=str(uuid4()),
+        line_id=str(line_id or uuid4()),
+        equipment_code=equipment_code,
+        start_time=START,
+        reason_code="MAT_JAM",
+        reason_description="Material jam",
+        category="unplanned",
+        fault_data={"active_faults": [3]},
+        context_data={"speed": 0.0}
+    )
+
+
+class FakeRedis:
+    """Minimal async Redis hash."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.hashes.setdefault(key, {})
+        if field is not None:
+            fields[field] = value
+        fields.update(mapping or {})
+
+    async def delete(self, key):
+        self.hashes.pop(key, None)
+
+    async def hexists(self, key, field):
+        return field in self.hashes.get(key, {})
+
+    async def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+class TestDowntimeState:
+    """Tests for DowntimeState encoding."""
+
+    def test_json_round_trip(self):
+        """Test that a state survives the shared hash encoding."""
+        state = make_state()
+
+        decoded = DowntimeState.from_json(state.to_json())
+
+        assert decoded.to_event() == state.to_event()
+        assert decoded.to_event()["status"] == "open"
+
+    def test_start_time_naive_utc(self):
+        """Test that aware TIMESTAMPTZ rows and naive tracker events share one convention."""
+        row = {
+            "id": uuid4(), "line_id": None, "equipment_code": "BP01.FILL.F1",
+            "start_time": START.replace(tzinfo=timezone.utc), "reason_code": "UNKNOWN",
+            "reason_description": None, "category": "unplanned", "subcategory": None
+        }
+
+        state = DowntimeState.from_row(row)
+
+        assert state.start_time == START
+        assert DowntimeState.from_json(state.to_json()).start_time == START
+        assert (START + timedelta(minutes=1) - state.start_time).total_seconds() == 60
+
+
+class TestDowntimeStateStore:
+    """Tests for DowntimeStateStore."""
+
+    @pytest.mark.asyncio
+    async def test_owner_writes_through(self):
+        """Test that the owning process serves memory and writes through to Redis."""
+        owner, reader = DowntimeStateStore(), DowntimeStateStore()
+        owner.redis_client = reader.redis_client = FakeRedis()
+        owner.is_loaded = True
+        state = make_state()
+
+        await owner.put(state)
+
+        assert await owner.get(state.equipment_code) is state
+        shared = await reader.get(state.equipment_code)
+        assert shared.event_id == state.event_id
+        assert [s.event_id for s in await reader.active(state.line_id)] == [state.event_id]
+        assert await reader.active(uuid4()) == []
+
+        await owner.remove(state.equipment_code)
+        assert await reader.get(state.equipment_code) is None
+
+    @pytest.mark.asyncio
+    async def test_load_falls_back_to_database(self):
+        """Test that without Redis the open downtime_events rows are loaded."""
+        store = DowntimeStateStore()
+        row = {
+            "id": uuid4(), "line_id": uuid4(), "equipment_code": "BP01.FILL.F1",
+            "start_time": START, "reason_code": "UNKNOWN", "reason_description": None,
+            "category": "unplanned", "subcategory": None
+        }
+
+        with patch(
+            "backend.app.services.downtime_state_store.execute_query", AsyncMock(return_value=[row])
+        ) as mock_query:
+            assert await store.load() == 1
+
+        assert "end_time IS NULL" in mock_query.await_args.args[0]
+        assert (await store.get("BP01.FILL.F1")).event_id == str(row["id"])
+
+    @pytest.mark.asyncio
+    async def test_reader_connects_on_first_read(self):
+        """Test that a process that never started the store reads the shared hash."""
+        shared = FakeRedis()
+        state = make_state()
+        await shared.hset(DowntimeStateStore.REDIS_KEY, mapping={
+            state.equipment_code: state.to_json(), DowntimeStateStore.SEEDED_FIELD: START.isoformat()
+        })
+        reader = DowntimeStateStore()
+
+        async def connect(force=False):
+            reader.redis_client = shared
+
+        with patch.object(reader, "_connect", side_effect=connect) as mock_connect, \
+             patch("backend.app.services.downtime_state_store.execute_query", AsyncMock()) as mock_query:
+            assert (await reader.get(state.equipment_code)).event_id == state.event_id
+            assert [s.event_id for s in await reader.active()] == [state.event_id]
+
+        assert mock_connect.await_count == 2
+        mock_query.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_owner_load_seeds_hash_from_database(self):
+        """Test that the owner replaces a stale hash with the open downtime_events rows."""
+        owner = DowntimeStateStore()
+        owner.redis_client = shared = FakeRedis()
+        stale = make_state("BP01.PACK.BAG1")
+        await shared.hset(DowntimeStateStore.REDIS_KEY, stale.equipment_code, stale.to_json())
+        row = {
+            "id": uuid4(), "line_id": uuid4(), "equipment_code": "BP01.FILL.F1",
+            "start_time": START, "reason_code": "UNKNOWN", "reason_description": None,
+            "category": "unplanned", "subcategory": None
+        }
+
+        with patch("backend.app.services.downtime_state_store.execute_query", AsyncMock(return_value=[row])):
+            assert await owner.load() == 1
+
+        fields = shared.hashes[DowntimeStateStore.REDIS_KEY]
+        assert set(fields) == {"BP01.FILL.F1", DowntimeStateStore.SEEDED_FIELD}
+
+        # A hash lost after loading is re-seeded on the next write
+        await shared.delete(DowntimeStateStore.REDIS_KEY)
+        await owner.put(stale)
+        assert set(shared.hashes[DowntimeStateStore.REDIS_KEY]) == {
+            "BP01.FILL.F1", stale.equipment_code, DowntimeStateStore.SEEDED_FIELD
+        }
+
+    @pytest.mark.asyncio
+    async def test_reader_of_unseeded_hash_reads_database(self):
+        """Test that a flushed or never-seeded hash does not hide open downtime_events rows."""
+        reader = DowntimeStateStore()
+        reader.redis_client = FakeRedis()
+        row = {
+            "id": uuid4(), "line_id": uuid4(), "equipment_code": "BP01.FILL.F1",
+            "start_time": START, "reason_code": "UNKNOWN", "reason_description": None,
+            "category": "unplanned", "subcategory": None
+        }
+
+        with patch(
+            "backend.app.services.downtime_state_store.execute_query", AsyncMock(return_value=[row])
+        ) as mock_query:
+            assert (await reader.get("BP01.FILL.F1")).event_id == str(row["id"])
+            assert [s.event_id for s in await reader.active()] == [str(row["id"])]
+
+        assert mock_query.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_unavailable_redis_retried_after_interval(self):
+        """Test that readers do not retry an unavailable Redis on every read."""
+        store = DowntimeStateStore()
+
+        with patch(
+            "backend.app.services.downtime_state_store.redis.from_url", side_effect=Exception("refused")
+        ) as mock_from_url, patch(
+            "backend.app.services.downtime_state_store.execute_query", AsyncMock(return_value=[])
+        ):
+            assert await store.active() == []
+            assert await store.get("BP01.FILL.F1") is None
+            assert mock_from_url.call_count == 1
+
+            store._connect_attempted_at -= store.RECONNECT_SECONDS
+            await store.active()
+            assert mock_from_url.call_count == 2
+
+
+class TestDowntimeTrackerState:
+    """Tests for DowntimeTracker detection against the shared state."""
+
+    @pytest.fixture
+    def tracker(self):
+        """Create a tracker on a private, loaded store."""
+        tracker = DowntimeTracker()
+        tracker.state_store = DowntimeStateStore()
+        tracker.state_store.is_loaded = True
+        return tracker
+
+    @pytest.mark.asyncio
+    async def test_unchanged_sample_not_written(self, tracker):
+        """Test that a stopped sample repeating the open event's data is not written."""
+        state = make_state()
+        await tracker.state_store.put(state)
+
+        with patch.object(tracker, "_extract_fault_data", return_value={"active_faults": [3]}), \
+             patch.object(tracker, "_extract_context_data", return_value={"speed": 0.0}), \
+             patch.object(tracker, "_update_downtime_event_in_db", AsyncMock()) as mock_update:
+            event = await tracker.detect_downtime_event(uuid4(), state.equipment_code, {"running": False})
+            mock_update.assert_not_awaited()
+
+        with patch.object(tracker, "_extract_fault_data", return_value={"active_faults": [3, 7]}), \
+             patch.object(tracker, "_extract_context_data", return_value={"speed": 0.0}), \
+             patch.object(tracker, "_update_downtime_event_in_db", AsyncMock()) as mock_update:
+            await tracker.detect_downtime_event(uuid4(), state.equipment_code, {"running": False})
+            mock_update.assert_awaited_once()
+
+        assert event["id"] is not None
+        assert (await tracker.get_active_downtime_event(state.equipment_code))["fault_data"] == {"active_faults": [3, 7]}
+
+    @pytest.mark.asyncio
+    async def test_running_sample_closes_event(self, tracker):
+        """Test that a running sample closes and forgets the open event."""
+        state = make_state()
+        await tracker.state_store.put(state)
+
+        with patch.object(tracker, "_update_downtime_event_in_db", AsyncMock()) as mock_update, \
+             patch("backend.app.services.downtime_tracker.broadcast_downtime_event", AsyncMock()):
+            event = await tracker.detect_downtime_event(
+                uuid4(), state.equipment_code, {"running": True, "speed": 10.0},
+                timestamp=START + timedelta(minutes=2)
+            )
+
+        assert event["duration_seconds"] == 120
+        assert mock_update.await_args.kwargs["status"] == "closed"
+        assert await tracker.get_active_downtime_events() == []
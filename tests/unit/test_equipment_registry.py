@@ -0,0 +1,155 @@
+"""
+MS5.0 Floor Dashboard - Equipment Registry Unit Tests
+
+Tests loading equipment, line membership and fault catalogs, default
+fallbacks, versioned reloads and their use by the downtime tracker.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from backend.app.services.equipment_registry import (
+    EquipmentRegistry, EquipmentRecord, FaultRecord, DEFAULT_FAULT_CATALOG
+)
+from backend.app.services.downtime_tracker import DowntimeTracker
+from backend.app.services.downtime_reason_rules import DowntimeReasonRules
+
+
+LINE_A = uuid4()
+LINE_B = uuid4()
+
+
+def registry_rows():
+    """Equipment, line and fault catalog rows in load() query order."""
+    equipment_rows = [
+        {"equipment_code": "BP01.PACK.BAG1", "name": "Bagger 1", "enabled": True,
+         "production_line_id": LINE_B, "equipment_type": "packaging", "criticality_level": 4,
+         "ideal_cycle_time": 0.5, "target_speed": 120.0, "oee_targets": '{"oee": 0.8}',
+         "fault_thresholds": None, "andon_settings": {"auto_generate_events": True}},
+        {"equipment_code": "BP01.UTIL.AIR", "name": "Compressor", "enabled": False,
+         "production_line_id": LINE_B, "equipment_type": "utility", "criticality_level": 2,
+         "ideal_cycle_time": None, "target_speed": None, "oee_targets": None,
+         "fault_thresholds": None, "andon_settings": None}
+    ]
+    line_rows = [
+        {"id": LINE_A, "equipment_codes": ["BP01.PACK.BAG1", "BP01.PACK.BAG1.BL"]},
+        {"id": LINE_B, "equipment_codes": []}
+    ]
+    fault_rows = [
+        {"equipment_code": "BP01.PACK.BAG1", "bit_index": 3, "name": "Film Break",
+         "description": None, "marker": "INTERNAL", "severity": "high", "reason_code": None}
+    ]
+    return [equipment_rows, line_rows, fault_rows]
+
+
+class TestEquipmentRegistry:
+    """Tests for EquipmentRegistry."""
+
+    @pytest.fixture
+    async def registry(self):
+        """Create a registry loaded from mocked rows."""
+        registry = EquipmentRegistry()
+        with patch(
+            "backend.app.services.equipment_registry.execute_query",
+            AsyncMock(side_effect=registry_rows())
+        ):
+            await registry.load()
+        return registry
+
+    @pytest.mark.asyncio
+    async def test_load_equipment_records(self, registry):
+        """Test equipment records, line membership and defaults."""
+        record = registry.get_equipment("BP01.PACK.BAG1")
+
+        assert isinstance(record, EquipmentRecord)
+        assert record.ideal_cycle_time == 0.5
+        assert record.oee_targets == {"oee": 0.8}
+        # Line membership wins over equipment_config.production_line_id
+        assert registry.line_for_equipment("BP01.PACK.BAG1") == LINE_A
+        assert registry.line_for_equipment("BP01.UTIL.AIR") == LINE_B
+        assert registry.get_equipment("BP01.UTIL.AIR").enabled is False
+
+        # Equipment on a line without configuration, and unknown equipment
+        assert registry.line_for_equipment("BP01.PACK.BAG1.BL") == LINE_A
+        assert registry.ideal_cycle_time("BP01.PACK.BAG1.BL") == 1.0
+        assert registry.ideal_cycle_time("UNKNOWN") == 1.0
+        assert registry.line_for_equipment("UNKNOWN") is None
+
+    @pytest.mark.asyncio
+    async def test_line_equipment_codes(self, registry):
+        """Test line equipment lookups for known, empty and unknown lines."""
+        assert registry.line_equipment_codes(LINE_A) == ["BP01.PACK.BAG1", "BP01.PACK.BAG1.BL"]
+        assert registry.line_equipment_codes(str(LINE_B)) == []
+        assert registry.line_equipment_codes(uuid4()) is None
+
+    @pytest.mark.asyncio
+    async def test_fault_catalog_falls_back_to_default(self, registry):
+        """Test per-equipment fault catalogs and the default catalog."""
+        fault = registry.get_fault("BP01.PACK.BAG1", 3)
+
+        assert isinstance(fault, FaultRecord)
+        assert fault.to_dict() == {
+            "bit_index": 3, "name": "Film Break", "description": "Film Break",
+            "marker": "INTERNAL", "severity": "high"
+        }
+        assert registry.get_fault("BP01.PACK.BAG1", 0) is None
+        assert registry.fault_catalog("BP01.UTIL.AIR") is DEFAULT_FAULT_CATALOG
+        assert registry.get_fault(None, 0).severity == "critical"
+
+    @pytest.mark.asyncio
+    async def test_ensure_loaded_reloads_when_expired(self, registry):
+        """Test that a registry without a listener reloads after the refresh interval."""
+        with patch(
+            "backend.app.services.equipment_registry.execute_query",
+            AsyncMock(side_effect=registry_rows())
+        ) as mock_query:
+            await registry.ensure_loaded()
+            assert mock_query.await_count == 0
+
+            registry.loaded_at = datetime.utcnow() - timedelta(seconds=registry.refresh_seconds)
+            await registry.ensure_loaded()
+
+        assert mock_query.await_count == 3
+        assert registry.version == 2
+
+    @pytest.mark.asyncio
+    async def test_ensure_loaded_keeps_registry_on_error(self):
+        """Test that a failed load leaves the defaults in place."""
+        registry = EquipmentRegistry()
+        with patch(
+            "backend.app.services.equipment_registry.execute_query",
+            AsyncMock(side_effect=RuntimeError("connection refused"))
+        ):
+            await registry.ensure_loaded()
+
+        assert registry.is_loaded is False
+        assert registry.stats["reload_errors"] == 1
+        assert registry.get_fault("BP01.PACK.BAG1", 0) is DEFAULT_FAULT_CATALOG[0]
+
+    @pytest.mark.asyncio
+    async def test_change_notification_reloads(self, registry):
+        """Test that a change notification reloads and bumps the version."""
+        with patch(
+            "backend.app.services.equipment_registry.execute_query",
+            AsyncMock(side_effect=registry_rows())
+        ):
+            registry._on_change_notification(None, 1, registry.CHANGE_CHANNEL, "fault_catalog")
+            await registry._reload_task
+
+        assert registry.version == 2
+        assert registry.stats["notifications"] == 1
+
+    @pytest.mark.asyncio
+    async def test_downtime_reason_uses_equipment_catalog(self, registry):
+        """Test that the downtime tracker resolves fault bits per equipment."""
+        tracker = DowntimeTracker()
+        fault_bits = [False] * 8
+        fault_bits[3] = True
+
+        with patch("backend.app.services.downtime_tracker.downtime_reason_rules", DowntimeReasonRules(registry)):
+            reason = await tracker._determine_downtime_reason("BP01.PACK.BAG1", {"fault_bits": fault_bits})
+
+        assert reason[1] == "Film Break"
+        assert reason[2] == "unplanned"
@@ -0,0 +1,146 @@
+"""
+MS5.0 Floor Dashboard - Line OEE Aggregator Unit Tests
+
+Tests constraint-weighted line OEE aggregation and the batched line
+calculation shared by the dashboard, reports and OEE tasks.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from backend.app.services.line_oee_aggregator import LineOEEAggregator
+from backend.app.services.oee_calculator import OEECalculator
+from backend.app.services.equipment_registry import EquipmentRegistry, EquipmentRecord
+
+
+def equipment(code, oee, ideal_cycle_time=1.0, availability=0.9, performance=0.9, quality=0.9):
+    """Build a per-equipment OEE entry."""
+    return {
+        "equipment_code": code, "oee": oee, "ideal_cycle_time": ideal_cycle_time,
+        "availability": availability, "performance": performance, "quality": quality
+    }
+
+
+class TestLineOEEAggregator:
+    """Tests for LineOEEAggregator.aggregate."""
+
+    def test_identical_equipment_read_as_one(self):
+        """Test that a line of identical machines has their OEE."""
+        line = LineOEEAggregator.aggregate(uuid4(), [
+            equipment("BP01.PACK.BAG1", 0.729), equipment("BP01.PACK.BAG1.BL", 0.729)
+        ])
+
+        assert line["oee"] == 0.729
+        assert line["availability"] == 0.9
+        assert [entry["line_weight"] for entry in line["equipment_oee"]] == [0.5, 0.5]
+
+    def test_constraint_dominates(self):
+        """Test that the slowest machine per good part carries the most weight."""
+        line = LineOEEAggregator.aggregate(uuid4(), [
+            equipment("BP01.FILL.F1", 0.8, ideal_cycle_time=1.0, availability=1.0),
+            equipment("BP01.PACK.BAG1", 0.5, ideal_cycle_time=2.0, availability=0.5)
+        ])
+
+        # Effective cycle times 1.25s and 4s per good part
+        assert line["constraint_equipment"] == "BP01.PACK.BAG1"
+        assert line["constraint_oee"] == 0.5
+        availability = (1.25 * 1.0 + 4.0 * 0.5) / 5.25
+        assert line["availability"] == round(availability, 4)
+        # Line OEE is the product of the weighted components it reports
+        assert line["oee"] == round(availability * 0.9 * 0.9, 4)
+
+    def test_idle_equipment_not_the_constraint(self):
+        """Test that equipment without production or planned time carry no weight."""
+        line = LineOEEAggregator.aggregate(uuid4(), [
+            {**equipment("BP01.FILL.F1", 0.729), "total_parts": 100, "planned_production_time": 3600},
+            {**equipment("BP01.PACK.BAG1.BL", 0.0, availability=0.0, performance=0.0),
+             "total_parts": 0, "planned_production_time": 3600},
+            equipment("BP01.PACK.BAG1", 0.0, availability=0.0)
+        ])
+
+        assert line["oee"] == 0.729
+        assert line["constraint_equipment"] == "BP01.FILL.F1"
+        assert [entry["line_weight"] for entry in line["equipment_oee"]] == [1.0, 0.0, 0.0]
+        assert [entry["idle"] for entry in line["equipment_oee"]] == [False, True, True]
+
+    def test_producing_equipment_without_oee_is_the_constraint(self):
+        """Test that equipment rejecting every part take the whole weight and zero the line."""
+        line = LineOEEAggregator.aggregate(uuid4(), [
+            {**equipment("BP01.FILL.F1", 0.729), "total_parts": 100, "planned_production_time": 3600},
+            {**equipment("BP01.PACK.BAG1", 0.0, quality=0.0), "total_parts": 50, "planned_production_time": 3600}
+        ])
+
+        assert line["oee"] == 0.0
+        assert line["quality"] == 0.0
+        assert line["constraint_equipment"] == "BP01.PACK.BAG1"
+
+    def test_idle_line(self):
+        """Test a line where no equipment produced."""
+        line = LineOEEAggregator.aggregate(uuid4(), [
+            {**equipment("BP01.PACK.BAG1", 0.0), "total_parts": 0, "planned_production_time": 3600}
+        ])
+
+        assert line["oee"] == 0
+        assert line["constraint_equipment"] is None
+        assert line["equipment_count"] == 1
+
+    def test_empty_line(self):
+        """Test a line without equipment OEE."""
+        line = LineOEEAggregator.aggregate(uuid4(), [])
+
+        assert line["oee"] == 0
+        assert line["constraint_equipment"] is None
+        assert line["equipment_count"] == 0
+
+    def test_ideal_cycle_time_from_registry(self):
+        """Test that entries without an ideal cycle time use the equipment registry."""
+        registry = EquipmentRegistry()
+        registry._equipment = {"BP01.PACK.BAG1": EquipmentRecord("BP01.PACK.BAG1", ideal_cycle_time=3.0)}
+
+        with patch("backend.app.services.line_oee_aggregator.equipment_registry", registry):
+            line = LineOEEAggregator.aggregate(uuid4(), [
+                {"equipment_code": "BP01.PACK.BAG1", "oee": 0.5,
+                 "availability": 0.5, "performance": 1.0, "quality": 1.0},
+                {"equipment_code": "BP01.FILL.F1", "oee": 0.5,
+                 "availability": 1.0, "performance": 0.5, "quality": 1.0}
+            ])
+
+        assert line["constraint_equipment"] == "BP01.PACK.BAG1"
+        assert [entry["line_weight"] for entry in line["equipment_oee"]] == [0.75, 0.25]
+
+
+class TestLineOEECalculation:
+    """Tests for OEECalculator.calculate_line_oee."""
+
+    @pytest.mark.asyncio
+    async def test_line_loaded_with_one_query(self):
+        """Test that every equipment on the line is loaded with a single query."""
+        line_id = uuid4()
+        end_time = datetime(2024, 1, 1, 9, 0, 0)
+        start_time = end_time - timedelta(hours=1)
+        equipment_codes = ["BP01.FILL.F1", "BP01.PACK.BAG1", "BP01.PACK.BAG1.BL"]
+        rows = [
+            {"idx": index, "downtime_seconds": 360 * index, "good_parts": 90,
+             "total_parts": 100, "avg_cycle_time": 1.0}
+            for index in range(1, 4)
+        ]
+
+        registry = EquipmentRegistry()
+        registry.is_loaded = True
+        registry.loaded_at = datetime.utcnow()
+        registry._line_equipment = {str(line_id): equipment_codes}
+
+        with patch("backend.app.services.oee_calculator.equipment_registry", registry), \
+             patch(
+                 "backend.app.services.oee_calculator.execute_query",
+                 AsyncMock(return_value=rows)
+             ) as mock_query:
+            line = await OEECalculator.calculate_line_oee(line_id, start_time, end_time)
+
+        assert mock_query.await_count == 1
+        assert line["equipment_count"] == 3
+        assert line["constraint_equipment"] == "BP01.PACK.BAG1.BL"
+        assert [entry["availability"] for entry in line["equipment_oee"]] == [0.9, 0.8, 0.7]
+        assert line["end_time"] == end_time
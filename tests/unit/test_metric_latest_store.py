@@ -0,0 +1,164 @@
+"""
+MS5.0 Floor Dashboard - Metric Latest Store Unit Tests
+
+Tests the in-memory latest-value mirror: slot loading, poller and NOTIFY
+updates, stale sample rejection and equipment snapshots. Loaded rows carry
+aware TIMESTAMPTZ values while the poller writes naive UTC sample times.
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from backend.app.services.metric_latest_store import MetricLatestStore
+
+
+class TestMetricLatestStore:
+    """Tests for MetricLatestStore."""
+
+    @pytest.fixture
+    def metric_rows(self):
+        """Provide metric_def LEFT JOIN metric_latest rows."""
+        ts = datetime(2024, 1, 1, 8, 0, 0, tzinfo=timezone.utc)
+        return [
+            {
+                "metric_def_id": uuid4(), "equipment_code": "BP01.PACK.BAG1",
+                "metric_key": "running_status", "ts": ts, "value_bool": True,
+                "value_int": None, "value_real": None, "value_text": None, "value_json": None
+            },
+            {
+                "metric_def_id": uuid4(), "equipment_code": "BP01.PACK.BAG1",
+                "metric_key": "speed_real", "ts": ts, "value_bool": None,
+                "value_int": None, "value_real": 42.5, "value_text": None, "value_json": None
+            },
+            {
+                "metric_def_id": uuid4(), "equipment_code": "BP01.PACK.BAG1.BL",
+                "metric_key": "product_count", "ts": None, "value_bool": None,
+                "value_int": None, "value_real": None, "value_text": None, "value_json": None
+            }
+        ]
+
+    @pytest.fixture
+    async def store(self, metric_rows):
+        """Create a loaded MetricLatestStore."""
+        store = MetricLatestStore()
+        with patch(
+            "backend.app.services.metric_latest_store.execute_query",
+            AsyncMock(return_value=metric_rows)
+        ):
+            await store.load()
+        return store
+
+    @pytest.mark.asyncio
+    async def test_load_builds_equipment_index(self, store):
+        """Test loading metric definitions and current values."""
+        latest = store.get_equipment_latest("BP01.PACK.BAG1")
+
+        assert latest["running_status"] is True
+        assert latest["speed_real"] == 42.5
+        assert latest["timestamp"] == datetime(2024, 1, 1, 8, 0, 0, tzinfo=timezone.utc)
+        assert store.get_equipment_latest("BP01.PACK.BAG1.BL")["product_count"] is None
+        assert store.get_equipment_latest("UNKNOWN") == {}
+
+    @pytest.mark.asyncio
+    async def test_update_rejects_stale_samples(self, store, metric_rows):
+        """Test that older samples do not overwrite newer values."""
+        metric_def_id = metric_rows[1]["metric_def_id"]
+        newer = datetime(2024, 1, 1, 8, 0, 5)
+
+        assert store.update(metric_def_id, newer, 50.0) is True
+        assert store.update(metric_def_id, newer - timedelta(seconds=10), 10.0) is False
+        assert store.get(metric_def_id) == (newer.replace(tzinfo=timezone.utc), 50.0)
+        assert store.stats["stale_updates"] == 1
+
+    @pytest.mark.asyncio
+    async def test_update_unknown_metric(self, store):
+        """Test updates for metric ids outside the loaded layout."""
+        assert store.update(uuid4(), datetime.utcnow(), 1) is False
+        assert store.stats["unknown_metrics"] == 1
+
+    @pytest.mark.asyncio
+    async def test_update_equipment_from_poll_sample(self, store):
+        """Test applying a poller sample keyed by metric_key."""
+        ts = datetime(2024, 1, 1, 8, 0, 1)
+        applied = store.update_equipment(
+            "BP01.PACK.BAG1",
+            {"running_status": False, "speed_real": 0.0, "not_bound": 1},
+            ts
+        )
+
+        assert applied == 2
+        latest = store.get_equipment_latest("BP01.PACK.BAG1")
+        assert latest["running_status"] is False
+        assert latest["speed_real"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_equipment_sample_time(self, store):
+        """Test that the newest sample time per equipment follows updates."""
+        assert store.equipment_sample_time("BP01.PACK.BAG1") == datetime(2024, 1, 1, 8, 0, 0, tzinfo=timezone.utc)
+        assert store.equipment_sample_time("BP01.PACK.BAG1.BL") is None
+
+        ts = datetime(2024, 1, 1, 8, 0, 3)
+        store.update_equipment("BP01.PACK.BAG1.BL", {"product_count": 10}, ts)
+
+        assert store.equipment_sample_time("BP01.PACK.BAG1.BL") == ts.replace(tzinfo=timezone.utc)
+
+    @pytest.mark.asyncio
+    async def test_value_notification(self, store, metric_rows):
+        """Test applying a metric_latest NOTIFY payload."""
+        metric_def_id = metric_rows[2]["metric_def_id"]
+        payload = json.dumps({
+            "metric_def_id": str(metric_def_id),
+            "ts": "2024-01-01T08:00:02",
+            "value_bool": None,
+            "value_int": 1200,
+            "value_real": None,
+            "value_text": None
+        })
+
+        store._on_value_notification(None, 1, "metric_latest", payload)
+
+        assert store.get(metric_def_id) == (datetime(2024, 1, 1, 8, 0, 2, tzinfo=timezone.utc), 1200)
+        assert store.stats["notifications"] == 1
+
+    @pytest.mark.asyncio
+    async def test_value_notification_without_value_reloads_row(self, store, metric_rows):
+        """Test that a notification flagged for reload applies the full metric_latest row."""
+        metric_def_id = metric_rows[2]["metric_def_id"]
+        payload = json.dumps({
+            "metric_def_id": str(metric_def_id),
+            "ts": "2024-01-01T08:00:02",
+            "value_bool": None,
+            "value_int": None,
+            "value_real": None,
+            "value_text": None,
+            "reload": True
+        })
+        row = {
+            "ts": datetime(2024, 1, 1, 8, 0, 2, tzinfo=timezone.utc), "value_bool": None,
+            "value_int": None, "value_real": None, "value_text": None, "value_json": {"faults": [3, 7]}
+        }
+
+        with patch(
+            "backend.app.services.metric_latest_store.execute_query", AsyncMock(return_value=[row])
+        ) as mock_query:
+            store._on_value_notification(None, 1, "metric_latest", payload)
+            await asyncio.gather(*store._row_reload_tasks)
+
+        assert mock_query.await_args.args[1] == {"metric_def_id": str(metric_def_id)}
+        assert store.get(metric_def_id) == (row["ts"], {"faults": [3, 7]})
+        assert store.stats["row_reloads"] == 1
+
+    @pytest.mark.asyncio
+    async def test_naive_update_after_aware_load(self, store, metric_rows):
+        """Test that naive poller samples are compared with aware loaded samples as UTC."""
+        metric_def_id = metric_rows[0]["metric_def_id"]
+
+        assert not store.update(metric_def_id, datetime(2024, 1, 1, 7, 59, 59), False)
+        assert store.update(metric_def_id, datetime(2024, 1, 1, 8, 0, 1), False)
+
+        assert store.get(metric_def_id)[0] == datetime(2024, 1, 1, 8, 0, 1, tzinfo=timezone.utc)
+        assert store.equipment_sample_time("BP01.PACK.BAG1") == datetime(2024, 1, 1, 8, 0, 1, tzinfo=timezone.utc)
@@ -0,0 +1,170 @@
+"""
+MS5.0 Floor Dashboard - Micro-Stop Aggregator Unit Tests
+
+Tests interval bucketing and flushing of micro-stop counters, and the
+downtime tracker counting short stops while promoting long ones to events
+and reporting them in its statistics.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+from backend.app.services.micro_stop_aggregator import MicroStopAggregator
+from backend.app.services.equipment_registry import EquipmentRegistry, EquipmentRecord
+from backend.app.services.downtime_state_store import DowntimeStateStore
+from backend.app.services.downtime_tracker import DowntimeTracker
+
+
+START = datetime(2024, 1, 1, 8, 7, 30)
+
+
+class TestMicroStopAggregator:
+    """Tests for MicroStopAggregator."""
+
+    @pytest.fixture
+    def aggregator(self):
+        """Create an aggregator with 15 minute intervals."""
+        return MicroStopAggregator(interval_minutes=15, flush_interval_seconds=60)
+
+    def test_stops_bucketed_by_interval(self, aggregator):
+        """Test that stops are counted in the interval they started in."""
+        line_id = uuid4()
+        aggregator.record(line_id, "BP01.PACK.BAG1", "MAT_JAM", "unplanned", START, 4.0)
+        aggregator.record(line_id, "BP01.PACK.BAG1", "MAT_JAM", "unplanned", START + timedelta(minutes=7), 9.0)
+        aggregator.record(line_id, "BP01.PACK.BAG1", "MAT_JAM", "unplanned", START + timedelta(minutes=8), 2.0)
+
+        first = aggregator._buckets[(str(line_id), "BP01.PACK.BAG1", datetime(2024, 1, 1, 8, 0), "MAT_JAM")]
+        second = aggregator._buckets[(str(line_id), "BP01.PACK.BAG1", datetime(2024, 1, 1, 8, 15), "MAT_JAM")]
+
+        assert (first.stop_count, first.total_seconds, first.max_seconds) == (2, 13.0, 9.0)
+        assert (second.stop_count, second.total_seconds) == (1, 2.0)
+
+    def test_aware_start_time_bucketed_as_utc(self, aggregator):
+        """Test that aware start times share the naive UTC intervals."""
+        line_id = uuid4()
+        aggregator.record(line_id, "BP01.PACK.BAG1", "MAT_JAM", "unplanned", START, 4.0)
+        aggregator.record(
+            line_id, "BP01.PACK.BAG1", "MAT_JAM", "unplanned",
+            (START + timedelta(hours=2)).replace(tzinfo=timezone(timedelta(hours=2))), 2.0
+        )
+
+        (bucket,) = aggregator._buckets.values()
+        assert bucket.stop_count == 2
+
+    def test_stop_without_line(self, aggregator):
+        """Test that a stop without a line takes the registry line or is skipped."""
+        registry = EquipmentRegistry()
+        line_id = uuid4()
+        registry._equipment = {"BP01.PACK.BAG1": EquipmentRecord("BP01.PACK.BAG1", line_id=line_id)}
+
+        with patch("backend.app.services.micro_stop_aggregator.equipment_registry", registry):
+            aggregator.record(None, "BP01.PACK.BAG1", "MAT_JAM", "unplanned", START, 4.0)
+            aggregator.record(None, "UNKNOWN", "MAT_JAM", "unplanned", START, 4.0)
+
+        assert [key[0] for key in aggregator._buckets] == [str(line_id)]
+        assert aggregator.stats["stops_without_line"] == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_one_row_per_bucket(self, aggregator):
+        """Test that a flush upserts every bucket in one statement and clears them."""
+        line_id = uuid4()
+        aggregator.record(line_id, "BP01.PACK.BAG1", "MAT_JAM", "unplanned", START, 4.0)
+        aggregator.record(line_id, "BP01.FILL.F1", "UNKNOWN", "unplanned", START, 1.5)
+
+        with patch(
+            "backend.app.services.micro_stop_aggregator.execute_update", AsyncMock(return_value=2)
+        ) as mock_update:
+            assert await aggregator.flush() == 2
+
+        query, params = mock_update.await_args.args
+        assert "ON CONFLICT" in query
+        assert sorted(params["equipment_code"]) == ["BP01.FILL.F1", "BP01.PACK.BAG1"]
+        assert aggregator.get_stats()["pending_rows"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_kept(self, aggregator):
+        """Test that counters survive a failed flush and merge with new stops."""
+        line_id = uuid4()
+        aggregator.record(line_id, "BP01.PACK.BAG1", "MAT_JAM", "unplanned", START, 4.0)
+
+        async def failing_update(query, params):
+            aggregator.record(line_id, "BP01.PACK.BAG1", "MAT_JAM", "unplanned", START, 6.0)
+            raise RuntimeError("database unavailable")
+
+        with patch("backend.app.services.micro_stop_aggregator.execute_update", side_effect=failing_update):
+            assert await aggregator.flush() == 0
+
+        (bucket,) = aggregator._buckets.values()
+        assert (bucket.stop_count, bucket.total_seconds, bucket.max_seconds) == (2, 10.0, 6.0)
+        assert aggregator.stats["flush_errors"] == 1
+
+
+class TestDowntimeTrackerMicroStops:
+    """Tests for DowntimeTracker micro-stop handling."""
+
+    @pytest.fixture
+    def tracker(self):
+        """Create a tracker with a 30 second threshold on a private store."""
+        tracker = DowntimeTracker()
+        tracker.state_store = DowntimeStateStore()
+        tracker.state_store.is_loaded = True
+        tracker.micro_stop_seconds = 30
+        tracker.micro_stops = MicroStopAggregator(interval_minutes=15, flush_interval_seconds=60)
+        return tracker
+
+    @pytest.mark.asyncio
+    async def test_short_stop_counted_not_stored(self, tracker):
+        """Test that a stop shorter than the threshold never reaches downtime_events."""
+        line_id = uuid4()
+
+        with patch.object(tracker, "_determine_downtime_reason", AsyncMock(return_value=("MAT_JAM", "Jam", "unplanned"))), \
+             patch.object(tracker, "_store_downtime_event", AsyncMock()) as mock_store, \
+             patch.object(tracker, "_update_downtime_event_in_db", AsyncMock()) as mock_update:
+            assert await tracker.detect_downtime_event(line_id, "BP01.PACK.BAG1", {"running": False}, START) is None
+            assert await tracker.detect_downtime_event(
+                line_id, "BP01.PACK.BAG1", {"running": False}, START + timedelta(seconds=5)
+            ) is None
+            assert await tracker.detect_downtime_event(
+                line_id, "BP01.PACK.BAG1", {"running": True, "speed": 10.0}, START + timedelta(seconds=8)
+            ) is None
+
+        mock_store.assert_not_awaited()
+        mock_update.assert_not_awaited()
+        (bucket,) = tracker.micro_stops._buckets.values()
+        assert (bucket.stop_count, bucket.total_seconds) == (1, 8.0)
+        assert await tracker.get_active_downtime_events() == []
+
+    @pytest.mark.asyncio
+    async def test_long_stop_promoted(self, tracker):
+        """Test that a stop outlasting the threshold is stored from its original start."""
+        line_id = uuid4()
+        event_id = uuid4()
+
+        with patch.object(tracker, "_determine_downtime_reason", AsyncMock(return_value=("MAT_JAM", "Jam", "unplanned"))), \
+             patch.object(tracker, "_store_downtime_event", AsyncMock(return_value=event_id)) as mock_store:
+            await tracker.detect_downtime_event(line_id, "BP01.PACK.BAG1", {"running": False}, START)
+            event = await tracker.detect_downtime_event(
+                line_id, "BP01.PACK.BAG1", {"running": False}, START + timedelta(seconds=31)
+            )
+
+        assert event["id"] == event_id
+        assert mock_store.await_args.args[0]["start_time"] == START
+        assert (await tracker.get_active_downtime_event("BP01.PACK.BAG1"))["id"] == event_id
+        assert tracker.micro_stops._buckets == {}
+
+    @pytest.mark.asyncio
+    async def test_statistics_bind_micro_stop_range(self, tracker):
+        """Test that the micro-stop statistics query gets its own range parameters."""
+        with patch(
+            "backend.app.services.downtime_tracker.execute_query", AsyncMock(return_value=[])
+        ) as mock_query:
+            await tracker.get_downtime_statistics(uuid4(), date(2024, 1, 1), date(2024, 1, 1))
+
+        micro_query, params = next(
+            call.args for call in mock_query.await_args_list if "downtime_micro_stops" in call.args[0]
+        )
+        assert ":micro_start" in micro_query and ":micro_end" in micro_query
+        assert params["micro_start"] == datetime(2024, 1, 1)
+        assert params["micro_end"] == datetime(2024, 1, 2)
@@ -0,0 +1,231 @@
+"""
+MS5.0 Floor Dashboard - Notification Dispatcher Unit Tests
+
+Tests multicast batching, dedup coalescing, outcome recording in the outbox
+and retrying claimed outbox rows.
+"""
+
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+from backend.app.services.notification_dispatcher import NotificationDispatcher, OutboundMessage
+
+
+class FakeTransport:
+    """Records multicast payloads and fails the tokens it is told to."""
+
+    def __init__(self, errors=None, missing_tokens=()):
+        self.push_configured = True
+        self.payloads = []
+        self.errors = errors or {}
+        self.missing_tokens = set(missing_tokens)
+
+    async def resolve_fcm_tokens(self, user_ids):
+        return {user_id: f"token-{user_id}" for user_id in user_ids if user_id not in self.missing_tokens}
+
+    async def send_fcm_multicast(self, payload):
+        self.payloads.append(payload)
+        return [self.errors.get(token) for token in payload["registration_ids"]]
+
+
+def outbox_rows(query, params):
+    """Enqueue every recipient, numbering rows in order."""
+    return [
+        {"id": position + 1, "user_id": user_id, "attempts": 1}
+        for position, user_id in enumerate(params["user_ids"])
+    ]
+
+
+class FakeResult:
+    """Rows returned by a session statement."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeSession:
+    """Records the enqueue transaction's statements, failing them when told to."""
+
+    def __init__(self, error=None):
+        self.statements = []
+        self.error = error
+
+    async def execute(self, statement, params):
+        if self.error:
+            raise self.error
+        self.statements.append((str(statement), params))
+        return FakeResult(outbox_rows(statement, params) if "user_ids" in params else [])
+
+
+def patch_session(session):
+    """Patch the dispatcher's database sessions with one fake session."""
+    @asynccontextmanager
+    async def get_db_session():
+        yield session
+
+    return patch("backend.app.services.notification_dispatcher.get_db_session", get_db_session)
+
+
+@pytest.fixture
+def mock_db():
+    """Patch the enqueue transaction and the outbox updates."""
+    session = FakeSession()
+    with patch_session(session), patch(
+        "backend.app.services.notification_dispatcher.execute_update", AsyncMock(return_value=1)
+    ) as mock_update:
+        yield session, mock_update
+
+
+class TestDispatch:
+    """Tests for NotificationDispatcher.dispatch."""
+
+    @pytest.mark.asyncio
+    async def test_multicast_batches(self, mock_db):
+        """Test that 50 recipients are sent in multicast batches, not 50 requests."""
+        transport = FakeTransport()
+        dispatcher = NotificationDispatcher(transport, workers=4, multicast_size=20, dedup_seconds=60)
+        user_ids = [f"tech_{index}" for index in range(50)]
+
+        result = await dispatcher.dispatch(user_ids, "Andon Alert - BP01.PACK.BAG1", "maintenance: jam")
+
+        assert result["total_sent"] == 50
+        assert [len(payload["registration_ids"]) for payload in transport.payloads] == [20, 20, 10]
+        assert transport.payloads[0]["notification"]["title"] == "Andon Alert - BP01.PACK.BAG1"
+        assert dispatcher.get_stats()["multicast_requests"] == 3
+
+        _, mock_update = mock_db
+        params = mock_update.await_args.args[1]
+        assert params["status"] == ["sent"] * 50
+
+    @pytest.mark.asyncio
+    async def test_repeats_coalesced(self, mock_db):
+        """Test that recipients already sent a dedup key within the window are coalesced."""
+        transport = FakeTransport()
+        dispatcher = NotificationDispatcher(transport, workers=4, multicast_size=20, dedup_seconds=60)
+
+        await dispatcher.dispatch(["op_1", "op_2"], "Alert", "Jam", dedup_key="andon:1")
+        result = await dispatcher.dispatch(["op_2", "op_3", "op_3"], "Alert", "Jam again", dedup_key="andon:1")
+
+        assert result["coalesced"] == ["op_2"]
+        assert result["successful"] == ["op_3"]
+        assert transport.payloads[-1]["registration_ids"] == ["token-op_3"]
+
+    @pytest.mark.asyncio
+    async def test_outcomes_recorded(self, mock_db):
+        """Test that transient failures are retried and permanent ones failed."""
+        transport = FakeTransport(
+            errors={"token-op_2": "Unavailable", "token-op_3": "NotRegistered"},
+            missing_tokens={"op_4"}
+        )
+        dispatcher = NotificationDispatcher(transport, workers=4, multicast_size=20, dedup_seconds=60)
+
+        result = await dispatcher.dispatch(["op_1", "op_2", "op_3", "op_4"], "Alert", "Jam")
+
+        assert result["successful"] == ["op_1"]
+        assert result["failed"] == ["op_2", "op_3", "op_4"]
+
+        _, mock_update = mock_db
+        params = mock_update.await_args.args[1]
+        assert params["status"] == ["sent", "pending", "failed", "failed"]
+        assert params["error"] == [None, "Unavailable", "NotRegistered", "no_token"]
+
+    @pytest.mark.asyncio
+    async def test_sent_without_outbox(self):
+        """Test that notifications are still sent when the outbox cannot be written."""
+        transport = FakeTransport()
+        dispatcher = NotificationDispatcher(transport, workers=4, multicast_size=20, dedup_seconds=60)
+
+        with patch_session(FakeSession(error=Exception("connection refused"))), patch(
+            "backend.app.services.notification_dispatcher.execute_update", AsyncMock()
+        ) as mock_update:
+            result = await dispatcher.dispatch(["op_1"], "Alert", "Jam")
+
+        assert result["total_sent"] == 1
+        assert dispatcher.get_stats()["outbox_errors"] == 1
+        mock_update.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_direct_send_not_coalesced(self):
+        """Test that a recipient neither sent nor enqueued is sent the next repeat."""
+        transport = FakeTransport(errors={"token-op_1": "Unavailable"})
+        dispatcher = NotificationDispatcher(transport, workers=4, multicast_size=20, dedup_seconds=60)
+
+        with patch_session(FakeSession(error=Exception("connection refused"))):
+            first = await dispatcher.dispatch(["op_1", "op_2"], "Alert", "Jam", dedup_key="andon:1")
+            transport.errors = {}
+            second = await dispatcher.dispatch(["op_1", "op_2"], "Alert", "Jam", dedup_key="andon:1")
+
+        assert first["failed"] == ["op_1"]
+        assert second["successful"] == ["op_1"]
+        assert second["coalesced"] == ["op_2"]
+
+    @pytest.mark.asyncio
+    async def test_enqueue_serialized_per_dedup_key(self, mock_db):
+        """Test that the outbox insert runs after taking the dedup key's advisory lock."""
+        dispatcher = NotificationDispatcher(FakeTransport(), workers=4, multicast_size=20, dedup_seconds=60)
+
+        await dispatcher.dispatch(["op_1"], "Alert", "Jam", dedup_key="andon:1")
+
+        session, _ = mock_db
+        (lock_query, lock_params), (insert_query, _) = session.statements
+        assert "pg_advisory_xact_lock(hashtext(:dedup_key))" in lock_query
+        assert lock_params == {"dedup_key": "andon:1"}
+        assert "INSERT INTO factory_telemetry.notification_outbox" in insert_query
+
+    @pytest.mark.asyncio
+    async def test_push_not_configured(self, mock_db):
+        """Test that nothing is enqueued or sent without push configured."""
+        transport = FakeTransport()
+        transport.push_configured = False
+        dispatcher = NotificationDispatcher(transport, workers=4, multicast_size=20, dedup_seconds=60)
+
+        result = await dispatcher.dispatch(["op_1", "op_2"], "Alert", "Jam")
+
+        assert result["total_failed"] == 2
+        assert transport.payloads == []
+        session, _ = mock_db
+        assert session.statements == []
+
+
+class TestRetry:
+    """Tests for NotificationDispatcher.retry_due."""
+
+    @pytest.mark.asyncio
+    async def test_claimed_rows_resent_per_message(self):
+        """Test that claimed rows are grouped into one fan-out per message."""
+        transport = FakeTransport(errors={"token-op_3": "Unavailable"})
+        dispatcher = NotificationDispatcher(transport, workers=4, multicast_size=20, dedup_seconds=60)
+
+        def row(row_id, user_id, title, attempts):
+            return {
+                "id": row_id, "user_id": user_id, "notification_type": "andon",
+                "dedup_key": f"andon:{title}", "title": title, "body": "Jam",
+                "data": '{"line_id": "L1"}', "attempts": attempts
+            }
+
+        claimed = [row(1, "op_1", "A", 2), row(2, "op_2", "B", 2), row(3, "op_3", "A", 5)]
+
+        with patch(
+            "backend.app.services.notification_dispatcher.execute_query", AsyncMock(return_value=claimed)
+        ), patch(
+            "backend.app.services.notification_dispatcher.execute_update", AsyncMock(return_value=1)
+        ) as mock_update:
+            assert await dispatcher.retry_due() == 3
+
+        assert sorted(len(payload["registration_ids"]) for payload in transport.payloads) == [1, 2]
+        assert transport.payloads[0]["data"]["line_id"] == "L1"
+
+        recorded = {}
+        for call in mock_update.await_args_list:
+            recorded.update(zip(call.args[1]["id"], call.args[1]["status"]))
+        assert recorded == {1: "sent", 2: "sent", 3: "failed"}
+
+    def test_default_dedup_key(self):
+        """Test that identical messages share a dedup key."""
+        first = OutboundMessage("andon", "Alert", "Jam")
+        assert first.dedup_key == OutboundMessage("andon", "Alert", "Jam").dedup_key
+        assert first.dedup_key != OutboundMessage("andon", "Alert", "Jam cleared").dedup_key
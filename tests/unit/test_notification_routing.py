@@ -0,0 +1,149 @@
+"""
+MS5.0 Floor Dashboard - Notification Routing Unit Tests
+
+Tests building the Andon recipient routing table from users, escalation
+rules and recipient roles, and resolving recipients, tokens and escalation
+notifications from it.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+from backend.app.services.notification_routing import NotificationRouting
+from backend.app.services.notification_service import EnhancedNotificationService
+
+
+LINE_1 = uuid4()
+LINE_2 = uuid4()
+
+
+def user(role, token=None, line_ids=None, preferences=None):
+    """Build a users row."""
+    return {
+        "id": uuid4(), "role": role, "email": f"{role}@company.com", "phone": None,
+        "fcm_token": token, "line_ids": line_ids, "notification_preferences": preferences or {}
+    }
+
+
+RULES = [
+    {"priority": "high", "escalation_level": 1, "recipients": ["shift_manager", "engineer"]},
+    {"priority": "high", "escalation_level": 2, "recipients": ["all_managers"]},
+    {"priority": "low", "escalation_level": 1, "recipients": ["engineer"]}
+]
+
+
+@pytest.fixture
+def users():
+    return {
+        "shift_manager": user("shift_manager", "token-sm"),
+        "engineer_line_1": user("engineer", "token-e1", line_ids=[LINE_1]),
+        "engineer_line_2": user("engineer", None, line_ids=[LINE_2]),
+        "production_manager": user("production_manager", "token-pm", preferences='{"push_enabled": false}'),
+        "operator": user("operator", "token-op")
+    }
+
+
+@pytest.fixture
+def routing(users):
+    """Routing table where engineers are not notified at escalation level 2."""
+    routing = NotificationRouting()
+    routing.build(
+        list(users.values()),
+        RULES,
+        [{"role": "engineer", "escalation_levels": [1], "enabled": True}],
+        [{"id": LINE_1}, {"id": LINE_2}]
+    )
+    return routing
+
+
+def user_ids(recipients):
+    return {recipient.user_id for recipient in recipients}
+
+
+class TestNotificationRouting:
+    """Tests for NotificationRouting."""
+
+    def test_routes_by_line_priority_and_level(self, routing, users):
+        """Test that routes hold the rule's roles, limited to users serving the line."""
+        assert user_ids(routing.route(LINE_1, "high", 1)) == {
+            str(users["shift_manager"]["id"]), str(users["engineer_line_1"]["id"])
+        }
+        assert user_ids(routing.route(str(LINE_2), "low")) == {str(users["engineer_line_2"]["id"])}
+        assert routing.route(LINE_1, "critical", 1) == ()
+
+    def test_role_groups(self, routing, users):
+        """Test that role groups expand to their roles."""
+        assert user_ids(routing.route(LINE_1, "high", 2)) == {
+            str(users["shift_manager"]["id"]), str(users["production_manager"]["id"])
+        }
+        assert len(routing.role_members("all_managers")) == 2
+
+    def test_tokens_and_preferences(self, routing, users):
+        """Test tokens and preferences resolved from the same table."""
+        ids = [str(row["id"]) for row in users.values()]
+
+        assert set(routing.fcm_tokens(ids).values()) == {"token-sm", "token-e1", "token-pm", "token-op"}
+
+        manager = routing.get_recipient(users["production_manager"]["id"])
+        assert not manager.push_enabled
+        assert manager.preferences["websocket_enabled"] is True
+        assert manager.preferences["email"] == "production_manager@company.com"
+
+    def test_disabled_role_not_routed(self, users):
+        """Test that disabled escalation recipient roles receive no notifications."""
+        routing = NotificationRouting()
+        routing.build(
+            list(users.values()), RULES,
+            [{"role": "engineer", "escalation_levels": [1, 2], "enabled": False}],
+            [{"id": LINE_1}]
+        )
+
+        assert user_ids(routing.route(LINE_1, "high", 1)) == {str(users["shift_manager"]["id"])}
+        assert routing.version == 1
+
+    @pytest.mark.asyncio
+    async def test_load_once_until_changed(self, users):
+        """Test that lookups share one load until a change notification arrives."""
+        routing = NotificationRouting()
+        results = [list(users.values()), RULES, [], [{"id": LINE_1}]]
+
+        with patch(
+            "backend.app.services.notification_routing.execute_query",
+            AsyncMock(side_effect=results * 2)
+        ) as mock_query:
+            await routing.ensure_loaded()
+            await routing.ensure_loaded()
+            assert mock_query.await_count == 4
+
+            routing._on_change_notification(None, 0, routing.CHANGE_CHANNEL, "users")
+            await routing._reload_task
+            assert mock_query.await_count == 8
+
+        assert routing.version == 2
+        assert len(routing.route(LINE_1, "high", 1)) == 2
+
+
+class TestEscalationNotification:
+    """Tests for escalation notifications resolved through the routing table."""
+
+    @pytest.mark.asyncio
+    async def test_escalation_recipients_routed(self, routing, users):
+        """Test that escalation recipients follow the line, priority and level route."""
+        service = EnhancedNotificationService()
+
+        with patch("backend.app.services.notification_service.notification_routing", routing), \
+             patch.object(service, "send_bulk_push_notification", AsyncMock(return_value={"total_sent": 1})) as mock_push, \
+             patch.object(service, "send_email_notification", AsyncMock(return_value=True)):
+            sent = await service.send_escalation_notification(
+                "event-1", 2, "maintenance", "BP01.PACK.BAG1", "Jam", priority="high", line_id=LINE_1
+            )
+            unrouted = await service.send_escalation_notification(
+                "event-1", 3, "maintenance", "BP01.PACK.BAG1", "Jam", priority="high", line_id=LINE_1
+            )
+
+        assert sent is True
+        assert unrouted is False
+        # The production manager has push disabled and is not pushed to
+        assert mock_push.await_args.kwargs["user_ids"] == [str(users["shift_manager"]["id"])]
+        assert mock_push.await_args.kwargs["dedup_key"] == "escalation:event-1:2"
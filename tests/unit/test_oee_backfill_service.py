@@ -0,0 +1,122 @@
+"""
+MS5.0 Floor Dashboard - OEE Backfill Service Unit Tests
+
+Tests chunk planning, recalculation from stored inputs, COPY write-back and
+the resumable worker loop.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from backend.app.services.oee_backfill_service import OEEBackfillService
+from backend.app.services import oee_backfill_service as backfill_module
+
+
+def make_connection(rows):
+    """Build an asyncpg connection mock returning stored calculation inputs."""
+    connection = MagicMock()
+    connection.fetch = AsyncMock(return_value=rows)
+    connection.execute = AsyncMock()
+    connection.copy_records_to_table = AsyncMock()
+    connection.close = AsyncMock()
+    transaction = MagicMock()
+    transaction.__aenter__ = AsyncMock()
+    transaction.__aexit__ = AsyncMock(return_value=False)
+    connection.transaction = MagicMock(return_value=transaction)
+    return connection
+
+
+class TestOEEBackfillService:
+    """Tests for OEEBackfillService."""
+
+    def test_plan_chunks(self):
+        """Test splitting lines x range into day chunks, oldest range first."""
+        line_a, line_b = uuid4(), uuid4()
+        start = datetime(2024, 1, 1)
+
+        chunks = OEEBackfillService.plan_chunks([line_a, line_b], start, start + timedelta(hours=36), 24)
+
+        assert chunks == [
+            (line_a, start, start + timedelta(hours=24)),
+            (line_b, start, start + timedelta(hours=24)),
+            (line_a, start + timedelta(hours=24), start + timedelta(hours=36)),
+            (line_b, start + timedelta(hours=24), start + timedelta(hours=36))
+        ]
+
+    def test_recalculate_rows_uses_configured_ideal_cycle_time(self):
+        """Test that performance and OEE follow the current ideal cycle time."""
+        rows = [
+            {"id": 1, "planned_production_time": 3600, "actual_production_time": 3240,
+             "actual_cycle_time": 2.0, "good_parts": 95, "total_parts": 100, "ideal_cycle_time": 1.5},
+            {"id": 2, "planned_production_time": 0, "actual_production_time": 0,
+             "actual_cycle_time": None, "good_parts": 0, "total_parts": 0, "ideal_cycle_time": None}
+        ]
+
+        results = OEEBackfillService.recalculate_rows(rows)
+
+        assert results[0] == (1, 1.5, 0.9, 0.75, 0.95, pytest.approx(0.9 * 0.75 * 0.95))
+        assert results[1] == (2, 1.0, 0.0, 0.0, 0.0, 0.0)
+
+    @pytest.mark.asyncio
+    async def test_create_job_rejects_invalid_range(self):
+        """Test range validation before any query runs."""
+        start = datetime(2024, 1, 1)
+
+        with pytest.raises(backfill_module.ValidationError):
+            await OEEBackfillService.create_job(start, start)
+        with pytest.raises(backfill_module.ValidationError):
+            await OEEBackfillService.create_job(start, start + timedelta(days=1000))
+
+    @pytest.mark.asyncio
+    async def test_process_chunk_copies_results(self):
+        """Test that a chunk is written with COPY and completed in the same transaction."""
+        job = {"id": uuid4(), "equipment_code": None}
+        chunk = {"chunk_index": 3, "line_id": uuid4(),
+                 "start_time": datetime(2024, 1, 1), "end_time": datetime(2024, 1, 2)}
+        rows = [{"id": 7, "planned_production_time": 600, "actual_production_time": 600,
+                 "actual_cycle_time": 1.0, "good_parts": 10, "total_parts": 10, "ideal_cycle_time": 1.0}]
+        connection = make_connection(rows)
+
+        with patch(
+            "backend.app.services.oee_backfill_service.open_direct_connection",
+            AsyncMock(return_value=connection)
+        ):
+            written = await OEEBackfillService.process_chunk(job, chunk)
+
+        assert written == 1
+        records = connection.copy_records_to_table.call_args[1]["records"]
+        assert records == [(7, 1.0, 1.0, 1.0, 1.0, 1.0)]
+
+        statements = [call[0][0] for call in connection.execute.call_args_list]
+        assert "skip_oee_rollup" in statements[0]
+        assert statements[-1] == backfill_module.COMPLETE_CHUNK_QUERY
+        assert connection.execute.call_args_list[-1][0][1:] == (job["id"], 3, 1)
+        assert connection.close.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_run_worker_drains_and_retries(self):
+        """Test that failed chunks are handed back and the job is finalized when drained."""
+        job_id = uuid4()
+        chunks = [{"chunk_index": 1, "attempts": 1}, {"chunk_index": 2, "attempts": 1}, None]
+
+        with patch.object(OEEBackfillService, "get_job", AsyncMock(return_value={"id": job_id})), \
+             patch.object(OEEBackfillService, "_claim_chunk", AsyncMock(side_effect=chunks)), \
+             patch.object(OEEBackfillService, "process_chunk",
+                          AsyncMock(side_effect=[5, RuntimeError("deadlock")])), \
+             patch.object(OEEBackfillService, "_fail_chunk", AsyncMock()) as mock_fail, \
+             patch.object(OEEBackfillService, "_finalize_job", AsyncMock()) as mock_finalize, \
+             patch("backend.app.services.oee_backfill_service.execute_update", AsyncMock()):
+            result = await OEEBackfillService.run_worker(job_id)
+
+        assert result == {"job_id": str(job_id), "chunks": 1, "rows": 5, "remaining": False}
+        assert mock_fail.await_args[0][1]["chunk_index"] == 2
+        assert mock_finalize.await_count == 1
+
+    def test_job_progress(self):
+        """Test the progress percentage of a job row."""
+        row = {field: None for field in backfill_module.JOB_FIELDS}
+        row.update(total_chunks=8, completed_chunks=5, failed_chunks=1)
+
+        assert OEEBackfillService._job_with_progress(row)["progress_percent"] == 75.0
@@ -0,0 +1,169 @@
+"""
+MS5.0 Floor Dashboard - OEE History Analytics Unit Tests
+
+Tests the columnar hourly history, vectorized group statistics, bottleneck
+ranking, prediction and the per (line, window) cache.
+"""
+
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from backend.app.services.oee_history_analytics import (
+    OEEHistory, OEEHistoryAnalytics, group_quantiles, group_slopes,
+    rolling_mean, exponential_smoothing
+)
+
+
+AS_OF = datetime(2024, 1, 10, 0, 0, 0)
+
+
+def rollup_row(equipment_code, bucket_start, performance=0.9, downtime=360, good=95, total=100):
+    """Build an hour rollup row with two calculations."""
+    return {
+        "equipment_code": equipment_code,
+        "bucket_start": bucket_start,
+        "bucket_seconds": 3600,
+        "calculation_count": 2,
+        "performance_sum": performance * 2,
+        "good_parts": good,
+        "total_parts": total,
+        "unplanned_downtime_seconds": downtime
+    }
+
+
+def line_rows(hours=48):
+    """Two equipment over ``hours`` hours; the filler loses on availability."""
+    start = AS_OF - timedelta(hours=hours)
+    rows = []
+    for hour in range(hours):
+        bucket_start = start + timedelta(hours=hour)
+        rows.append(rollup_row("BP01.PACK.BAG1", bucket_start))
+        rows.append(rollup_row("BP01.FILL.F1", bucket_start, performance=0.95, downtime=1800, good=99))
+    return rows
+
+
+class TestOEEHistory:
+    """Tests for OEEHistory."""
+
+    def test_from_rows_components(self):
+        """Test components derived from rollup columns."""
+        rows = [
+            rollup_row("BP01.PACK.BAG1", AS_OF - timedelta(hours=2)),
+            # Open bucket: only the elapsed 30 minutes are planned time
+            rollup_row("BP01.PACK.BAG1", AS_OF - timedelta(minutes=30), downtime=900, total=0, good=0)
+        ]
+
+        history = OEEHistory.from_rows(uuid4(), 1, rows, AS_OF)
+        records = history.records
+
+        assert history.equipment_codes == ["BP01.PACK.BAG1"]
+        assert records["availability"].tolist() == [0.9, 0.5]
+        assert records["performance"].tolist() == pytest.approx([0.9, 0.9])
+        assert records["quality"].tolist() == [0.95, 0.0]
+        assert records["oee"][0] == pytest.approx(0.9 * 0.9 * 0.95)
+
+    def test_daily_and_select(self):
+        """Test per-day means and per-equipment selection."""
+        history = OEEHistory.from_rows(uuid4(), 2, line_rows(48), AS_OF)
+
+        days, daily = history.daily(history.select("BP01.FILL.F1"))
+
+        assert len(days) == 2
+        assert daily[:, 0].tolist() == pytest.approx([0.5, 0.5])
+        assert len(history.select("UNKNOWN")) == 0
+
+
+class TestVectorizedStatistics:
+    """Tests for the grouped statistics helpers."""
+
+    def test_group_quantiles(self):
+        """Test nearest-rank quantiles within each group."""
+        groups = np.array([0, 1, 0, 1, 0, 1, 1])
+        values = np.array([3.0, 40.0, 1.0, 10.0, 2.0, 30.0, 20.0])
+
+        result = group_quantiles(groups, values, 3, (0.0, 0.5, 1.0))
+
+        assert result[0].tolist() == [1.0, 2.0, 3.0]
+        assert result[1].tolist() == [10.0, 20.0, 40.0]
+        assert result[2].tolist() == [0.0, 0.0, 0.0]
+
+    def test_group_slopes(self):
+        """Test per-group least-squares slopes."""
+        groups = np.array([0, 0, 0, 1, 1, 1])
+        x = np.array([0.0, 1.0, 2.0, 0.0, 1.0, 2.0])
+        y = np.array([1.0, 3.0, 5.0, 4.0, 4.0, 4.0])
+
+        assert group_slopes(groups, x, y, 2).tolist() == pytest.approx([2.0, 0.0])
+
+    def test_rolling_mean_and_smoothing(self):
+        """Test the cumulative-sum rolling mean and closed-form smoothing."""
+        values = np.array([1.0, 2.0, 3.0, 4.0])
+        assert rolling_mean(values, 2).tolist() == [1.5, 2.5, 3.5]
+
+        expected = values[0]
+        for value in values[1:]:
+            expected = 0.3 * value + 0.7 * expected
+        assert exponential_smoothing(values[:, None], 0.3)[0] == pytest.approx(expected)
+
+
+class TestOEEHistoryAnalytics:
+    """Tests for OEEHistoryAnalytics."""
+
+    @pytest.fixture
+    def history(self):
+        """Provide two days of history for two equipment."""
+        return OEEHistory.from_rows(uuid4(), 2, line_rows(48), AS_OF)
+
+    def test_rank_bottlenecks(self, history):
+        """Test that the lowest OEE equipment ranks first with its losing component."""
+        ranking = OEEHistoryAnalytics.rank_bottlenecks(history, ["BP01.PACK.BAG1", "BP01.FILL.F1"])
+
+        assert [entry["equipment_code"] for entry in ranking] == ["BP01.FILL.F1", "BP01.PACK.BAG1"]
+        assert ranking[0]["primary_bottleneck"] == "availability"
+        assert ranking[0]["hours"] == 48
+        assert ranking[0]["oee_trend_per_day"] == 0.0
+        assert ranking[0]["optimization_potential"] == round(0.85 - 0.5 * 0.95 * 0.99, 4)
+
+        line = OEEHistoryAnalytics.line_bottlenecks(ranking)
+        assert line["primary_bottleneck"] == "availability"
+        assert line["constraint_equipment"] == "BP01.FILL.F1"
+
+    def test_rank_bottlenecks_limited_to_line_equipment(self, history):
+        """Test that equipment no longer on the line is left out."""
+        ranking = OEEHistoryAnalytics.rank_bottlenecks(history, ["BP01.PACK.BAG1"])
+
+        assert [entry["equipment_code"] for entry in ranking] == ["BP01.PACK.BAG1"]
+
+    def test_predict(self, history):
+        """Test flat history predicts its level with decaying confidence."""
+        predictions, accuracy, averages = OEEHistoryAnalytics.predict(history, "BP01.PACK.BAG1", 3, 0.95)
+
+        assert len(predictions) == 3
+        assert predictions[0]["availability"] == pytest.approx(0.9)
+        assert predictions[2]["oee"] == round(0.9 * 0.9 * 0.95, 4)
+        assert [p["confidence"] for p in predictions] == [0.95, 0.9, 0.85]
+        assert accuracy["volatility"] == 0.0
+        assert averages["quality"] == pytest.approx(0.95)
+
+    @pytest.mark.asyncio
+    async def test_history_cached_per_line_and_window(self):
+        """Test that a (line, window) history is loaded once within the cache lifetime."""
+        line_id = uuid4()
+        OEEHistoryAnalytics.invalidate()
+
+        with patch(
+            "backend.app.services.oee_history_analytics.execute_query",
+            AsyncMock(return_value=line_rows(4))
+        ) as mock_query:
+            first = await OEEHistoryAnalytics.get_history(line_id, 14)
+            second = await OEEHistoryAnalytics.get_history(line_id, 14)
+            await OEEHistoryAnalytics.get_history(line_id, 30)
+
+        assert first is second
+        assert mock_query.await_count == 2
+
+        OEEHistoryAnalytics.invalidate(line_id)
+        assert OEEHistoryAnalytics._cache == {}
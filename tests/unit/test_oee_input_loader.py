@@ -0,0 +1,120 @@
+"""
+MS5.0 Floor Dashboard - OEE Input Loader Unit Tests
+
+Tests the single-query OEE input loader and its batch variant.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from backend.app.services.oee_calculator import OEECalculator
+from backend.app.services.equipment_registry import EquipmentRegistry, EquipmentRecord
+
+
+class TestOEEInputLoader:
+    """Tests for OEECalculator.load_oee_inputs_batch."""
+
+    @pytest.fixture
+    def window(self):
+        """Provide a one hour window."""
+        end_time = datetime(2024, 1, 1, 9, 0, 0)
+        return uuid4(), "BP01.PACK.BAG1", end_time - timedelta(hours=1), end_time
+
+    @pytest.fixture(autouse=True)
+    def registry(self):
+        """Serve ideal cycle times from a loaded registry."""
+        registry = EquipmentRegistry()
+        registry._equipment = {"BP01.PACK.BAG1.BL": EquipmentRecord("BP01.PACK.BAG1.BL", ideal_cycle_time=2.0)}
+        registry.is_loaded = True
+        registry.loaded_at = datetime.utcnow()
+        with patch("backend.app.services.oee_calculator.equipment_registry", registry):
+            yield registry
+
+    @pytest.mark.asyncio
+    async def test_single_window_uses_one_query(self, window):
+        """Test that production data is loaded with one round trip."""
+        row = {
+            "idx": 1, "downtime_seconds": 600, "good_parts": 950,
+            "total_parts": 1000, "avg_cycle_time": 1.25
+        }
+        with patch(
+            "backend.app.services.oee_calculator.execute_query",
+            AsyncMock(return_value=[row])
+        ) as mock_query:
+            production_data = await OEECalculator._get_production_data(*window)
+
+        assert mock_query.await_count == 1
+        assert production_data == {
+            "planned_production_time": 3600,
+            "actual_production_time": 3000,
+            "ideal_cycle_time": 1.0,
+            "actual_cycle_time": 1.25,
+            "good_parts": 950,
+            "total_parts": 1000
+        }
+
+    @pytest.mark.asyncio
+    async def test_batch_preserves_window_order(self, window):
+        """Test that batch results follow the order of the requested windows."""
+        line_id, _, start_time, end_time = window
+        windows = [
+            (line_id, "BP01.PACK.BAG1", start_time, end_time),
+            (line_id, "BP01.PACK.BAG1.BL", start_time, end_time)
+        ]
+        rows = [
+            {"idx": 2, "downtime_seconds": 0, "good_parts": 10, "total_parts": 10,
+             "avg_cycle_time": 2.5},
+            {"idx": 1, "downtime_seconds": 3600, "good_parts": 0, "total_parts": 0,
+             "avg_cycle_time": 0}
+        ]
+        with patch(
+            "backend.app.services.oee_calculator.execute_query",
+            AsyncMock(return_value=rows)
+        ) as mock_query:
+            batch = await OEECalculator.load_oee_inputs_batch(windows)
+
+        params = mock_query.call_args[0][1]
+        assert params["equipment_codes"] == ["BP01.PACK.BAG1", "BP01.PACK.BAG1.BL"]
+
+        assert batch[0]["actual_production_time"] == 0
+        assert batch[0]["ideal_cycle_time"] == 1.0
+        assert batch[0]["total_parts"] == 1
+        assert batch[1]["good_parts"] == 10
+        assert batch[1]["ideal_cycle_time"] == 2.0
+        assert batch[1]["actual_cycle_time"] == 2.5
+
+    @pytest.mark.asyncio
+    async def test_empty_batch(self):
+        """Test that an empty batch does not query the database."""
+        with patch("backend.app.services.oee_calculator.execute_query", AsyncMock()) as mock_query:
+            assert await OEECalculator.load_oee_inputs_batch([]) == []
+
+        mock_query.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_bulk_store_uses_one_insert(self, window):
+        """Test that many calculations are stored with a single statement."""
+        line_id, _, _, end_time = window
+        calculations = [
+            {
+                "line_id": line_id, "equipment_code": equipment_code, "calculation_time": end_time,
+                "availability": 0.9, "performance": 0.8, "quality": 0.95, "oee": 0.684,
+                "planned_production_time": 600, "actual_production_time": 540,
+                "ideal_cycle_time": 1.0, "actual_cycle_time": 1.25,
+                "good_parts": 95, "total_parts": 100
+            }
+            for equipment_code in ("BP01.PACK.BAG1", "BP01.PACK.BAG1.BL")
+        ]
+        with patch(
+            "backend.app.services.oee_calculator.execute_update",
+            AsyncMock(return_value=2)
+        ) as mock_update:
+            stored = await OEECalculator.store_oee_calculations_bulk(calculations)
+
+        assert stored == 2
+        assert mock_update.await_count == 1
+        params = mock_update.call_args[0][1]
+        assert params["equipment_code"] == ["BP01.PACK.BAG1", "BP01.PACK.BAG1.BL"]
+        assert params["total_parts"] == [100, 100]
@@ -0,0 +1,228 @@
+"""
+MS5.0 Floor Dashboard - OEE Rollup Service Unit Tests
+
+Tests deriving OEE components from hour, shift and day rollup rows and the
+rollup-backed line summaries.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, date, timedelta, timezone
+from uuid import uuid4
+
+from backend.app.services.oee_rollup_service import OEERollupService
+from backend.app.services.oee_calculator import OEECalculator
+
+
+def make_rollup(**overrides):
+    """Build a day rollup row."""
+    rollup = {
+        "line_id": uuid4(),
+        "equipment_code": "BP01.PACK.BAG1",
+        "granularity": "day",
+        "bucket_start": datetime(2024, 1, 1, 0, 0, 0),
+        "bucket_seconds": 86400,
+        "shift_id": None,
+        "calculation_count": 4,
+        "good_parts": 950,
+        "total_parts": 1000,
+        "cycle_time_sum": 4.8,
+        "cycle_time_count": 4,
+        "availability_sum": 3.6,
+        "performance_sum": 3.2,
+        "quality_sum": 3.8,
+        "oee_sum": 2.2,
+        "downtime_event_count": 2,
+        "unplanned_downtime_seconds": 8640,
+        "planned_downtime_seconds": 1800
+    }
+    rollup.update(overrides)
+    return rollup
+
+
+class TestOEERollupService:
+    """Tests for OEERollupService."""
+
+    def test_rollup_to_oee_closed_bucket(self):
+        """Test OEE components for a complete day."""
+        components = OEERollupService.rollup_to_oee(make_rollup())
+
+        assert components["availability"] == 0.9
+        assert components["performance"] == 0.8
+        assert components["quality"] == 0.95
+        assert components["oee"] == round(0.9 * 0.8 * 0.95, 4)
+        assert components["planned_production_time"] == 86400
+        assert components["actual_cycle_time"] == pytest.approx(1.2)
+
+    def test_rollup_to_oee_open_bucket(self):
+        """Test that availability only counts the elapsed part of an open bucket."""
+        rollup = make_rollup(unplanned_downtime_seconds=3600)
+
+        components = OEERollupService.rollup_to_oee(rollup, as_of=datetime(2024, 1, 1, 12, 0, 0))
+
+        assert components["planned_production_time"] == 43200
+        assert components["availability"] == round(39600 / 43200, 4)
+
+    def test_rollup_to_oee_aware_as_of(self):
+        """Test that an aware as_of is compared with the naive bucket start as UTC."""
+        rollup = make_rollup(unplanned_downtime_seconds=3600)
+        as_of = datetime(2024, 1, 1, 14, 0, 0, tzinfo=timezone(timedelta(hours=2)))
+
+        components = OEERollupService.rollup_to_oee(rollup, as_of=as_of)
+
+        assert components["planned_production_time"] == 43200
+
+    def test_rollup_to_oee_empty_bucket(self):
+        """Test a bucket with downtime but no calculations."""
+        rollup = make_rollup(calculation_count=0, performance_sum=0, good_parts=0, total_parts=0,
+                             cycle_time_sum=0, cycle_time_count=0)
+
+        components = OEERollupService.rollup_to_oee(rollup)
+
+        assert components["performance"] == 0.0
+        assert components["quality"] == 0.0
+        assert components["oee"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_get_day_rollups_uses_bucket_key(self):
+        """Test that day rollups are read by primary key."""
+        line_id = uuid4()
+        with patch(
+            "backend.app.services.oee_rollup_service.execute_query",
+            AsyncMock(return_value=[make_rollup()])
+        ) as mock_query:
+            rollups = await OEERollupService.get_day_rollups(line_id, date(2024, 1, 1))
+
+        assert len(rollups) == 1
+        params = mock_query.call_args[0][1]
+        assert params == {
+            "line_id": line_id,
+            "granularity": "day",
+            "bucket_start": datetime(2024, 1, 1, 0, 0, 0)
+        }
+
+    @pytest.mark.asyncio
+    async def test_rejects_unknown_granularity(self):
+        """Test that unknown granularities are rejected."""
+        with pytest.raises(ValueError):
+            await OEERollupService.get_line_rollups(uuid4(), "week", datetime(2024, 1, 1))
+
+
+class TestRollupTrends:
+    """Tests for rollup-backed OEE trend computation."""
+
+    @pytest.mark.asyncio
+    async def test_bucket_summaries_use_one_rollup_query(self):
+        """Test that a multi-day trend is built from a single range query."""
+        line_id = uuid4()
+        rollups = [
+            make_rollup(bucket_start=datetime(2024, 1, day), equipment_code=equipment_code)
+            for day in (1, 2, 3)
+            for equipment_code in ("BP01.PACK.BAG1", "BP01.PACK.BAG1.BL", "OTHER.LINE")
+        ]
+
+        with patch(
+            "backend.app.services.oee_calculator.OEERollupService.get_line_rollup_range",
+            AsyncMock(return_value=rollups)
+        ) as mock_query:
+            summaries = await OEECalculator.get_bucket_oee_summaries(
+                line_id, datetime(2024, 1, 1), datetime(2024, 1, 4), "day",
+                ["BP01.PACK.BAG1", "BP01.PACK.BAG1.BL"]
+            )
+
+        assert mock_query.await_count == 1
+        assert [summary["date"] for summary in summaries] == [
+            date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)
+        ]
+        assert all(summary["equipment_count"] == 2 for summary in summaries)
+
+    @pytest.mark.asyncio
+    async def test_equipment_hourly_history_use_one_rollup_query(self):
+        """Test that every equipment's hourly trend and downtime come from one range query."""
+        line_id = uuid4()
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+        rollups = [
+            make_rollup(
+                granularity="hour", bucket_seconds=3600, equipment_code=equipment_code,
+                bucket_start=hour + timedelta(hours=offset), unplanned_downtime_seconds=360,
+                planned_downtime_seconds=0, downtime_event_count=1
+            )
+            for offset in (0, 1)
+            for equipment_code in ("BP01.PACK.BAG1", "BP01.PACK.BAG1.BL")
+        ]
+
+        with patch(
+            "backend.app.services.oee_calculator.OEERollupService.get_line_rollup_range",
+            AsyncMock(return_value=rollups)
+        ) as mock_query:
+            history = await OEECalculator.get_equipment_hourly_history(line_id, hours=24)
+
+        assert mock_query.await_count == 1
+        assert mock_query.await_args.args[1] == "hour"
+        assert set(history) == {"BP01.PACK.BAG1", "BP01.PACK.BAG1.BL"}
+        bagger = history["BP01.PACK.BAG1"]
+        assert [entry["timestamp"] for entry in bagger["trends"]["hourly_oee"]] == [hour, hour + timedelta(hours=1)]
+        assert bagger["trends"]["hourly_oee"][0]["availability"] == 0.9
+        assert bagger["trends"]["trends"]["oee"]["trend"] == "stable"
+        assert bagger["downtime_analysis"]["event_count"] == 2
+        assert bagger["downtime_analysis"]["total_downtime_minutes"] == 12
+
+    def test_trend_statistics(self):
+        """Test vectorized trend statistics and slope direction."""
+        summaries = [
+            {"average_oee": oee, "average_availability": 0.9,
+             "average_performance": 0.8, "average_quality": quality}
+            for oee, quality in ((0.5, 0.99), (0.6, 0.98), (0.7, 0.97))
+        ]
+
+        trends = OEECalculator._compute_trend_statistics(summaries)
+
+        assert trends["oee"]["current"] == 0.7
+        assert trends["oee"]["average"] == 0.6
+        assert trends["oee"]["min"] == 0.5
+        assert trends["oee"]["max"] == 0.7
+        assert trends["oee"]["slope"] == pytest.approx(0.1)
+        assert trends["oee"]["trend"] == "up"
+        assert trends["availability"]["trend"] == "stable"
+        assert trends["quality"]["trend"] == "down"
+
+    def test_trend_statistics_empty(self):
+        """Test trend statistics without data."""
+        trends = OEECalculator._compute_trend_statistics([])
+
+        assert trends["oee"]["trend"] == "stable"
+        assert trends["oee"]["average"] == 0
+
+
+class TestShiftSummary:
+    """Tests for the rollup-backed shift OEE summary."""
+
+    @pytest.mark.asyncio
+    async def test_open_shift_with_aware_at_time(self):
+        """Test that an offset at_time is resolved against the naive shift buckets."""
+        line_id = uuid4()
+        shift = {
+            "shift_id": uuid4(), "shift_name": "Day", "bucket_seconds": 28800,
+            "bucket_start": datetime(2024, 1, 1, 6, 0, 0)
+        }
+        rollup = make_rollup(granularity="shift", bucket_start=shift["bucket_start"], bucket_seconds=28800,
+                             unplanned_downtime_seconds=0)
+        at_time = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone(timedelta(hours=2)))
+
+        with patch(
+            "backend.app.services.oee_calculator.OEERollupService.get_shift_bucket", AsyncMock(return_value=shift)
+        ) as mock_bucket, patch(
+            "backend.app.services.oee_calculator.OEERollupService.get_line_rollups", AsyncMock(return_value=[rollup])
+        ), patch(
+            "backend.app.services.oee_calculator.OEECalculator._get_line_equipment_codes",
+            AsyncMock(return_value=["BP01.PACK.BAG1"])
+        ), patch(
+            "backend.app.services.oee_calculator.datetime"
+        ) as mock_datetime:
+            mock_datetime.utcnow.return_value = datetime(2024, 1, 1, 10, 0, 0)
+            summary = await OEECalculator.calculate_shift_oee_summary(line_id, at_time)
+
+        assert mock_bucket.await_args.args[0] == datetime(2024, 1, 1, 10, 0, 0)
+        assert summary["closed"] is False
+        assert summary["equipment_count"] == 1
+        assert summary["average_availability"] == 1.0
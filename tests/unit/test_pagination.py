@@ -0,0 +1,111 @@
+"""
+MS5.0 Floor Dashboard - Keyset Pagination Unit Tests
+
+Tests cursor encoding, the seek predicate builder and keyset paging of the
+Andon event listing.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime
+from uuid import uuid4
+
+from backend.app.utils import pagination as pagination_module
+from backend.app.utils.pagination import (
+    encode_cursor, decode_cursor, keyset_predicate, next_cursor
+)
+from backend.app.services.andon_service import AndonService
+
+
+class TestCursor:
+    """Tests for cursor encoding."""
+
+    def test_round_trip(self):
+        """Test that sort key values survive an opaque cursor."""
+        reported_at, event_id = datetime(2024, 1, 1, 8, 30, 15, 250000), uuid4()
+
+        token = encode_cursor(reported_at, event_id)
+
+        assert "=" not in token
+        assert decode_cursor(token, (datetime, type(event_id))) == (reported_at, event_id)
+
+    @pytest.mark.parametrize("token", ["not-a-cursor", encode_cursor("2024-01-01"), encode_cursor("x", "y")])
+    def test_invalid_cursor(self, token):
+        """Test that malformed cursors are rejected as validation errors."""
+        with pytest.raises(pagination_module.ValidationError):
+            decode_cursor(token, (datetime, type(uuid4())))
+
+
+class TestKeysetPredicate:
+    """Tests for keyset_predicate and next_cursor."""
+
+    def test_first_page_has_no_predicate(self):
+        """Test that listing without a cursor adds no conditions."""
+        assert keyset_predicate(["reported_at", "id"], None, (datetime, str)) == ([], {})
+
+    def test_seek_predicate(self):
+        """Test the row comparison continuing after the cursor."""
+        reported_at = datetime(2024, 1, 1, 8, 0, 0)
+        token = encode_cursor(reported_at, "event-1")
+
+        conditions, params = keyset_predicate(["de.start_time", "de.id"], token, (datetime, str))
+
+        assert conditions == ["(de.start_time, de.id) < (:cursor_0, :cursor_1)"]
+        assert params == {"cursor_0": reported_at, "cursor_1": "event-1"}
+
+    def test_rejects_unsafe_column(self):
+        """Test that column names are validated before interpolation."""
+        with pytest.raises(ValueError):
+            keyset_predicate(["id; DROP TABLE x"], None, (str,))
+
+    def test_next_cursor(self):
+        """Test that only a full page has a next page."""
+        rows = [{"reported_at": datetime(2024, 1, 1, hour), "id": f"e{hour}"} for hour in (3, 2)]
+
+        assert next_cursor(rows, 3, "reported_at", "id") is None
+        assert decode_cursor(next_cursor(rows, 2, "reported_at", "id"), (datetime, str)) == (
+            datetime(2024, 1, 1, 2), "e2"
+        )
+
+
+class TestAndonEventPaging:
+    """Tests for keyset paging of AndonService.list_andon_events."""
+
+    @pytest.mark.asyncio
+    async def test_cursor_replaces_offset(self):
+        """Test that a cursor page seeks past the cursor instead of skipping rows."""
+        reported_at, event_id = datetime(2024, 1, 1, 8, 0, 0), uuid4()
+        line_id = uuid4()
+
+        with patch(
+            "backend.app.services.andon_service.execute_query", AsyncMock(return_value=[])
+        ) as mock_query:
+            await AndonService.list_andon_events(
+                line_id=line_id, skip=500, limit=50, cursor=encode_cursor(reported_at, event_id)
+            )
+
+        query, params = mock_query.await_args.args
+        assert "(reported_at, id) < (:cursor_0, :cursor_1)" in query
+        assert "ORDER BY reported_at DESC, id DESC" in query
+        assert params == {
+            "cursor_0": reported_at, "cursor_1": event_id,
+            "limit": 50, "skip": 0, "line_id": line_id
+        }
+
+    @pytest.mark.asyncio
+    async def test_offset_kept_without_cursor(self):
+        """Test that clients without a cursor still page with skip."""
+        with patch(
+            "backend.app.services.andon_service.execute_query", AsyncMock(return_value=[])
+        ) as mock_query:
+            await AndonService.list_andon_events(skip=200, limit=100)
+
+        query, params = mock_query.await_args.args
+        assert "WHERE" not in query
+        assert params == {"limit": 100, "skip": 200}
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_not_masked(self):
+        """Test that a bad cursor surfaces as a validation error."""
+        with pytest.raises(pagination_module.ValidationError):
+            await AndonService.list_andon_events(cursor="garbage")
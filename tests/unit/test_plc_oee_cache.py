@@ -0,0 +1,135 @@
+"""
+MS5.0 Floor Dashboard - PLC OEE Cache Unit Tests
+
+Tests the bounded (line, equipment, window) cache of real-time OEE results:
+TTL expiry, LRU eviction, per-equipment invalidation and invalidation by newer
+metric samples.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from backend.app.services.plc_integrated_oee_calculator import (
+    OEEWindowCache, PLCIntegratedOEECalculator
+)
+from backend.app.services.metric_latest_store import MetricLatestStore
+
+
+WINDOW_START = datetime(2024, 1, 1, 8, 0, 0)
+LINE_ID = uuid4()
+
+
+class TestOEEWindowCache:
+    """Tests for OEEWindowCache."""
+
+    @pytest.fixture(autouse=True)
+    def store(self):
+        """Serve sample times from an empty metric latest store."""
+        store = MetricLatestStore()
+        with patch("backend.app.services.plc_integrated_oee_calculator.metric_latest_store", store):
+            yield store
+
+    def test_same_window_hits(self):
+        """Test that timestamps in one window share an entry."""
+        cache = OEEWindowCache(60, 10)
+        cache.set(LINE_ID, "BP01.PACK.BAG1", WINDOW_START, {"oee": 0.8})
+
+        assert cache.get(LINE_ID, "BP01.PACK.BAG1", WINDOW_START + timedelta(seconds=59)) == {"oee": 0.8}
+        assert cache.get(LINE_ID, "BP01.PACK.BAG1", WINDOW_START + timedelta(seconds=60)) is None
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+
+    def test_entries_expire(self):
+        """Test that the TTL is enforced on lookup."""
+        cache = OEEWindowCache(60, 10)
+        with patch("backend.app.services.plc_integrated_oee_calculator.time.monotonic", return_value=1000.0):
+            cache.set(LINE_ID, "BP01.PACK.BAG1", WINDOW_START, {"oee": 0.8})
+        with patch("backend.app.services.plc_integrated_oee_calculator.time.monotonic", return_value=1060.0):
+            assert cache.get(LINE_ID, "BP01.PACK.BAG1", WINDOW_START) is None
+
+        assert cache.stats["expired"] == 1
+        assert cache.get_stats()["entries"] == 0
+        assert cache.get_stats()["equipment"] == 0
+
+    def test_least_recently_used_evicted(self):
+        """Test that the cache stays within max_entries."""
+        cache = OEEWindowCache(60, 2)
+        cache.set(LINE_ID, "BP01.PACK.BAG1", WINDOW_START, {"oee": 0.1})
+        cache.set(LINE_ID, "BP01.PACK.BAG1.BL", WINDOW_START, {"oee": 0.2})
+        cache.get(LINE_ID, "BP01.PACK.BAG1", WINDOW_START)
+        cache.set(LINE_ID, "BP01.FILL.F1", WINDOW_START, {"oee": 0.3})
+
+        assert cache.get(LINE_ID, "BP01.PACK.BAG1.BL", WINDOW_START) is None
+        assert cache.get(LINE_ID, "BP01.PACK.BAG1", WINDOW_START) == {"oee": 0.1}
+        assert cache.stats["evictions"] == 1
+        assert cache.get_stats()["entries"] == 2
+
+    def test_invalidate_equipment(self):
+        """Test dropping every window of one equipment."""
+        cache = OEEWindowCache(60, 10)
+        for minute in range(3):
+            cache.set(LINE_ID, "BP01.PACK.BAG1", WINDOW_START + timedelta(minutes=minute), {"oee": 0.8})
+        cache.set(LINE_ID, "BP01.PACK.BAG1.BL", WINDOW_START, {"oee": 0.7})
+
+        assert cache.invalidate("BP01.PACK.BAG1") == 3
+        assert cache.get(LINE_ID, "BP01.PACK.BAG1.BL", WINDOW_START) == {"oee": 0.7}
+        assert cache.invalidate() == 1
+
+    def test_newer_sample_invalidates(self, store):
+        """Test that a sample newer than the cached result drops the equipment."""
+        store._equipment_sample_times["BP01.PACK.BAG1"] = WINDOW_START
+        cache = OEEWindowCache(60, 10)
+        cache.set(LINE_ID, "BP01.PACK.BAG1", WINDOW_START, {"oee": 0.8})
+        assert cache.get(LINE_ID, "BP01.PACK.BAG1", WINDOW_START) == {"oee": 0.8}
+
+        store._equipment_sample_times["BP01.PACK.BAG1"] = (WINDOW_START + timedelta(seconds=1)).replace(
+            tzinfo=timezone.utc
+        )
+
+        assert cache.get(LINE_ID, "BP01.PACK.BAG1", WINDOW_START) is None
+        assert cache.stats["invalidations"] == 1
+
+    def test_lines_cached_separately(self):
+        """Test that the same equipment code on another line does not share an entry."""
+        cache = OEEWindowCache(60, 10)
+        cache.set(LINE_ID, "BP01.PACK.BAG1", WINDOW_START, {"oee": 0.8})
+
+        assert cache.get(uuid4(), "BP01.PACK.BAG1", WINDOW_START) is None
+        assert cache.get(str(LINE_ID), "BP01.PACK.BAG1", WINDOW_START) == {"oee": 0.8}
+        assert cache.invalidate("BP01.PACK.BAG1") == 1
+
+    def test_aware_timestamps_share_window(self):
+        """Test that naive and aware UTC timestamps fall into the same window."""
+        cache = OEEWindowCache(60, 10)
+        cache.set(LINE_ID, "BP01.PACK.BAG1", WINDOW_START, {"oee": 0.8})
+
+        assert cache.get(LINE_ID, "BP01.PACK.BAG1", WINDOW_START.replace(tzinfo=timezone.utc)) == {"oee": 0.8}
+
+
+class TestPLCIntegratedOEECache:
+    """Tests for real-time OEE served from the window cache."""
+
+    @pytest.mark.asyncio
+    async def test_real_time_oee_cached_per_window(self):
+        """Test that a repeated calculation in the same window skips the queries."""
+        calculator = PLCIntegratedOEECalculator()
+        context = AsyncMock(return_value={})
+
+        with patch.object(calculator, "_get_production_context", context), \
+             patch.object(calculator, "_calculate_availability_from_plc", AsyncMock(return_value=0.9)), \
+             patch.object(calculator, "_calculate_performance_from_plc", AsyncMock(return_value=0.9)), \
+             patch.object(calculator, "_calculate_quality_from_production", AsyncMock(return_value=1.0)), \
+             patch.object(calculator, "_get_current_downtime_stats", AsyncMock(return_value={})):
+            first = await calculator.calculate_real_time_oee(LINE_ID, "BP01.PACK.BAG1", {}, WINDOW_START)
+            second = await calculator.calculate_real_time_oee(
+                LINE_ID, "BP01.PACK.BAG1", {}, WINDOW_START + timedelta(seconds=30)
+            )
+
+        assert first is second
+        assert context.await_count == 1
+        assert calculator.get_cache_stats()["hits"] == 1
+
+        calculator.clear_cache("BP01.PACK.BAG1")
+        assert calculator.get_cached_oee_data(LINE_ID, "BP01.PACK.BAG1", WINDOW_START) is None
@@ -0,0 +1,202 @@
+"""
+MS5.0 Floor Dashboard - Shift Snapshot Service Unit Tests
+
+Tests shift boundary detection, snapshot computation from the shift rollups,
+closing each line's shift once and publishing closed shifts.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, time, timedelta
+from uuid import uuid4
+
+from backend.app.services.shift_snapshot_service import (
+    ShiftSnapshotService, ShiftSnapshotPublisher, shift_instances
+)
+from backend.app.services.equipment_registry import EquipmentRegistry
+
+
+SHIFTS = [
+    {"id": uuid4(), "name": "Day", "start_time": time(6, 0), "end_time": time(18, 0)},
+    {"id": uuid4(), "name": "Night", "start_time": time(18, 0), "end_time": time(6, 0)}
+]
+
+
+def shift_rollup(equipment_code, shift_start, downtime=0, good=90, total=100):
+    """Build a 12 hour shift rollup row."""
+    return {
+        "equipment_code": equipment_code,
+        "bucket_start": shift_start,
+        "bucket_seconds": 12 * 3600,
+        "calculation_count": 4,
+        "performance_sum": 4.0,
+        "good_parts": good,
+        "total_parts": total,
+        "unplanned_downtime_seconds": downtime,
+        "planned_downtime_seconds": 600,
+        "downtime_event_count": 2,
+        "cycle_time_sum": 4.0,
+        "cycle_time_count": 4
+    }
+
+
+def snapshot(shift_start, hours, oee, good=90, total=100):
+    """Build a stored snapshot."""
+    return {
+        "shift_start": shift_start, "shift_end": shift_start + timedelta(hours=hours),
+        "oee": oee, "availability": oee, "performance": 1.0, "quality": 1.0,
+        "good_parts": good, "total_parts": total, "downtime_event_count": 1,
+        "unplanned_downtime_seconds": 600, "planned_downtime_seconds": 0
+    }
+
+
+class TestShiftInstances:
+    """Tests for shift_instances."""
+
+    def test_shifts_ended_in_window(self):
+        """Test that only occurrences ending in (since, until] are returned, oldest first."""
+        instances = shift_instances(SHIFTS, datetime(2024, 1, 2, 0, 0), datetime(2024, 1, 2, 18, 0))
+
+        assert [(i["shift_name"], i["shift_start"], i["shift_end"]) for i in instances] == [
+            ("Night", datetime(2024, 1, 1, 18, 0), datetime(2024, 1, 2, 6, 0)),
+            ("Day", datetime(2024, 1, 2, 6, 0), datetime(2024, 1, 2, 18, 0))
+        ]
+
+    def test_open_shift_not_returned(self):
+        """Test that a shift still running at ``until`` is not due."""
+        instances = shift_instances(SHIFTS, datetime(2024, 1, 2, 7, 0), datetime(2024, 1, 2, 17, 59))
+
+        assert instances == []
+
+
+class TestShiftSnapshotService:
+    """Tests for ShiftSnapshotService."""
+
+    @pytest.mark.asyncio
+    async def test_compute_snapshot(self):
+        """Test a line snapshot from the rollups of the line's equipment only."""
+        line_id = uuid4()
+        shift = shift_instances(SHIFTS, datetime(2024, 1, 2, 0, 0), datetime(2024, 1, 2, 6, 0))[0]
+        rollups = [
+            shift_rollup("BP01.FILL.F1", shift["shift_start"], good=100),
+            shift_rollup("BP01.PACK.BAG1", shift["shift_start"], downtime=4320),
+            shift_rollup("BP02.FILL.F1", shift["shift_start"])
+        ]
+
+        registry = EquipmentRegistry()
+        registry.is_loaded = True
+        registry.loaded_at = datetime.utcnow()
+        registry._line_equipment = {str(line_id): ["BP01.FILL.F1", "BP01.PACK.BAG1"]}
+
+        with patch("backend.app.services.shift_snapshot_service.equipment_registry", registry), \
+             patch(
+                 "backend.app.services.shift_snapshot_service.OEERollupService.get_line_rollups",
+                 AsyncMock(return_value=rollups)
+             ):
+            result = await ShiftSnapshotService.compute_snapshot(line_id, shift)
+
+        assert result["shift_name"] == "Night"
+        assert result["constraint_equipment"] == "BP01.PACK.BAG1"
+        assert result["good_parts"] == 190
+        assert result["total_parts"] == 200
+        assert result["downtime_event_count"] == 4
+        assert result["unplanned_downtime_seconds"] == 4320
+        assert [entry["equipment_code"] for entry in result["equipment_oee"]] == [
+            "BP01.FILL.F1", "BP01.PACK.BAG1"
+        ]
+
+    @staticmethod
+    async def close_due_shifts(as_of, lines, closed_rows):
+        """Close due Day shifts of ``lines`` with ``closed_rows`` already stored."""
+        async def query(sql, params=None):
+            if "production_shifts" in sql:
+                return [SHIFTS[0]]
+            if "production_lines" in sql:
+                return [{"id": line_id} for line_id in lines]
+            return closed_rows
+
+        def compute(line_id, instance, as_of):
+            return {"line_id": line_id, "shift_start": instance["shift_start"]}
+
+        with patch("backend.app.services.shift_snapshot_service.execute_query", side_effect=query), \
+             patch.object(ShiftSnapshotService, "compute_snapshot", AsyncMock(side_effect=compute)), \
+             patch.object(ShiftSnapshotService, "store_snapshot", AsyncMock(return_value=True)):
+            return await ShiftSnapshotService.close_due_shifts(as_of)
+
+    @pytest.mark.asyncio
+    async def test_close_due_shifts_skips_closed_lines(self):
+        """Test that a line's shift is only closed when it has no snapshot yet."""
+        closed_line, open_line = uuid4(), uuid4()
+        shift_start = datetime(2024, 1, 2, 6, 0)
+
+        closed = await self.close_due_shifts(
+            datetime(2024, 1, 2, 18, 30), [closed_line, open_line],
+            [{"line_id": closed_line, "shift_start": shift_start}]
+        )
+
+        assert [s["line_id"] for s in closed if s["shift_start"] == shift_start] == [open_line]
+        # Earlier shifts within the lookback window are caught up for both lines
+        assert len([s for s in closed if s["shift_start"] == shift_start - timedelta(days=1)]) == 2
+
+    @pytest.mark.asyncio
+    async def test_close_due_shifts_waits_for_settle_delay(self):
+        """Test that a shift is not closed before the settle delay has passed."""
+        closed = await self.close_due_shifts(datetime(2024, 1, 2, 18, 5), [uuid4()], [])
+
+        assert datetime(2024, 1, 2, 6, 0) not in [s["shift_start"] for s in closed]
+        assert datetime(2024, 1, 1, 6, 0) in [s["shift_start"] for s in closed]
+
+    def test_combine_weights_by_shift_length(self):
+        """Test that components are weighted by shift length and totals summed."""
+        start = datetime(2024, 1, 2, 6, 0)
+        period = ShiftSnapshotService.combine([
+            snapshot(start, 12, 0.9),
+            snapshot(start + timedelta(hours=12), 4, 0.5, good=20, total=40)
+        ])
+
+        assert period["oee"] == 0.8
+        assert period["good_parts"] == 110
+        assert period["total_parts"] == 140
+        assert period["shift_count"] == 2
+        assert period["planned_seconds"] == 16 * 3600
+
+    def test_combine_empty(self):
+        """Test a period without shift snapshots."""
+        period = ShiftSnapshotService.combine([])
+
+        assert period["oee"] == 0.0
+        assert period["shift_count"] == 0
+
+
+class TestShiftSnapshotPublisher:
+    """Tests for ShiftSnapshotPublisher."""
+
+    @pytest.mark.asyncio
+    async def test_publishes_closed_snapshot(self):
+        """Test that a notification pushes the JSON-safe snapshot to the line."""
+        line_id = uuid4()
+        shift_start = datetime(2024, 1, 2, 6, 0)
+        stored = {**snapshot(shift_start, 12, 0.9), "line_id": line_id, "equipment_oee": []}
+        published = AsyncMock()
+        publisher = ShiftSnapshotPublisher(publisher=published)
+
+        with patch.object(ShiftSnapshotService, "get_snapshot", AsyncMock(return_value=stored)) as get:
+            await publisher._publish(json.dumps({
+                "line_id": str(line_id), "shift_start": shift_start.isoformat()
+            }))
+
+        get.assert_awaited_once_with(line_id, shift_start)
+        published.assert_awaited_once()
+        assert published.await_args.args[0] == str(line_id)
+        assert published.await_args.args[1]["shift_start"] == str(shift_start)
+        assert publisher.stats["published"] == 1
+
+    @pytest.mark.asyncio
+    async def test_bad_payload_counted(self):
+        """Test that an unreadable notification is counted, not raised."""
+        publisher = ShiftSnapshotPublisher(publisher=AsyncMock())
+
+        await publisher._publish("not json")
+
+        assert publisher.stats["publish_errors"] == 1
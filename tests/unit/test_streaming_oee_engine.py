@@ -0,0 +1,285 @@
+"""
+MS5.0 Floor Dashboard - Streaming OEE Engine Unit Tests
+
+Tests incremental availability, performance and quality from poll samples,
+rolling window expiry, shift resets, publish-on-change and reads of the
+snapshots shared with processes that do not poll.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, time, timedelta
+from uuid import uuid4
+
+from backend.app.services.streaming_oee_engine import StreamingOEEEngine, RollingOEEWindow
+from backend.app.services.oee_calculator import OEECalculator
+
+
+def sample(running=True, product_count=0, reject_count=None, planned_stop=False, line_id="line-1"):
+    """Build a poll sample."""
+    metrics = {
+        "running_status": running,
+        "product_count": product_count,
+        "planned_stop": planned_stop,
+        "production_line_id": line_id
+    }
+    if reject_count is not None:
+        metrics["reject_count"] = reject_count
+    return metrics
+
+
+class TestStreamingOEEEngine:
+    """Tests for StreamingOEEEngine."""
+
+    @pytest.fixture
+    def engine(self):
+        """Create an engine; unregistered equipment uses a one second ideal cycle time."""
+        engine = StreamingOEEEngine()
+        engine.max_gap_seconds = 10
+        return engine
+
+    @pytest.mark.asyncio
+    async def test_incremental_oee(self, engine):
+        """Test OEE components accumulated from one-second samples."""
+        start = datetime(2024, 1, 1, 8, 0, 0)
+        await engine.ingest("BP01.PACK.BAG1", sample(product_count=0, reject_count=0), start)
+
+        # 30 s running at 0.5 parts/s, then 10 s stopped
+        for second in range(1, 31):
+            await engine.ingest(
+                "BP01.PACK.BAG1",
+                sample(product_count=second // 2, reject_count=second // 10),
+                start + timedelta(seconds=second)
+            )
+        for second in range(31, 41):
+            await engine.ingest(
+                "BP01.PACK.BAG1",
+                sample(running=False, product_count=15, reject_count=3),
+                start + timedelta(seconds=second)
+            )
+
+        oee = engine.get("BP01.PACK.BAG1")
+
+        assert oee["availability"] == round(31 / 40, 4)
+        assert oee["performance"] == round(15 / 31, 4)
+        assert oee["quality"] == 0.8
+        assert oee["shift"]["total_parts"] == 15
+        assert oee["is_currently_down"] is True
+        assert oee["current_downtime_duration_seconds"] == 9
+        assert oee["line_id"] == "line-1"
+
+    @pytest.mark.asyncio
+    async def test_planned_stop_and_gaps_are_not_counted(self, engine):
+        """Test that planned stops and poller gaps do not reduce availability."""
+        start = datetime(2024, 1, 1, 8, 0, 0)
+        await engine.ingest("BP01.PACK.BAG1", sample(), start)
+        await engine.ingest("BP01.PACK.BAG1", sample(running=False, planned_stop=True), start + timedelta(seconds=5))
+        await engine.ingest("BP01.PACK.BAG1", sample(), start + timedelta(seconds=15))
+        await engine.ingest("BP01.PACK.BAG1", sample(), start + timedelta(minutes=5))
+
+        oee = engine.get("BP01.PACK.BAG1")
+
+        assert oee["rolling"]["planned_production_time"] == 5
+        assert oee["availability"] == 1.0
+        assert oee["is_currently_down"] is False
+
+    @pytest.mark.asyncio
+    async def test_counter_reset(self, engine):
+        """Test that a PLC counter reset does not produce negative parts."""
+        start = datetime(2024, 1, 1, 8, 0, 0)
+        for second, count in enumerate((100, 101, 2, 3)):
+            await engine.ingest("BP01.PACK.BAG1", sample(product_count=count), start + timedelta(seconds=second))
+
+        assert engine.get("BP01.PACK.BAG1")["rolling"]["total_parts"] == 2
+
+    @pytest.mark.asyncio
+    async def test_shift_totals_reset(self, engine):
+        """Test that shift totals restart at a shift boundary, including overnight shifts."""
+        engine._shifts = [(time(6, 0), time(18, 0), "day-shift"), (time(18, 0), time(6, 0), "night-shift")]
+        start = datetime(2024, 1, 1, 17, 59, 58)
+        for second in range(4):
+            await engine.ingest("BP01.PACK.BAG1", sample(product_count=second), start + timedelta(seconds=second))
+
+        oee = engine.get("BP01.PACK.BAG1")
+
+        assert oee["shift"]["shift_id"] == "night-shift"
+        assert oee["shift"]["shift_start"] == datetime(2024, 1, 1, 18, 0, 0)
+        assert oee["shift"]["total_parts"] == 1
+        assert oee["rolling"]["total_parts"] == 3
+        assert engine.resolve_shift(datetime(2024, 1, 2, 3, 0, 0)) == ("night-shift", datetime(2024, 1, 1, 18, 0, 0))
+
+    @pytest.mark.asyncio
+    async def test_publishes_on_change(self, engine):
+        """Test that unchanged OEE values are not republished."""
+        publisher = AsyncMock()
+        engine._publisher = publisher
+        start = datetime(2024, 1, 1, 8, 0, 0)
+
+        for second in range(5):
+            await engine.ingest("BP01.PACK.BAG1", sample(product_count=second), start + timedelta(seconds=second))
+
+        # The first sample and the first credited interval; steady state is not republished
+        assert publisher.await_count == 2
+        line_id, oee_data = publisher.await_args[0]
+        assert line_id == "line-1"
+        assert oee_data["oee"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_stale_samples_ignored(self, engine):
+        """Test that out-of-order samples do not move the state."""
+        start = datetime(2024, 1, 1, 8, 0, 0)
+        await engine.ingest("BP01.PACK.BAG1", sample(), start + timedelta(seconds=1))
+        await engine.ingest("BP01.PACK.BAG1", sample(running=False), start)
+
+        assert engine.get("BP01.PACK.BAG1")["running"] is True
+        assert engine.stats["stale_samples"] == 1
+
+    @pytest.mark.asyncio
+    async def test_get_unknown_or_stale_equipment(self, engine):
+        """Test reads for unknown equipment and with a maximum age."""
+        await engine.ingest("BP01.PACK.BAG1", sample(), datetime.utcnow() - timedelta(minutes=1))
+
+        assert engine.get("UNKNOWN") is None
+        assert engine.get("BP01.PACK.BAG1", max_age_seconds=10) is None
+        assert engine.get("BP01.PACK.BAG1", max_age_seconds=120) is not None
+
+
+class FakeRedis:
+    """Minimal async Redis hash."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+
+class TestSharedSnapshots:
+    """Tests for snapshots shared from the poller to other processes."""
+
+    @pytest.fixture
+    def engines(self):
+        """Create a polling engine and a reader engine sharing one Redis hash."""
+        poller, reader = StreamingOEEEngine(), StreamingOEEEngine()
+        poller.redis_client = reader.redis_client = FakeRedis()
+        poller.max_gap_seconds = 10
+        return poller, reader
+
+    @pytest.mark.asyncio
+    async def test_reader_sees_poller_snapshot(self, engines):
+        """Test that a process without samples reads the poller's snapshot."""
+        poller, reader = engines
+        start = datetime.utcnow() - timedelta(seconds=3)
+        for second in range(3):
+            await poller.ingest("BP01.PACK.BAG1", sample(product_count=second), start + timedelta(seconds=second))
+
+        shared = await reader.read("BP01.PACK.BAG1", max_age_seconds=10)
+
+        assert reader.get("BP01.PACK.BAG1") is None
+        assert shared["oee"] == poller.get("BP01.PACK.BAG1")["oee"]
+        assert shared["calculation_time"] == start + timedelta(seconds=2)
+        assert shared["rolling"]["total_parts"] == 2
+        assert await reader.read("UNKNOWN") is None
+
+    @pytest.mark.asyncio
+    async def test_shared_at_most_once_per_interval(self, engines):
+        """Test that the shared hash is written at most once per publish interval."""
+        poller, _ = engines
+        poller.publish_interval = 5
+        start = datetime(2024, 1, 1, 8, 0, 0)
+        for second in range(6):
+            await poller.ingest("BP01.PACK.BAG1", sample(product_count=second), start + timedelta(seconds=second))
+
+        assert poller.stats["shared_writes"] == 2
+
+    @pytest.mark.asyncio
+    async def test_real_time_oee_schema_matches_database_path(self, engines):
+        """Test that real-time OEE served from the shared snapshot has the database path's fields."""
+        poller, reader = engines
+        line_id = uuid4()
+        start = datetime.utcnow() - timedelta(seconds=3)
+        for second in range(3):
+            await poller.ingest(
+                "BP01.PACK.BAG1", sample(product_count=second, line_id=str(line_id)),
+                start + timedelta(seconds=second)
+            )
+
+        with patch("backend.app.services.oee_calculator.streaming_oee_engine", reader), \
+             patch("backend.app.services.oee_calculator.DowntimeTracker") as mock_tracker:
+            mock_tracker.return_value.get_active_downtime_event = AsyncMock(return_value=None)
+            mock_tracker.return_value.get_downtime_statistics = AsyncMock(return_value={"total_events": 0})
+            result = await OEECalculator.calculate_real_time_oee(line_id, "BP01.PACK.BAG1", {})
+            production_data = AsyncMock(return_value={
+                "planned_production_time": 3600, "actual_production_time": 3600, "ideal_cycle_time": 1.0,
+                "actual_cycle_time": 1.0, "good_parts": 3600, "total_parts": 3600
+            })
+            with patch.object(OEECalculator, "_get_production_data", production_data):
+                database_result = await OEECalculator.calculate_real_time_oee(uuid4(), "BP01.PACK.BAG1", {})
+
+        assert set(result) == set(database_result) == {
+            "line_id", "equipment_code", "calculation_time", "availability", "performance", "quality",
+            "oee", "planned_production_time", "actual_production_time", "ideal_cycle_time",
+            "actual_cycle_time", "good_parts", "total_parts", "current_downtime_event",
+            "downtime_statistics", "is_currently_down", "current_downtime_duration_seconds"
+        }
+        assert result["line_id"] == line_id
+        assert result["total_parts"] == 2
+        # Daily downtime statistics are opt-in and not queried by default
+        assert result["downtime_statistics"] is None
+        mock_tracker.return_value.get_downtime_statistics.assert_not_awaited()
+        # Equipment tracked on another line falls back to the database path
+        production_data.assert_awaited_once()
+        assert database_result["total_parts"] == 3600
+
+    @pytest.mark.asyncio
+    async def test_real_time_oee_downtime_from_engine(self, engines):
+        """Test that streamed real-time OEE takes downtime from the engine and state store only."""
+        poller, reader = engines
+        line_id = uuid4()
+        start = datetime.utcnow() - timedelta(seconds=3)
+        await poller.ingest("BP01.PACK.BAG1", sample(line_id=str(line_id)), start)
+        await poller.ingest(
+            "BP01.PACK.BAG1", sample(running=False, line_id=str(line_id)), start + timedelta(seconds=1)
+        )
+        await poller.ingest(
+            "BP01.PACK.BAG1", sample(running=False, line_id=str(line_id)), start + timedelta(seconds=3)
+        )
+        open_event = {"status": "open", "start_time": start + timedelta(seconds=1)}
+
+        with patch("backend.app.services.oee_calculator.streaming_oee_engine", poller), \
+             patch("backend.app.services.oee_calculator.DowntimeTracker") as mock_tracker, \
+             patch.object(OEECalculator, "_get_production_data", AsyncMock()) as production_data:
+            mock_tracker.return_value.get_active_downtime_event = AsyncMock(return_value=open_event)
+            mock_tracker.return_value.get_downtime_statistics = AsyncMock(return_value={"total_events": 1})
+            result = await OEECalculator.calculate_real_time_oee(line_id, "BP01.PACK.BAG1", {})
+            with_statistics = await OEECalculator.calculate_real_time_oee(
+                line_id, "BP01.PACK.BAG1", {}, include_downtime_statistics=True
+            )
+
+        production_data.assert_not_awaited()
+        assert result["is_currently_down"] is True
+        assert result["current_downtime_duration_seconds"] == 2
+        assert result["current_downtime_event"] == open_event
+        assert with_statistics["downtime_statistics"] == {"total_events": 1}
+        mock_tracker.return_value.get_downtime_statistics.assert_awaited_once()
+
+
+class TestRollingOEEWindow:
+    """Tests for RollingOEEWindow."""
+
+    def test_expires_old_buckets(self):
+        """Test that totals only cover the window."""
+        window = RollingOEEWindow(window_seconds=120, bucket_seconds=60)
+        start = datetime(2024, 1, 1, 8, 0, 0)
+
+        window.add(start, 60, 60, 10, 0)
+        window.add(start + timedelta(minutes=1), 60, 30, 5, 1)
+        assert window.totals.total_parts == 15
+
+        window.add(start + timedelta(minutes=2), 60, 0, 0, 0)
+        assert window.totals.total_parts == 5
+        assert window.totals.run_seconds == 30
+        assert window.totals.reject_parts == 1
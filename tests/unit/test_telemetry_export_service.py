@@ -0,0 +1,120 @@
+"""
+MS5.0 Floor Dashboard - Telemetry Export Service Unit Tests
+
+Tests export request validation, window splitting, query building and CSV
+streaming through the bounded queue.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import datetime, timedelta, timezone
+
+from backend.app.services.telemetry_export_service import TelemetryExportService
+from backend.app.services import telemetry_export_service as export_module
+
+
+class TestTelemetryExportService:
+    """Tests for TelemetryExportService."""
+
+    @pytest.fixture
+    def service(self):
+        """Create a TelemetryExportService instance."""
+        return TelemetryExportService()
+
+    def test_validate_request(self, service):
+        """Test rejecting unknown datasets, formats, filters and ranges."""
+        start = datetime(2024, 1, 1)
+
+        with pytest.raises(export_module.ValidationError):
+            service.validate_request("users", "csv", start, start + timedelta(days=1))
+        with pytest.raises(export_module.ValidationError):
+            service.validate_request("metric_hist", "xlsx", start, start + timedelta(days=1))
+        with pytest.raises(export_module.ValidationError):
+            service.validate_request("metric_hist", "csv", start, start)
+        with pytest.raises(export_module.ValidationError):
+            service.validate_request("metric_hist", "csv", start, start + timedelta(days=365))
+        with pytest.raises(export_module.ValidationError):
+            service.validate_request(
+                "metric_hist", "csv", start, start + timedelta(days=1), {"line_id": "x"}
+            )
+
+        service.validate_request(
+            "oee_calculations", "csv", start, start + timedelta(days=1), {"line_id": "x"}
+        )
+
+    def test_validate_request_mixed_timezones(self, service):
+        """Test that a naive start and an offset end are compared as UTC."""
+        start = datetime(2024, 1, 1, 8, 0)
+
+        with pytest.raises(export_module.ValidationError):
+            service.validate_request(
+                "metric_hist", "csv", start, datetime(2024, 1, 1, 9, 0, tzinfo=timezone(timedelta(hours=2)))
+            )
+        service.validate_request(
+            "metric_hist", "csv", start, datetime(2024, 1, 1, 11, 0, tzinfo=timezone(timedelta(hours=2)))
+        )
+
+    def test_iter_windows(self, service):
+        """Test splitting a range into consecutive windows."""
+        start = datetime(2024, 1, 1)
+        windows = list(service.iter_windows(start, start + timedelta(hours=60)))
+
+        assert windows[0] == (start, start + timedelta(hours=24))
+        assert windows[-1] == (start + timedelta(hours=48), start + timedelta(hours=60))
+        assert len(windows) == 3
+
+    def test_build_query(self, service):
+        """Test window predicates, filters and compression-ordered output."""
+        start = datetime(2024, 1, 1)
+        query, args = service.build_query(
+            "oee_calculations", start, start + timedelta(days=1), {"equipment_code": "BP01.PACK.BAG1"}
+        )
+
+        assert "oc.calculation_time >= $1 AND oc.calculation_time < $2" in query
+        assert "oc.equipment_code = $3" in query
+        assert query.endswith("ORDER BY oc.line_id, oc.calculation_time DESC")
+        assert args == [start, start + timedelta(days=1), "BP01.PACK.BAG1"]
+
+    @pytest.mark.asyncio
+    async def test_stream_csv(self, service):
+        """Test streaming CSV chunks from COPY for every window."""
+        async def copy_from_query(query, *args, output, format):
+            await output(f"{args[0].isoformat()}\n".encode())
+
+        connection = MagicMock()
+        connection.copy_from_query = AsyncMock(side_effect=copy_from_query)
+        connection.close = AsyncMock()
+
+        start = datetime(2024, 1, 1)
+        with patch(
+            "backend.app.services.telemetry_export_service.open_direct_connection",
+            AsyncMock(return_value=connection)
+        ):
+            chunks = [
+                chunk async for chunk in service.stream(
+                    "metric_hist", "csv", start, start + timedelta(days=2)
+                )
+            ]
+
+        assert chunks[0].startswith(b"equipment_code,metric_key,ts")
+        assert chunks[1:] == [b"2024-01-01T00:00:00\n", b"2024-01-02T00:00:00\n"]
+        assert connection.close.await_count == 1
+        assert service.stats["exports_completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_propagates_database_errors(self, service):
+        """Test that database failures end the stream with an error."""
+        connection = MagicMock()
+        connection.copy_from_query = AsyncMock(side_effect=RuntimeError("connection lost"))
+        connection.close = AsyncMock()
+
+        start = datetime(2024, 1, 1)
+        with patch(
+            "backend.app.services.telemetry_export_service.open_direct_connection",
+            AsyncMock(return_value=connection)
+        ):
+            with pytest.raises(RuntimeError):
+                async for _ in service.stream("metric_hist", "csv", start, start + timedelta(days=1)):
+                    pass
+
+        assert service.stats["exports_failed"] == 1
@@ -0,0 +1,113 @@
+"""
+MS5.0 Floor Dashboard - Time Range Predicate Unit Tests
+
+Tests the shared half-open time-range predicate builder and time_bucket
+expressions used by the analytics queries, and timestamp normalisation.
+"""
+
+import pytest
+from datetime import date, datetime, timedelta, timezone
+
+from backend.app.utils.time_range import (
+    day_range, time_range_predicate, time_bucket_expression, bucket_date, to_utc, to_naive_utc
+)
+
+
+class TestTimeRangePredicate:
+    """Tests for time_range_predicate."""
+
+    def test_date_bounds_are_half_open(self):
+        """Test that date bounds cover whole days with an exclusive end."""
+        conditions, params = time_range_predicate(
+            "de.start_time", date(2024, 1, 1), date(2024, 1, 31)
+        )
+
+        assert conditions == ["de.start_time >= :range_start", "de.start_time < :range_end"]
+        assert params == {
+            "range_start": datetime(2024, 1, 1, 0, 0, 0),
+            "range_end": datetime(2024, 2, 1, 0, 0, 0)
+        }
+
+    def test_datetime_bounds_are_used_as_given(self):
+        """Test that datetime bounds are not widened."""
+        end = datetime(2024, 1, 1, 12, 30, 0)
+        _, params = time_range_predicate("reported_at", datetime(2024, 1, 1, 8, 0, 0), end)
+
+        assert params["range_end"] == end
+
+    def test_open_ended_ranges(self):
+        """Test omitting either bound."""
+        conditions, params = time_range_predicate("reported_at", start=date(2024, 1, 1))
+        assert conditions == ["reported_at >= :range_start"]
+        assert "range_end" not in params
+
+        conditions, params = time_range_predicate("reported_at")
+        assert conditions == []
+        assert params == {}
+
+    def test_param_prefix(self):
+        """Test custom parameter names for queries with several ranges."""
+        conditions, params = time_range_predicate(
+            "reported_at", date(2024, 1, 1), date(2024, 1, 2), param_prefix="prev"
+        )
+
+        assert conditions == ["reported_at >= :prev_start", "reported_at < :prev_end"]
+        assert set(params) == {"prev_start", "prev_end"}
+
+    def test_rejects_expressions(self):
+        """Test that only plain column names are accepted."""
+        with pytest.raises(ValueError):
+            time_range_predicate("DATE(start_time)", date(2024, 1, 1))
+
+        with pytest.raises(ValueError):
+            time_range_predicate("start_time; DROP TABLE x", date(2024, 1, 1))
+
+    def test_day_range_single_day(self):
+        """Test a single-day range."""
+        assert day_range(date(2024, 3, 10)) == (
+            datetime(2024, 3, 10, 0, 0, 0),
+            datetime(2024, 3, 11, 0, 0, 0)
+        )
+
+
+class TestTimeBucketExpression:
+    """Tests for time_bucket_expression and bucket_date."""
+
+    def test_bucket_expression(self):
+        """Test building a time_bucket grouping expression."""
+        assert time_bucket_expression("reported_at") == "time_bucket(INTERVAL '1 day', reported_at)"
+        assert time_bucket_expression("de.start_time", "15 minutes") == (
+            "time_bucket(INTERVAL '15 minutes', de.start_time)"
+        )
+
+    def test_rejects_invalid_bucket(self):
+        """Test that bucket widths are validated."""
+        with pytest.raises(ValueError):
+            time_bucket_expression("reported_at", "1 day'); --")
+
+    def test_bucket_date(self):
+        """Test converting daily bucket timestamps to dates."""
+        assert bucket_date(datetime(2024, 1, 5, 0, 0, 0)) == date(2024, 1, 5)
+        assert bucket_date(date(2024, 1, 5)) == date(2024, 1, 5)
+
+
+class TestTimestampNormalisation:
+    """Tests for to_utc and to_naive_utc."""
+
+    def test_to_utc(self):
+        """Test that naive, offset and ISO timestamps become aware UTC."""
+        expected = datetime(2024, 1, 5, 8, 0, 0, tzinfo=timezone.utc)
+        offset = timezone(timedelta(hours=2))
+
+        assert to_utc(datetime(2024, 1, 5, 8, 0, 0)) == expected
+        assert to_utc(datetime(2024, 1, 5, 10, 0, 0, tzinfo=offset)).tzinfo == timezone.utc
+        assert to_utc("2024-01-05T08:00:00") == expected
+        assert to_utc(None) is None
+
+    def test_to_naive_utc(self):
+        """Test that aware timestamps are converted to UTC before dropping the offset."""
+        offset = timezone(timedelta(hours=2))
+
+        assert to_naive_utc(datetime(2024, 1, 5, 10, 0, 0, tzinfo=offset)) == datetime(2024, 1, 5, 8, 0, 0)
+        assert to_naive_utc(datetime(2024, 1, 5, 8, 0, 0)) == datetime(2024, 1, 5, 8, 0, 0)
+        assert to_naive_utc(None) is None